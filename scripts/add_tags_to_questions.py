@@ -5,10 +5,15 @@ Tags are extracted from AWS concepts and best practices for future use
 """
 
 import json
+import sys
 from pathlib import Path
 from typing import Dict, Any, List
 
-ANALYSIS_FILE = "analysis_output.json"
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.analysis_store import ANALYSIS_DIR, AnalysisStore
+from utils.question_utils import get_question_fingerprint
+
 QUESTIONS_FILE = "questions/test2.json"
 BACKUP_SUFFIX = ".backup"
 
@@ -21,7 +26,7 @@ def get_question_key(question: Dict[str, Any]) -> str:
         test_key = question.get("testKey", "test2")
         return f"{test_key}-q{question['id']}"
     else:
-        return str(hash(question.get("text", "")) % (10**10))
+        return f"q-{get_question_fingerprint(question)}"
 
 
 def extract_tags_from_analysis(gemini_analysis: Dict[str, Any]) -> List[str]:
@@ -47,14 +52,14 @@ def extract_tags_from_analysis(gemini_analysis: Dict[str, Any]) -> List[str]:
     return sorted(list(set(tags)))
 
 
-def add_tags_to_questions(analysis_file: str, questions_file: str):
+def add_tags_to_questions(analysis_dir: str, questions_file: str):
     """Add tags to questions based on Gemini analysis"""
 
-    # Load analysis
-    print(f"📂 Loading analysis from {analysis_file}...")
-    with open(analysis_file, "r", encoding="utf-8") as f:
-        analysis_data = json.load(f)
-    print(f"✓ Loaded {len(analysis_data)} analyses\n")
+    # Open the analysis store (shards are read only for the tests whose entries are used)
+    print(f"📂 Opening analysis store {analysis_dir}/...")
+    analysis_data = AnalysisStore(analysis_dir)
+    print(f"✓ {len(analysis_data)} analyses\n")
+    analysis_index = analysis_data.content_index()
 
     # Load questions
     print(f"📂 Loading questions from {questions_file}...")
@@ -83,6 +88,11 @@ def add_tags_to_questions(analysis_file: str, questions_file: str):
                 if alt_key in analysis_data:
                     analysis_entry = analysis_data[alt_key]
                     break
+        if not analysis_entry:
+            # Match by content (survives ID changes)
+            content_key = analysis_index.lookup(question)
+            if content_key is not None:
+                analysis_entry = analysis_data[content_key]
 
         if analysis_entry and "analysis" in analysis_entry:
             # Extract tags from analysis
@@ -122,4 +132,4 @@ def add_tags_to_questions(analysis_file: str, questions_file: str):
 
 
 if __name__ == "__main__":
-    add_tags_to_questions(ANALYSIS_FILE, QUESTIONS_FILE)
+    add_tags_to_questions(ANALYSIS_DIR, QUESTIONS_FILE)
@@ -2,14 +2,26 @@
 """
 Question analysis script using Google Gemini 2.0 Flash API
 Uses gemini-2.0-flash for ultra-fast analysis with checkpointing and resume capability
+
+Usage:
+    python analyze_questions_gemini.py                 # one request at a time
+    python analyze_questions_gemini.py --async [--concurrency 8] [--rpm 1000] [--tpm 1000000]
+    python analyze_questions_gemini.py --batch-size 5    # several questions per request
+    python analyze_questions_gemini.py --mock            # offline, against the local mock model
+    python analyze_questions_gemini.py --stream          # validate responses while they stream in
+    python analyze_questions_gemini.py --priority --max-requests 200   # weakest explanations first
+    python analyze_questions_gemini.py --plan            # requests, tokens, time and cost; sends nothing
 """
 
+import argparse
+import asyncio
 import json
+import signal
+import statistics
 import time
-import os
 import sys
 from pathlib import Path
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Set, Tuple
 
 # Import shared utilities
 sys.path.insert(0, str(Path(__file__).parent))
@@ -17,8 +29,26 @@ from utils.question_utils import (
     find_test_files,
     load_questions_file,
     save_questions_file,
+    get_question_fingerprint,
+    get_project_root,
     get_questions_dir,
+    split_explanation_sections,
 )
+from utils.analysis_index import AnalysisIndex
+from utils.analysis_log import AnalysisLog, replay_analysis_log
+from utils.analysis_store import ANALYSIS_DIR, AnalysisStore
+from utils.batching import BATCH_ITEM_KEY, chunked, split_batch_items
+from utils.client_pool import ClientPool, PoolExhaustedError, create_gemini_client, load_api_keys
+from utils.llm_cache import CacheMissError, CachedModel, ResponseCache, make_cache_key
+from utils.mock_model import MOCK_MODEL_NAME, MockGeminiModel
+from utils.rate_limit import CHARS_PER_TOKEN, RateLimiter, estimate_tokens
+from utils.request_groups import group_duplicates, request_key
+from utils.retry import RetryController, classify_error
+from utils.scheduler import PriorityScheduler, RequestCounter, WorkBudget
+from utils.stream_json import MalformedResponseError, StreamingJSONValidator
+from utils.telemetry import TELEMETRY_FILE, Telemetry, estimate_cost, load_telemetry, telemetry_labels
+from fix_domains_gemini import VALID_DOMAINS
+from verify_gemini_explanations import is_generic_explanation
 
 try:
     import google.generativeai as genai  # type: ignore
@@ -43,16 +73,70 @@ except ImportError:
 
 # Configuration - Optimized Speed 🏎️
 INPUT_FILES = None  # None = auto-detect all test*.json files, or specify list like ["questions/test2.json", "questions/test3.json"]
-OUTPUT_FILE = "analysis_output.json"
+OUTPUT_DIR = ANALYSIS_DIR  # Analysis store, one shard per test (utils/analysis_store.py)
+LOG_FILE = "analysis_output.jsonl"  # Append-only checkpoint log, compacted into OUTPUT_DIR
+MOCK_OUTPUT_DIR = "mock_analysis"  # --mock results (never mixed with real ones)
+MOCK_LOG_FILE = "mock_analysis_output.jsonl"
+COPIED_FROM_FIELD = "copied_from"  # Key of the identical question an entry's analysis was requested for
+MOCK_TELEMETRY_FILE = "mock_gemini_telemetry.ndjson"
 MODEL_NAME = "gemini-2.0-flash"  # Latest Gemini 2.0 Flash model
 
 RATE_LIMIT_DELAY = 2.0  # Delay between requests (seconds)
 RETRY_BASE_DELAY = 5  # Base delay for exponential backoff (seconds)
-MAX_RETRIES = 10  # Maximum number of retries
-BATCH_SAVE_SIZE = 5  # Save after every N questions
+RETRY_MAX_DELAY = 60  # Cap for a single backoff delay (seconds)
+MAX_RETRIES = 10  # Maximum attempts per request
+QUESTION_RETRY_BUDGET = 300  # Give up on a question after this many seconds of retrying
+CIRCUIT_BREAKER_THRESHOLD = 5  # Consecutive server errors that pause all requests
+CIRCUIT_BREAKER_COOLDOWN = 60  # Seconds to pause once the circuit opens
+BATCH_SAVE_SIZE = 5  # Fsync the checkpoint log after every N questions
 MAX_QUESTIONS = (
     None  # Set to a number to limit processing (e.g., 5 for testing), None for all
 )
+BATCH_SIZE = 1  # Questions per request (--batch-size); failed items are retried one at a time
+STREAM_RESPONSES = False  # Validate responses chunk by chunk as they stream in (--stream)
+
+# Expected type of each analysis field; malformed responses are retried, never stored
+ANALYSIS_FIELD_TYPES = {
+    "analysis": str,
+    "correct_explanations": dict,
+    "incorrect_explanations": dict,
+    "aws_concepts": list,
+    "best_practices": list,
+    "key_takeaways": str,
+}
+
+# Priority mode (--priority): questions most in need of a better explanation go first
+MISSING_EXPLANATION_MARKER = "Explanation not available"
+PRIORITY_MISSING_EXPLANATION = 100  # No explanation, or the placeholder text
+PRIORITY_GENERIC_EXPLANATION = 50  # Flagged by verify_gemini_explanations.is_generic_explanation
+PRIORITY_SHORT_EXPLANATION = 20  # Shorter than SHORT_EXPLANATION_CHARS
+PRIORITY_UNEXPLAINED_OPTION = 5  # Per option without a "**Why option N" section
+PRIORITY_MISSING_DOMAIN = 10  # No valid SAA-C03 domain
+PRIORITY_MISSING_TAGS = 5
+SHORT_EXPLANATION_CHARS = 400
+
+# Async mode (--async): requests run concurrently under a shared token bucket
+CONCURRENCY = 8  # Maximum in-flight requests
+REQUESTS_PER_MINUTE = 1000  # Match your API quota tier
+TOKENS_PER_MINUTE = 1_000_000  # Match your API quota tier
+ESTIMATED_OUTPUT_TOKENS = 1000  # Response size reserved per request in the TPM bucket
+
+# Run plan (--plan): response time per question when the telemetry has no measurements yet
+ESTIMATED_SECONDS_PER_QUESTION = 6.0
+
+# Response cache shared with the other Gemini scripts (--no-cache to bypass)
+CACHE_DIR = get_project_root() / ".llm_cache"
+CACHE_MAX_MB = 500
+
+GENERATION_CONFIG = {
+    "temperature": 0.3,
+    "top_p": 0.95,
+    "top_k": 40,
+}
+
+# Shared by all requests of a run (see get_retry_controller and get_telemetry)
+_retry_controller: Optional[RetryController] = None
+_telemetry: Optional[Telemetry] = None
 
 
 def load_questions(file_path: str) -> List[Dict[str, Any]]:
@@ -76,88 +160,58 @@ def find_all_test_files(questions_dir: str = "questions") -> List[str]:
     return [str(f) for f in test_files]
 
 
+def get_input_files() -> List[str]:
+    """Test files to analyze: INPUT_FILES, or every test*.json in the questions directory"""
+    if INPUT_FILES is None:
+        return find_all_test_files()
+    return INPUT_FILES if isinstance(INPUT_FILES, list) else [INPUT_FILES]
+
+
 def load_existing_output(
-    file_path: str,
-) -> Tuple[Dict[str, Any], Set[str], Dict[str, str]]:  # type: ignore
+    output_dir: str,
+    log_path: Optional[str] = None,
+) -> Tuple[AnalysisStore, Set[str], AnalysisIndex]:  # type: ignore
     """
-    Load existing output and return the full data, processed question IDs, and question text map.
-    Returns: (output_dict, processed_ids_set, question_text_map)
-    question_text_map: maps question text hash to question ID for matching
+    Open the analysis store and return it, the processed question IDs, and the content index.
+    Results in the checkpoint log (if given) are replayed on top of the store (in memory).
+    Returns: (store, processed_ids_set, analysis_index)
+    analysis_index: matches questions to entries by content fingerprint (stable across runs)
+
+    Raises:
+        ValueError: If an unmigrated analysis_output.json sits next to the store
     """
-    if not os.path.exists(file_path):
-        return {}, set(), {}
+    store = AnalysisStore(output_dir)
+    legacy = store.legacy_file()
+    if legacy is not None:
+        raise ValueError(f"{legacy} has not been migrated; run migrate_analysis_store.py first")
 
-    try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            data: Any = json.load(f)
-
-        # Extract processed question IDs and create text hash map
-        processed_ids: Set[str] = set()
-        output_dict: Dict[str, Any] = {}
-        question_text_map: Dict[str, str] = {}  # text_hash -> question_id
-
-        if isinstance(data, dict):
-            # If it's a dict with question keys
-            processed_ids = set(data.keys())
-            output_dict = data
-            # Build text hash map for matching
-            for q_id, entry in data.items():
-                if isinstance(entry, dict):
-                    question_text = entry.get("question_text", "")
-                    if question_text:
-                        text_hash = str(hash(question_text) % (10**10))
-                        question_text_map[text_hash] = q_id
-        elif isinstance(data, list):
-            # If it's a list of question objects - convert to dict
-            for item in data:
-                if isinstance(item, dict):
-                    q_id = item.get("question_id") or item.get("id")
-                    if q_id is not None:
-                        q_id_str = str(q_id)
-                        processed_ids.add(q_id_str)
-                        output_dict[q_id_str] = item
-                        # Build text hash map
-                        question_text = item.get("question_text", "")
-                        if question_text:
-                            text_hash = str(hash(question_text) % (10**10))
-                            question_text_map[text_hash] = q_id_str
-
-        return output_dict, processed_ids, question_text_map
-    except (json.JSONDecodeError, FileNotFoundError) as e:
-        print(f"⚠️  Warning: Could not load existing output: {e}")
-        return {}, set(), {}
-
-
-def save_output_json(data: Dict[str, Any], file_path: str):
-    """Save output to JSON file (full rewrite)"""
-    path = Path(file_path)
-    # Use shared utility but handle dict data (not list of questions)
-    # Create backup before writing
-    if path.exists():
-        backup_path = path.with_suffix(".json.backup")
-        try:
-            import shutil
+    if log_path:
+        logged = replay_analysis_log(Path(log_path))
+        if logged:
+            print(f"✓ Replayed {len(logged)} results from checkpoint log {log_path}")
+        store.update(logged)
 
-            shutil.copy2(path, backup_path)
-        except Exception:
-            pass
+    return store, set(store), store.content_index()
 
-    # Write atomically using temp file
-    temp_path = path.with_suffix(".json.tmp")
+
+def finalize_output(log_path: str, output_dir: str):
+    """Compact the checkpoint log into the analysis store (only the shards it touches are rewritten)"""
     try:
-        with open(temp_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        temp_path.replace(path)  # Atomic replace
-    except Exception as e:
-        print(f"❌ Error saving output: {e}")
-        if temp_path.exists():
-            temp_path.unlink()
-        raise
+        stats = AnalysisStore(output_dir).compact_log(Path(log_path), truncate=True)
+    except (OSError, ValueError, json.JSONDecodeError) as e:
+        print(f"❌ Error compacting {log_path} into {output_dir}: {e}")
+        print(f"   Results are safe in {log_path}; run compact_analysis_log.py to retry")
+        return
+    if stats:
+        print(
+            f"💾 Compacted {stats['logged']} new result(s) into {output_dir} "
+            f"({stats['shards']} shard(s) written, {stats['total']} total)"
+        )
 
 
 def get_question_id(question: Dict[str, Any], test_key: Optional[str] = None) -> str:
     """Get unique identifier for a question in testX-qY format"""
-    # Priority: uniqueId (if in testX-qY format) > id with test context > hash of text
+    # Priority: uniqueId (if in testX-qY format) > id with test context > content fingerprint
     if "uniqueId" in question:
         unique_id = str(question["uniqueId"])
         # If uniqueId is already in testX-qY format, use it
@@ -175,25 +229,32 @@ def get_question_id(question: Dict[str, Any], test_key: Optional[str] = None) ->
         # If no test_key, use numeric ID (shouldn't happen in normal operation)
         return str(question["id"])
     else:
-        # Fallback: hash of question text (shouldn't happen in normal operation)
-        return str(hash(question.get("text", "")) % (10**10))
-
-
-def analyze_question_with_retry(
-    question: Dict[str, Any], model
-) -> Optional[Dict[str, Any]]:
-    """Analyze question with exponential backoff retry logic"""
+        # Fallback: stable content fingerprint (shouldn't happen in normal operation)
+        return f"q-{get_question_fingerprint(question)}"
 
-    # Build comprehensive prompt
-    prompt = f"""You are an expert AWS Solutions Architect. Analyze the following AWS SAA-C03 exam question in detail.
 
-Question: {question.get("text", "")}
+def format_question_details(question: Dict[str, Any]) -> str:
+    """Question text, marked options, domain and correct answers as shown in prompts"""
+    details = f"""Question: {question.get("text", "")}
 
 Options:
 """
     for i, opt in enumerate(question.get("options", [])):
         marker = "✓ CORRECT" if opt.get("correct", False) else ""
-        prompt += f"{i}. {opt.get('text', '')} {marker}\n"
+        details += f"{i}. {opt.get('text', '')} {marker}\n"
+
+    details += f"""
+Domain: {question.get("domain", "Unknown")}
+Correct Answer(s): {question.get("correctAnswers", [])}
+"""
+    return details
+
+
+def build_analysis_prompt(question: Dict[str, Any]) -> str:
+    """Build the analysis prompt for a question"""
+    prompt = f"""You are an expert AWS Solutions Architect. Analyze the following AWS SAA-C03 exam question in detail.
+
+{format_question_details(question)}"""
 
     correct_answers = question.get("correctAnswers", [])
 
@@ -206,9 +267,6 @@ Options:
     )
 
     prompt += f"""
-Domain: {question.get("domain", "Unknown")}
-Correct Answer(s): {correct_answers}
-
 Provide a detailed analysis in JSON format with the following structure:
 {{
     "analysis": "Comprehensive analysis of the question and scenario",
@@ -232,9 +290,85 @@ IMPORTANT:
 
 Return ONLY valid JSON, no markdown formatting or code blocks.
 """
+    return prompt
+
+
+def build_batch_analysis_prompt(questions: List[Dict[str, Any]]) -> str:
+    """Build one prompt analyzing several questions, answered as a JSON array"""
+    count = len(questions)
+    prompt = f"""You are an expert AWS Solutions Architect. Analyze each of the following {count} AWS SAA-C03 exam questions in detail.
+"""
+    for item, question in enumerate(questions, 1):
+        prompt += f"\n=== ITEM {item} ===\n{format_question_details(question)}"
 
-    # Configure safety settings to allow security exam questions
-    # Set all harm categories to BLOCK_NONE to prevent false positives
+    prompt += f"""
+Provide the analyses as a JSON array with exactly {count} objects, one per item, in item order.
+Each object must have the following structure:
+{{
+    "{BATCH_ITEM_KEY}": 1,
+    "analysis": "Comprehensive analysis of the question and scenario",
+    "correct_explanations": {{
+        "<correct option number>": "Detailed explanation of why this option is correct..."
+    }},
+    "incorrect_explanations": {{
+        "<incorrect option number>": "Explanation of why this option is incorrect"
+    }},
+    "aws_concepts": ["List of relevant AWS concepts and services"],
+    "best_practices": ["List of AWS best practices relevant to this question"],
+    "key_takeaways": "Key learning points from this question"
+}}
+
+IMPORTANT:
+- "{BATCH_ITEM_KEY}" is the item number the object answers.
+- Provide a separate explanation for EACH of the item's Correct Answer(s) in its "correct_explanations" object, keyed by option number.
+- Each explanation should focus specifically on why THAT particular option is correct.
+- Do NOT include phrases like "Option 1 is correct because..." or "Option X" in the explanation text - just explain why it's correct directly.
+- Start explanations directly with the reasoning (e.g., "This is correct because..." or "This solution addresses the requirement by...").
+
+Return ONLY a valid JSON array, no markdown formatting or code blocks.
+"""
+    return prompt
+
+
+def check_analysis(question: Dict[str, Any], analysis: Any) -> Optional[str]:
+    """
+    Check an analysis against the expected schema and its question.
+    Requiring an explanation for every correct answer also catches answers
+    the model attached to the wrong item of a batch.
+
+    Returns:
+        Description of the first problem found, or None if the analysis is valid
+    """
+    if not isinstance(analysis, dict):
+        return f"expected a JSON object, got {type(analysis).__name__}"
+    for field, expected_type in ANALYSIS_FIELD_TYPES.items():
+        if field in analysis and not isinstance(analysis[field], expected_type):
+            return f"field '{field}' should be a {expected_type.__name__}"
+    if not isinstance(analysis.get("analysis"), str) or not analysis["analysis"].strip():
+        return "missing 'analysis'"
+    correct_explanations = analysis.get("correct_explanations")
+    if not isinstance(correct_explanations, dict):
+        return "missing 'correct_explanations'"
+    missing = {str(ans) for ans in question.get("correctAnswers", [])} - set(correct_explanations)
+    if missing:
+        return f"no explanation for correct answer(s) {', '.join(sorted(missing))}"
+    return None
+
+
+def validate_batch_analysis(
+    question: Dict[str, Any], analysis: Dict[str, Any]
+) -> Optional[Dict[str, Any]]:
+    """Check one item of a batched response against its question (see check_analysis)"""
+    if check_analysis(question, analysis) is not None:
+        return None
+    return analysis
+
+
+def get_safety_settings() -> List[Dict[str, Any]]:
+    """
+    Configure safety settings to allow security exam questions
+    Set all harm categories to BLOCK_NONE to prevent false positives
+    """
     safety_settings = []
     if (
         genai
@@ -259,146 +393,1035 @@ Return ONLY valid JSON, no markdown formatting or code blocks.
                 "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
             },
         ]
+    return safety_settings
+
+
+def get_retry_controller() -> RetryController:
+    """Retry controller shared by every request of this run"""
+    global _retry_controller
+    if _retry_controller is None:
+        _retry_controller = RetryController(
+            base_delay=RETRY_BASE_DELAY,
+            max_delay=RETRY_MAX_DELAY,
+            max_attempts=MAX_RETRIES,
+            question_budget=QUESTION_RETRY_BUDGET,
+            breaker_threshold=CIRCUIT_BREAKER_THRESHOLD,
+            breaker_cooldown=CIRCUIT_BREAKER_COOLDOWN,
+            no_retry=(CacheMissError, PoolExhaustedError),
+        )
+    return _retry_controller
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = model.generate_content(
-                prompt,
-                generation_config={
-                    "temperature": 0.3,
-                    "top_p": 0.95,
-                    "top_k": 40,
-                },
-                safety_settings=safety_settings,
-            )
 
-            # Extract JSON from response
-            response_text = response.text.strip()
-
-            # Remove markdown code blocks if present
-            if response_text.startswith("```json"):
-                response_text = response_text[7:]
-            elif response_text.startswith("```"):
-                response_text = response_text[3:]
-
-            if response_text.endswith("```"):
-                response_text = response_text[:-3]
-
-            response_text = response_text.strip()
-
-            # Parse JSON
-            try:
-                analysis = json.loads(response_text)
-                return analysis
-            except json.JSONDecodeError as e:
-                # If JSON parsing fails, return raw response with error flag
-                return {
-                    "raw_response": response_text,
-                    "analysis": response_text[:500],  # Truncate for storage
-                    "error": f"JSON parse error: {str(e)}",
-                    "aws_concepts": [],
-                    "best_practices": [],
-                }
+def get_telemetry() -> Telemetry:
+    """Per-request telemetry of this run (records nothing until main() enables it)"""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry(None, "analyze", MODEL_NAME)
+    return _telemetry
 
-        except Exception as e:
-            error_str = str(e)
-            error_code = getattr(e, "status_code", None)
-
-            # Check for rate limit or quota errors
-            is_rate_limit = (
-                "429" in error_str
-                or "ResourceExhausted" in error_str
-                or "quota" in error_str.lower()
-                or error_code == 429
-            )
 
-            # Check for server errors
-            is_server_error = (
-                "500" in error_str
-                or "503" in error_str
-                or "502" in error_str
-                or error_code in [500, 502, 503]
-            )
+def _failure_class(error: Exception) -> str:
+    return "cache_miss" if isinstance(error, CacheMissError) else classify_error(error)
 
-            if (is_rate_limit or is_server_error) and attempt < MAX_RETRIES - 1:
-                # Exponential backoff: 2^attempt * base_delay
-                wait_time = RETRY_BASE_DELAY * (2**attempt)
-                error_type = "Rate limit" if is_rate_limit else "Server error"
-                print(
-                    f"\n⚠️  {error_type} hit. Waiting {wait_time}s before retry {attempt + 1}/{MAX_RETRIES}..."
-                )
-                time.sleep(wait_time)
-                continue
+
+def _generation_kwargs() -> Dict[str, Any]:
+    kwargs = {"generation_config": GENERATION_CONFIG, "safety_settings": get_safety_settings()}
+    if STREAM_RESPONSES:
+        kwargs["stream"] = True
+    return kwargs
+
+
+def _forget_response(model, prompt: str, kwargs: Dict[str, Any]):
+    """Drop a rejected response from the response cache so a retry does not replay it"""
+    invalidate = getattr(model, "invalidate", None)
+    if invalidate is not None:
+        invalidate(prompt, **kwargs)
+
+
+def _check_result(result: Any, check: Optional[Callable[[Any], Optional[str]]]) -> Any:
+    problem = check(result) if check is not None else None
+    if problem:
+        raise MalformedResponseError(f"Malformed response: {problem}")
+    return result
+
+
+def request_json(
+    prompt: str,
+    model,
+    root: type = dict,
+    check: Optional[Callable[[Any], Optional[str]]] = None,
+    retry_malformed: bool = True,
+    kind: str = "analysis",
+    items: int = 1,
+) -> Optional[Any]:
+    """
+    Request a JSON document through the shared retry controller.
+
+    The response is validated inside the retried call: chunk by chunk as it
+    arrives with STREAM_RESPONSES (a bad response is abandoned early), or once
+    complete otherwise. A malformed response (invalid JSON, wrong field types
+    or rejected by check) is dropped from the cache and retried like a failed
+    request, unless retry_malformed is False.
+
+    Args:
+        prompt: Prompt to send
+        model: Gemini model
+        root: Expected top-level type (dict or list)
+        check: Optional schema check returning a problem description or None
+        retry_malformed: Retry malformed responses (False returns None for them)
+        kind: Request kind recorded in the telemetry
+        items: Questions in the prompt (for the telemetry)
+
+    Returns:
+        The parsed document, or None if the request failed for good (or is
+        not cached in --cache-only mode)
+    """
+    kwargs = _generation_kwargs()
+    call = get_telemetry().call(kind, prompt, items)
+
+    def attempt() -> Any:
+        validator = StreamingJSONValidator(root, ANALYSIS_FIELD_TYPES)
+        attempt_started = time.monotonic()
+        response = model.generate_content(prompt, **kwargs)
+        try:
+            if STREAM_RESPONSES:
+                for chunk in response:
+                    validator.feed(chunk.text)
+                    response = chunk  # The last chunk carries the usage metadata
+            else:
+                validator.feed(response.text)
+            call.received(attempt_started, validator.text, response)
+            return _check_result(validator.finish(), check)
+        except MalformedResponseError as e:
+            call.received(attempt_started, validator.text, response)
+            _forget_response(model, prompt, kwargs)
+            if retry_malformed:
+                raise
+            print(f"\n⚠️  {e}")
+            return None
+
+    try:
+        result = get_retry_controller().call(attempt, trace=call.trace)
+    except Exception as e:
+        call.finish(_failure_class(e))
+        return None  # The controller already reported why
+    call.finish(None if result is not None else "malformed")
+    return result
+
+
+async def request_json_async(
+    prompt: str,
+    model,
+    limiter: RateLimiter,
+    request_tokens: int,
+    root: type = dict,
+    check: Optional[Callable[[Any], Optional[str]]] = None,
+    retry_malformed: bool = True,
+    kind: str = "analysis",
+    items: int = 1,
+) -> Optional[Any]:
+    """Async variant of request_json() that waits on the shared rate limiter per attempt"""
+    kwargs = _generation_kwargs()
+    call = get_telemetry().call(kind, prompt, items)
+
+    async def attempt() -> Any:
+        queued = time.monotonic()
+        await limiter.acquire_async(request_tokens)
+        call.queued(time.monotonic() - queued)
+        validator = StreamingJSONValidator(root, ANALYSIS_FIELD_TYPES)
+        attempt_started = time.monotonic()
+        response = await model.generate_content_async(prompt, **kwargs)
+        try:
+            if STREAM_RESPONSES:
+                async for chunk in response:
+                    validator.feed(chunk.text)
+                    response = chunk  # The last chunk carries the usage metadata
             else:
-                if attempt == MAX_RETRIES - 1:
-                    print(f"\n❌ Max retries reached. Error: {error_str}")
-                    return None
-                # For other errors, retry with shorter delay
-                wait_time = RETRY_BASE_DELAY
-                print(
-                    f"\n⚠️  Error: {error_str[:100]}. Waiting {wait_time}s before retry {attempt + 1}/{MAX_RETRIES}..."
+                validator.feed(response.text)
+            call.received(attempt_started, validator.text, response)
+            return _check_result(validator.finish(), check)
+        except MalformedResponseError as e:
+            call.received(attempt_started, validator.text, response)
+            _forget_response(model, prompt, kwargs)
+            if retry_malformed:
+                raise
+            print(f"\n⚠️  {e}")
+            return None
+
+    try:
+        result = await get_retry_controller().call_async(attempt, trace=call.trace)
+    except Exception as e:
+        call.finish(_failure_class(e))
+        return None  # The controller already reported why
+    call.finish(None if result is not None else "malformed")
+    return result
+
+
+def analyze_question_with_retry(
+    question: Dict[str, Any], model
+) -> Optional[Dict[str, Any]]:
+    """Analyze question, retrying failed requests and malformed responses"""
+    return request_json(
+        build_analysis_prompt(question),
+        model,
+        check=lambda analysis: check_analysis(question, analysis),
+    )
+
+
+async def analyze_question_async(
+    question: Dict[str, Any], model, limiter: RateLimiter
+) -> Optional[Dict[str, Any]]:
+    """Async variant of analyze_question_with_retry() that waits on the shared rate limiter"""
+    prompt = build_analysis_prompt(question)
+    request_tokens = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS
+    return await request_json_async(
+        prompt,
+        model,
+        limiter,
+        request_tokens,
+        check=lambda analysis: check_analysis(question, analysis),
+    )
+
+
+def _split_batch_analysis(
+    items: Optional[List[Any]], questions: List[Dict[str, Any]]
+) -> Dict[int, Dict[str, Any]]:
+    """Validated analyses by position in the batch"""
+    if items is None:
+        return {}
+    return split_batch_items(
+        items,
+        len(questions),
+        lambda position, obj: validate_batch_analysis(questions[position], obj),
+    )
+
+
+def analyze_batch_with_retry(
+    questions: List[Dict[str, Any]], model
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Analyze several questions in one request.
+
+    Returns:
+        Analyses by position in questions. Positions missing from the result
+        failed validation and should be retried one question at a time.
+    """
+    # A malformed batch is not retried: its questions fall back to single requests
+    items = request_json(
+        build_batch_analysis_prompt(questions),
+        model,
+        root=list,
+        retry_malformed=False,
+        kind="analysis_batch",
+        items=len(questions),
+    )
+    return _split_batch_analysis(items, questions)
+
+
+async def analyze_batch_async(
+    questions: List[Dict[str, Any]], model, limiter: RateLimiter
+) -> Dict[int, Dict[str, Any]]:
+    """Async variant of analyze_batch_with_retry() that waits on the shared rate limiter"""
+    prompt = build_batch_analysis_prompt(questions)
+    request_tokens = estimate_tokens(prompt) + ESTIMATED_OUTPUT_TOKENS * len(questions)
+    items = await request_json_async(
+        prompt,
+        model,
+        limiter,
+        request_tokens,
+        root=list,
+        retry_malformed=False,
+        kind="analysis_batch",
+        items=len(questions),
+    )
+    return _split_batch_analysis(items, questions)
+
+
+def score_question(question: Dict[str, Any]) -> Tuple[int, List[str]]:
+    """
+    Score how much a question needs a new analysis (higher = more urgent).
+
+    Returns:
+        Tuple of (priority, reasons); reasons name the checks that added to it
+    """
+    explanation = question.get("explanation") or ""
+    score = 0
+    reasons = []
+    if not explanation.strip() or MISSING_EXPLANATION_MARKER in explanation:
+        score += PRIORITY_MISSING_EXPLANATION
+        reasons.append("missing explanation")
+    else:
+        if is_generic_explanation(explanation):
+            score += PRIORITY_GENERIC_EXPLANATION
+            reasons.append("generic explanation")
+        if len(explanation) < SHORT_EXPLANATION_CHARS:
+            score += PRIORITY_SHORT_EXPLANATION
+            reasons.append("short explanation")
+        explained = {option_id for option_id, _, _ in split_explanation_sections(explanation)}
+        unexplained = [
+            option for option in question.get("options", []) if option.get("id") not in explained
+        ]
+        if unexplained:
+            score += PRIORITY_UNEXPLAINED_OPTION * len(unexplained)
+            reasons.append("unexplained options")
+    if question.get("domain") not in VALID_DOMAINS:
+        score += PRIORITY_MISSING_DOMAIN
+        reasons.append("missing domain")
+    if not question.get("tags"):
+        score += PRIORITY_MISSING_TAGS
+        reasons.append("missing tags")
+    return score, reasons
+
+
+def build_output_entry(
+    question: Dict[str, Any],
+    test_key: str,
+    analysis: Dict[str, Any],
+    copied_from: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build the analysis store entry for an analyzed question"""
+    entry = {
+        "question_id": question.get("id"),
+        "unique_id": question.get("uniqueId"),
+        "test_key": test_key,  # Always include test key
+        "question_text": question.get("text"),
+        "fingerprint": get_question_fingerprint(question),  # Stable identity for resume/merge
+        "domain": question.get("domain"),
+        "correct_answers": question.get("correctAnswers"),
+        "analysis": analysis,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    if copied_from:
+        # Provenance: the analysis was requested for an identical question under this key
+        entry[COPIED_FROM_FIELD] = copied_from
+    return entry
+
+
+def record_analysis(
+    existing_output: MutableMapping[str, Any],
+    checkpoint_log: AnalysisLog,
+    q_id: str,
+    entry: Dict[str, Any],
+    analysis_index: Optional[AnalysisIndex] = None,
+):
+    """Add an entry to the output, append it to the checkpoint log and index it"""
+    existing_output[q_id] = entry
+    checkpoint_log.append(q_id, entry)
+    if analysis_index is not None:
+        # Later test files skip copies of this question
+        analysis_index.add(q_id, entry)
+
+
+def fan_out_analysis(
+    existing_output: MutableMapping[str, Any],
+    checkpoint_log: AnalysisLog,
+    source_key: str,
+    analysis: Dict[str, Any],
+    copies: List[Tuple[str, str, Dict[str, Any]]],
+    analysis_index: Optional[AnalysisIndex] = None,
+) -> int:
+    """
+    Record one request's analysis for identical questions under their own keys.
+
+    Args:
+        source_key: Key of the question the analysis was requested for
+        analysis: The analysis
+        copies: (test_key, q_id, question) of the identical questions
+
+    Returns:
+        Number of copies recorded
+    """
+    for test_key, q_id, question in copies:
+        entry = build_output_entry(question, test_key, analysis, copied_from=source_key)
+        record_analysis(existing_output, checkpoint_log, q_id, entry, analysis_index)
+    return len(copies)
+
+
+def copy_existing_analyses(
+    existing_output: MutableMapping[str, Any],
+    checkpoint_log: AnalysisLog,
+    test_key: str,
+    content_matches: List[Tuple[str, Dict[str, Any], str]],
+) -> int:
+    """
+    Record existing analyses under the keys of identical questions.
+
+    Args:
+        content_matches: (q_id, question, matching key) from select_questions_to_process
+
+    Returns:
+        Number of entries copied (the content index only matches usable
+        analyses of questions with the same correct answers)
+    """
+    copied = 0
+    for q_id, question, source_key in content_matches:
+        source = existing_output[source_key]
+        # Point at the question the analysis was originally requested for
+        origin = source.get(COPIED_FROM_FIELD) or source_key
+        entry = build_output_entry(question, test_key, source["analysis"], copied_from=origin)
+        record_analysis(existing_output, checkpoint_log, q_id, entry)
+        copied += 1
+    return copied
+
+
+def group_pending_work(
+    work: List[Tuple[str, str, Dict[str, Any]]],
+) -> Tuple[List[Tuple[str, str, Dict[str, Any]]], Dict[str, List[Tuple[str, str, Dict[str, Any]]]]]:
+    """
+    Group (test_key, q_id, question) work items by request_key().
+
+    Returns:
+        Tuple of (one item per group, copies of each by the sent item's q_id)
+    """
+    groups = group_duplicates(work, lambda item: request_key(item[2]))
+    copies = {group[0][1]: group[1:] for group in groups if len(group) > 1}
+    return [group[0] for group in groups], copies
+
+
+def select_questions_to_process(
+    questions: List[Dict[str, Any]],
+    test_key: str,
+    processed_ids: Set[str],
+    analysis_index: AnalysisIndex,
+    content_matches: Optional[List[Tuple[str, Dict[str, Any], str]]] = None,
+) -> Tuple[List[Tuple[str, Dict[str, Any]]], int]:
+    """
+    Filter out already processed questions
+    Returns: (questions_to_process as (q_id, question) pairs, skipped_count)
+    content_matches: if given, (q_id, question, matching key) is appended for
+    questions skipped only because identical content was analyzed under another key
+    """
+    questions_to_process = []
+    skipped_count = 0
+
+    for question in questions:
+        q_id = get_question_id(question, test_key)
+
+        # Check if already processed using multiple methods
+        is_processed = False
+
+        # Method 1: Check new format ID (testX-qY)
+        if q_id in processed_ids:
+            is_processed = True
+
+        # Method 2: Check old format ID (numeric) - only for test2 (backward compatibility)
+        if not is_processed and test_key == "test2":
+            question_id = question.get("id")
+            old_format_id = str(question_id) if question_id is not None else None
+            if old_format_id and old_format_id in processed_ids:
+                is_processed = True
+
+        # Method 3: Check by content fingerprint and correct answers (handles cross-test duplicates and ID mismatches)
+        if not is_processed:
+            content_key = analysis_index.lookup(question)
+            if content_key is not None:
+                is_processed = True
+                if content_matches is not None:
+                    content_matches.append((q_id, question, content_key))
+
+        if is_processed:
+            skipped_count += 1
+        else:
+            questions_to_process.append((q_id, question))
+
+    return questions_to_process, skipped_count
+
+
+def run_sync_analysis(
+    work: List[Tuple[str, Dict[str, Any]]],
+    test_key: str,
+    model,
+    existing_output: MutableMapping[str, Any],
+    checkpoint_log: AnalysisLog,
+    analysis_index: AnalysisIndex,
+    batch_size: int = 1,
+    pbar=None,
+    copies: Optional[Dict[str, List[Tuple[str, str, Dict[str, Any]]]]] = None,
+) -> Tuple[int, int]:
+    """
+    Analyze one test file's questions one request at a time.
+
+    Results are added to existing_output, appended to the checkpoint log and
+    indexed so later test files skip copies of the same question. The result
+    of a question with identical copies (see group_pending_work) is fanned out
+    to them as well.
+
+    Args:
+        work: (q_id, question) for every question to analyze
+        test_key: Test the questions belong to (e.g. "test2")
+        model: Gemini model
+        existing_output: Analysis store (or dict) updated in place
+        checkpoint_log: Open checkpoint log results are appended to
+        analysis_index: Content index updated in place
+        batch_size: Questions per request; failed items are retried one at a time
+        pbar: Optional progress bar advanced per question
+        copies: (test_key, q_id, question) copies of a work item, by its q_id
+
+    Returns:
+        Tuple of (analyzed_count, error_count), not counting copies
+    """
+    analyzed_count = 0
+    error_count = 0
+
+    # Telemetry attributes every request made here to this test file
+    with telemetry_labels(tests=[test_key]):
+        for batch in chunked(work, batch_size):
+            analyses = {}
+            if len(batch) > 1:
+                analyses = analyze_batch_with_retry(
+                    [question for _, question in batch], model
                 )
-                time.sleep(wait_time)
-                continue
+                if RATE_LIMIT_DELAY > 0:
+                    time.sleep(RATE_LIMIT_DELAY)
 
-    return None
+            for position, (q_id, question) in enumerate(batch):
+                # Analyze question (batch failures are retried individually)
+                analysis = analyses.get(position)
+                from_batch = analysis is not None
+                if analysis is None:
+                    analysis = analyze_question_with_retry(question, model)
 
+                if analysis:
+                    # Ensure test_key is set (should always be set from test file name)
+                    if not test_key:
+                        # Fallback: try to extract from q_id
+                        if "-q" in q_id:
+                            test_key = q_id.split("-q")[0]
+                        else:
+                            test_key = "unknown"
 
-def main():
-    """Main function"""
+                    # Add to output with consistent format
+                    entry = build_output_entry(question, test_key, analysis)
+                    record_analysis(existing_output, checkpoint_log, q_id, entry, analysis_index)
+                    if copies and q_id in copies:
+                        fan_out_analysis(
+                            existing_output, checkpoint_log, q_id, analysis, copies[q_id], analysis_index
+                        )
 
-    # Check for API key (from .env file or environment variables)
-    # Try both GOOGLE_API_KEY and API_KEY for flexibility
-    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("API_KEY")
-    if not api_key:
-        print("❌ Error: API key not found")
-        print("Options:")
-        print(
-            "  1. Create a .env file in the project root with: GOOGLE_API_KEY=your-key-here"
+                    analyzed_count += 1
+                else:
+                    error_count += 1
+
+                # Update progress bar
+                if pbar is not None:
+                    pbar.update(1)
+                # No rate limiting - unlimited requests (RATE_LIMIT_DELAY = 0)
+                # Only sleep if delay is explicitly set (for testing/debugging)
+                if (
+                    RATE_LIMIT_DELAY > 0
+                    and not from_batch
+                    and analyzed_count < len(work)
+                ):
+                    time.sleep(RATE_LIMIT_DELAY)
+
+    return analyzed_count, error_count
+
+
+async def run_async_analysis(
+    work: List[Tuple[str, str, Dict[str, Any]]],
+    model,
+    existing_output: MutableMapping[str, Any],
+    checkpoint_log: AnalysisLog,
+    concurrency: int,
+    limiter: RateLimiter,
+    batch_size: int = 1,
+    batches: Optional[Iterator[List[Tuple[str, str, Dict[str, Any]]]]] = None,
+    copies: Optional[Dict[str, List[Tuple[str, str, Dict[str, Any]]]]] = None,
+) -> Tuple[int, int, bool]:
+    """
+    Analyze questions concurrently with a fixed pool of worker tasks.
+
+    Results are added to existing_output and appended to the checkpoint log
+    as they complete. The first Ctrl-C stops new requests and lets in-flight
+    ones finish; a second Ctrl-C cancels them.
+
+    Args:
+        work: (test_key, q_id, question) for every question to analyze
+        model: Gemini model
+        existing_output: Analysis store (or dict) updated in place
+        checkpoint_log: Open checkpoint log results are appended to
+        concurrency: Number of worker tasks
+        limiter: Shared requests/tokens per minute limiter
+        batch_size: Questions per request; failed items are retried one at a time
+        batches: Optional batches to take instead of chunking work in order
+            (e.g. from a PriorityScheduler, which may stop early on its budget)
+        copies: (test_key, q_id, question) copies of a work item, by its q_id;
+            they receive its result (see group_pending_work)
+
+    Returns:
+        Tuple of (analyzed_count, error_count, interrupted), not counting copies
+    """
+    pending = batches if batches is not None else chunked(work, batch_size)
+    stop = asyncio.Event()
+    stats = {"analyzed": 0, "errors": 0}
+    pbar = tqdm(total=len(work), desc="Analyzing", unit="question") if tqdm else None
+    loop = asyncio.get_running_loop()
+    workers: List[asyncio.Task] = []
+
+    def on_interrupt():
+        if stop.is_set():
+            print("\n⚠️  Second interrupt: cancelling in-flight requests...")
+            for task in workers:
+                task.cancel()
+            return
+        stop.set()
+        print("\n\n⚠️  Interrupted by user. Finishing in-flight requests (Ctrl-C again to cancel them)...")
+
+    try:
+        loop.add_signal_handler(signal.SIGINT, on_interrupt)
+    except (NotImplementedError, RuntimeError):
+        pass  # e.g. Windows: Ctrl-C raises KeyboardInterrupt instead
+
+    async def worker():
+        while not stop.is_set():
+            batch = next(pending, None)
+            if batch is None:
+                return
+            analyses = {}
+            if len(batch) > 1:
+                with telemetry_labels(tests=[test_key for test_key, _, _ in batch]):
+                    analyses = await analyze_batch_async(
+                        [question for _, _, question in batch], model, limiter
+                    )
+            for position, (test_key, q_id, question) in enumerate(batch):
+                analysis = analyses.get(position)
+                if analysis is None:
+                    with telemetry_labels(tests=[test_key]):
+                        analysis = await analyze_question_async(question, model, limiter)
+                if analysis:
+                    entry = build_output_entry(question, test_key, analysis)
+                    record_analysis(existing_output, checkpoint_log, q_id, entry)
+                    if copies and q_id in copies:
+                        fan_out_analysis(existing_output, checkpoint_log, q_id, analysis, copies[q_id])
+                    stats["analyzed"] += 1
+                else:
+                    stats["errors"] += 1
+                if pbar is not None:
+                    pbar.update(1)
+
+    try:
+        workers.extend(asyncio.create_task(worker()) for _ in range(max(1, concurrency)))
+        results = await asyncio.gather(*workers, return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                print(f"\n❌ Worker failed: {result}")
+    finally:
+        try:
+            loop.remove_signal_handler(signal.SIGINT)
+        except (NotImplementedError, RuntimeError):
+            pass
+        if pbar is not None:
+            pbar.close()
+        checkpoint_log.sync()
+
+    return stats["analyzed"], stats["errors"], stop.is_set()
+
+
+def plan_run(
+    test_files: List[str],
+    output_dir: str,
+    log_file: str,
+    model_name: str,
+    batch_size: int = 1,
+    response_cache: Optional[ResponseCache] = None,
+) -> List[Tuple[str, Dict[str, int]]]:
+    """
+    Work out the requests a run would send, without sending any.
+
+    The same filters as a real run apply: questions in the store or the
+    checkpoint log are skipped, identical pending questions share one request
+    (across test files too), and requests whose response is in the response
+    cache are free. Prompts come from the builders the requests use.
+
+    Args:
+        test_files: Test files the run would process
+        output_dir: Analysis store
+        log_file: Checkpoint log replayed on top of the store
+        model_name: Model the cache keys are computed for
+        batch_size: Questions per request
+        response_cache: Response cache to check prompts against, or None
+
+    Returns:
+        (test_key, plan) per test file; plan counts questions, skipped,
+        copied, requests, cached, questions_sent, prompt_bytes, prompt_tokens
+        and output_tokens
+    """
+    _, processed_ids, analysis_index = load_existing_output(output_dir, log_file)
+    kwargs = _generation_kwargs()
+    planned: Set[str] = set()  # request_key() of every question given a request
+    plans = []
+    for test_file in test_files:
+        test_key = Path(test_file).stem
+        if not test_key.startswith("test"):
+            continue
+        try:
+            questions = load_questions(test_file)
+        except Exception as e:
+            print(f"⚠️  Skipping {Path(test_file).name}: {e}")
+            continue
+
+        plan = dict.fromkeys(
+            ["questions", "skipped", "copied", "requests", "cached", "questions_sent",
+             "prompt_bytes", "prompt_tokens", "output_tokens"],
+            0,
         )
-        print("     (or use API_KEY=your-key-here)")
-        print("  2. Or set environment variable: export GOOGLE_API_KEY='your-key-here'")
-        print(
-            "\nNote: .env file is git-ignored and will not be committed to the repository."
+        plan["questions"] = len(questions)
+        questions_to_process, plan["skipped"] = select_questions_to_process(
+            questions, test_key, processed_ids, analysis_index
         )
-        return 1
+        pending = []
+        for _, question in questions_to_process:
+            key = request_key(question)
+            if key in planned:
+                plan["copied"] += 1
+            else:
+                planned.add(key)
+                pending.append(question)
+
+        for batch in chunked(pending, batch_size):
+            prompt = build_batch_analysis_prompt(batch) if len(batch) > 1 else build_analysis_prompt(batch[0])
+            if response_cache is not None and response_cache.contains(
+                make_cache_key(model_name, prompt, kwargs["generation_config"], kwargs["safety_settings"])
+            ):
+                plan["cached"] += 1
+                continue
+            plan["requests"] += 1
+            plan["questions_sent"] += len(batch)
+            plan["prompt_bytes"] += len(prompt.encode("utf-8"))
+            plan["prompt_tokens"] += estimate_tokens(prompt)
+            plan["output_tokens"] += ESTIMATED_OUTPUT_TOKENS * len(batch)
+        plans.append((test_key, plan))
+    return plans
 
-    # Initialize Gemini
-    if genai is None:
-        print("❌ Error: google-generativeai not installed")
-        print("Install it with: pip install -U google-generativeai")
-        return 1
 
-    print("🔧 Initializing Gemini 2.0 Flash API...")
+def measured_seconds_per_question(telemetry_file: str) -> Tuple[Optional[float], int]:
+    """
+    Median response time per question of past successful analysis requests.
+
+    Returns:
+        Tuple of (seconds, or None without measurements; records measured)
+    """
+    path = Path(telemetry_file)
+    if not path.exists():
+        return None, 0
+    samples = [
+        record["latency_s"] / max(1, record.get("items") or 1)
+        for record in load_telemetry(path)
+        if record.get("script") == "analyze"
+        and record.get("ok")
+        and not record.get("cached")
+        and record.get("latency_s")
+    ]
+    return (statistics.median(samples) if samples else None), len(samples)
+
+
+def estimate_wall_seconds(
+    plan: Dict[str, int],
+    seconds_per_question: float,
+    use_async: bool = False,
+    concurrency: int = CONCURRENCY,
+    rpm: float = REQUESTS_PER_MINUTE,
+    tpm: float = TOKENS_PER_MINUTE,
+) -> float:
+    """
+    Expected duration of a plan's requests, assuming no retries.
+
+    Sequential runs wait RATE_LIMIT_DELAY after each request; --async runs
+    are bound by the slowest of concurrency, requests/min and tokens/min.
+    """
+    if not plan["requests"]:
+        return 0.0
+    busy = plan["questions_sent"] * seconds_per_question
+    if not use_async:
+        return busy + plan["requests"] * RATE_LIMIT_DELAY
+    tokens = plan["prompt_tokens"] + plan["output_tokens"]
+    return max(busy / max(1, concurrency), plan["requests"] / rpm * 60, tokens / tpm * 60)
+
+
+def show_plan(args, output_dir: str, log_file: str, telemetry_file: str, model_name: str) -> int:
+    """Print the plan of the run the other arguments describe (--plan)"""
+    response_cache = None
+    if not args.mock and not args.no_cache and CACHE_DIR.exists():
+        response_cache = ResponseCache(CACHE_DIR, CACHE_MAX_MB * 1024 * 1024)
+
+    test_files = get_input_files()
+    if not test_files:
+        print("❌ No test*.json files found in questions directory")
+        return 1
     try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(MODEL_NAME)
-        print(f"✓ Model {MODEL_NAME} ready\n")
-    except Exception as e:
-        print(f"❌ Error initializing Gemini: {e}")
+        plans = plan_run(test_files, output_dir, log_file, model_name, args.batch_size, response_cache)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+
+    seconds_per_question, measured = measured_seconds_per_question(telemetry_file)
+    if seconds_per_question is None:
+        seconds_per_question = ESTIMATED_SECONDS_PER_QUESTION
+
+    # --rpm/--tpm are per API key
+    key_count = args.mock_keys if args.mock else max(1, len(load_api_keys()))
+
+    def timing(plan: Dict[str, int]) -> float:
+        return estimate_wall_seconds(
+            plan, seconds_per_question, args.use_async, args.concurrency, args.rpm * key_count, args.tpm * key_count
+        )
+
+    def row(label: str, plan: Dict[str, int]) -> str:
+        cost = estimate_cost(model_name, plan["prompt_tokens"], plan["output_tokens"])
+        return (
+            f"   {label:<8} {plan['questions']:>9} {plan['skipped']:>8} {plan['copied']:>7} "
+            f"{plan['requests']:>9} {plan['cached']:>7} {plan['prompt_bytes'] / 1024:>9.1f} "
+            f"{plan['prompt_tokens']:>10,} {plan['output_tokens']:>10,} "
+            f"{timing(plan) / 60:>8.1f} {cost:>8.4f}"
+        )
+
+    print("=" * 60)
+    print("📋 Run plan (nothing is sent)")
+    print("=" * 60)
+    print(
+        f"   {'Test':<8} {'Questions':>9} {'Skipped':>8} {'Copies':>7} {'Requests':>9} {'Cached':>7} "
+        f"{'Prompt KB':>9} {'Tokens in':>10} {'Tokens out':>10} {'Minutes':>8} {'Cost $':>8}"
+    )
+    total: Dict[str, int] = {}
+    for test_key, plan in plans:
+        print(row(test_key, plan))
+        for field, value in plan.items():
+            total[field] = total.get(field, 0) + value
+    if total:
+        print(row("Total", total))
+    print()
+
+    source = (
+        f"median of {measured} telemetry record(s) in {telemetry_file}"
+        if measured
+        else "default, no telemetry yet"
+    )
+    print(f"⏱️  Response time: {seconds_per_question:.1f}s per question ({source}), no retries")
+    if args.use_async:
         print(
-            "Make sure you have the latest version: pip install -U google-generativeai"
+            f"   --async: {args.concurrency} concurrent, {args.rpm * key_count:g} requests/min, "
+            f"{args.tpm * key_count:g} tokens/min ({key_count} API key(s))"
         )
+    else:
+        print(f"   Sequential, {RATE_LIMIT_DELAY:g}s pause after each request")
+    print(f"💲 Cost at the {model_name} list price; cached responses are free")
+    print(f"🔢 Tokens estimated at {CHARS_PER_TOKEN} characters per token, {ESTIMATED_OUTPUT_TOKENS} output tokens per question")
+    if response_cache is None and not args.mock:
+        print("🗄️  Response cache not checked (--no-cache or no cache yet)")
+    if args.cache_only and total.get("requests"):
+        print(f"⚠️  --cache-only: the {total['requests']} uncached request(s) would be skipped")
+    if args.max_requests is not None and total.get("requests", 0) > args.max_requests:
+        print(f"⚠️  --max-requests {args.max_requests} stops the run before the other {total['requests'] - args.max_requests} request(s)")
+    return 0
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Analyze exam questions with Google Gemini"
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Send requests concurrently under a requests/tokens per minute limiter",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=CONCURRENCY,
+        help=f"Maximum in-flight requests in --async mode (default: {CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--rpm",
+        type=float,
+        default=REQUESTS_PER_MINUTE,
+        help=f"Requests per minute limit per API key in --async mode (default: {REQUESTS_PER_MINUTE})",
+    )
+    parser.add_argument(
+        "--tpm",
+        type=float,
+        default=TOKENS_PER_MINUTE,
+        help=f"Tokens per minute limit per API key in --async mode (default: {TOKENS_PER_MINUTE})",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=BATCH_SIZE,
+        help=f"Questions analyzed per request; items that fail validation are retried one at a time (default: {BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the API instead of reusing cached responses",
+    )
+    parser.add_argument(
+        "--cache-only",
+        action="store_true",
+        help="Replay cached responses only; questions without one are skipped (no API calls)",
+    )
+    parser.add_argument(
+        "--mock",
+        action="store_true",
+        help=f"Use the local mock model instead of the API (writes {MOCK_OUTPUT_DIR}/)",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream responses and validate them as they arrive, abandoning malformed ones early",
+    )
+    parser.add_argument(
+        "--priority",
+        action="store_true",
+        help="Analyze the questions with the weakest explanations first, across all test files",
+    )
+    parser.add_argument(
+        "--max-requests",
+        type=int,
+        default=None,
+        help="Stop after this many API requests (implies --priority; cached responses are free)",
+    )
+    parser.add_argument(
+        "--max-minutes",
+        type=float,
+        default=None,
+        help="Stop taking new questions after this many minutes (implies --priority)",
+    )
+    parser.add_argument(
+        "--no-telemetry",
+        action="store_true",
+        help=f"Do not record per-request telemetry (default: append to {TELEMETRY_FILE})",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Report the requests, prompt size, time and cost of the run per test file; sends nothing",
+    )
+    parser.add_argument(
+        "--mock-keys",
+        type=int,
+        default=1,
+        help="With --mock, spread requests over this many mock clients through the API key pool (default: 1)",
+    )
+    args = parser.parse_args()
+
+    if args.cache_only and args.no_cache:
+        print("❌ Error: --cache-only and --no-cache cannot be combined")
+        return 1
+    if args.batch_size < 1:
+        print("❌ Error: --batch-size must be at least 1")
+        return 1
+    if args.mock_keys < 1:
+        print("❌ Error: --mock-keys must be at least 1")
+        return 1
+    if args.stream:
+        global STREAM_RESPONSES
+        STREAM_RESPONSES = True
+    if (args.max_requests is not None and args.max_requests < 1) or (
+        args.max_minutes is not None and args.max_minutes <= 0
+    ):
+        print("❌ Error: --max-requests and --max-minutes must be positive")
         return 1
+    # A budget is only useful when the most valuable work comes first
+    use_priority = args.priority or args.max_requests is not None or args.max_minutes is not None
+
+    if args.plan:
+        # No model, API key or telemetry needed
+        if args.mock:
+            return show_plan(args, MOCK_OUTPUT_DIR, MOCK_LOG_FILE, MOCK_TELEMETRY_FILE, MOCK_MODEL_NAME)
+        return show_plan(args, OUTPUT_DIR, LOG_FILE, TELEMETRY_FILE, MODEL_NAME)
+
+    output_dir, log_file, telemetry_file = OUTPUT_DIR, LOG_FILE, TELEMETRY_FILE
+    model_name = MODEL_NAME
+    response_cache = None
+    pool: Optional[ClientPool] = None
+    if args.mock:
+        # Offline stand-in: no API key or cache, and results kept apart from real ones
+        if args.mock_keys > 1:
+            pool = ClientPool.from_models(
+                {f"mock{position}": MockGeminiModel(seed=position) for position in range(1, args.mock_keys + 1)},
+                args.rpm,
+                args.tpm,
+                output_tokens=ESTIMATED_OUTPUT_TOKENS,
+            )
+        counter = RequestCounter(pool or MockGeminiModel(seed=0))
+        model = counter
+        output_dir, log_file, telemetry_file = MOCK_OUTPUT_DIR, MOCK_LOG_FILE, MOCK_TELEMETRY_FILE
+        model_name = MOCK_MODEL_NAME
+        print(f"🧪 Using the local mock model; results go to {output_dir}/\n")
+    else:
+        # Check for API keys (from .env file or environment variables)
+        # GOOGLE_API_KEYS (comma-separated) for a key pool, or a single GOOGLE_API_KEY / API_KEY
+        api_keys = load_api_keys()
+        if not api_keys and not args.cache_only:
+            print("❌ Error: API key not found")
+            print("Options:")
+            print(
+                "  1. Create a .env file in the project root with: GOOGLE_API_KEY=your-key-here"
+            )
+            print("     (or use API_KEY=your-key-here, or GOOGLE_API_KEYS=key1,key2 for several keys)")
+            print("  2. Or set environment variable: export GOOGLE_API_KEY='your-key-here'")
+            print(
+                "\nNote: .env file is git-ignored and will not be committed to the repository."
+            )
+            return 1
+
+        # Initialize Gemini
+        if genai is None:
+            print("❌ Error: google-generativeai not installed")
+            print("Install it with: pip install -U google-generativeai")
+            return 1
+
+        print("🔧 Initializing Gemini 2.0 Flash API...")
+        try:
+            client = create_gemini_client(
+                genai, MODEL_NAME, api_keys, args.rpm, args.tpm, output_tokens=ESTIMATED_OUTPUT_TOKENS
+            )
+            pool = client if isinstance(client, ClientPool) else None
+            # Counted below the response cache, so only real API calls use up --max-requests
+            counter = RequestCounter(client)
+            model = counter
+            print(f"✓ Model {MODEL_NAME} ready\n")
+        except Exception as e:
+            print(f"❌ Error initializing Gemini: {e}")
+            print(
+                "Make sure you have the latest version: pip install -U google-generativeai"
+            )
+            return 1
+
+        if not args.no_cache:
+            response_cache = ResponseCache(CACHE_DIR, CACHE_MAX_MB * 1024 * 1024)
+            model = CachedModel(model, MODEL_NAME, response_cache, cache_only=args.cache_only)
+            mode = "replay only" if args.cache_only else "read/write"
+            print(f"🗄️  Response cache: {CACHE_DIR} ({mode})\n")
+    if pool is not None:
+        print(f"🔑 Spreading requests over {len(pool)} API keys ({args.rpm:g} requests/min, {args.tpm:g} tokens/min each)\n")
+
+    global _telemetry
+    if not args.no_telemetry:
+        _telemetry = Telemetry(Path(telemetry_file), "analyze", model_name)
+        print(f"📈 Recording per-request telemetry to {telemetry_file}\n")
 
     # Determine which test files to process
+    test_files = get_input_files()
     if INPUT_FILES is None:
         # Auto-detect all test files
-        test_files = find_all_test_files()
         if not test_files:
             print("❌ No test*.json files found in questions directory")
             return 1
         print(f"📂 Auto-detected {len(test_files)} test files to process\n")
     else:
-        # Use specified files
-        test_files = INPUT_FILES if isinstance(INPUT_FILES, list) else [INPUT_FILES]
         print(f"📂 Processing {len(test_files)} specified test file(s)\n")
 
     # Load existing output and get processed IDs
-    print(f"📂 Loading existing output from {OUTPUT_FILE}...")
-    existing_output, processed_ids, question_text_map = load_existing_output(
-        OUTPUT_FILE
-    )
+    print(f"📂 Loading existing output from {output_dir}/...")
+    try:
+        existing_output, processed_ids, analysis_index = load_existing_output(
+            output_dir, log_file
+        )
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
     print(f"✓ Found {len(processed_ids)} questions already analyzed\n")
 
     # Process all test files
@@ -406,10 +1429,13 @@ def main():
     total_skipped = 0
     total_analyzed = 0
     total_errors = 0
+    total_shared = 0  # Questions given the analysis of an identical question instead of a request
+
+    # (test_key, q_id, question) collected for --async and --priority modes
+    queued_work: List[Tuple[str, str, Dict[str, Any]]] = []
 
-    # Initialize output structure (should already be a dict from load_existing_output)
-    if not isinstance(existing_output, dict):
-        existing_output = {}
+    # Every result is appended here; the output file is rewritten once at the end
+    checkpoint_log = AnalysisLog(Path(log_file), fsync_every=BATCH_SAVE_SIZE).open()
 
     # Process each test file
     for test_file in test_files:
@@ -440,45 +1466,29 @@ def main():
         total_questions += len(questions)
 
         # Filter out already processed questions
-        questions_to_process = []
-        skipped_count = 0
-
-        for question in questions:
-            q_id = get_question_id(question, test_key)
-            question_text = question.get("text", "")
-
-            # Check if already processed using multiple methods
-            is_processed = False
-
-            # Method 1: Check new format ID (testX-qY)
-            if q_id in processed_ids:
-                is_processed = True
+        content_matches: List[Tuple[str, Dict[str, Any], str]] = []
+        questions_to_process, skipped_count = select_questions_to_process(
+            questions, test_key, processed_ids, analysis_index, content_matches
+        )
+        # Identical questions analyzed under another key get that analysis under their own
+        copied = copy_existing_analyses(existing_output, checkpoint_log, test_key, content_matches)
+        processed_ids.update(q_id for q_id, _, _ in content_matches)
 
-            # Method 2: Check old format ID (numeric) - only for test2 (backward compatibility)
-            if not is_processed and test_key == "test2":
-                question_id = question.get("id")
-                old_format_id = str(question_id) if question_id is not None else None
-                if old_format_id and old_format_id in processed_ids:
-                    is_processed = True
-
-            # Method 3: Check by question text hash (handles cross-test duplicates and ID mismatches)
-            if not is_processed and question_text:
-                text_hash = str(hash(question_text) % (10**10))
-                if text_hash in question_text_map:
-                    # Found by text hash - this question was already processed
-                    is_processed = True
-
-            if is_processed:
-                skipped_count += 1
-            else:
-                questions_to_process.append((q_id, question))
+        # One request per group of identical questions in this file
+        work = [(test_key, q_id, question) for q_id, question in questions_to_process]
+        representatives, copies = group_pending_work(work)
+        shared = sum(len(group) for group in copies.values())
 
         print(f"📊 Processing plan for {test_path.name}:")
         print(f"   - Total questions: {len(questions)}")
-        print(f"   - Already processed: {skipped_count}")
-        print(f"   - To process: {len(questions_to_process)}\n")
+        print(f"   - Already processed: {skipped_count} ({copied} copied from identical questions)")
+        print(f"   - To process: {len(questions_to_process)}")
+        if shared:
+            print(f"   - Identical copies sharing a request: {shared}")
+        print()
 
         total_skipped += skipped_count
+        total_shared += copied
 
         if len(questions_to_process) == 0:
             print(
@@ -486,10 +1496,12 @@ def main():
             )
             continue
 
-        # Analyze questions from this test file
-        analyzed_count = 0
-        error_count = 0
-        save_counter = 0
+        if args.use_async or use_priority:
+            # Queue for the concurrent or prioritized run after all files are planned
+            # (grouped across all files once planning is done)
+            queued_work.extend(work)
+            continue
+        total_shared += shared
 
         # Create progress bar for this test file
         if tqdm is None:
@@ -497,62 +1509,26 @@ def main():
             pbar = None
         else:
             pbar = tqdm(
-                total=len(questions_to_process),
+                total=len(representatives),
                 desc=f"Analyzing {test_path.name}",
                 unit="question",
             )
 
         try:
-            for q_id, question in questions_to_process:
-                # Analyze question
-                analysis = analyze_question_with_retry(question, model)
-
-                if analysis:
-                    # Ensure test_key is set (should always be set from test file name)
-                    if not test_key:
-                        # Fallback: try to extract from q_id
-                        if "-q" in q_id:
-                            test_key = q_id.split("-q")[0]
-                        else:
-                            test_key = "unknown"
-
-                    # Add to output with consistent format
-                    existing_output[q_id] = {
-                        "question_id": question.get("id"),
-                        "unique_id": question.get("uniqueId"),
-                        "test_key": test_key,  # Always include test key
-                        "question_text": question.get("text"),
-                        "domain": question.get("domain"),
-                        "correct_answers": question.get("correctAnswers"),
-                        "analysis": analysis,
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                    }
-
-                    analyzed_count += 1
-                    save_counter += 1
-
-                    # Save in batches or immediately
-                    if save_counter >= BATCH_SAVE_SIZE:
-                        save_output_json(existing_output, OUTPUT_FILE)
-                        save_counter = 0
-                else:
-                    error_count += 1
-                    # Still save progress even on error
-                    if save_counter > 0:
-                        save_output_json(existing_output, OUTPUT_FILE)
-                        save_counter = 0
-
-                # Update progress bar
-                if pbar is not None:
-                    pbar.update(1)
-                # No rate limiting - unlimited requests (RATE_LIMIT_DELAY = 0)
-                # Only sleep if delay is explicitly set (for testing/debugging)
-                if RATE_LIMIT_DELAY > 0 and analyzed_count < len(questions_to_process):
-                    time.sleep(RATE_LIMIT_DELAY)
+            analyzed_count, error_count = run_sync_analysis(
+                [(q_id, question) for _, q_id, question in representatives],
+                test_key,
+                model,
+                existing_output,
+                checkpoint_log,
+                analysis_index,
+                args.batch_size,
+                pbar,
+                copies,
+            )
 
-            # Final save for this test file
-            if save_counter > 0:
-                save_output_json(existing_output, OUTPUT_FILE)
+            # Checkpoint for this test file
+            checkpoint_log.sync()
 
             total_analyzed += analyzed_count
             total_errors += error_count
@@ -563,14 +1539,14 @@ def main():
 
         except KeyboardInterrupt:
             print("\n\n⚠️  Interrupted by user. Saving progress...")
-            save_output_json(existing_output, OUTPUT_FILE)
-            print("✓ Progress saved. You can resume later.")
+            checkpoint_log.close()
+            print(f"✓ Progress saved to {log_file}. You can resume later.")
             if pbar is not None:
                 pbar.close()
             return 1
         except Exception as e:
             print(f"\n\n❌ Unexpected error processing {test_path.name}: {e}")
-            save_output_json(existing_output, OUTPUT_FILE)
+            checkpoint_log.sync()
             print("✓ Progress saved before exit.")
             if pbar is not None:
                 pbar.close()
@@ -580,6 +1556,117 @@ def main():
             if pbar is not None:
                 pbar.close()
 
+    queued_copies: Dict[str, List[Tuple[str, str, Dict[str, Any]]]] = {}
+    if queued_work:
+        # One request per group of identical questions across all test files
+        queued_total = len(queued_work)
+        queued_work, queued_copies = group_pending_work(queued_work)
+        if len(queued_work) < queued_total:
+            print(
+                f"🔗 {queued_total} pending questions, {len(queued_work)} distinct: "
+                f"{queued_total - len(queued_work)} identical copies share a request\n"
+            )
+            total_shared += queued_total - len(queued_work)
+
+    scheduler = None
+    if use_priority and queued_work:
+        budget = WorkBudget(args.max_requests, args.max_minutes, lambda: counter.requests)
+        scheduler = PriorityScheduler(budget)
+        reasons: Dict[str, int] = {}
+        for item in queued_work:
+            score, item_reasons = score_question(item[2])
+            scheduler.push(score, item)
+            for reason in item_reasons:
+                reasons[reason] = reasons.get(reason, 0) + 1
+        print("=" * 60)
+        print(f"🎯 Priority queue: {len(scheduler)} questions from {len({key for key, _, _ in queued_work})} test file(s)")
+        for reason, count in sorted(reasons.items(), key=lambda entry: -entry[1]):
+            print(f"   - {reason}: {count}")
+        print(f"   Budget: {budget.describe() if budget.limited else 'unlimited'}")
+        print("=" * 60 + "\n")
+
+    if scheduler is not None and not args.use_async:
+        pbar = tqdm(total=len(queued_work), desc="Analyzing", unit="question") if tqdm else None
+        try:
+            for batch in scheduler.batches(args.batch_size):
+                # A copy of the question may have been analyzed since it was queued
+                batch = [item for item in batch if analysis_index.lookup(item[2]) is None]
+                # Results are recorded under each question's own test file
+                by_test: Dict[str, List[Tuple[str, Dict[str, Any]]]] = {}
+                for test_key, q_id, question in batch:
+                    by_test.setdefault(test_key, []).append((q_id, question))
+                for test_key, work in by_test.items():
+                    analyzed_count, error_count = run_sync_analysis(
+                        work,
+                        test_key,
+                        model,
+                        existing_output,
+                        checkpoint_log,
+                        analysis_index,
+                        args.batch_size,
+                        pbar,
+                        queued_copies,
+                    )
+                    total_analyzed += analyzed_count
+                    total_errors += error_count
+        except KeyboardInterrupt:
+            print("\n\n⚠️  Interrupted by user. Saving progress...")
+            checkpoint_log.close()
+            print(f"✓ Progress saved to {log_file}. You can resume later.")
+            return 1
+        finally:
+            if pbar is not None:
+                pbar.close()
+        checkpoint_log.sync()
+
+    if args.use_async and queued_work:
+        # --rpm/--tpm are per key: the pool's keys together allow that many times more
+        key_count = pool.active if pool is not None else 1
+        limiter = RateLimiter(args.rpm * key_count, args.tpm * key_count)
+        print("=" * 60)
+        print(
+            f"🚀 Analyzing {len(queued_work)} questions with up to {args.concurrency} concurrent requests"
+        )
+        if args.batch_size > 1:
+            print(f"   Batch size: {args.batch_size} questions per request")
+        print(f"   Limits: {args.rpm * key_count:g} requests/min, {args.tpm * key_count:g} tokens/min")
+        print("=" * 60 + "\n")
+        start_time = time.perf_counter()
+        try:
+            analyzed_count, error_count, interrupted = asyncio.run(
+                run_async_analysis(
+                    queued_work,
+                    model,
+                    existing_output,
+                    checkpoint_log,
+                    args.concurrency,
+                    limiter,
+                    args.batch_size,
+                    scheduler.batches(args.batch_size) if scheduler is not None else None,
+                    queued_copies,
+                )
+            )
+        except KeyboardInterrupt:
+            # Platforms without asyncio signal handlers; completed results are in the log
+            checkpoint_log.close()
+            print(f"✓ Progress saved to {log_file}. You can resume later.")
+            return 1
+        total_analyzed += analyzed_count
+        total_errors += error_count
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"\n✓ Async run finished in {elapsed:.1f}s "
+            f"({analyzed_count / elapsed * 60 if elapsed else 0:.1f} questions/min, "
+            f"{limiter.waited:.1f}s spent waiting on rate limits)"
+        )
+        if interrupted:
+            checkpoint_log.close()
+            print(f"✓ Progress saved to {log_file}. You can resume later.")
+            return 1
+
+    checkpoint_log.close()
+    finalize_output(log_file, output_dir)
+
     # Final summary across all test files
     print("\n" + "=" * 60)
     print("✅ Analysis complete for all test files!")
@@ -587,8 +1674,19 @@ def main():
     print(f"   - Total questions across all tests: {total_questions}")
     print(f"   - Already processed (skipped): {total_skipped}")
     print(f"   - Newly analyzed: {total_analyzed}")
+    print(f"   - Filled from identical questions (no request): {total_shared}")
     print(f"   - Errors: {total_errors}")
-    print(f"   - Output saved to: {OUTPUT_FILE}")
+    if scheduler is not None and scheduler.stopped:
+        print(f"   - Stopped early ({scheduler.stopped}): {len(scheduler)} question(s) left for a later run")
+    print(f"   - Retries: {get_retry_controller().summary()}")
+    if response_cache is not None:
+        print(f"   - Response cache: {response_cache.summary()}")
+    if pool is not None:
+        print(f"   - API keys: {pool.summary()}")
+    print(f"   - Output saved to: {output_dir}/")
+    if get_telemetry().enabled:
+        print(f"   - Telemetry: {get_telemetry().records} request(s) recorded in {telemetry_file}")
+        get_telemetry().close()
     print("=" * 60)
 
     return 0
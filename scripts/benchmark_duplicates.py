@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Scale benchmark for duplicate detection.
+Generates synthetic question banks (seeded from the real questions/ text) with
+planted exact, reordered and paraphrased duplicates, then runs each duplicate
+detection mode against them and records wall time, peak memory, precision and
+recall.
+
+Usage:
+    python benchmark_duplicates.py generate --size 10000 --output bench_corpus
+    python benchmark_duplicates.py run bench_corpus [--modes exact,check] [--output results.json] [--compare old.json]
+    python benchmark_duplicates.py scale --sizes 2000,10000,50000 [--modes exact,remove] [--output results.json]
+
+Modes:
+    exact           load_all_questions() + find_duplicates() (text and options signature)
+    check           check-duplicates (exact text plus >=95% SequenceMatcher clusters)
+    remove          remove-duplicates plan + apply on a scratch copy of the corpus
+    remove-similar  the same with --include-similar
+    find-similar    find-similar TF-IDF cosine report (requires numpy)
+
+The SequenceMatcher-based modes (check, remove-similar) scale worse than
+linearly; start with small sizes before running them at 50k+ questions.
+"""
+
+import io
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.duplicate_clusters import UnionFind
+from utils.question_utils import (
+    find_duplicates,
+    get_questions_dir,
+    load_all_questions,
+    load_question_records,
+)
+from utils.synthetic_corpus import (
+    DUPLICATE_KINDS,
+    CorpusProfile,
+    generate_corpus,
+    load_manifest,
+    write_corpus,
+)
+import question_management
+
+# Configuration
+DEFAULT_MODES = ["exact", "check", "remove", "remove-similar", "find-similar"]
+DEFAULT_QUESTIONS_PER_TEST = 65
+REGRESSION_TOLERANCE = 0.20  # Flag modes that got >20% slower than the baseline
+
+
+def detect_exact(corpus_dir: Path, scratch_dir: Path):
+    """find_duplicates() over signatures: one group per duplicated signature."""
+    duplicates = find_duplicates(load_all_questions(corpus_dir))
+    return [[f"{test}-q{q_id}" for test, q_id in occurrences] for occurrences in duplicates.values()]
+
+
+def detect_check(corpus_dir: Path, scratch_dir: Path):
+    """check-duplicates with its cluster report streamed to the scratch directory."""
+    report = scratch_dir / "clusters.ndjson"
+    question_management.cmd_check_duplicates(corpus_dir, report=str(report))
+    groups = []
+    with open(report, 'r', encoding='utf-8') as f:
+        for line in f:
+            cluster = json.loads(line)
+            members = [cluster["canonical"]] + cluster["duplicates"]
+            groups.append([f"{m['test']}-q{m['id']}" for m in members])
+    return groups
+
+
+def _detect_removal(corpus_dir: Path, scratch_dir: Path, include_similar: bool):
+    """Plan and apply a removal on a copy of the corpus; removed questions group with the kept copy."""
+    working_dir = scratch_dir / "corpus"
+    shutil.copytree(corpus_dir, working_dir)
+    plan_path = scratch_dir / "plan.json"
+    question_management.cmd_plan_removal(working_dir, str(plan_path), include_similar=include_similar)
+    question_management.cmd_apply_removal(working_dir, str(plan_path))
+
+    with open(plan_path, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+    groups = defaultdict(set)
+    for test_name, removals in plan["tests"].items():
+        for removal in removals:
+            keep = f"{removal['keep']['test']}-q{removal['keep']['id']}"
+            groups[keep].update([keep, f"{test_name}-q{removal['id']}"])
+    return [sorted(members) for members in groups.values()]
+
+
+def detect_remove(corpus_dir: Path, scratch_dir: Path):
+    return _detect_removal(corpus_dir, scratch_dir, include_similar=False)
+
+
+def detect_remove_similar(corpus_dir: Path, scratch_dir: Path):
+    return _detect_removal(corpus_dir, scratch_dir, include_similar=True)
+
+
+def detect_find_similar(corpus_dir: Path, scratch_dir: Path):
+    """find-similar report; pairs are returned as two-member groups."""
+    report = scratch_dir / "similar.json"
+    question_management.cmd_find_similar(corpus_dir, output=str(report))
+    if not report.exists():
+        raise ImportError("find-similar did not produce a report (is numpy installed?)")
+    with open(report, 'r', encoding='utf-8') as f:
+        pairs = json.load(f)["pairs"]
+    return [[f"{p['a']['test']}-q{p['a']['id']}", f"{p['b']['test']}-q{p['b']['id']}"] for p in pairs]
+
+
+DETECTORS = {
+    "exact": detect_exact,
+    "check": detect_check,
+    "remove": detect_remove,
+    "remove-similar": detect_remove_similar,
+    "find-similar": detect_find_similar,
+}
+
+
+def _pairs(count: int) -> int:
+    return count * (count - 1) // 2
+
+
+def score_groups(groups, manifest: dict) -> dict:
+    """
+    Score detected duplicate groups against the planted ground truth.
+
+    Groups are merged into clusters first (pair-based detectors may chain).
+    Precision and recall are over question pairs: two questions are true
+    duplicates when both come from the same original. Per-kind recall counts
+    planted copies that ended up in the same cluster as their original.
+    """
+    truth = {}  # location -> original location
+    for duplicate in manifest["duplicates"]:
+        truth[duplicate["original"]] = duplicate["original"]
+        truth[duplicate["copy"]] = duplicate["original"]
+
+    locations = {}
+    uf = UnionFind(sum(len(group) for group in groups))
+    for group in groups:
+        first = locations.setdefault(group[0], len(locations))
+        for location in group[1:]:
+            uf.union(first, locations.setdefault(location, len(locations)))
+
+    clusters = defaultdict(list)
+    for location, idx in locations.items():
+        clusters[uf.find(idx)].append(location)
+    cluster_of = {location: uf.find(idx) for location, idx in locations.items()}
+
+    detected_pairs = sum(_pairs(len(members)) for members in clusters.values())
+    true_positive = sum(
+        _pairs(count)
+        for members in clusters.values()
+        for original, count in Counter(truth[m] for m in members if m in truth).items()
+    )
+    truth_pairs = sum(_pairs(count) for count in Counter(truth.values()).values())
+
+    found = Counter()
+    for duplicate in manifest["duplicates"]:
+        copy_cluster = cluster_of.get(duplicate["copy"])
+        if copy_cluster is not None and copy_cluster == cluster_of.get(duplicate["original"]):
+            found[duplicate["kind"]] += 1
+    planted = Counter(duplicate["kind"] for duplicate in manifest["duplicates"])
+
+    return {
+        "clusters": len(clusters),
+        "detected_pairs": detected_pairs,
+        "precision": true_positive / detected_pairs if detected_pairs else 1.0,
+        "recall": true_positive / truth_pairs if truth_pairs else 1.0,
+        "recall_by_kind": {
+            kind: found[kind] / planted[kind] for kind in DUPLICATE_KINDS if planted[kind]
+        },
+    }
+
+
+def run_mode(mode: str, corpus_dir: Path, manifest: dict, trace_memory: bool = True) -> dict:
+    """
+    Run one detection mode with its console output captured.
+
+    Returns:
+        Result dict with seconds, peak_mb and the score_groups() fields,
+        or an "error" entry if the mode could not run
+    """
+    with tempfile.TemporaryDirectory(prefix="dup_bench_") as scratch:
+        if trace_memory:
+            tracemalloc.start()
+        start_time = time.perf_counter()
+        try:
+            with redirect_stdout(io.StringIO()):
+                groups = DETECTORS[mode](corpus_dir, Path(scratch))
+        except ImportError as e:
+            return {"mode": mode, "error": str(e)}
+        finally:
+            elapsed = time.perf_counter() - start_time
+            peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            if trace_memory:
+                tracemalloc.stop()
+
+    result = {
+        "mode": mode,
+        "seconds": round(elapsed, 3),
+        "peak_mb": round(peak / (1024 * 1024), 1) if peak is not None else None,
+    }
+    result.update(score_groups(groups, manifest))
+    return result
+
+
+def print_results(size: int, results: list):
+    """Print one table of results for a corpus."""
+    print(f"\n{'='*80}")
+    print(f"DUPLICATE DETECTION BENCHMARK ({size} questions)")
+    print(f"{'='*80}\n")
+    print(f"  {'mode':<15}{'time':>9}{'peak MB':>9}{'precision':>11}{'recall':>8}   recall exact/reordered/paraphrased")
+    for result in results:
+        if "error" in result:
+            print(f"  {result['mode']:<15}skipped: {result['error']}")
+            continue
+        peak = f"{result['peak_mb']:.1f}" if result["peak_mb"] is not None else "-"
+        by_kind = "/".join(f"{result['recall_by_kind'].get(kind, 0):.0%}" for kind in DUPLICATE_KINDS)
+        print(f"  {result['mode']:<15}{result['seconds']:>8.2f}s{peak:>9}{result['precision']:>11.1%}{result['recall']:>8.1%}   {by_kind}")
+
+
+def compare_results(runs: list, baseline_path: Path):
+    """Print timing and recall changes against a previous results file."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    previous = {
+        (run["size"], result["mode"]): result
+        for run in baseline.get("runs", [])
+        for result in run["results"]
+        if "error" not in result
+    }
+
+    print(f"\n{'='*80}")
+    print(f"COMPARISON WITH {baseline_path}")
+    print(f"{'='*80}\n")
+    regressions = 0
+    for run in runs:
+        for result in run["results"]:
+            old = previous.get((run["size"], result["mode"]))
+            if old is None or "error" in result:
+                continue
+            ratio = result["seconds"] / old["seconds"] if old["seconds"] else 1.0
+            flags = []
+            if ratio > 1 + REGRESSION_TOLERANCE:
+                flags.append("SLOWER")
+            if result["recall"] < old["recall"]:
+                flags.append("RECALL DROP")
+            if result["precision"] < old["precision"]:
+                flags.append("PRECISION DROP")
+            regressions += bool(flags)
+            print(f"  {run['size']:>7} {result['mode']:<15}{old['seconds']:>8.2f}s -> {result['seconds']:.2f}s ({ratio:.2f}x)"
+                  f"  recall {old['recall']:.1%} -> {result['recall']:.1%}  {' '.join(flags)}")
+    print(f"\n{'⚠️  ' + str(regressions) + ' regression(s)' if regressions else '✓ No regressions'}")
+    return regressions
+
+
+def build_profile() -> CorpusProfile:
+    """Learn text and shape distributions from the real question bank."""
+    records = load_question_records(get_questions_dir())
+    print(f"📂 Seeding generator from {len(records)} real questions")
+    return CorpusProfile([q for _, _, q in records])
+
+
+def generate(profile: CorpusProfile, size: int, output_dir: Path, args) -> dict:
+    """Generate a corpus into output_dir and return its manifest."""
+    start_time = time.perf_counter()
+    tests, manifest = generate_corpus(
+        profile,
+        size,
+        questions_per_test=args.per_test,
+        exact_rate=args.exact_rate,
+        reordered_rate=args.reordered_rate,
+        paraphrased_rate=args.paraphrased_rate,
+        seed=args.seed,
+    )
+    write_corpus(output_dir, tests, manifest)
+    planted = ", ".join(f"{count} {kind}" for kind, count in manifest["planted_counts"].items())
+    print(f"✓ Generated {size} questions in {len(tests)} test files ({planted}) in {time.perf_counter() - start_time:.1f}s")
+    return manifest
+
+
+def benchmark_corpus(corpus_dir: Path, modes: list, trace_memory: bool) -> dict:
+    """Run every mode against one corpus."""
+    manifest = load_manifest(corpus_dir)
+    results = []
+    for mode in modes:
+        print(f"  Running {mode}...", flush=True)
+        results.append(run_mode(mode, corpus_dir, manifest, trace_memory))
+    print_results(manifest["size"], results)
+    return {"size": manifest["size"], "seed": manifest["seed"], "results": results}
+
+
+def save_results(runs: list, output: str, trace_memory: bool):
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": sys.version.split()[0],
+            "trace_memory": trace_memory,
+            "runs": runs,
+        }, f, indent=2)
+    print(f"\n💾 Saved results to {output}")
+
+
+def parse_modes(value: str) -> list:
+    modes = [mode.strip() for mode in value.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in DETECTORS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown mode(s): {', '.join(unknown)} (choose from {', '.join(DETECTORS)})")
+    return modes
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Synthetic corpus generator and scale benchmark for duplicate detection")
+    subparsers = parser.add_subparsers(dest='command', help='Command to execute')
+
+    def add_generator_args(sub):
+        sub.add_argument('--per-test', type=int, default=DEFAULT_QUESTIONS_PER_TEST, help=f'Questions per test file (default: {DEFAULT_QUESTIONS_PER_TEST})')
+        sub.add_argument('--exact-rate', type=float, default=0.02, help='Fraction of exact duplicates (default: 0.02)')
+        sub.add_argument('--reordered-rate', type=float, default=0.01, help='Fraction of duplicates with shuffled options (default: 0.01)')
+        sub.add_argument('--paraphrased-rate', type=float, default=0.02, help='Fraction of duplicates with paraphrased text (default: 0.02)')
+        sub.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+
+    def add_run_args(sub):
+        sub.add_argument('--modes', type=parse_modes, default=DEFAULT_MODES, help=f'Comma-separated modes (default: {",".join(DEFAULT_MODES)})')
+        sub.add_argument('--output', help='Write results to this JSON file')
+        sub.add_argument('--compare', help='Previous results file to compare timings and recall against')
+        sub.add_argument('--no-trace-memory', action='store_true', help='Skip tracemalloc (faster, no peak memory figures)')
+
+    generate_parser = subparsers.add_parser('generate', help='Generate a synthetic corpus with planted duplicates')
+    generate_parser.add_argument('--size', type=int, required=True, help='Number of questions')
+    generate_parser.add_argument('--output', required=True, help='Directory to write test files and manifest.json to')
+    add_generator_args(generate_parser)
+
+    run_parser = subparsers.add_parser('run', help='Benchmark duplicate detection on a generated corpus')
+    run_parser.add_argument('corpus', help='Corpus directory written by "generate"')
+    add_run_args(run_parser)
+
+    scale_parser = subparsers.add_parser('scale', help='Generate corpora of several sizes and benchmark each')
+    scale_parser.add_argument('--sizes', default='2000,10000', help='Comma-separated corpus sizes (default: 2000,10000)')
+    add_generator_args(scale_parser)
+    add_run_args(scale_parser)
+
+    args = parser.parse_args()
+
+    if not args.command:
+        parser.print_help()
+        return 1
+
+    if args.command == 'generate':
+        generate(build_profile(), args.size, Path(args.output), args)
+        return 0
+
+    trace_memory = not args.no_trace_memory
+    runs = []
+    if args.command == 'run':
+        corpus_dir = Path(args.corpus)
+        if not (corpus_dir / "manifest.json").exists():
+            print(f"❌ Error: {corpus_dir} has no manifest.json (generate it with the 'generate' command)")
+            return 1
+        print(f"🔍 Benchmarking {corpus_dir}...\n")
+        runs.append(benchmark_corpus(corpus_dir, args.modes, trace_memory))
+    else:
+        profile = build_profile()
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            with tempfile.TemporaryDirectory(prefix="dup_corpus_") as corpus:
+                print(f"\n🔍 Benchmarking {size} questions...\n")
+                generate(profile, size, Path(corpus), args)
+                runs.append(benchmark_corpus(Path(corpus), args.modes, trace_memory))
+
+    if args.output:
+        save_results(runs, args.output, trace_memory)
+    if args.compare:
+        return 1 if compare_results(runs, Path(args.compare)) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for the Gemini enrichment pipeline.
+Drives the real analysis and domain-fixing code paths against the local mock
+model (utils/mock_model.py) with configurable latency, injected 429/500/503
+errors and malformed responses, and reports throughput, tail latency and
+retry behaviour for every combination of mode, concurrency and batch size.
+
+Usage:
+    python benchmark_enrichment.py [--pipeline analysis] [--modes sync,async] [--questions 200]
+                                   [--concurrency 4,8,16] [--batch-size 1,5]
+                                   [--median-ms 800] [--p99-ms 4000] [--error-429 0.02] [--malformed 0.01]
+                                   [--time-scale 0.01] [--stream] [--output results.json]
+    python benchmark_enrichment.py --pipeline domains --batch-size 1,25,50
+    python benchmark_enrichment.py --keys 3 --bad-keys 1 --quota-rpm 60   # API key pool, one rejected key
+
+All sleeps (mock latency, retry backoff, pacing delays and rate limits) are
+multiplied by --time-scale, and reported times are converted back, so a run
+at --time-scale 0.01 finishes 100x faster and still projects real wall time.
+"""
+
+import io
+import sys
+import math
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from collections import defaultdict
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.analysis_index import AnalysisIndex
+from utils.analysis_log import AnalysisLog
+from utils.client_pool import DEFAULT_COOLDOWN, ClientPool
+from utils.mock_model import LATENCY_KINDS, LatencyModel, MockGeminiModel
+from utils.question_utils import get_questions_dir, load_question_records, save_questions_file
+from utils.rate_limit import RateLimiter
+import analyze_questions_gemini
+import fix_domains_gemini
+
+# Configuration
+PIPELINES = ["analysis", "domains"]
+MODES = ["sync", "async"]
+DEFAULT_QUESTIONS = 200
+DEFAULT_TIME_SCALE = 0.01
+# Script constants multiplied by --time-scale
+SCALED_DELAYS = [
+    "RATE_LIMIT_DELAY",
+    "RETRY_BASE_DELAY",
+    "RETRY_MAX_DELAY",
+    "QUESTION_RETRY_BUDGET",
+    "CIRCUIT_BREAKER_COOLDOWN",
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+@contextmanager
+def scaled_delays(time_scale: float):
+    """
+    Temporarily multiply the scripts' retry and pacing delays by time_scale.
+    Each run also gets a fresh shared retry controller built from the scaled values.
+    """
+    saved = []
+    for module in (analyze_questions_gemini, fix_domains_gemini):
+        for name in SCALED_DELAYS:
+            saved.append((module, name, getattr(module, name)))
+            setattr(module, name, getattr(module, name) * time_scale)
+        module._retry_controller = None
+    try:
+        yield
+    finally:
+        for module, name, value in saved:
+            setattr(module, name, value)
+        for module in (analyze_questions_gemini, fix_domains_gemini):
+            module._retry_controller = None
+
+
+def build_models(args) -> list:
+    """
+    One mock model per API key configured from the command line; the first
+    --bad-keys of them reject every request with 403 like an invalid key.
+    """
+    return [
+        MockGeminiModel(
+            latency=LatencyModel(args.latency, args.median_ms, args.p99_ms, args.per_item_ms),
+            error_rates=(
+                {403: 1.0} if position < args.bad_keys
+                else {429: args.error_429, 500: args.error_500, 503: args.error_503}
+            ),
+            malformed_rate=args.malformed,
+            quota_rpm=args.quota_rpm,
+            time_scale=args.time_scale,
+            seed=args.seed + position,
+        )
+        for position in range(args.keys)
+    ]
+
+
+def build_client(models: list, args):
+    """The single mock model, or a key pool over several (limits and cooldowns scaled like other delays)."""
+    if len(models) == 1:
+        return models[0]
+    return ClientPool.from_models(
+        {f"mock{position}": model for position, model in enumerate(models, 1)},
+        args.key_rpm / args.time_scale if args.key_rpm else None,
+        cooldown=DEFAULT_COOLDOWN * args.time_scale,
+        verbose=False,
+    )
+
+
+def group_by_test(records: list) -> dict:
+    """(test_name, question) pairs grouped by test, in order."""
+    groups = defaultdict(list)
+    for test_name, _, question in records:
+        groups[test_name].append(question)
+    return groups
+
+
+def run_analysis(records: list, model, mode: str, concurrency: int, batch_size: int, args, scratch: Path) -> dict:
+    """Analyze every record with the sync or async code path; returns question counts."""
+    output = {}
+    log = AnalysisLog(scratch / "analysis_output.jsonl").open()
+    try:
+        if mode == "async":
+            work = [
+                (test_name, analyze_questions_gemini.get_question_id(question, test_name), question)
+                for test_name, _, question in records
+            ]
+            limiter = RateLimiter(args.rpm / args.time_scale, args.tpm / args.time_scale)
+            analyzed, errors, _ = asyncio.run(
+                analyze_questions_gemini.run_async_analysis(work, model, output, log, concurrency, limiter, batch_size)
+            )
+        else:
+            analyzed = errors = 0
+            index = AnalysisIndex()
+            for test_name, questions in group_by_test(records).items():
+                work = [(analyze_questions_gemini.get_question_id(q, test_name), q) for q in questions]
+                counts = analyze_questions_gemini.run_sync_analysis(work, test_name, model, output, log, index, batch_size)
+                analyzed += counts[0]
+                errors += counts[1]
+    finally:
+        log.close()
+    stored_errors = sum(1 for entry in output.values() if "error" in entry.get("analysis", {}))
+    return {"analyzed": analyzed, "errors": errors, "stored_parse_errors": stored_errors}
+
+
+def run_domains(records: list, model, batch_size: int, scratch: Path) -> dict:
+    """Classify every record with fix_domains_gemini.process_test_file() in dry-run mode."""
+    analyzed = errors = 0
+    for test_name, questions in group_by_test(records).items():
+        test_file = scratch / f"{test_name}.json"
+        save_questions_file(test_file, questions, create_backup=False)
+        stats = fix_domains_gemini.process_test_file(test_file, model, dry_run=True, batch_size=batch_size)
+        analyzed += stats["analyzed"]
+        errors += stats["errors"]
+    return {"analyzed": analyzed, "errors": errors}
+
+
+def summarize_requests(models: list, time_scale: float) -> dict:
+    """Request latency, per-prompt completion latency and retry counts from the mocks' logs."""
+    request_log = [entry for model in models for entry in model.request_log]
+    total_calls = sum(model.stats["calls"] for model in models)
+    latencies = [(end - start) / time_scale for _, start, end, _ in request_log]
+    by_prompt = defaultdict(list)
+    for digest, start, end, outcome in request_log:
+        by_prompt[digest].append((start, end, outcome))
+    # Completion: first attempt sent -> last attempt answered, including backoff between retries
+    completion = [(max(e for _, e, _ in calls) - min(s for s, _, _ in calls)) / time_scale for calls in by_prompt.values()]
+    outcomes = defaultdict(int)
+    for model in models:
+        for key, count in model.stats.items():
+            if key != "calls":
+                outcomes[key] += count
+    return {
+        "requests": total_calls,
+        "distinct_prompts": len(by_prompt),
+        "retries": total_calls - len(by_prompt),
+        "outcomes": dict(outcomes),
+        "latency_p50": round(percentile(latencies, 50), 3),
+        "latency_p95": round(percentile(latencies, 95), 3),
+        "latency_p99": round(percentile(latencies, 99), 3),
+        "completion_p50": round(percentile(completion, 50), 3),
+        "completion_p95": round(percentile(completion, 95), 3),
+        "completion_p99": round(percentile(completion, 99), 3),
+    }
+
+
+def run_config(records: list, pipeline: str, mode: str, concurrency: int, batch_size: int, args) -> dict:
+    """Run one configuration with its console output (and progress bars) captured."""
+    models = build_models(args)
+    model = build_client(models, args)
+    with tempfile.TemporaryDirectory(prefix="enrich_bench_") as scratch, scaled_delays(args.time_scale):
+        start_time = time.perf_counter()
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            if pipeline == "analysis":
+                counts = run_analysis(records, model, mode, concurrency, batch_size, args, Path(scratch))
+            else:
+                counts = run_domains(records, model, batch_size, Path(scratch))
+        elapsed = (time.perf_counter() - start_time) / args.time_scale
+        module = analyze_questions_gemini if pipeline == "analysis" else fix_domains_gemini
+        retry_stats = module.get_retry_controller().stats
+
+    result = {
+        "pipeline": pipeline,
+        "mode": mode,
+        "concurrency": concurrency if mode == "async" else 1,
+        "batch_size": batch_size,
+        "questions": len(records),
+        "seconds": round(elapsed, 1),
+        "questions_per_min": round(counts["analyzed"] / elapsed * 60, 1) if elapsed else 0.0,
+    }
+    result.update(counts)
+    result.update(summarize_requests(models, args.time_scale))
+    if isinstance(model, ClientPool):
+        result["keys"] = model.stats()
+    result["shared_pauses"] = retry_stats["pauses"]
+    result["circuit_opens"] = retry_stats["circuit_opens"]
+    result["gave_up"] = retry_stats["give_ups"]
+    return result
+
+
+def print_results(results: list, args):
+    """Print one table of results."""
+    print(f"\n{'='*80}")
+    print(f"ENRICHMENT BENCHMARK ({results[0]['questions']} questions, mock latency {args.latency} "
+          f"p50 {args.median_ms:g} ms / p99 {args.p99_ms:g} ms)")
+    print(f"{'='*80}\n")
+    print(f"  {'mode':<7}{'conc':>5}{'batch':>6}{'time':>10}{'q/min':>9}{'req':>6}{'retry':>6}"
+          f"{'req p50/p99':>14}{'done p95/p99':>15}{'errors':>8}")
+    for r in results:
+        print(f"  {r['mode']:<7}{r['concurrency']:>5}{r['batch_size']:>6}{r['seconds']:>9.1f}s{r['questions_per_min']:>9.1f}"
+              f"{r['requests']:>6}{r['retries']:>6}{r['latency_p50']:>7.2f}/{r['latency_p99']:<6.2f}"
+              f"{r['completion_p95']:>8.1f}/{r['completion_p99']:<6.1f}{r['errors']:>8}")
+    print("\n  req = API requests sent, retry = requests beyond the first per prompt,")
+    print("  done = seconds from a prompt's first attempt to its last response (includes backoff)")
+    outcomes = defaultdict(int)
+    for r in results:
+        for key, count in r["outcomes"].items():
+            outcomes[key] += count
+    print(f"  Outcomes across all runs: {', '.join(f'{k}: {v}' for k, v in sorted(outcomes.items()))}")
+    print(f"  Retry controller: {sum(r['shared_pauses'] for r in results)} shared pause(s), "
+          f"{sum(r['circuit_opens'] for r in results)} circuit open(s), "
+          f"{sum(r['gave_up'] for r in results)} request(s) given up")
+    for r in results:
+        if "keys" in r:
+            print(f"  Key pool ({r['mode']}, conc {r['concurrency']}, batch {r['batch_size']}): "
+                  + "; ".join(f"{k['key']} {k['requests']} req, {k['rate_limited']} limited, {k['status']}" for k in r["keys"]))
+    stored = sum(r.get("stored_parse_errors", 0) for r in results)
+    if stored:
+        print(f"  ⚠️  {stored} malformed response(s) were stored as parse-error analyses")
+
+
+def parse_int_list(value: str) -> list:
+    try:
+        numbers = [int(v) for v in value.split(",") if v.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected comma-separated integers, got '{value}'")
+    if not numbers or min(numbers) < 1:
+        raise argparse.ArgumentTypeError("values must be positive integers")
+    return numbers
+
+
+def parse_modes(value: str) -> list:
+    modes = [mode.strip() for mode in value.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown mode(s): {', '.join(unknown)} (choose from {', '.join(MODES)})")
+    return modes
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Offline enrichment pipeline benchmark against the mock Gemini model")
+    parser.add_argument('--pipeline', choices=PIPELINES, default='analysis', help='Code path to drive (default: analysis)')
+    parser.add_argument('--modes', type=parse_modes, default=MODES, help='Analysis modes: sync,async (default: both; domains is always sync)')
+    parser.add_argument('--questions', type=int, default=DEFAULT_QUESTIONS, help=f'Number of real questions to process (default: {DEFAULT_QUESTIONS})')
+    parser.add_argument('--concurrency', type=parse_int_list, default=[8], help='Comma-separated async concurrency levels (default: 8)')
+    parser.add_argument('--batch-size', type=parse_int_list, default=[1], help='Comma-separated questions per request (default: 1)')
+    parser.add_argument('--rpm', type=float, default=analyze_questions_gemini.REQUESTS_PER_MINUTE, help='Async client requests/min limit')
+    parser.add_argument('--tpm', type=float, default=analyze_questions_gemini.TOKENS_PER_MINUTE, help='Async client tokens/min limit')
+    parser.add_argument('--stream', action='store_true', help='Stream analysis responses and validate them as they arrive')
+
+    mock = parser.add_argument_group('mock model')
+    mock.add_argument('--latency', choices=LATENCY_KINDS, default='lognormal', help='Latency distribution (default: lognormal)')
+    mock.add_argument('--median-ms', type=float, default=800, help='Median request latency (default: 800)')
+    mock.add_argument('--p99-ms', type=float, default=4000, help='99th percentile request latency (default: 4000)')
+    mock.add_argument('--per-item-ms', type=float, default=150, help='Extra latency per additional question in a batch (default: 150)')
+    mock.add_argument('--error-429', type=float, default=0.02, help='Injected 429 rate (default: 0.02)')
+    mock.add_argument('--error-500', type=float, default=0.005, help='Injected 500 rate (default: 0.005)')
+    mock.add_argument('--error-503', type=float, default=0.005, help='Injected 503 rate (default: 0.005)')
+    mock.add_argument('--malformed', type=float, default=0.01, help='Malformed response rate (default: 0.01)')
+    mock.add_argument('--quota-rpm', type=float, help='Server-side quota: 429 for requests beyond this many per minute')
+    mock.add_argument('--keys', type=int, default=1, help='Mock API keys; more than one runs through the client pool (default: 1)')
+    mock.add_argument('--bad-keys', type=int, default=0, help='How many of the keys reject every request with 403 (default: 0)')
+    mock.add_argument('--key-rpm', type=float, help='Client-side requests/min limit of each pooled key')
+    mock.add_argument('--time-scale', type=float, default=DEFAULT_TIME_SCALE, help=f'Multiplier for all sleeps (default: {DEFAULT_TIME_SCALE})')
+    mock.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+    parser.add_argument('--output', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    if args.time_scale <= 0:
+        print("❌ Error: --time-scale must be positive")
+        return 1
+    if args.keys < 1 or not 0 <= args.bad_keys < args.keys:
+        print("❌ Error: --keys must be at least 1 and --bad-keys below --keys")
+        return 1
+    analyze_questions_gemini.STREAM_RESPONSES = args.stream
+
+    records = load_question_records(get_questions_dir())[:args.questions]
+    if not records:
+        print("❌ No questions found in questions directory")
+        return 1
+    print(f"📂 Benchmarking the {args.pipeline} pipeline on {len(records)} questions "
+          f"(time scale {args.time_scale:g})\n")
+
+    configs = []
+    if args.pipeline == "domains":
+        configs = [("sync", 1, batch_size) for batch_size in args.batch_size]
+    else:
+        for mode in args.modes:
+            levels = args.concurrency if mode == "async" else [1]
+            configs.extend((mode, level, batch_size) for level in levels for batch_size in args.batch_size)
+
+    results = []
+    for mode, concurrency, batch_size in configs:
+        print(f"  Running {mode} (concurrency {concurrency}, batch size {batch_size})...", flush=True)
+        results.append(run_config(records, args.pipeline, mode, concurrency, batch_size, args))
+    print_results(results, args)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "settings": {k: v for k, v in vars(args).items() if k != "output"},
+                "results": results,
+            }, f, indent=2)
+        print(f"\n💾 Saved results to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
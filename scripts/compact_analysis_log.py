@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Compact the append-only analysis checkpoint log (analysis_output.jsonl) into
+the sharded analysis store (analysis/) that merge_gemini_analysis.py reads.
+analyze_questions_gemini.py does this at the end of a complete run; use this
+script after an interrupted or crashed run. Only the shards of the tests in
+the log are rewritten.
+
+Usage:
+    python compact_analysis_log.py [--keep-log]
+"""
+
+import sys
+from pathlib import Path
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.analysis_store import ANALYSIS_DIR, AnalysisStore
+
+LOG_FILE = "analysis_output.jsonl"
+
+
+def main():
+    """Main entry point."""
+    keep_log = "--keep-log" in sys.argv
+
+    if not Path(LOG_FILE).exists():
+        print(f"❌ File not found: {LOG_FILE}")
+        return 1
+
+    print(f"📂 Compacting {LOG_FILE} into {ANALYSIS_DIR}/...")
+    try:
+        store = AnalysisStore(ANALYSIS_DIR)
+        legacy = store.legacy_file()
+        if legacy is not None:
+            print(f"❌ {legacy} has not been migrated; run migrate_analysis_store.py first")
+            return 1
+        stats = store.compact_log(Path(LOG_FILE), truncate=not keep_log)
+    except Exception as e:
+        print(f"❌ Error compacting log: {e}")
+        return 1
+
+    if stats is None:
+        print("✓ Log is empty, nothing to compact")
+        return 0
+
+    print(f"\n✅ Compaction complete!")
+    print(f"   - Entries before: {stats['existing']}")
+    print(f"   - Results in log: {stats['logged']}")
+    print(f"   - Total entries: {stats['total']}")
+    print(f"   - Shards written: {stats['shards']}")
+    if not keep_log:
+        print(f"   - {LOG_FILE} emptied")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
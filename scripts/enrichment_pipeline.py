@@ -0,0 +1,680 @@
+#!/usr/bin/env python3
+"""
+Single-pass enrichment pipeline.
+
+Runs each question through analysis → domain check → explanation merge → tag
+extraction in one pass over the corpus. The separate scripts
+(analyze_questions_gemini.py, fix_domains_gemini.py, merge_gemini_analysis.py,
+add_tags_to_questions.py) each reload and rewrite every test file.
+
+    python3 scripts/enrichment_pipeline.py                      # all stages, all tests
+    python3 scripts/enrichment_pipeline.py --stages merge,tags  # local stages only, no API calls
+    python3 scripts/enrichment_pipeline.py --dry-run            # show what each stage would do
+
+Every stage records, per question content fingerprint, a digest of its input
+and of the output it left in the question (enrichment_state.json). A stage is
+skipped for a question while both still match, so re-runs only pay for
+questions whose content or analysis changed. Each test file is loaded once
+and written at most once, after all stages ran, and only if it changed.
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, MutableMapping, Optional, Tuple
+
+# Add utils to path
+sys.path.insert(0, str(Path(__file__).parent))
+import analyze_questions_gemini
+import fix_domains_gemini
+from add_tags_to_questions import extract_tags_from_analysis
+from merge_gemini_analysis import (
+    ANALYSIS_DIGEST_FIELD,
+    analysis_digest,
+    convert_gemini_analysis_to_explanation,
+)
+from utils.analysis_index import AnalysisIndex
+from utils.analysis_log import AnalysisLog
+from utils.client_pool import ClientPool, create_gemini_client, load_api_keys
+from utils.domain_classifier import DomainClassifier, load_default_classifier
+from utils.enrichment_state import EnrichmentState, stable_digest
+from utils.llm_cache import CachedModel, ResponseCache
+from utils.mock_model import MOCK_MODEL_NAME, MockGeminiModel
+from utils.request_groups import group_duplicates, request_key
+from utils.question_utils import (
+    find_test_files,
+    get_question_fingerprint,
+    get_questions_dir,
+    load_questions_file,
+    save_questions_file,
+)
+from utils.scheduler import RequestCounter
+from utils.telemetry import TELEMETRY_FILE, Telemetry, telemetry_labels
+
+# Configuration
+STATE_FILE = "enrichment_state.json"
+MOCK_STATE_FILE = "mock_enrichment_state.json"  # --mock records (never mixed with real ones)
+MODEL_NAME = analyze_questions_gemini.MODEL_NAME
+CACHE_DIR = analyze_questions_gemini.CACHE_DIR
+CACHE_MAX_MB = analyze_questions_gemini.CACHE_MAX_MB
+
+
+class PipelineItem:
+    """One question flowing through the stages."""
+
+    def __init__(self, test_key: str, question: Dict[str, Any]):
+        self.test_key = test_key
+        self.question = question
+        self.q_id = analyze_questions_gemini.get_question_id(question, test_key)
+        self.fingerprint = get_question_fingerprint(question)
+
+
+class PipelineContext:
+    """
+    State shared by the stages for one run.
+
+    Args:
+        model: Gemini model (or None when no selected stage calls the model)
+        analysis_output: Analysis store (analysis/ shards), updated in place
+        analysis_index: Content index over analysis_output
+        checkpoint_log: Open checkpoint log for new analysis results (or None)
+        state: Stage records
+        batch_size: Questions per analysis request
+        domain_batch_size: Questions per domain classification request
+        domain_classifier: Local classifier whose confirmed domains skip the API (or None)
+    """
+
+    def __init__(
+        self,
+        model,
+        analysis_output: MutableMapping[str, Any],
+        analysis_index: AnalysisIndex,
+        checkpoint_log: Optional[AnalysisLog],
+        state: EnrichmentState,
+        batch_size: int = analyze_questions_gemini.BATCH_SIZE,
+        domain_batch_size: int = fix_domains_gemini.BATCH_SIZE,
+        domain_classifier: Optional[DomainClassifier] = None,
+    ):
+        self.model = model
+        self.analysis_output = analysis_output
+        self.analysis_index = analysis_index
+        self.checkpoint_log = checkpoint_log
+        self.state = state
+        self.batch_size = batch_size
+        self.domain_batch_size = domain_batch_size
+        self.domain_classifier = domain_classifier
+
+    def find_analysis(self, item: PipelineItem) -> Optional[Dict[str, Any]]:
+        """Analysis entry for a question, by key first and then by content."""
+        entry = self.analysis_output.get(item.q_id)
+        if entry is None:
+            content_key = self.analysis_index.lookup(item.question)
+            if content_key is not None:
+                entry = self.analysis_output.get(content_key)
+        return entry
+
+    def usable_analysis(self, item: PipelineItem) -> Optional[Dict[str, Any]]:
+        """Gemini analysis dict for a question, or None if missing or unparsable."""
+        entry = self.find_analysis(item)
+        analysis = entry.get("analysis") if isinstance(entry, dict) else None
+        if not isinstance(analysis, dict) or "error" in analysis:
+            return None
+        return analysis
+
+
+class Stage:
+    """
+    One enrichment step, described by its input and its output in the question.
+
+    Subclasses implement input_digest(), current_output(), compute() and
+    apply(). A question is skipped while its recorded input digest and output
+    still match; questions with the same content are computed once.
+    """
+
+    name = ""
+    description = ""
+    uses_model = False
+    # Record the output itself rather than its digest, so a recorded result can be
+    # applied to other copies of the question without computing it again
+    stores_value = False
+
+    def input_digest(self, item: PipelineItem, ctx: PipelineContext) -> Optional[str]:
+        """Digest of everything the stage output depends on, or None if the input is not ready yet."""
+        raise NotImplementedError
+
+    def current_output(self, item: PipelineItem) -> Any:
+        """The question field(s) this stage writes."""
+        raise NotImplementedError
+
+    def compute(self, items: List[PipelineItem], ctx: PipelineContext) -> Dict[int, Any]:
+        """Stage results by position in items; failed positions are left out."""
+        raise NotImplementedError
+
+    def apply(self, item: PipelineItem, value: Any) -> bool:
+        """Write a result into the question; returns True if the question changed."""
+        raise NotImplementedError
+
+    def recorded(self, item: PipelineItem) -> Any:
+        output = self.current_output(item)
+        return output if self.stores_value else stable_digest(output)
+
+    def plan(
+        self, items: List[PipelineItem], ctx: PipelineContext, stats: Counter
+    ) -> List[Tuple[PipelineItem, str]]:
+        """
+        Decide what this stage must do for one test file.
+
+        Up-to-date questions are counted as skipped and recorded results are
+        reused (when stores_value is set) without calling compute(). A stored
+        output edited by hand since the stage left it is kept and recorded.
+
+        Returns:
+            (item, input digest) for every question that needs compute()
+        """
+        pending = []
+        for item in items:
+            digest = self.input_digest(item, ctx)
+            if digest is None:
+                stats["waiting"] += 1
+                continue
+            record = ctx.state.get(item.fingerprint, self.name)
+            if record and record["input"] == digest:
+                output = self.recorded(item)
+                copies = dict(record.get("copies", {}))
+                if record["output"] == output:
+                    stats["skipped"] += 1
+                    if self.stores_value and copies.get(item.q_id) != output:
+                        copies[item.q_id] = output
+                        ctx.state.set(item.fingerprint, self.name, digest, output, copies)
+                    continue
+                if self.stores_value:
+                    if item.q_id in copies and copies[item.q_id] != output:
+                        # Changed since the stage last left a value here: a user edit,
+                        # which becomes the recorded output instead of being reverted
+                        stats["kept"] += 1
+                        copies[item.q_id] = output
+                        ctx.state.set(item.fingerprint, self.name, digest, output, copies)
+                        continue
+                    # A copy the stage has not reached yet, or one still holding the value
+                    # the stage left in it: bring it up to the recorded output
+                    stats["reused"] += 1
+                    if self.apply(item, record["output"]):
+                        stats["changed"] += 1
+                    copies[item.q_id] = self.recorded(item)
+                    ctx.state.set(item.fingerprint, self.name, digest, record["output"], copies)
+                    continue
+            pending.append((item, digest))
+        return pending
+
+    def execute(
+        self, pending: List[Tuple[PipelineItem, str]], ctx: PipelineContext, stats: Counter
+    ) -> int:
+        """
+        Compute and apply results for the planned questions.
+
+        Returns:
+            Number of questions changed
+        """
+        groups: Dict[Tuple[str, str], List[PipelineItem]] = {}
+        for item, digest in pending:
+            groups.setdefault((item.fingerprint, digest), []).append(item)
+        keys = list(groups)
+        results = self.compute([groups[key][0] for key in keys], ctx)
+
+        changed = 0
+        for position, (fingerprint, digest) in enumerate(keys):
+            copies = groups[(fingerprint, digest)]
+            if position not in results:
+                stats["failed"] += len(copies)
+                continue
+            for item in copies:
+                stats["processed"] += 1
+                if self.apply(item, results[position]):
+                    changed += 1
+            left = None
+            if self.stores_value:
+                record = ctx.state.get(fingerprint, self.name) or {}
+                left = dict(record.get("copies", {}))
+                left.update((item.q_id, self.recorded(item)) for item in copies)
+            ctx.state.set(fingerprint, self.name, digest, self.recorded(copies[0]), left)
+        stats["changed"] += changed
+        return changed
+
+
+class AnalysisStage(Stage):
+    """Gemini analysis; results go to the analysis checkpoint log, not into the question."""
+
+    name = "analysis"
+    description = "Gemini analysis"
+    uses_model = True
+
+    def plan(self, items, ctx, stats):
+        # The analysis store is this stage's record: skip questions it already covers.
+        # Identical questions share one request; its result is fanned out to the copies.
+        unanalyzed = []
+        for item in items:
+            if ctx.find_analysis(item) is not None:
+                stats["skipped"] += 1
+                continue
+            unanalyzed.append(item)
+        pending = []
+        for representative, *copies in group_duplicates(unanalyzed, lambda item: request_key(item.question)):
+            stats["reused"] += len(copies)
+            pending.append((representative, copies))
+        return pending
+
+    def execute(self, pending, ctx, stats):
+        copies = {
+            item.q_id: [(copy.test_key, copy.q_id, copy.question) for copy in item_copies]
+            for item, item_copies in pending
+            if item_copies
+        }
+        analyzed, errors = analyze_questions_gemini.run_sync_analysis(
+            [(item.q_id, item.question) for item, _ in pending],
+            pending[0][0].test_key,
+            ctx.model,
+            ctx.analysis_output,
+            ctx.checkpoint_log,
+            ctx.analysis_index,
+            batch_size=ctx.batch_size,
+            copies=copies,
+        )
+        stats["processed"] += analyzed
+        stats["failed"] += errors
+        return 0
+
+
+class DomainStage(Stage):
+    """Domain classification; the recorded domain is reused for copies of the question."""
+
+    name = "domain"
+    description = "Domain check"
+    uses_model = True
+    stores_value = True
+
+    def input_digest(self, item, ctx):
+        return stable_digest(fix_domains_gemini.get_domain_analysis_prompt(item.question))
+
+    def current_output(self, item):
+        return item.question.get("domain")
+
+    def compute(self, items, ctx):
+        domains, _, _ = fix_domains_gemini.classify_with_prefilter(
+            [item.question for item in items],
+            ctx.model,
+            batch_size=ctx.domain_batch_size,
+            classifier=ctx.domain_classifier,
+        )
+        return domains
+
+    def apply(self, item, value):
+        if item.question.get("domain") == value:
+            return False
+        item.question["domain"] = value
+        return True
+
+
+class MergeStage(Stage):
+    """Explanation built from the Gemini analysis (as merge_gemini_analysis.py does)."""
+
+    name = "merge"
+    description = "Explanation merge"
+
+    def input_digest(self, item, ctx):
+        analysis = ctx.usable_analysis(item)
+        if analysis is None:
+            return None
+        return analysis_digest(analysis, item.question)
+
+    def current_output(self, item):
+        # The digest lets merge_gemini_analysis.py skip questions merged here
+        return {
+            "explanation": item.question.get("explanation"),
+            ANALYSIS_DIGEST_FIELD: item.question.get(ANALYSIS_DIGEST_FIELD),
+        }
+
+    def compute(self, items, ctx):
+        results = {}
+        for position, item in enumerate(items):
+            analysis = ctx.usable_analysis(item)
+            results[position] = {
+                "explanation": convert_gemini_analysis_to_explanation(analysis, item.question),
+                ANALYSIS_DIGEST_FIELD: analysis_digest(analysis, item.question),
+            }
+        return results
+
+    def apply(self, item, value):
+        if self.current_output(item) == value:
+            return False
+        item.question.update(value)
+        return True
+
+
+class TagStage(Stage):
+    """Tags from AWS concepts and best practices, merged with existing tags (as add_tags_to_questions.py does)."""
+
+    name = "tags"
+    description = "Tag extraction"
+
+    def input_digest(self, item, ctx):
+        analysis = ctx.usable_analysis(item)
+        if analysis is None:
+            return None
+        return stable_digest(extract_tags_from_analysis(analysis))
+
+    def current_output(self, item):
+        return sorted(item.question.get("tags", []))
+
+    def compute(self, items, ctx):
+        return {
+            position: extract_tags_from_analysis(ctx.usable_analysis(item))
+            for position, item in enumerate(items)
+        }
+
+    def apply(self, item, value):
+        existing_tags = item.question.get("tags", [])
+        merged_tags = sorted(set(existing_tags) | set(value))
+        if merged_tags == existing_tags:
+            return False
+        item.question["tags"] = merged_tags
+        return True
+
+
+# Stages in the order a question flows through them
+STAGES: List[Stage] = [AnalysisStage(), DomainStage(), MergeStage(), TagStage()]
+STAGE_NAMES = [stage.name for stage in STAGES]
+
+
+def parse_stages(value: str) -> List[Stage]:
+    """Selected stages in pipeline order, from a comma-separated list of names"""
+    names = [name.strip() for name in value.split(",") if name.strip()]
+    unknown = [name for name in names if name not in STAGE_NAMES]
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(
+            f"unknown stage(s) {', '.join(unknown) or value!r} (choose from {','.join(STAGE_NAMES)})"
+        )
+    return [stage for stage in STAGES if stage.name in names]
+
+
+def create_model(args) -> Tuple[Optional[Any], Optional[RequestCounter], Optional[ResponseCache]]:
+    """
+    Model client for the stages that call the API.
+
+    Returns:
+        Tuple of (model, request counter, response cache); model is None if it
+        could not be initialized
+    """
+    if args.mock:
+        counter = RequestCounter(MockGeminiModel(seed=0))
+        print("🧪 Using the local mock model\n")
+        return counter, counter, None
+
+    api_keys = load_api_keys()
+    if not api_keys and not args.cache_only:
+        print("❌ Error: API key not found")
+        print("Create a .env file in the project root with: GOOGLE_API_KEY=your-key-here")
+        print("(or run only the local stages: --stages merge,tags)")
+        return None, None, None
+
+    genai = analyze_questions_gemini.genai
+    if genai is None:
+        print("❌ Error: google-generativeai not installed")
+        print("Install it with: pip install -U google-generativeai")
+        return None, None, None
+
+    print("🔧 Initializing Gemini API...")
+    try:
+        client = create_gemini_client(
+            genai,
+            MODEL_NAME,
+            api_keys,
+            analyze_questions_gemini.REQUESTS_PER_MINUTE,
+            analyze_questions_gemini.TOKENS_PER_MINUTE,
+        )
+        if isinstance(client, ClientPool):
+            print(f"🔑 Spreading requests over {len(client)} API keys")
+        counter = RequestCounter(client)
+        print(f"✓ Model {MODEL_NAME} ready\n")
+    except Exception as e:
+        print(f"❌ Error initializing Gemini: {e}")
+        return None, None, None
+
+    if args.no_cache:
+        return counter, counter, None
+    response_cache = ResponseCache(CACHE_DIR, CACHE_MAX_MB * 1024 * 1024)
+    model = CachedModel(counter, MODEL_NAME, response_cache, cache_only=args.cache_only)
+    print(f"🗄️  Response cache: {CACHE_DIR} ({'replay only' if args.cache_only else 'read/write'})\n")
+    return model, counter, response_cache
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(
+        description="Analyze, classify, merge and tag questions in one pass"
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="Test files to process (default: every test*.json in the questions directory)",
+    )
+    parser.add_argument(
+        "--stages",
+        type=parse_stages,
+        default=STAGES,
+        help=f"Comma-separated stages to run (default: {','.join(STAGE_NAMES)})",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what each stage would do; no API calls and no files written",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=analyze_questions_gemini.BATCH_SIZE,
+        help=f"Questions per analysis request (default: {analyze_questions_gemini.BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--domain-batch-size",
+        type=int,
+        default=fix_domains_gemini.BATCH_SIZE,
+        help=f"Questions per domain classification request (default: {fix_domains_gemini.BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Always call the API instead of reusing cached responses",
+    )
+    parser.add_argument(
+        "--cache-only",
+        action="store_true",
+        help="Replay cached responses only; questions without one are left for a later run",
+    )
+    parser.add_argument(
+        "--mock",
+        action="store_true",
+        help=(
+            f"Use the local mock model (results go to {analyze_questions_gemini.MOCK_OUTPUT_DIR}/ "
+            f"and {MOCK_STATE_FILE}; question files are only written with --questions-dir)"
+        ),
+    )
+    parser.add_argument(
+        "--questions-dir",
+        type=Path,
+        default=None,
+        help="Directory of test files to process (default: the project's questions directory)",
+    )
+    parser.add_argument(
+        "--classifier",
+        action="store_true",
+        help="Skip the API for domains the local classifier confirms at its calibrated confidence",
+    )
+    parser.add_argument(
+        "--no-telemetry",
+        action="store_true",
+        help=f"Do not record per-request telemetry (default: append to {TELEMETRY_FILE})",
+    )
+    args = parser.parse_args()
+
+    if args.cache_only and args.no_cache:
+        print("❌ Error: --cache-only and --no-cache cannot be combined")
+        return 1
+    if args.batch_size < 1 or args.domain_batch_size < 1:
+        print("❌ Error: batch sizes must be at least 1")
+        return 1
+
+    stages: List[Stage] = args.stages
+    output_dir = analyze_questions_gemini.OUTPUT_DIR
+    log_file = analyze_questions_gemini.LOG_FILE
+    state_file = STATE_FILE
+    telemetry_file, model_name = TELEMETRY_FILE, MODEL_NAME
+    write_questions = not args.dry_run
+    if args.mock:
+        # Keep synthetic results apart, and never write them into the real question files
+        output_dir = analyze_questions_gemini.MOCK_OUTPUT_DIR
+        log_file = analyze_questions_gemini.MOCK_LOG_FILE
+        state_file = MOCK_STATE_FILE
+        telemetry_file, model_name = analyze_questions_gemini.MOCK_TELEMETRY_FILE, MOCK_MODEL_NAME
+        write_questions = write_questions and args.questions_dir is not None
+        # The mock has no quota to pace for
+        analyze_questions_gemini.RATE_LIMIT_DELAY = 0
+        fix_domains_gemini.RATE_LIMIT_DELAY = 0
+
+    model, counter, response_cache = None, None, None
+    if not args.dry_run and any(stage.uses_model for stage in stages):
+        model, counter, response_cache = create_model(args)
+        if model is None:
+            return 1
+        # Both stages use the same API quota, so they share one retry controller
+        fix_domains_gemini._retry_controller = analyze_questions_gemini.get_retry_controller()
+        if not args.no_telemetry:
+            telemetry = Telemetry(Path(telemetry_file), "pipeline", model_name)
+            analyze_questions_gemini._telemetry = telemetry
+            fix_domains_gemini._telemetry = telemetry
+            print(f"📈 Recording per-request telemetry to {telemetry_file}\n")
+
+    if args.dry_run:
+        print("🔍 DRY RUN MODE - No API calls, no files modified\n")
+
+    # Find test files
+    if args.files:
+        test_files = [Path(f) for f in args.files if Path(f).exists()]
+    else:
+        test_files = find_test_files(args.questions_dir or get_questions_dir(), exclude_backups=True)
+    if not test_files:
+        print("❌ No test*.json files found in questions directory")
+        return 1
+
+    print(f"📂 Loading existing analysis from {output_dir}/...")
+    try:
+        analysis_output, _, analysis_index = analyze_questions_gemini.load_existing_output(output_dir, log_file)
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    state = EnrichmentState(Path(state_file)).load()
+    print(f"✓ {len(analysis_output)} analyses, {len(state)} questions with stage records\n")
+    print(f"🔗 Stages: {' → '.join(stage.name for stage in stages)}")
+    print(f"📂 {len(test_files)} test file(s) to process\n")
+
+    checkpoint_log = None
+    if not args.dry_run and any(stage.name == "analysis" for stage in stages):
+        checkpoint_log = AnalysisLog(Path(log_file), fsync_every=analyze_questions_gemini.BATCH_SAVE_SIZE).open()
+
+    ctx = PipelineContext(
+        model,
+        analysis_output,
+        analysis_index,
+        checkpoint_log,
+        state,
+        batch_size=args.batch_size,
+        domain_batch_size=args.domain_batch_size,
+        domain_classifier=load_default_classifier() if args.classifier else None,
+    )
+    stats: Dict[str, Counter] = {stage.name: Counter() for stage in stages}
+    files_written = 0
+    total_questions = 0
+    start_time = time.time()
+
+    try:
+        for test_file in test_files:
+            test_key = test_file.stem
+            questions = load_questions_file(test_file)
+            if questions is None:
+                continue
+            total_questions += len(questions)
+            items = [PipelineItem(test_key, question) for question in questions]
+
+            changed = 0
+            summary = []
+            for stage in stages:
+                stage_stats = stats[stage.name]
+                before = stage_stats.copy()
+                pending = stage.plan(items, ctx, stage_stats)
+                if args.dry_run:
+                    stage_stats["pending"] += len(pending)
+                elif pending:
+                    with telemetry_labels(tests=[test_key]):
+                        stage.execute(pending, ctx, stage_stats)
+                done = stage_stats - before
+                changed += done["changed"]
+                summary.append(f"{stage.name}: {done['pending' if args.dry_run else 'processed']} to run")
+
+            print(f"📋 {test_file.name}: {len(questions)} questions | {' | '.join(summary)}")
+            if changed and write_questions:
+                if save_questions_file(test_file, questions, create_backup=True):
+                    files_written += 1
+                    print(f"   💾 Saved {changed} change(s) to {test_file.name}")
+            elif changed:
+                print(f"   [NOT SAVED] {changed} change(s) to {test_file.name}")
+
+            if not args.dry_run:
+                state.save()
+    except KeyboardInterrupt:
+        print("\n⚠️  Interrupted - saving progress...")
+    finally:
+        if checkpoint_log is not None:
+            checkpoint_log.close()
+            analyze_questions_gemini.finalize_output(log_file, output_dir)
+        if not args.dry_run:
+            state.save()
+
+    # Summary
+    elapsed = time.time() - start_time
+    print(f"\n{'=' * 60}")
+    print("✅ Pipeline complete!" if not args.dry_run else "✅ Dry run complete!")
+    print(f"   Questions: {total_questions} in {len(test_files)} file(s)")
+    for stage in stages:
+        stage_stats = stats[stage.name]
+        if args.dry_run:
+            print(
+                f"   {stage.description}: {stage_stats['pending']} to run, {stage_stats['skipped']} up to date, "
+                f"{stage_stats['reused']} from records, {stage_stats['waiting']} waiting for analysis"
+            )
+        else:
+            print(
+                f"   {stage.description}: {stage_stats['processed']} run, {stage_stats['skipped']} skipped, "
+                f"{stage_stats['reused']} from records, {stage_stats['kept']} kept as edited, "
+                f"{stage_stats['changed']} changed, "
+                f"{stage_stats['failed']} failed, {stage_stats['waiting']} waiting for analysis"
+            )
+    print(f"   Files written: {files_written}")
+    if counter is not None:
+        print(f"   API requests: {counter.requests}")
+        print(f"   Retries: {analyze_questions_gemini.get_retry_controller().summary()}")
+        if isinstance(counter.model, ClientPool):
+            print(f"   API keys: {counter.model.summary()}")
+    if response_cache is not None:
+        print(f"   Response cache: {response_cache.summary()}")
+    telemetry = analyze_questions_gemini.get_telemetry()
+    if telemetry.enabled:
+        print(f"   Telemetry: {telemetry.records} request(s) recorded in {telemetry_file}")
+        telemetry.close()
+    print(f"   Time: {elapsed:.1f}s")
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
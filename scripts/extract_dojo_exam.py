@@ -7,10 +7,17 @@ import re
 import json
 import os
 import sys
+from pathlib import Path
 from bs4 import BeautifulSoup
 
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.domain_classifier import confident_domain
+from utils.import_gate import ImportGate, parse_policy_args
+from extract_questions_from_pdf import keyword_domain
+
 def determine_domain(category_text):
-    """Map category to SAA-C03 domain"""
+    """Map category to SAA-C03 domain; None if the category names no domain"""
     if 'Cost-Optimized' in category_text:
         return "Design Cost-Optimized Architectures"
     elif 'Secure' in category_text:
@@ -20,7 +27,13 @@ def determine_domain(category_text):
     elif 'High-Performing' in category_text or 'Performance' in category_text:
         return "Design High-Performing Architectures"
     else:
-        return "Design High-Performing Architectures"  # Default
+        return None
+
+
+def classify_domain(question_text, options):
+    """Domain of an uncategorized question from the trained classifier, if it is confident"""
+    domain = confident_domain({"text": question_text, "options": options})
+    return domain or keyword_domain(question_text)
 
 def extract_dojo_exam(html_path):
     """Extract questions from Dojo exam HTML file"""
@@ -119,7 +132,7 @@ def extract_dojo_exam(html_path):
                                     explanation = (explanation, explanation_html)
                     
                     if question_text and options:
-                        domain = current_category if current_category else "Design High-Performing Architectures"
+                        domain = current_category if current_category else classify_domain(question_text, options)
                         
                         # Format explanation to match our format
                         if explanation:
@@ -277,6 +290,9 @@ def format_dojo_explanation(explanation, explanation_html, correct_answers, opti
 
 def main():
     """Main function"""
+    # Duplicate policies for the pre-import gate (checked before any work is done)
+    exact_policy, near_policy = parse_policy_args(description=__doc__)
+
     script_dir = os.path.dirname(__file__)
     project_root = os.path.dirname(script_dir) if os.path.basename(script_dir) == 'scripts' else script_dir
     
@@ -299,6 +315,14 @@ def main():
     questions_dir = os.path.join(project_root, 'questions')
     os.makedirs(questions_dir, exist_ok=True)
     
+    # Check against the existing question bank before writing
+    gate = ImportGate.from_questions_dir(
+        Path(questions_dir), exclude_tests=['test8'], exact_policy=exact_policy, near_policy=near_policy
+    )
+    questions = gate.filter(questions, 'test8')
+    gate.print_report()
+    gate.save_report(Path(project_root) / 'import_report.json')
+    
     output_file = os.path.join(questions_dir, 'test8.json')
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(questions, f, indent=2, ensure_ascii=False)
@@ -8,6 +8,12 @@ import re
 import json
 import os
 import sys
+from pathlib import Path
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.domain_classifier import confident_domain
+from utils.import_gate import ImportGate, parse_policy_args
 
 # Try to import PDF libraries
 try:
@@ -71,8 +77,13 @@ def extract_text_from_pdf(pdf_path):
         )
 
 
-def determine_domain(text):
-    """Determine SAA-C03 domain based on question content"""
+def determine_domain(text, options):
+    """Determine SAA-C03 domain with the trained classifier when it is confident, else keyword rules"""
+    return confident_domain({"text": text, "options": options}) or keyword_domain(text)
+
+
+def keyword_domain(text):
+    """Determine SAA-C03 domain from keywords in the question content"""
     text_lower = text.lower()
 
     security_keywords = [
@@ -246,7 +257,7 @@ def parse_questions_from_text(text):
                     break
 
             if options and q_text.strip():
-                domain = determine_domain(q_text)
+                domain = determine_domain(q_text, options)
                 explanation = f"The correct answer{'s are' if len(correct_answers) > 1 else ' is'} the option{'s' if len(correct_answers) > 1 else ''} marked as correct. This solution best addresses the requirements described in the scenario."
 
                 question = {
@@ -322,7 +333,7 @@ def extract_questions_from_json(json_path):
                         "options": option_list,
                         "correctAnswers": correct_answers,
                         "explanation": q.get("explanation", q.get("solution", "")),
-                        "domain": determine_domain(question_text),
+                        "domain": determine_domain(question_text, option_list),
                     }
                 )
 
@@ -494,7 +505,7 @@ def extract_questions_from_wpProQuiz(html_path):
                                 domain = (
                                     current_category
                                     if current_category
-                                    else determine_domain(question_text)
+                                    else determine_domain(question_text, options)
                                 )
                                 questions.append(
                                     {
@@ -583,7 +594,7 @@ def extract_questions_from_wpProQuiz(html_path):
                                     domain = (
                                         current_category
                                         if current_category
-                                        else determine_domain(question_text)
+                                        else determine_domain(question_text, options)
                                     )
 
                                     questions.append(
@@ -752,6 +763,9 @@ function getTestQuestions(testNumber) {
 
 def main():
     """Main function to extract questions from PDFs and HTML files"""
+    # Duplicate policies for the pre-import gate (checked before any work is done)
+    exact_policy, near_policy = parse_policy_args(description=__doc__)
+
     script_dir = os.path.dirname(__file__)
     project_root = (
         os.path.dirname(script_dir)
@@ -855,6 +869,18 @@ def main():
         questions_json_dir = os.path.join(project_root, "questions")
         os.makedirs(questions_json_dir, exist_ok=True)
 
+        # Check against the existing question bank (minus the tests being regenerated) before writing
+        gate = ImportGate.from_questions_dir(
+            Path(questions_json_dir),
+            exclude_tests=all_tests.keys(),
+            exact_policy=exact_policy,
+            near_policy=near_policy,
+        )
+        for test_key in sorted(all_tests, key=lambda x: int(x.replace("test", ""))):
+            all_tests[test_key] = gate.filter(all_tests[test_key], test_key)
+        gate.print_report()
+        gate.save_report(Path(project_root) / "import_report.json")
+
         print("\nGenerating questions.js and JSON text files...")
         js_content = generate_js_file(all_tests)
 
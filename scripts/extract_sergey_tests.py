@@ -7,8 +7,15 @@ import re
 import json
 import os
 import sys
+from pathlib import Path
 from bs4 import BeautifulSoup
 
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.domain_classifier import confident_domain
+from utils.import_gate import ImportGate, parse_policy_args
+from utils.question_utils import save_questions_file, update_combined_tests_file
+
 # Prefer pymupdf as it handles encrypted PDFs better
 try:
     import fitz  # PyMuPDF
@@ -62,8 +69,13 @@ def extract_text_from_pdf(pdf_path):
         raise ImportError("No PDF library found. Please install one: pip install PyPDF2 pdfplumber pymupdf")
 
 
-def determine_domain(text):
-    """Determine SAA-C03 domain based on question content"""
+def determine_domain(text, options):
+    """Determine SAA-C03 domain with the trained classifier when it is confident, else keyword rules"""
+    return confident_domain({"text": text, "options": options}) or keyword_domain(text)
+
+
+def keyword_domain(text):
+    """Determine SAA-C03 domain from keywords in the question content"""
     text_lower = text.lower()
     
     security_keywords = [
@@ -179,7 +191,7 @@ def parse_questions_from_text(text):
         
         # Only add question if we have question text and at least 2 options
         if question_text and len(options) >= 2:
-            domain = determine_domain(question_text)
+            domain = determine_domain(question_text, options)
             
             # Format explanation properly
             if not explanation:
@@ -204,6 +216,9 @@ def parse_questions_from_text(text):
 
 def main():
     """Main function to extract questions from Sergey PDF"""
+    # Duplicate policies for the pre-import gate (checked before any work is done)
+    exact_policy, near_policy = parse_policy_args(description=__doc__)
+
     script_dir = os.path.dirname(__file__)
     project_root = os.path.dirname(script_dir) if os.path.basename(script_dir) == "scripts" else script_dir
     
@@ -253,25 +268,55 @@ def main():
         output_dir = os.path.join(project_root, "questions")
         os.makedirs(output_dir, exist_ok=True)
         
-        # Split questions into tests and save
-        for test_idx in range(num_tests):
-            test_num = start_test_num + test_idx
-            start_idx = test_idx * questions_per_test
-            end_idx = min(start_idx + questions_per_test, len(questions))
-            test_questions = questions[start_idx:end_idx]
-            
+        # Check against the existing question bank (minus the tests being regenerated).
+        # Questions are gated one at a time under the test and ID they will be written
+        # with, so report locations and duplicateOf links name real testN-qM questions.
+        regenerated_tests = [f"test{start_test_num + i}" for i in range(num_tests)]
+        gate = ImportGate.from_questions_dir(
+            Path(output_dir),
+            exclude_tests=regenerated_tests,
+            exact_policy=exact_policy,
+            near_policy=near_policy,
+        )
+        tests = []
+        for question in questions:
+            if not tests or len(tests[-1]) == questions_per_test:
+                tests.append([])
             # Reset IDs to start from 0 for each test
-            for i, q in enumerate(test_questions):
-                q["id"] = i
-            
-            # Save to JSON
-            output_file = os.path.join(output_dir, f"test{test_num}.json")
-            with open(output_file, "w", encoding="utf-8") as f:
-                json.dump(test_questions, f, indent=2, ensure_ascii=False)
-            
-            print(f"✓ Saved {len(test_questions)} questions to {output_file}")
+            question["id"] = len(tests[-1])
+            tests[-1].extend(gate.filter([question], f"test{start_test_num + len(tests) - 1}"))
+        tests = [test_questions for test_questions in tests if test_questions]
+        gate.print_report()
+        gate.save_report(Path(project_root) / "import_report.json")
+        num_tests = len(tests)
+        written = {f"test{start_test_num + i}": test_questions for i, test_questions in enumerate(tests)}
+        
+        # Skipped duplicates can leave fewer tests than before; an old file for a
+        # test that is no longer written would keep the questions just dropped
+        removed_tests = []
+        for test_key in regenerated_tests[num_tests:]:
+            stale_file = Path(output_dir) / f"{test_key}.json"
+            if stale_file.exists():
+                backup_file = stale_file.with_suffix(".json.backup")
+                stale_file.replace(backup_file)
+                removed_tests.append(test_key)
+                print(f"✓ Moved {stale_file.name} to {backup_file.name} (no questions left for it after the duplicate check)")
+        
+        # Save each test
+        for test_key, test_questions in written.items():
+            output_file = Path(output_dir) / f"{test_key}.json"
+            if save_questions_file(output_file, test_questions, create_backup=False):
+                print(f"✓ Saved {len(test_questions)} questions to {output_file}")
+        
+        all_tests_file = Path(output_dir) / "all_tests.json"
+        if all_tests_file.exists() and update_combined_tests_file(all_tests_file, written, removed_tests):
+            print(f"✓ Updated {all_tests_file.name}")
+        
+        if not written:
+            print("Warning: Every extracted question was skipped as a duplicate; no tests written.")
+            return
         
-        print(f"\n✓ Successfully extracted {len(questions)} questions into {num_tests} test(s)")
+        print(f"\n✓ Successfully extracted {sum(len(t) for t in tests)} questions into {num_tests} test(s)")
         print(f"Tests created: test{start_test_num} through test{start_test_num + num_tests - 1}")
         
     except Exception as e:
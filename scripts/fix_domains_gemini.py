@@ -6,10 +6,9 @@ Analyzes each question and assigns the correct AWS SAA-C03 domain
 
 import json
 import time
-import os
 import sys
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Tuple
 
 # Import shared utilities
 sys.path.insert(0, str(Path(__file__).parent))
@@ -17,8 +16,17 @@ from utils.question_utils import (
     find_test_files,
     load_questions_file,
     save_questions_file,
+    get_project_root,
     get_questions_dir,
 )
+from utils.batching import BATCH_ITEM_KEY, chunked, split_batch_response
+from utils.client_pool import ClientPool, PoolExhaustedError, create_gemini_client, load_api_keys
+from utils.domain_classifier import DomainClassifier, load_default_classifier
+from utils.llm_cache import CacheMissError, CachedModel, ResponseCache
+from utils.mock_model import MOCK_MODEL_NAME, MockGeminiModel
+from utils.request_groups import group_duplicates, request_key
+from utils.retry import RetryController, classify_error
+from utils.telemetry import TELEMETRY_FILE, Telemetry, telemetry_labels
 
 try:
     import google.generativeai as genai
@@ -43,8 +51,33 @@ except ImportError:
 MODEL_NAME = "gemini-2.0-flash"
 RATE_LIMIT_DELAY = 1.0  # Delay between requests (seconds)
 RETRY_BASE_DELAY = 5
+RETRY_MAX_DELAY = 60
 MAX_RETRIES = 5
+QUESTION_RETRY_BUDGET = 180  # Give up on a question after this many seconds of retrying
+CIRCUIT_BREAKER_THRESHOLD = 5  # Consecutive server errors that pause all requests
+CIRCUIT_BREAKER_COOLDOWN = 60
 BATCH_SAVE_SIZE = 10  # Save after every N questions
+BATCH_SIZE = 1  # Questions classified per request (--batch-size=N to batch, e.g. 25)
+# With --classifier, questions whose current domain the local classifier
+# (train_domain_classifier.py) confirms at least this confidently skip the API.
+# None = the threshold calibrated on held-out predictions and saved with the model
+# (override with --min-confidence=X)
+CLASSIFIER_MIN_CONFIDENCE = None
+
+# Limits of each key when several keys are configured (GOOGLE_API_KEYS=key1,key2)
+KEY_REQUESTS_PER_MINUTE = 1000  # Match your API quota tier
+KEY_TOKENS_PER_MINUTE = 1_000_000
+
+# Response cache shared with the other Gemini scripts (--no-cache to bypass)
+CACHE_DIR = get_project_root() / ".llm_cache"
+CACHE_MAX_MB = 500
+
+# Per-request telemetry (--no-telemetry to disable); mock runs record separately
+MOCK_TELEMETRY_FILE = "mock_gemini_telemetry.ndjson"
+
+# Shared by all requests of a run (see get_retry_controller and get_telemetry)
+_retry_controller: Optional[RetryController] = None
+_telemetry: Optional[Telemetry] = None
 
 # AWS SAA-C03 Domains (4 domains only)
 VALID_DOMAINS = [
@@ -55,8 +88,25 @@ VALID_DOMAINS = [
 ]
 
 
-def get_domain_analysis_prompt(question: Dict[str, Any]) -> str:
-    """Create prompt for Gemini to analyze question domain"""
+# Domain descriptions and tie-breaking rules shared by the single and batched prompts
+DOMAIN_GUIDELINES = """AWS SAA-C03 Domains (4 domains):
+1. Design Secure Architectures - Focuses on security, encryption, IAM, compliance, threat detection
+2. Design Resilient Architectures - Focuses on high availability, fault tolerance, disaster recovery, backup strategies
+3. Design High-Performing Architectures - Focuses on performance optimization, caching, content delivery, database performance
+4. Design Cost-Optimized Architectures - Focuses on cost reduction, resource optimization, right-sizing, cost-effective storage
+
+IMPORTANT GUIDELINES:
+- Choose the PRIMARY domain that best matches the question's main focus
+- If a question mentions cost but the PRIMARY focus is security, choose "Design Secure Architectures"
+- If a question mentions cost and the PRIMARY focus is cost optimization, choose "Design Cost-Optimized Architectures"
+- If a question mentions performance and the PRIMARY focus is performance optimization, choose "Design High-Performing Architectures"
+- If a question mentions availability/fault tolerance/disaster recovery, choose "Design Resilient Architectures"
+- If a question mentions monitoring/logging/automation, classify based on the PRIMARY focus (usually Resilient or High-Performing)
+"""
+
+
+def format_domain_question(question: Dict[str, Any]) -> str:
+    """Question text, correct answer and options as shown in domain prompts"""
     question_text = question.get("text", "")
     options = question.get("options", [])
     correct_answers = question.get("correctAnswers", [])
@@ -68,11 +118,7 @@ def get_domain_analysis_prompt(question: Dict[str, Any]) -> str:
         if correct_idx < len(options):
             correct_text = options[correct_idx].get("text", "")
 
-    prompt = f"""You are an AWS Certified Solutions Architect expert analyzing exam questions for the AWS SAA-C03 certification.
-
-Analyze the following question and determine which AWS SAA-C03 domain it primarily belongs to.
-
-QUESTION:
+    details = f"""QUESTION:
 {question_text}
 
 CORRECT ANSWER:
@@ -81,33 +127,43 @@ CORRECT ANSWER:
 OPTIONS:
 """
     for i, opt in enumerate(options):
-        prompt += f"{i}. {opt.get('text', '')}\n"
+        details += f"{i}. {opt.get('text', '')}\n"
+    return details
 
-    prompt += f"""
-AWS SAA-C03 Domains (4 domains):
-1. Design Secure Architectures - Focuses on security, encryption, IAM, compliance, threat detection
-2. Design Resilient Architectures - Focuses on high availability, fault tolerance, disaster recovery, backup strategies
-3. Design High-Performing Architectures - Focuses on performance optimization, caching, content delivery, database performance
-4. Design Cost-Optimized Architectures - Focuses on cost reduction, resource optimization, right-sizing, cost-effective storage
 
-IMPORTANT GUIDELINES:
-- Choose the PRIMARY domain that best matches the question's main focus
-- If a question mentions cost but the PRIMARY focus is security, choose "Design Secure Architectures"
-- If a question mentions cost and the PRIMARY focus is cost optimization, choose "Design Cost-Optimized Architectures"
-- If a question mentions performance and the PRIMARY focus is performance optimization, choose "Design High-Performing Architectures"
-- If a question mentions availability/fault tolerance/disaster recovery, choose "Design Resilient Architectures"
-- If a question mentions monitoring/logging/automation, classify based on the PRIMARY focus (usually Resilient or High-Performing)
+def get_domain_analysis_prompt(question: Dict[str, Any]) -> str:
+    """Create prompt for Gemini to analyze question domain"""
+    return f"""You are an AWS Certified Solutions Architect expert analyzing exam questions for the AWS SAA-C03 certification.
+
+Analyze the following question and determine which AWS SAA-C03 domain it primarily belongs to.
 
+{format_domain_question(question)}
+{DOMAIN_GUIDELINES}
 Respond with ONLY the exact domain name from the list above, nothing else.
 """
-    return prompt
 
 
-def analyze_domain_with_retry(question: Dict[str, Any], model) -> Optional[str]:
-    """Analyze question domain with retry logic"""
-    prompt = get_domain_analysis_prompt(question)
+def get_batch_domain_prompt(questions: List[Dict[str, Any]]) -> str:
+    """Create one prompt classifying several questions, answered as a JSON array"""
+    count = len(questions)
+    prompt = f"""You are an AWS Certified Solutions Architect expert analyzing exam questions for the AWS SAA-C03 certification.
+
+Analyze each of the following {count} questions and determine which AWS SAA-C03 domain it primarily belongs to.
+"""
+    for item, question in enumerate(questions, 1):
+        prompt += f"\n=== ITEM {item} ===\n{format_domain_question(question)}"
+
+    prompt += f"""
+{DOMAIN_GUIDELINES}
+Respond with ONLY a JSON array of exactly {count} objects, one per item, in item order, like:
+[{{"{BATCH_ITEM_KEY}": 1, "domain": "<exact domain name from the list above>"}}]
+No markdown formatting or code blocks.
+"""
+    return prompt
 
-    # Configure safety settings to allow security exam questions
+
+def get_safety_settings() -> List[Dict[str, Any]]:
+    """Configure safety settings to allow security exam questions"""
     safety_settings = []
     if (
         genai
@@ -132,54 +188,237 @@ def analyze_domain_with_retry(question: Dict[str, Any], model) -> Optional[str]:
                 "threshold": genai.types.HarmBlockThreshold.BLOCK_NONE,
             },
         ]
+    return safety_settings
+
+
+def normalize_domain(domain: Any) -> Optional[str]:
+    """Map a model's domain answer to one of VALID_DOMAINS, or None"""
+    if not isinstance(domain, str):
+        return None
+
+    # Clean up response (remove quotes, extra text)
+    domain = domain.strip().strip("\"'")
+    domain = domain.split("\n")[0].strip()
+    if not domain:
+        return None
+
+    # Validate domain
+    if domain in VALID_DOMAINS:
+        return domain
+
+    # Try to find partial match
+    for valid_domain in VALID_DOMAINS:
+        if (
+            valid_domain.lower() in domain.lower()
+            or domain.lower() in valid_domain.lower()
+        ):
+            return valid_domain
+    return None
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            if safety_settings:
-                response = model.generate_content(
-                    prompt, safety_settings=safety_settings
-                )
-            else:
-                response = model.generate_content(prompt)
 
-            if response and response.text:
-                domain = response.text.strip()
+def get_retry_controller() -> RetryController:
+    """Retry controller shared by every request of this run"""
+    global _retry_controller
+    if _retry_controller is None:
+        _retry_controller = RetryController(
+            base_delay=RETRY_BASE_DELAY,
+            max_delay=RETRY_MAX_DELAY,
+            max_attempts=MAX_RETRIES,
+            question_budget=QUESTION_RETRY_BUDGET,
+            breaker_threshold=CIRCUIT_BREAKER_THRESHOLD,
+            breaker_cooldown=CIRCUIT_BREAKER_COOLDOWN,
+            no_retry=(CacheMissError, PoolExhaustedError),
+        )
+    return _retry_controller
 
-                # Clean up response (remove quotes, extra text)
-                domain = domain.strip("\"'")
-                domain = domain.split("\n")[0].strip()
 
-                # Validate domain
-                if domain in VALID_DOMAINS:
-                    return domain
-                else:
-                    # Try to find partial match
-                    for valid_domain in VALID_DOMAINS:
-                        if (
-                            valid_domain.lower() in domain.lower()
-                            or domain.lower() in valid_domain.lower()
-                        ):
-                            return valid_domain
-
-                    print(
-                        f"⚠️  Warning: Invalid domain '{domain}' for Q{question.get('id')}, keeping original"
-                    )
-                    return None
+def get_telemetry() -> Telemetry:
+    """Per-request telemetry of this run (records nothing until main() enables it)"""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = Telemetry(None, "fix_domains", MODEL_NAME)
+    return _telemetry
 
-        except Exception as e:
-            if attempt < MAX_RETRIES - 1:
-                delay = RETRY_BASE_DELAY * (2**attempt)
-                print(
-                    f"⚠️  Error (attempt {attempt + 1}/{MAX_RETRIES}): {e}. Retrying in {delay}s..."
-                )
-                time.sleep(delay)
-            else:
-                print(f"❌ Failed after {MAX_RETRIES} attempts: {e}")
-                return None
 
-        time.sleep(RATE_LIMIT_DELAY)
+def generate_text(prompt: str, model, kind: str = "domain", items: int = 1) -> Optional[str]:
+    """Send a prompt through the shared retry controller; None if it failed for good"""
+    safety_settings = get_safety_settings()
+    call = get_telemetry().call(kind, prompt, items)
 
-    return None
+    def attempt() -> str:
+        attempt_started = time.monotonic()
+        if safety_settings:
+            response = model.generate_content(prompt, safety_settings=safety_settings)
+        else:
+            response = model.generate_content(prompt)
+        call.received(attempt_started, response.text, response)
+        return response.text
+
+    try:
+        text = get_retry_controller().call(attempt, trace=call.trace)
+    except Exception as e:
+        call.finish("cache_miss" if isinstance(e, CacheMissError) else classify_error(e))
+        return None  # The controller already reported why
+    call.finish()
+    return text
+
+
+def forget_response(prompt: str, model):
+    """Drop an unusable response from the response cache so the next run asks again"""
+    invalidate = getattr(model, "invalidate", None)
+    if invalidate is None:
+        return
+    safety_settings = get_safety_settings()
+    if safety_settings:
+        invalidate(prompt, safety_settings=safety_settings)
+    else:
+        invalidate(prompt)
+
+
+def analyze_domain_with_retry(question: Dict[str, Any], model) -> Optional[str]:
+    """Analyze question domain, retrying through the shared retry controller"""
+    prompt = get_domain_analysis_prompt(question)
+    response_text = generate_text(prompt, model)
+    if not response_text:
+        return None
+
+    domain = normalize_domain(response_text)
+    if domain is None:
+        print(
+            f"⚠️  Warning: Invalid domain '{response_text.strip()[:80]}' for Q{question.get('id')}, keeping original"
+        )
+        forget_response(prompt, model)
+    return domain
+
+
+def analyze_domains_batch_with_retry(
+    questions: List[Dict[str, Any]], model
+) -> Dict[int, str]:
+    """
+    Classify several questions in one request.
+
+    Returns:
+        Domains by position in questions. Positions missing from the result
+        were absent or invalid in the response and should be retried one
+        question at a time with analyze_domain_with_retry().
+    """
+    prompt = get_batch_domain_prompt(questions)
+    response_text = generate_text(prompt, model, kind="domain_batch", items=len(questions))
+    if response_text is None:
+        return {}
+    domains = split_batch_response(
+        response_text,
+        len(questions),
+        lambda position, obj: normalize_domain(obj.get("domain")),
+    )
+    if not domains:
+        # Unparseable, or not one usable domain: replaying it would never help
+        forget_response(prompt, model)
+    return domains
+
+
+def classify_domains(
+    questions: List[Dict[str, Any]],
+    model,
+    batch_size: int = BATCH_SIZE,
+    on_question: Optional[Callable[[], None]] = None,
+) -> Tuple[Dict[int, str], int]:
+    """
+    Classify questions, several per request; items the batch response does
+    not answer validly are retried one question at a time.
+
+    Args:
+        questions: Questions to classify
+        model: Gemini model
+        batch_size: Questions per request (1 = one request per question)
+        on_question: Optional callback run once per classified question
+
+    Returns:
+        Tuple of (domains by position in questions, count answered by batched
+        requests). Positions missing from the domains failed for good.
+    """
+    response_cache = getattr(model, "cache", None)
+
+    def pace(hits_before: int):
+        # Cached responses cost no quota, so only pace real API calls
+        if not (response_cache and response_cache.stats["hits"] > hits_before):
+            time.sleep(RATE_LIMIT_DELAY)
+
+    domains: Dict[int, str] = {}
+    batch_answered = 0
+    for index, batch in enumerate(chunked(questions, batch_size)):
+        start = index * max(1, batch_size)
+        batch_domains: Dict[int, str] = {}
+        if len(batch) > 1:
+            hits_before = response_cache.stats["hits"] if response_cache else 0
+            batch_domains = analyze_domains_batch_with_retry(batch, model)
+            pace(hits_before)
+            batch_answered += len(batch_domains)
+
+        for position, question in enumerate(batch):
+            domain = batch_domains.get(position)
+            if domain is None:
+                hits_before = response_cache.stats["hits"] if response_cache else 0
+                domain = analyze_domain_with_retry(question, model)
+                pace(hits_before)
+            if domain:
+                domains[start + position] = domain
+            if on_question is not None:
+                on_question()
+
+    return domains, batch_answered
+
+
+def classify_locally(
+    questions: List[Dict[str, Any]],
+    classifier: DomainClassifier,
+    min_confidence: Optional[float] = CLASSIFIER_MIN_CONFIDENCE,
+) -> Dict[int, str]:
+    """
+    Current domains the local classifier confirms.
+
+    A question stays local only when the classifier agrees with its current
+    domain at min_confidence or above (default: the model's calibrated
+    threshold). Training questions are judged by their held-out prediction,
+    so the model never just repeats the label it learned.
+
+    Returns:
+        Domains by position in questions; the other questions need the API
+    """
+    if min_confidence is None:
+        min_confidence = classifier.min_confidence
+    predictions = classifier.predict_questions(questions)
+    return {
+        position: domain
+        for position, (domain, confidence) in enumerate(predictions)
+        if confidence >= min_confidence and domain == questions[position].get("domain")
+    }
+
+
+def classify_with_prefilter(
+    questions: List[Dict[str, Any]],
+    model,
+    batch_size: int = BATCH_SIZE,
+    classifier: Optional[DomainClassifier] = None,
+    min_confidence: Optional[float] = CLASSIFIER_MIN_CONFIDENCE,
+    on_question: Optional[Callable[[], None]] = None,
+) -> Tuple[Dict[int, str], int, int]:
+    """
+    Keep the current domain where the classifier confirms it (see
+    classify_locally) and send only the rest to the API (see classify_domains).
+
+    Returns:
+        Tuple of (domains by position in questions, count answered by batched
+        requests, count classified locally)
+    """
+    local = classify_locally(questions, classifier, min_confidence) if classifier is not None else {}
+    remaining = [position for position in range(len(questions)) if position not in local]
+    api_domains, batch_answered = classify_domains(
+        [questions[position] for position in remaining], model, batch_size=batch_size, on_question=on_question
+    )
+    domains = dict(local)
+    domains.update((remaining[position], domain) for position, domain in api_domains.items())
+    return domains, batch_answered, len(local)
 
 
 def find_all_test_files() -> List[Path]:
@@ -188,8 +427,23 @@ def find_all_test_files() -> List[Path]:
     return find_test_files(questions_dir, exclude_backups=True)
 
 
-def process_test_file(test_file: Path, model, dry_run: bool = False) -> Dict[str, Any]:
-    """Process a single test file"""
+def process_test_file(
+    test_file: Path,
+    model,
+    dry_run: bool = False,
+    batch_size: int = BATCH_SIZE,
+    classifier: Optional[DomainClassifier] = None,
+    min_confidence: Optional[float] = CLASSIFIER_MIN_CONFIDENCE,
+    known_domains: Optional[Dict[str, Tuple[str, str]]] = None,
+) -> Dict[str, Any]:
+    """
+    Process a single test file; domains the local classifier confirms skip the API.
+
+    Identical questions (see utils.request_groups) are classified once: copies
+    within the file share the first one's result, and when known_domains is
+    given (request key -> (domain, source)), questions already classified
+    earlier in the run reuse that domain. New results are added to it.
+    """
     print(f"\n📂 Processing {test_file.name}...")
 
     # Load questions
@@ -202,6 +456,9 @@ def process_test_file(test_file: Path, model, dry_run: bool = False) -> Dict[str
             "changed": 0,
             "unchanged": 0,
             "errors": 0,
+            "batch_answered": 0,
+            "local": 0,
+            "shared": 0,
             "changes": [],
         }
 
@@ -221,53 +478,79 @@ def process_test_file(test_file: Path, model, dry_run: bool = False) -> Dict[str
         "changed": 0,
         "unchanged": 0,
         "errors": 0,
+        "batch_answered": 0,
+        "local": 0,
+        "shared": 0,
         "changes": [],
     }
 
-    # Process questions
-    pbar = tqdm(questions, desc=f"Analyzing {test_file.name}") if tqdm else questions
-
-    for question in pbar:
+    # Identical questions need one classification: reuse earlier results and group the rest
+    if known_domains is None:
+        known_domains = {}
+    keys = [request_key(question) for question in questions]
+    domains: Dict[int, str] = {}
+    sources: Dict[int, str] = {}
+    for position, key in enumerate(keys):
+        if key in known_domains:
+            domains[position], sources[position] = known_domains[key]
+    groups = group_duplicates(
+        [position for position in range(len(questions)) if position not in domains], lambda position: keys[position]
+    )
+    representatives = [group[0] for group in groups]
+
+    # Classify confident questions locally, the rest several per request
+    pbar = tqdm(total=len(representatives), desc=f"Analyzing {test_file.name}") if tqdm else None
+    with telemetry_labels(tests=[test_file.stem]):
+        group_domains, stats["batch_answered"], stats["local"] = classify_with_prefilter(
+            [questions[position] for position in representatives],
+            model,
+            batch_size=batch_size,
+            classifier=classifier,
+            min_confidence=min_confidence,
+            on_question=(lambda: pbar.update(1)) if pbar is not None else None,
+        )
+    if pbar is not None:
+        pbar.update(stats["local"])
+        pbar.close()
+
+    # Fan each result out to the copies of its question
+    for group_position, group in enumerate(groups):
+        domain = group_domains.get(group_position)
+        if not domain:
+            continue
+        source = f"{test_file.stem} Q{questions[group[0]].get('id', 'unknown')}"
+        known_domains[keys[group[0]]] = (domain, source)
+        for position in group:
+            domains[position] = domain
+            if position != group[0]:
+                sources[position] = source
+    stats["shared"] = len(sources)
+
+    for position, question in enumerate(questions):
         q_id = question.get("id", "unknown")
         current_domain = question.get("domain", "MISSING")
-
-        # Analyze domain
-        new_domain = analyze_domain_with_retry(question, model)
+        new_domain = domains.get(position)
 
         if new_domain:
             stats["analyzed"] += 1
 
             if new_domain != current_domain:
                 stats["changed"] += 1
-                stats["changes"].append(
-                    {"id": q_id, "old": current_domain, "new": new_domain}
-                )
+                change = {"id": q_id, "old": current_domain, "new": new_domain}
+                if position in sources:
+                    change["copied_from"] = sources[position]
+                stats["changes"].append(change)
 
                 if not dry_run:
                     question["domain"] = new_domain
-                    if tqdm:
-                        pbar.write(f"   ✓ Q{q_id}: {current_domain} → {new_domain}")
-                    else:
-                        print(f"   ✓ Q{q_id}: {current_domain} → {new_domain}")
+                    print(f"   ✓ Q{q_id}: {current_domain} → {new_domain}")
                 else:
-                    if tqdm:
-                        pbar.write(
-                            f"   [DRY RUN] Q{q_id}: {current_domain} → {new_domain}"
-                        )
-                    else:
-                        print(f"   [DRY RUN] Q{q_id}: {current_domain} → {new_domain}")
+                    print(f"   [DRY RUN] Q{q_id}: {current_domain} → {new_domain}")
             else:
                 stats["unchanged"] += 1
         else:
             stats["errors"] += 1
-            if tqdm:
-                pbar.write(
-                    f"   ⚠️  Q{q_id}: Failed to analyze, keeping '{current_domain}'"
-                )
-            else:
-                print(f"   ⚠️  Q{q_id}: Failed to analyze, keeping '{current_domain}'")
-
-        time.sleep(RATE_LIMIT_DELAY)
+            print(f"   ⚠️  Q{q_id}: Failed to analyze, keeping '{current_domain}'")
 
     # Save updated file
     if not dry_run and stats["changed"] > 0:
@@ -281,36 +564,94 @@ def main():
     """Main function"""
     import sys
 
-    # Check for API key
-    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("API_KEY")
-    if not api_key:
-        print("❌ Error: API key not found")
-        print(
-            "Create a .env file in the project root with: GOOGLE_API_KEY=your-key-here"
-        )
-        return 1
-
-    # Initialize Gemini
-    if genai is None:
-        print("❌ Error: google-generativeai not installed")
-        print("Install it with: pip install -U google-generativeai")
-        return 1
-
-    print("🔧 Initializing Gemini API...")
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(MODEL_NAME)
-        print(f"✓ Model {MODEL_NAME} ready\n")
-    except Exception as e:
-        print(f"❌ Error initializing Gemini: {e}")
-        return 1
-
-    # Check for dry-run flag
+    # Check for flags
     dry_run = "--dry-run" in sys.argv or "-d" in sys.argv
+    no_cache = "--no-cache" in sys.argv
+    cache_only = "--cache-only" in sys.argv
+    use_mock = "--mock" in sys.argv
+    no_telemetry = "--no-telemetry" in sys.argv
+    use_classifier = "--classifier" in sys.argv
+    batch_size = BATCH_SIZE
+    min_confidence = CLASSIFIER_MIN_CONFIDENCE
+    for arg in sys.argv[1:]:
+        if arg.startswith("--batch-size="):
+            try:
+                batch_size = int(arg.split("=", 1)[1])
+            except ValueError:
+                batch_size = 0
+            if batch_size < 1:
+                print(f"❌ Error: invalid {arg} (expected a positive integer)")
+                return 1
+        elif arg.startswith("--min-confidence="):
+            try:
+                min_confidence = float(arg.split("=", 1)[1])
+            except ValueError:
+                min_confidence = -1
+            if not 0 < min_confidence <= 1:
+                print(f"❌ Error: invalid {arg} (expected a number in (0, 1])")
+                return 1
+
+    response_cache = None
+    pool = None
+    telemetry_file, model_name = TELEMETRY_FILE, MODEL_NAME
+    if use_mock:
+        # Offline stand-in: synthetic domains are never written back
+        model = MockGeminiModel(seed=0)
+        telemetry_file, model_name = MOCK_TELEMETRY_FILE, MOCK_MODEL_NAME
+        dry_run = True
+        print("🧪 Using the local mock model (implies --dry-run)\n")
+    else:
+        # Check for API keys (not needed when replaying cached responses)
+        api_keys = load_api_keys()
+        if not api_keys and not cache_only:
+            print("❌ Error: API key not found")
+            print(
+                "Create a .env file in the project root with: GOOGLE_API_KEY=your-key-here"
+            )
+            print("(or GOOGLE_API_KEYS=key1,key2 to spread requests over several keys)")
+            return 1
+
+        # Initialize Gemini
+        if genai is None:
+            print("❌ Error: google-generativeai not installed")
+            print("Install it with: pip install -U google-generativeai")
+            return 1
+
+        print("🔧 Initializing Gemini API...")
+        try:
+            model = create_gemini_client(genai, MODEL_NAME, api_keys, KEY_REQUESTS_PER_MINUTE, KEY_TOKENS_PER_MINUTE)
+            if isinstance(model, ClientPool):
+                pool = model
+                print(f"🔑 Spreading requests over {len(pool)} API keys")
+            print(f"✓ Model {MODEL_NAME} ready\n")
+        except Exception as e:
+            print(f"❌ Error initializing Gemini: {e}")
+            return 1
+
+        if not no_cache:
+            response_cache = ResponseCache(CACHE_DIR, CACHE_MAX_MB * 1024 * 1024)
+            model = CachedModel(model, MODEL_NAME, response_cache, cache_only=cache_only)
+            print(f"🗄️  Response cache: {CACHE_DIR} ({'replay only' if cache_only else 'read/write'})\n")
 
     if dry_run:
         print("🔍 DRY RUN MODE - No files will be modified\n")
 
+    classifier = load_default_classifier() if use_classifier else None
+    if classifier is not None:
+        threshold = min_confidence if min_confidence is not None else classifier.min_confidence
+        if threshold == float("inf"):
+            print("💡 The local classifier has no trusted threshold (retrain it); every question goes to the API\n")
+            classifier = None
+        else:
+            print(f"🧠 Local classifier: domains it confirms at ≥ {threshold:g} confidence skip the API\n")
+    elif use_classifier:
+        print("💡 No local classifier (run train_domain_classifier.py); every question goes to the API\n")
+
+    global _telemetry
+    if not no_telemetry:
+        _telemetry = Telemetry(Path(telemetry_file), "fix_domains", model_name)
+        print(f"📈 Recording per-request telemetry to {telemetry_file}\n")
+
     # Find test files
     test_files = find_all_test_files()
 
@@ -321,19 +662,34 @@ def main():
     # Check if specific files requested
     if len(sys.argv) > 1:
         requested_files = [
-            arg for arg in sys.argv[1:] if arg not in ["--dry-run", "-d"]
+            arg
+            for arg in sys.argv[1:]
+            if arg not in ["--dry-run", "-d", "--no-cache", "--cache-only", "--mock", "--no-telemetry", "--classifier"]
+            and not arg.startswith("--batch-size=")
+            and not arg.startswith("--min-confidence=")
         ]
         if requested_files:
             test_files = [Path(f) for f in requested_files if Path(f).exists()]
 
     print(f"📂 Found {len(test_files)} test file(s) to process\n")
+    if batch_size > 1:
+        print(f"📦 Classifying up to {batch_size} questions per request\n")
 
     # Process each file
     all_stats = {}
     total_changed = 0
+    known_domains: Dict[str, Tuple[str, str]] = {}  # Shared across files: a question is classified once per run
 
     for test_file in test_files:
-        stats = process_test_file(test_file, model, dry_run=dry_run)
+        stats = process_test_file(
+            test_file,
+            model,
+            dry_run=dry_run,
+            batch_size=batch_size,
+            classifier=classifier,
+            min_confidence=min_confidence,
+            known_domains=known_domains,
+        )
         all_stats[test_file.name] = stats
         total_changed += stats["changed"]
 
@@ -343,12 +699,27 @@ def main():
         print(f"   Changed: {stats['changed']}")
         print(f"   Unchanged: {stats['unchanged']}")
         print(f"   Errors: {stats['errors']}")
+        if batch_size > 1:
+            print(f"   Answered in batches: {stats['batch_answered']}")
+        if classifier is not None:
+            print(f"   Confirmed locally: {stats['local']}")
+        if stats["shared"]:
+            print(f"   Reused from identical questions: {stats['shared']}")
 
     # Summary
     print(f"\n{'=' * 60}")
     print(f"✅ Processing complete!")
     print(f"   Files processed: {len(test_files)}")
     print(f"   Total questions changed: {total_changed}")
+    print(f"   Reused from identical questions: {sum(stats['shared'] for stats in all_stats.values())}")
+    print(f"   Retries: {get_retry_controller().summary()}")
+    if response_cache is not None:
+        print(f"   Response cache: {response_cache.summary()}")
+    if pool is not None:
+        print(f"   API keys: {pool.summary()}")
+    if get_telemetry().enabled:
+        print(f"   Telemetry: {get_telemetry().records} request(s) recorded in {telemetry_file}")
+        get_telemetry().close()
 
     if dry_run:
         print(f"\n💡 This was a dry run. Run without --dry-run to apply changes.")
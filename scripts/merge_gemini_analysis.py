@@ -2,17 +2,34 @@
 """
 Merge Gemini analysis results into question JSON files
 Converts Gemini analysis format to the website's expected explanation format
-Processes all test files automatically
+Processes all test files automatically (or those given with --tests), in
+parallel; each worker reads only the analysis shards of its test, only
+questions whose analysis changed since the last merge are converted, and only
+changed files are written
+
+Usage:
+    python merge_gemini_analysis.py [--tests test3,test5] [--workers N] [--force] [--dry-run]
 """
 
-import json
+import argparse
 import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Mapping, Optional, List, Tuple
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.analysis_index import AnalysisIndex
+from utils.analysis_store import ANALYSIS_DIR, AnalysisStore
+from utils.enrichment_state import stable_digest
+from utils.explanation_passes import OPTION_INTRO_PASSES, apply_passes
+from utils.question_utils import get_question_fingerprint, load_questions_file, save_questions_file
 
-ANALYSIS_FILE = "analysis_output.json"
 QUESTIONS_DIR = "questions"
-BACKUP_SUFFIX = ".backup"
+ANALYSIS_DIGEST_FIELD = "analysisDigest"  # Stored on each merged question; unchanged analyses are skipped
+MERGE_WORKERS = os.cpu_count() or 1  # Test files merged in parallel (--workers)
 
 def find_all_test_files(questions_dir: str = QUESTIONS_DIR) -> List[str]:
     """Find all test*.json files in the questions directory"""
@@ -49,35 +66,13 @@ def get_question_key(question: Dict[str, Any], test_key: Optional[str] = None) -
             return f"{question_test_key}-q{question['id']}"
         return str(question["id"])
     else:
-        return str(hash(question.get("text", "")) % (10**10))
+        return f"q-{get_question_fingerprint(question)}"
 
 def remove_option_intro(text: str) -> str:
     """Remove 'Option X' or 'Options X and Y' intros from explanation text"""
     if not text:
         return text
-    
-    import re
-    
-    # Pattern 1: "Option X is correct because" -> "This is correct because"
-    text = re.sub(r'^Option\s+\d+\s+is\s+correct\s+because\s+', 'This is correct because ', text, flags=re.IGNORECASE)
-    
-    # Pattern 2: "Options X and Y are correct because" -> "These are correct because"
-    text = re.sub(r'^Options\s+[\d\s,and]+\s+are\s+correct\s+because\s+', 'These are correct because ', text, flags=re.IGNORECASE)
-    
-    # Pattern 3: "Option X, '...', is the correct answer because" -> "This is the correct answer because"
-    text = re.sub(r'^Option\s+\d+[^.]*?is\s+the\s+correct\s+answer\s+because\s+', 'This is the correct answer because ', text, flags=re.IGNORECASE)
-    
-    # Pattern 4: "Option X is the best solution because" -> "This is the best solution because"
-    text = re.sub(r'^Option\s+\d+[^.]*?is\s+the\s+best\s+(?:solution|choice)\s+because\s+', 'This is the best solution because ', text, flags=re.IGNORECASE)
-    
-    # Pattern 5: "Option X states that..." -> "This states that..." (must come before pattern 6)
-    text = re.sub(r'^Option\s+\d+\s+states?\s+that\s+', 'This states that ', text, flags=re.IGNORECASE)
-    
-    # Pattern 6: "Option X, using..." or "Option X (using...)" -> "Using..." (remove option reference at start)
-    # This must come after pattern 5 to avoid matching "Option X states"
-    text = re.sub(r'^Option\s+\d+[,\s(]+', '', text, flags=re.IGNORECASE)
-    
-    return text.strip()
+    return apply_passes(text, OPTION_INTRO_PASSES).strip()
 
 
 def convert_gemini_analysis_to_explanation(gemini_analysis: Dict[str, Any], question: Dict[str, Any]) -> str:
@@ -123,113 +118,231 @@ def convert_gemini_analysis_to_explanation(gemini_analysis: Dict[str, Any], ques
     
     return "\n\n".join(parts)
 
-def merge_analysis_into_questions(analysis_data: Dict[str, Any], questions_file: str, test_key: Optional[str] = None):
-    """Merge Gemini analysis into questions JSON file"""
-    
-    # Load questions
-    print(f"📂 Loading questions from {questions_file}...")
-    with open(questions_file, 'r', encoding='utf-8') as f:
-        questions = json.load(f)
-    print(f"✓ Loaded {len(questions)} questions\n")
-    
-    # Create backup
-    backup_file = questions_file + BACKUP_SUFFIX
-    print(f"💾 Creating backup: {backup_file}...")
-    with open(backup_file, 'w', encoding='utf-8') as f:
-        json.dump(questions, f, indent=2, ensure_ascii=False)
-    print("✓ Backup created\n")
-    
-    # Merge analysis into questions
-    updated_count = 0
+def analysis_digest(gemini_analysis: Dict[str, Any], question: Dict[str, Any]) -> str:
+    """Digest of everything the merged explanation is built from (analysis, answers, options)"""
+    option_ids = [option.get("id") for option in question.get("options", [])]
+    return stable_digest([gemini_analysis, question.get("correctAnswers", []), option_ids])
+
+
+def find_analysis_entry(
+    question: Dict[str, Any],
+    test_key: Optional[str],
+    analysis_data: Mapping[str, Any],
+    analysis_index: AnalysisIndex,
+) -> Optional[Dict[str, Any]]:
+    """
+    Find the analysis entry for a question.
+    Questions are matched by key first, then by content fingerprint (analysis_index)
+    """
+    analysis_entry = analysis_data.get(get_question_key(question, test_key))
+    if not analysis_entry:
+        # Try alternative keys for backward compatibility
+        question_id = question.get("id")
+        if question_id is not None:
+            alt_keys = []
+            if test_key:
+                alt_keys.append(f"{test_key}-q{question_id}")
+            if test_key == "test2":
+                # Old numeric and test2 formats only ever named test2 questions
+                alt_keys.extend([str(question_id), f"test2-q{question_id}"])
+            for alt_key in alt_keys:
+                if alt_key in analysis_data:
+                    analysis_entry = analysis_data[alt_key]
+                    break
+
+    if not analysis_entry:
+        # Match by content (survives ID changes and renumbered tests)
+        content_key = analysis_index.lookup(question)
+        if content_key is not None:
+            analysis_entry = analysis_data[content_key]
+
+    return analysis_entry
+
+
+def merge_analysis_into_questions(
+    analysis_data: Mapping[str, Any],
+    questions_file: str,
+    test_key: Optional[str] = None,
+    analysis_index: Optional[AnalysisIndex] = None,
+    force: bool = False,
+    dry_run: bool = False,
+) -> Dict[str, int]:
+    """
+    Merge Gemini analysis into questions JSON file.
+
+    A question is only converted when the digest of its analysis differs from
+    the analysisDigest stored on it by the last merge, and the file (after a
+    .backup copy) is only rewritten when a question actually changed.
+
+    Args:
+        analysis_data: Analysis store (or a dict of its entries)
+        questions_file: Test file to update
+        test_key: Test the file holds (e.g. "test2")
+        analysis_index: Content index over analysis_data (built if None)
+        force: Convert every matched question, even if its digest is unchanged
+        dry_run: Count changes without writing the file
+
+    Returns:
+        Statistics: total, matched, converted, unchanged (digest matched), updated, written
+    """
+    if analysis_index is None:
+        if isinstance(analysis_data, AnalysisStore):
+            analysis_index = analysis_data.content_index()
+        else:
+            analysis_index = AnalysisIndex(analysis_data)
+
+    questions = load_questions_file(Path(questions_file))
+    if questions is None:
+        raise ValueError(f"Could not load {questions_file}")
+
+    stats = {"total": len(questions), "matched": 0, "converted": 0, "unchanged": 0, "updated": 0, "written": 0}
     for question in questions:
-        q_id = get_question_key(question, test_key)
-        
-        # Find matching analysis
-        analysis_entry = analysis_data.get(q_id)
-        if not analysis_entry:
-            # Try alternative keys for backward compatibility
-            question_id = question.get("id")
-            if question_id is not None:
-                alt_keys = [
-                    str(question_id),  # Old numeric format
-                    f"test2-q{question_id}",  # Old test2 format
-                ]
-                if test_key:
-                    alt_keys.append(f"{test_key}-q{question_id}")
-                for alt_key in alt_keys:
-                    if alt_key in analysis_data:
-                        analysis_entry = analysis_data[alt_key]
-                        break
-        
-        if analysis_entry and "analysis" in analysis_entry:
-            # Convert Gemini analysis to explanation format
-            explanation = convert_gemini_analysis_to_explanation(
-                analysis_entry["analysis"],
-                question
-            )
+        analysis_entry = find_analysis_entry(question, test_key, analysis_data, analysis_index)
+        if not analysis_entry or "analysis" not in analysis_entry:
+            continue
+        stats["matched"] += 1
+
+        digest = analysis_digest(analysis_entry["analysis"], question)
+        if not force and question.get(ANALYSIS_DIGEST_FIELD) == digest:
+            stats["unchanged"] += 1
+            continue
+
+        # Convert Gemini analysis to explanation format
+        explanation = convert_gemini_analysis_to_explanation(analysis_entry["analysis"], question)
+        stats["converted"] += 1
+        if question.get("explanation") != explanation or question.get(ANALYSIS_DIGEST_FIELD) != digest:
             question["explanation"] = explanation
-            updated_count += 1
-            print(f"  ✓ Updated question {question.get('id')}")
-    
-    # Save updated questions
-    print(f"\n💾 Saving updated questions to {questions_file}...")
-    with open(questions_file, 'w', encoding='utf-8') as f:
-        json.dump(questions, f, indent=2, ensure_ascii=False)
-    
-    return updated_count, len(questions)
+            question[ANALYSIS_DIGEST_FIELD] = digest
+            stats["updated"] += 1
+
+    if stats["updated"] and not dry_run:
+        if save_questions_file(Path(questions_file), questions, create_backup=True):
+            stats["written"] = 1
+
+    return stats
+
+
+# Per-process merge inputs (set once per worker by _init_worker, not pickled per file).
+# Each worker opens the store itself and only reads the shards its test files need.
+_worker_analysis: Optional[AnalysisStore] = None
+_worker_index: Optional[AnalysisIndex] = None
+
+
+def _init_worker(analysis_dir: str):
+    global _worker_analysis, _worker_index
+    _worker_analysis = AnalysisStore(analysis_dir)
+    _worker_index = _worker_analysis.content_index()
+
+
+def _merge_file(task: Tuple[str, Optional[str], bool, bool]) -> Tuple[str, Optional[Dict[str, int]], Optional[str]]:
+    """Merge one test file in a worker: (test_file, stats, error message)"""
+    test_file, test_key, force, dry_run = task
+    try:
+        stats = merge_analysis_into_questions(
+            _worker_analysis, test_file, test_key, _worker_index, force=force, dry_run=dry_run
+        )
+    except Exception as e:
+        return test_file, None, str(e)
+    return test_file, stats, None
+
 
 def main():
     """Main function to process all test files"""
-    
-    # Load analysis data once
-    print(f"📂 Loading analysis from {ANALYSIS_FILE}...")
-    with open(ANALYSIS_FILE, 'r', encoding='utf-8') as f:
-        analysis_data = json.load(f)
-    print(f"✓ Loaded {len(analysis_data)} analyses\n")
-    
+    parser = argparse.ArgumentParser(description="Merge Gemini analysis into the question files")
+    parser.add_argument(
+        "--tests",
+        help="Comma-separated test keys to merge, e.g. test3,test5 (default: all test files)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=MERGE_WORKERS,
+        help=f"Test files merged in parallel (default: {MERGE_WORKERS})",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Rebuild every explanation, even where the analysis is unchanged since the last merge",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Report what would change without writing any file",
+    )
+    args = parser.parse_args()
+
+    # Only the index is read here; shards are read by the workers that need them
+    print(f"📂 Opening analysis store {ANALYSIS_DIR}/...")
+    store = AnalysisStore(ANALYSIS_DIR)
+    legacy = store.legacy_file()
+    if legacy is not None:
+        print(f"❌ {legacy} has not been migrated; run migrate_analysis_store.py first")
+        return 1
+    print(f"✓ {len(store)} analyses in {len(store.shard_names())} shard(s)\n")
+
     # Find all test files
     test_files = find_all_test_files()
+    if args.tests:
+        selected = {name.strip() for name in args.tests.split(",") if name.strip()}
+        test_files = [test_file for test_file in test_files if Path(test_file).stem in selected]
     if not test_files:
-        print("❌ No test*.json files found in questions directory")
+        print("❌ No matching test*.json files found in questions directory")
         return 1
-    
-    print(f"📋 Found {len(test_files)} test files to process\n")
-    
-    # Process each test file
-    total_updated = 0
-    total_questions = 0
-    
+
+    workers = max(1, min(args.workers, len(test_files)))
+    print(f"📋 Found {len(test_files)} test files to process ({workers} worker(s))\n")
+    if args.dry_run:
+        print("🔍 DRY RUN MODE - No files will be modified\n")
+
+    tasks = []
     for test_file in test_files:
-        test_path = Path(test_file)
-        test_key = test_path.stem if test_path.stem.startswith("test") else None
-        
-        print("=" * 60)
-        print(f"📋 Processing: {test_path.name}")
-        if test_key:
-            print(f"   Test key: {test_key}")
-        print("=" * 60 + "\n")
-        
-        try:
-            updated, total = merge_analysis_into_questions(analysis_data, test_file, test_key)
-            total_updated += updated
-            total_questions += total
-            print(f"\n✅ Completed {test_path.name}: {updated}/{total} questions updated\n")
-        except Exception as e:
-            print(f"❌ Error processing {test_path.name}: {e}\n")
-            import traceback
-            traceback.print_exc()
-            continue
-    
+        test_stem = Path(test_file).stem
+        tasks.append((test_file, test_stem if test_stem.startswith("test") else None, args.force, args.dry_run))
+
+    start_time = time.time()
+    totals = {"total": 0, "matched": 0, "converted": 0, "unchanged": 0, "updated": 0, "written": 0}
+    failed = 0
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ANALYSIS_DIR,))
+        results = pool.map(_merge_file, tasks)
+    else:
+        pool = None
+        _init_worker(ANALYSIS_DIR)
+        results = map(_merge_file, tasks)
+
+    try:
+        for test_file, stats, error in results:
+            name = Path(test_file).name
+            if error is not None:
+                failed += 1
+                print(f"❌ Error processing {name}: {error}")
+                continue
+            for key in totals:
+                totals[key] += stats[key]
+            status = "💾 saved" if stats["written"] else ("[DRY RUN] not saved" if stats["updated"] else "unchanged")
+            print(
+                f"  {name}: {stats['matched']}/{stats['total']} with analysis, "
+                f"{stats['converted']} converted, {stats['updated']} updated ({status})"
+            )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
     # Final summary
-    print("=" * 60)
+    print("\n" + "=" * 60)
     print("✅ Merge complete for all test files!")
     print(f"📊 Summary:")
-    print(f"   - Total questions processed: {total_questions}")
-    print(f"   - Total questions updated: {total_updated}")
-    print(f"   - Test files processed: {len(test_files)}")
+    print(f"   - Total questions processed: {totals['total']}")
+    print(f"   - Questions with analysis: {totals['matched']}")
+    print(f"   - Skipped (analysis unchanged since last merge): {totals['unchanged']}")
+    print(f"   - Total questions updated: {totals['updated']}")
+    print(f"   - Test files written: {totals['written']} of {len(test_files)}")
+    if failed:
+        print(f"   - Test files failed: {failed}")
+    print(f"   - Time: {time.time() - start_time:.1f}s")
     print("=" * 60)
-    
-    return 0
+
+    return 0 if not failed else 1
 
 if __name__ == '__main__':
     exit(main())
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Migrate the monolithic analysis_output.json into the sharded analysis store
+(analysis/testN.jsonl plus analysis/index.json, see utils/analysis_store.py).
+
+Entries are verified against the original after writing; the original file
+is left in place and can be deleted once the store is in use.
+
+Usage:
+    python migrate_analysis_store.py [--input analysis_output.json] [--output analysis] [--force]
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.analysis_store import ANALYSIS_DIR, LEGACY_ANALYSIS_FILE, AnalysisStore
+
+
+def load_legacy_output(file_path: Path) -> Dict[str, Any]:
+    """
+    Entries of an analysis_output.json file.
+
+    Older files were a list of entries keyed by question_id/id; those are
+    converted to a dict.
+    """
+    with open(file_path, "r", encoding="utf-8") as f:
+        data: Any = json.load(f)
+
+    if isinstance(data, dict):
+        return data
+    output_dict: Dict[str, Any] = {}
+    if isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict):
+                q_id = item.get("question_id") or item.get("id")
+                if q_id is not None:
+                    output_dict[str(q_id)] = item
+        return output_dict
+    raise ValueError(f"{file_path} is neither a dictionary nor a list of analysis entries")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Migrate analysis_output.json into the sharded analysis store")
+    parser.add_argument("--input", type=Path, default=Path(LEGACY_ANALYSIS_FILE),
+                        help=f"Monolithic analysis file (default: {LEGACY_ANALYSIS_FILE})")
+    parser.add_argument("--output", type=Path, default=Path(ANALYSIS_DIR),
+                        help=f"Store directory (default: {ANALYSIS_DIR})")
+    parser.add_argument("--force", action="store_true",
+                        help="Migrate into an existing store (entries from the file replace stored ones)")
+    args = parser.parse_args()
+
+    if not args.input.exists():
+        print(f"❌ File not found: {args.input}")
+        return 1
+
+    store = AnalysisStore(args.output)
+    if store.exists() and not args.force:
+        print(f"❌ {args.output}/ already holds {len(store)} analyses (use --force to migrate into it)")
+        return 1
+
+    print(f"📂 Loading {args.input}...")
+    try:
+        entries = load_legacy_output(args.input)
+    except (OSError, ValueError, json.JSONDecodeError) as e:
+        print(f"❌ Error loading {args.input}: {e}")
+        return 1
+    print(f"✓ Loaded {len(entries)} entries\n")
+
+    print(f"💾 Writing shards to {args.output}/...")
+    store.update(entries)
+    shards = store.save()
+
+    # Verify against a fresh read of the store
+    written = AnalysisStore(args.output)
+    mismatched = [key for key, entry in entries.items() if written.get(key) != entry]
+    if mismatched:
+        print(f"❌ {len(mismatched)} entries differ after migration (first: {mismatched[0]})")
+        return 1
+
+    print(f"\n✅ Migration complete!")
+    print(f"   - Entries: {len(entries)} ({len(written)} in store)")
+    print(f"   - Shards written: {shards}")
+    for shard in written.shard_names():
+        size = written.shard_path(shard).stat().st_size
+        count = sum(1 for location in written.keys_index.values() if location[0] == shard)
+        print(f"     {shard}: {count} entries, {size / 1024:.0f} KB")
+    print(f"   - {args.input} was left in place; delete it once the store is in use")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
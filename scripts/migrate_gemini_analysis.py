@@ -5,9 +5,15 @@ Useful for copying explanations from test2 to other test files
 """
 
 import json
+import sys
 from pathlib import Path
 from typing import Dict, Any, Optional
 
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.analysis_store import ANALYSIS_DIR, AnalysisStore
+from utils.question_utils import get_question_fingerprint
+
 def get_question_key(question: Dict[str, Any], test_key: str = "test2") -> str:
     """Get unique identifier for a question"""
     if "uniqueId" in question:
@@ -15,7 +21,7 @@ def get_question_key(question: Dict[str, Any], test_key: str = "test2") -> str:
     elif "id" in question:
         return f"{test_key}-q{question['id']}"
     else:
-        return str(hash(question.get("text", "")) % (10**10))
+        return f"q-{get_question_fingerprint(question)}"
 
 def find_matching_question(source_question: Dict[str, Any], target_questions: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     """Find matching question in target list by comparing text"""
@@ -62,7 +68,7 @@ def convert_gemini_analysis_to_explanation(gemini_analysis: Dict[str, Any], ques
     
     return "\n\n".join(parts)
 
-def migrate_analysis(source_file: str, target_file: str, analysis_file: str):
+def migrate_analysis(source_file: str, target_file: str, analysis_dir: str):
     """Migrate Gemini analysis from source test to target test"""
     
     print(f"📂 Loading source questions from {source_file}...")
@@ -75,10 +81,9 @@ def migrate_analysis(source_file: str, target_file: str, analysis_file: str):
         target_questions = json.load(f)
     print(f"✓ Loaded {len(target_questions)} target questions\n")
     
-    print(f"📂 Loading analysis from {analysis_file}...")
-    with open(analysis_file, 'r', encoding='utf-8') as f:
-        analysis_data = json.load(f)
-    print(f"✓ Loaded {len(analysis_data)} analyses\n")
+    print(f"📂 Opening analysis store {analysis_dir}/...")
+    analysis_data = AnalysisStore(analysis_dir)
+    print(f"✓ {len(analysis_data)} analyses\n")
     
     # Create backup
     backup_file = target_file + ".backup"
@@ -139,12 +144,12 @@ if __name__ == '__main__':
     import sys
     
     if len(sys.argv) < 3:
-        print("Usage: python3 migrate_gemini_analysis.py <source_test_file> <target_test_file> [analysis_file]")
-        print("Example: python3 migrate_gemini_analysis.py questions/test2.json questions/test3.json analysis_output.json")
+        print("Usage: python3 migrate_gemini_analysis.py <source_test_file> <target_test_file> [analysis_dir]")
+        print("Example: python3 migrate_gemini_analysis.py questions/test2.json questions/test3.json analysis")
         sys.exit(1)
     
     source_file = sys.argv[1]
     target_file = sys.argv[2]
-    analysis_file = sys.argv[3] if len(sys.argv) > 3 else "analysis_output.json"
+    analysis_dir = sys.argv[3] if len(sys.argv) > 3 else ANALYSIS_DIR
     
-    migrate_analysis(source_file, target_file, analysis_file)
+    migrate_analysis(source_file, target_file, analysis_dir)
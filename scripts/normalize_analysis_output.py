@@ -1,52 +1,52 @@
 #!/usr/bin/env python3
 """
-Normalize analysis_output.json to use consistent testX-qY format for all entries
+Normalize the analysis store to use consistent testX-qY format for all entries
 Migrates old numeric IDs to new format and adds test_key field
+Old numeric keys all live in the "other" shard, so only that shard and the
+shards of the tests they move to are read and rewritten
 """
 
-import json
-import os
 import shutil
+import sys
 from pathlib import Path
-from typing import Dict, Any
 
-ANALYSIS_FILE = "analysis_output.json"
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.analysis_store import ANALYSIS_DIR, OTHER_SHARD, AnalysisStore
+
 BACKUP_SUFFIX = ".backup"
 
 
-def normalize_analysis_output(analysis_file: str):
+def normalize_analysis_output(analysis_dir: str):
     """Normalize analysis output to use consistent testX-qY format"""
-    
-    if not os.path.exists(analysis_file):
-        print(f"❌ File not found: {analysis_file}")
+
+    store = AnalysisStore(analysis_dir)
+    if not store.exists():
+        print(f"❌ Analysis store not found: {analysis_dir}/")
         return 1
-    
+
     # Create backup
-    backup_file = analysis_file + BACKUP_SUFFIX
-    print(f"💾 Creating backup: {backup_file}...")
-    shutil.copy2(analysis_file, backup_file)
-    print("✓ Backup created\n")
-    
+    shard_file = store.shard_path(OTHER_SHARD)
+    backup_file = None
+    if shard_file.exists():
+        backup_file = str(shard_file) + BACKUP_SUFFIX
+        print(f"💾 Creating backup: {backup_file}...")
+        shutil.copy2(shard_file, backup_file)
+        print("✓ Backup created\n")
+
     # Load existing data
-    print(f"📂 Loading {analysis_file}...")
-    with open(analysis_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-    
-    print(f"✓ Loaded {len(data)} entries\n")
-    
-    # Separate old and new format entries
-    old_format = {k: v for k, v in data.items() if k.isdigit()}
-    new_format = {k: v for k, v in data.items() if k not in old_format}
-    
+    print(f"📂 Loading {shard_file}...")
+    old_format = {k: v for k, v in store.load_shard(OTHER_SHARD).items() if k.isdigit()}
+    print(f"✓ Loaded {len(old_format)} old format entries\n")
+
     print(f"📊 Current structure:")
     print(f"   - Old format (numeric IDs): {len(old_format)}")
-    print(f"   - New format (testX-qY): {len(new_format)}\n")
-    
-    # Normalize old format entries
-    normalized_data = new_format.copy()  # Start with new format entries
+    print(f"   - Other entries: {len(store) - len(old_format)}\n")
+
+    # Normalize old format entries (the index answers which new IDs already exist)
     migrated_count = 0
     skipped_duplicates = 0
-    
+
     print("🔄 Migrating old format entries to test2-qX format...")
     for old_id, entry in old_format.items():
         # Check if entry already has test_key
@@ -61,11 +61,14 @@ def normalize_analysis_output(analysis_file: str):
         if question_id is None:
             question_id = int(old_id) if old_id.isdigit() else None
         
+        # The old entry is dropped either way (as a duplicate or under its new ID)
+        del store[old_id]
+
         if question_id is not None:
             new_id = f"{test_key}-q{question_id}"
             
             # Check if new_id already exists (might be duplicate)
-            if new_id in normalized_data:
+            if new_id in store:
                 print(f"⚠️  Skipping duplicate: {old_id} -> {new_id} (already exists)")
                 skipped_duplicates += 1
                 continue
@@ -77,7 +80,7 @@ def normalize_analysis_output(analysis_file: str):
                 if entry.get('unique_id') is None:
                     entry.pop('unique_id', None)
             
-            normalized_data[new_id] = entry
+            store[new_id] = entry
             migrated_count += 1
         else:
             print(f"⚠️  Warning: Could not migrate entry {old_id}")
@@ -87,25 +90,23 @@ def normalize_analysis_output(analysis_file: str):
     
     print(f"✓ Migrated {migrated_count} entries\n")
     
-    # Save normalized data
-    print(f"💾 Saving normalized data to {analysis_file}...")
-    with open(analysis_file, 'w', encoding='utf-8') as f:
-        json.dump(normalized_data, f, indent=2, ensure_ascii=False)
+    # Save normalized data (only the shards that changed are rewritten)
+    print(f"💾 Saving normalized data to {analysis_dir}/...")
+    shards = store.save()
     
     print(f"\n✅ Normalization complete!")
-    print(f"   - Total entries: {len(normalized_data)}")
+    print(f"   - Total entries: {len(store)}")
     print(f"   - Migrated: {migrated_count}")
-    print(f"   - Backup saved to: {backup_file}")
+    print(f"   - Shards written: {shards}")
+    if backup_file:
+        print(f"   - Backup saved to: {backup_file}")
     
-    # Verify all entries have test_key
-    entries_with_test_key = sum(
-        1 for v in normalized_data.values() 
-        if isinstance(v, dict) and v.get('test_key')
-    )
-    print(f"   - Entries with test_key: {entries_with_test_key}/{len(normalized_data)}")
+    # Verify no numeric IDs are left
+    remaining = sum(1 for key in store if key.isdigit())
+    print(f"   - Numeric IDs left: {remaining}")
     
     return 0
 
 
 if __name__ == "__main__":
-    exit(normalize_analysis_output(ANALYSIS_FILE))
+    exit(normalize_analysis_output(ANALYSIS_DIR))
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Normalize question explanations with the registered passes in
+utils/explanation_passes.py, in one traversal per explanation.
+
+Test files are processed in parallel. A sidecar state file records, per
+question, the pass set and a digest of the explanation it left, so questions
+not touched since the last run with the same passes are skipped. Only files
+where an explanation changed are written (after a .backup copy); the test
+files themselves carry no bookkeeping.
+
+Usage:
+    python normalize_explanations.py [--passes a,b] [--dry-run] [--diff N]
+                                     [--workers N] [--force] [--list]
+"""
+
+import argparse
+import difflib
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.enrichment_state import EnrichmentState, stable_digest
+from utils.explanation_passes import PASSES, normalize, pass_set_signature, select_passes
+from utils.question_utils import (
+    find_test_files,
+    get_question_fingerprint,
+    get_questions_dir,
+    load_questions_file,
+    save_questions_file,
+)
+
+STATE_FILE = "normalize_state.json"  # Pass set and explanation digest of each normalized question
+STATE_STAGE = "normalize"
+NORMALIZE_WORKERS = os.cpu_count() or 1  # Test files normalized in parallel (--workers)
+DEFAULT_DIFF_EXAMPLES = 5  # Diffs shown in --dry-run mode
+
+
+def explanation_diff(before: str, after: str, label: str) -> str:
+    """Unified diff of one explanation."""
+    return "".join(difflib.unified_diff(
+        before.splitlines(keepends=True), after.splitlines(keepends=True),
+        fromfile=f"{label} (before)", tofile=f"{label} (after)",
+    ))
+
+
+def normalize_questions_file(
+    questions_file: Path,
+    pass_names: Optional[List[str]] = None,
+    force: bool = False,
+    dry_run: bool = False,
+    diff_limit: int = 0,
+    state: Optional[EnrichmentState] = None,
+) -> Tuple[Dict[str, int], Counter, List[str], Dict[str, str]]:
+    """
+    Normalize every explanation in one test file.
+
+    Args:
+        questions_file: Test file to update
+        pass_names: Passes to run (all registered passes if None)
+        force: Normalize questions even if their state record shows they are already done
+        dry_run: Count changes without writing the file
+        diff_limit: Unified diffs to collect for changed explanations
+        state: Records of earlier runs (read only; the caller records the returned digests)
+
+    Returns:
+        Tuple of (stats: total, skipped, changed, written; hits per pass; diffs;
+        digest of each normalized explanation by question fingerprint)
+    """
+    passes = select_passes(pass_names)
+    signature = pass_set_signature(passes)
+    questions = load_questions_file(questions_file)
+    if questions is None:
+        raise ValueError(f"Could not load {questions_file}")
+
+    stats = {"total": len(questions), "skipped": 0, "changed": 0, "written": 0}
+    hits: Counter = Counter()
+    diffs: List[str] = []
+    normalized_digests: Dict[str, str] = {}
+    dirty = False
+    for question in questions:
+        explanation = question.get("explanation")
+        if not explanation:
+            continue
+        fingerprint = get_question_fingerprint(question)
+        record = state.get(fingerprint, STATE_STAGE) if state is not None else None
+        if not force and record == {"input": signature, "output": stable_digest(explanation)}:
+            stats["skipped"] += 1
+            continue
+
+        normalized, question_hits = normalize(explanation, passes)
+        hits.update(question_hits)
+        if normalized != explanation:
+            stats["changed"] += 1
+            if len(diffs) < diff_limit:
+                label = f"{questions_file.stem} q{question.get('id', '?')}"
+                diffs.append(explanation_diff(explanation, normalized, label))
+        if normalized != explanation:
+            question["explanation"] = normalized
+            dirty = True
+        normalized_digests[fingerprint] = stable_digest(normalized)
+
+    if dirty and not dry_run:
+        if save_questions_file(questions_file, questions, create_backup=True):
+            stats["written"] = 1
+        else:
+            normalized_digests.clear()  # Nothing was normalized on disk
+
+    return stats, hits, diffs, normalized_digests
+
+
+def _normalize_file(task: Tuple[Path, Optional[List[str]], bool, bool, int, EnrichmentState]):
+    """Normalize one test file in a worker: (test_file, stats, hits, diffs, digests, error message)"""
+    test_file, pass_names, force, dry_run, diff_limit, state = task
+    try:
+        stats, hits, diffs, digests = normalize_questions_file(
+            test_file, pass_names, force, dry_run, diff_limit, state
+        )
+    except Exception as e:
+        return test_file, None, None, None, None, str(e)
+    return test_file, stats, hits, diffs, digests, None
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Normalize question explanations")
+    parser.add_argument("--passes", help="Comma-separated passes to run (default: all, see --list)")
+    parser.add_argument("--list", action="store_true", help="List the registered passes and exit")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing any file")
+    parser.add_argument("--diff", type=int, default=None, metavar="N",
+                        help=f"Show up to N unified diffs (default: {DEFAULT_DIFF_EXAMPLES} with --dry-run, else 0)")
+    parser.add_argument("--force", action="store_true",
+                        help="Normalize every explanation, even those already normalized by the current passes")
+    parser.add_argument("--workers", type=int, default=NORMALIZE_WORKERS,
+                        help=f"Test files normalized in parallel (default: {NORMALIZE_WORKERS})")
+    args = parser.parse_args()
+
+    if args.list:
+        print("📋 Registered passes (run in this order):")
+        for name, registered in PASSES.items():
+            print(f"   - {name:<28} [{registered.scope}] {registered.description}")
+        return 0
+
+    pass_names = [name.strip() for name in args.passes.split(",") if name.strip()] if args.passes else None
+    try:
+        passes = select_passes(pass_names)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    diff_limit = args.diff if args.diff is not None else (DEFAULT_DIFF_EXAMPLES if args.dry_run else 0)
+
+    test_files = find_test_files(get_questions_dir())
+    if not test_files:
+        print("❌ No test*.json files found in questions directory")
+        return 1
+
+    workers = max(1, min(args.workers, len(test_files)))
+    print(f"📋 {len(test_files)} test files, {len(passes)} passes ({workers} worker(s))\n")
+    if args.dry_run:
+        print("🔍 DRY RUN MODE - No files will be modified\n")
+
+    # Workers only read the records; new ones are added here and saved once
+    state = EnrichmentState(Path(STATE_FILE)).load()
+    signature = pass_set_signature(passes)
+    tasks = [(test_file, pass_names, args.force, args.dry_run, diff_limit, state) for test_file in test_files]
+    start_time = time.time()
+    totals = {"total": 0, "skipped": 0, "changed": 0, "written": 0}
+    hits: Counter = Counter()
+    diffs: List[str] = []
+    failed = 0
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_normalize_file, tasks)
+    else:
+        pool = None
+        results = map(_normalize_file, tasks)
+
+    try:
+        for test_file, stats, file_hits, file_diffs, digests, error in results:
+            if error is not None:
+                failed += 1
+                print(f"❌ Error processing {test_file.name}: {error}")
+                continue
+            if not args.dry_run:
+                for fingerprint, digest in digests.items():
+                    state.set(fingerprint, STATE_STAGE, signature, digest)
+            for key in totals:
+                totals[key] += stats[key]
+            hits.update(file_hits)
+            diffs.extend(file_diffs[:diff_limit - len(diffs)])
+            if stats["changed"]:
+                status = "💾 saved" if stats["written"] else "[DRY RUN] not saved"
+                print(f"  {test_file.name}: {stats['changed']} changed ({status})")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if not args.dry_run:
+            state.save()
+
+    for diff in diffs:
+        print("\n" + diff.rstrip("\n"))
+
+    print("\n" + "=" * 60)
+    print("✅ Normalization complete!")
+    print(f"📊 Summary:")
+    print(f"   - Total questions: {totals['total']}")
+    print(f"   - Skipped (already normalized by these passes): {totals['skipped']}")
+    print(f"   - Explanations changed: {totals['changed']}")
+    print(f"   - Test files written: {totals['written']} of {len(test_files)}")
+    if failed:
+        print(f"   - Test files failed: {failed}")
+    print(f"   - Time: {time.time() - start_time:.1f}s")
+    print("\n   Hits per pass:")
+    for registered in passes:
+        print(f"   - {registered.name:<28} {hits.get(registered.name, 0)}")
+    print("=" * 60)
+
+    return 0 if not failed else 1
+
+
+if __name__ == "__main__":
+    exit(main())
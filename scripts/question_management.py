@@ -4,38 +4,56 @@ Unified question management script for duplicate detection and removal.
 Consolidates functionality from multiple separate scripts.
 
 Usage:
-    python question_management.py check-duplicates
+    python question_management.py check-duplicates [--report clusters.ndjson]
     python question_management.py find-exact-duplicates
-    python question_management.py analyze-by-test [--sergey-only]
-    python question_management.py remove-duplicates [--sergey-only] [--dry-run]
+    python question_management.py analyze-by-test [--sergey-only] [--matrix] [--csv overlap.csv] [--cover]
+    python question_management.py remove-duplicates [--sergey-only] [--dry-run] [--include-similar]
+    python question_management.py remove-duplicates plan [--output plan.json] [--sergey-only] [--include-similar]
+    python question_management.py remove-duplicates apply plan.json [--dry-run]
+    python question_management.py find-similar [--threshold 0.8] [--top-k 5] [--output report.json]
+    python question_management.py similar-explanations [--max-distance 3] [--output clusters.ndjson]
 """
 
 import sys
+import csv
+import json
+import time
 import argparse
 from pathlib import Path
 from collections import defaultdict, Counter
-from difflib import SequenceMatcher
+from contextlib import nullcontext
 
 # Import shared utilities
 sys.path.insert(0, str(Path(__file__).parent))
+from utils.duplicate_clusters import (
+    NDJSONWriter,
+    build_cluster_report,
+    cluster_duplicates,
+    find_near_duplicate_pairs,
+)
+from utils.test_overlap import build_test_bitsets, greedy_cover, overlap_matrix
+from utils.removal_plan import (
+    apply_removal_plan,
+    build_removal_plan,
+    load_removal_plan,
+    save_removal_plan,
+)
 from utils.question_utils import (
     normalize_text,
     normalize_question_text,
     get_question_signature,
+    get_question_fingerprint,
     find_test_files,
     load_questions_file,
-    save_questions_file,
+    update_combined_tests_file,
     load_all_questions,
     find_duplicates,
+    load_question_records,
+    split_explanation_sections,
     get_questions_dir,
 )
 
 
-def similarity(a: str, b: str) -> float:
-    """Calculate similarity ratio between two strings."""
-    return SequenceMatcher(None, a, b).ratio()
-
-
 def is_sergey_test(test_file: Path) -> bool:
     """Check if test belongs to Sergey (test9+)."""
     try:
@@ -45,76 +63,63 @@ def is_sergey_test(test_file: Path) -> bool:
         return False
 
 
-def cmd_check_duplicates(questions_dir: Path) -> int:
+def cmd_check_duplicates(questions_dir: Path, report: str = None) -> int:
     """
     Check for duplicate questions (similarity-based).
     Original functionality from check_duplicates.py
+    
+    Exact and near matches are grouped into clusters; the full cluster list is
+    streamed to an NDJSON report when one is requested.
     """
     print("🔍 Checking for duplicate questions (similarity-based)...\n")
     
     test_files = find_test_files(questions_dir)
     print(f"Checking {len(test_files)} test files...\n")
     
-    all_questions = []
-    question_by_id = defaultdict(list)
-    question_by_text = defaultdict(list)
-    
-    for test_file in test_files:
-        test_num = test_file.stem.replace("test", "")
-        questions = load_questions_file(test_file)
-        
-        if questions is None:
-            continue
-        
-        for q in questions:
-            if not isinstance(q, dict):
-                continue
-            
-            q_id = q.get("id")
-            text = normalize_question_text(q)
-            
-            if q_id is not None:
-                question_by_id[q_id].append((test_file.name, q))
-            if text:
-                question_by_text[text].append((test_file.name, q_id, q))
-                all_questions.append((test_file.name, q_id, text, q))
+    records = load_question_records(questions_dir, test_files)
+    texts = [normalize_question_text(q) for _, _, q in records]
+    test_names = [test_name for test_name, _, _ in records]
     
     # Find exact duplicates
-    exact_duplicates = {k: v for k, v in question_by_text.items() if len(v) > 1}
+    text_counts = Counter(text for text in texts if text)
+    exact_duplicates = sum(1 for count in text_counts.values() if count > 1)
     
     # Find similar questions
     similar_threshold = 0.95
-    similar_pairs = []
-    
-    for i, (test1, id1, text1, q1) in enumerate(all_questions):
-        for j, (test2, id2, text2, q2) in enumerate(all_questions[i+1:], i+1):
-            if text1 and text2:
-                sim = similarity(text1, text2)
-                if sim >= similar_threshold and sim < 1.0:  # Similar but not exact
-                    similar_pairs.append((test1, id1, test2, id2, sim, text1[:100]))
+    similar_pairs = find_near_duplicate_pairs(texts, similar_threshold)
     
     print(f"\n{'='*80}")
     print(f"DUPLICATE CHECK RESULTS")
     print(f"{'='*80}\n")
-    print(f"Total questions: {len(all_questions)}")
-    print(f"Exact duplicates: {len(exact_duplicates)}")
+    print(f"Total questions: {sum(text_counts.values())}")
+    print(f"Exact duplicates: {exact_duplicates}")
     print(f"Similar questions (>{similar_threshold*100}%): {len(similar_pairs)}\n")
     
-    if exact_duplicates:
-        print(f"Exact duplicates found:")
-        for text, occurrences in list(exact_duplicates.items())[:10]:  # Show first 10
-            print(f"  Found in {len(occurrences)} location(s):")
-            for test_name, q_id, _ in occurrences:
-                print(f"    - {test_name} (ID: {q_id})")
-            print(f"    Text: {text[:100]}...\n")
+    clusters = cluster_duplicates(texts, test_names, similar_pairs)
+    cluster_count = 0
     
-    if similar_pairs:
-        print(f"\nSimilar questions found:")
-        for test1, id1, test2, id2, sim, text in similar_pairs[:10]:  # Show first 10
-            print(f"  {test1} (ID: {id1}) <-> {test2} (ID: {id2}): {sim:.2%} similar")
-            print(f"    Text: {text}...\n")
-    
-    return 1 if (exact_duplicates or similar_pairs) else 0
+    with (NDJSONWriter(Path(report)) if report else nullcontext()) as writer:
+        for cluster_count, members in enumerate(clusters, 1):
+            cluster = build_cluster_report(cluster_count, members, records, texts)
+            if writer:
+                writer.write(cluster)
+            
+            if cluster_count == 1:
+                print(f"Duplicate clusters found:")
+            if cluster_count <= 10:  # Show first 10
+                canonical = cluster["canonical"]
+                print(f"  Cluster #{cluster_count}: {cluster['size']} question(s), keeping {canonical['test']} (ID: {canonical['id']})")
+                for member in cluster["duplicates"]:
+                    print(f"    - {member['test']} (ID: {member['id']}) [{member['match']}]")
+                print(f"    Text: {cluster['text'][:100]}...\n")
+    
+    print(f"Total duplicate clusters: {cluster_count}")
+    if writer:
+        print(f"💾 Streamed {writer.count} cluster(s) to {report}")
+    elif cluster_count > 10:
+        print(f"  ... {cluster_count - 10} more cluster(s) not shown (use --report to save all)")
+    
+    return 1 if cluster_count else 0
 
 
 def cmd_find_exact_duplicates(questions_dir: Path) -> int:
@@ -167,10 +172,19 @@ def cmd_find_exact_duplicates(questions_dir: Path) -> int:
     return 1
 
 
-def cmd_analyze_by_test(questions_dir: Path, sergey_only: bool = False) -> int:
+def cmd_analyze_by_test(
+    questions_dir: Path,
+    sergey_only: bool = False,
+    matrix: bool = False,
+    csv_path: str = None,
+    cover: bool = False,
+) -> int:
     """
     Analyze which test files have the most duplicate questions.
     Original functionality from analyze_duplicates_by_test.py
+    
+    Optionally reports which tests overlap with which (bitset overlap/Jaccard
+    matrix) and a greedy minimal set of tests covering all unique questions.
     """
     print(f"🔍 Analyzing duplicates by test file{' (Sergey tests only)' if sergey_only else ''}...\n")
     
@@ -182,6 +196,7 @@ def cmd_analyze_by_test(questions_dir: Path, sergey_only: bool = False) -> int:
     
     question_by_text = defaultdict(list)
     test_duplicate_count = Counter()
+    test_fingerprints = {}  # test name -> question fingerprints, for the overlap matrix
     
     for test_file in test_files:
         questions = load_questions_file(test_file)
@@ -189,12 +204,14 @@ def cmd_analyze_by_test(questions_dir: Path, sergey_only: bool = False) -> int:
         if questions is None:
             continue
         
+        fingerprints = test_fingerprints.setdefault(test_file.stem, [])
         for q in questions:
             if not isinstance(q, dict):
                 continue
             
             normalized = normalize_question_text(q)
             if normalized:
+                fingerprints.append(get_question_fingerprint(q))
                 question_by_text[normalized].append({
                     "test_file": test_file.name,
                     "test_num": test_file.stem.replace("test", ""),
@@ -230,25 +247,85 @@ def cmd_analyze_by_test(questions_dir: Path, sergey_only: bool = False) -> int:
             print(f"  {test_file}: {count} duplicates - MARKED FOR DELETION")
     
     print(f"\nTotal tests to delete: {len(tests_to_delete)}")
+    
+    if matrix or csv_path or cover:
+        _report_test_overlap(test_fingerprints, show_matrix=matrix, csv_path=csv_path, cover=cover)
+    
     return 0
 
 
-def cmd_remove_duplicates(questions_dir: Path, sergey_only: bool = False, dry_run: bool = False) -> int:
-    """
-    Remove duplicate questions from test files.
-    Original functionality from remove_duplicates.py, remove_duplicates_improved.py, remove_duplicates_sergey_only.py
+def _report_test_overlap(test_fingerprints: dict, show_matrix: bool, csv_path: str, cover: bool):
+    """Print/export the cross-test overlap matrix and the greedy covering set."""
+    names = list(test_fingerprints)
+    bitsets, key_index = build_test_bitsets(test_fingerprints)
+    overlap, jaccard = overlap_matrix(names, bitsets)
+    
+    if show_matrix:
+        print(f"\n{'='*80}")
+        print(f"CROSS-TEST OVERLAP (shared questions; diagonal = unique questions per test)")
+        print(f"{'='*80}\n")
+        labels = [name.replace("test", "") for name in names]
+        width = max(4, max(len(label) for label in labels) + 1)
+        print(" " * 8 + "".join(label.rjust(width) for label in labels))
+        for name, row in zip(names, overlap):
+            cells = "".join((str(count) if count else ".").rjust(width) for count in row)
+            print(f"{name:<8}{cells}")
+        
+        pairs = [
+            (jaccard[i][j], overlap[i][j], names[i], names[j])
+            for i in range(len(names)) for j in range(i + 1, len(names))
+            if overlap[i][j]
+        ]
+        pairs.sort(reverse=True)
+        print(f"\nMost overlapping test pairs ({len(pairs)} pair(s) share questions):")
+        for jac, shared, name_a, name_b in pairs[:10]:
+            print(f"  {name_a} <-> {name_b}: {shared} shared, Jaccard {jac:.2%}")
+    
+    if csv_path:
+        with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["test_a", "test_b", "size_a", "size_b", "overlap", "jaccard"])
+            for i, name_a in enumerate(names):
+                for j, name_b in enumerate(names):
+                    writer.writerow([name_a, name_b, overlap[i][i], overlap[j][j], overlap[i][j], f"{jaccard[i][j]:.4f}"])
+        print(f"\n💾 Saved {len(names)}x{len(names)} overlap matrix to {csv_path}")
+    
+    if cover:
+        picks = greedy_cover(names, bitsets)
+        print(f"\n{'='*80}")
+        print(f"MINIMAL TEST SET COVERING ALL {len(key_index)} UNIQUE QUESTIONS (greedy)")
+        print(f"{'='*80}\n")
+        covered = 0
+        for name, gained in picks:
+            covered += gained
+            print(f"  {name}: +{gained} new question(s) ({covered}/{len(key_index)})")
+        redundant = [name for name in names if name not in dict(picks)]
+        print(f"\n{len(picks)} of {len(names)} tests cover every unique question")
+        if redundant:
+            print(f"Fully covered by the others: {', '.join(redundant)}")
+
+
+def _plan_duplicate_removal(
+    questions_dir: Path,
+    sergey_only: bool = False,
+    include_similar: bool = False,
+):
     """
-    print(f"🧹 Removing duplicate questions{' (Sergey tests only)' if sergey_only else ''}{' [DRY RUN]' if dry_run else ''}...\n")
+    Load the selected test files once and build a removal plan from duplicate clusters.
     
+    Returns:
+        Tuple of (plan, records, loaded_tests) where loaded_tests maps test name to its questions
+    """
     test_files = find_test_files(questions_dir)
     
     if sergey_only:
         test_files = [f for f in test_files if is_sergey_test(f)]
         print(f"Filtering to {len(test_files)} Sergey test files...\n")
     
-    # Build a map: text -> list of (test_file, question, question_index)
-    text_to_questions = defaultdict(list)
-    all_questions = {}
+    # Flat list of questions with their location: (test_file, question_index)
+    loaded_tests = {}
+    records = []
+    locations = []
     
     for test_file in test_files:
         questions = load_questions_file(test_file)
@@ -256,84 +333,295 @@ def cmd_remove_duplicates(questions_dir: Path, sergey_only: bool = False, dry_ru
         if questions is None:
             continue
         
-        all_questions[test_file] = questions
+        loaded_tests[test_file.stem] = questions
         for idx, q in enumerate(questions):
             if not isinstance(q, dict):
                 continue
-            normalized = normalize_question_text(q)
-            if normalized:
-                text_to_questions[normalized].append((test_file, q, idx))
+            records.append((test_file.stem, q.get("id"), q))
+            locations.append((test_file, idx))
     
-    # Find duplicates
-    duplicates = {k: v for k, v in text_to_questions.items() if len(v) > 1}
+    texts = [normalize_question_text(q) for _, _, q in records]
+    near_pairs = find_near_duplicate_pairs(texts) if include_similar else None
+    clusters = list(cluster_duplicates(texts, [name for name, _, _ in records], near_pairs))
     
-    print(f"Found {len(duplicates)} duplicate question texts")
+    print(f"Found {len(clusters)} duplicate cluster(s)")
     
-    # For each duplicate text, decide which test to keep it in
-    # Strategy: Keep in the test with the lowest number, remove from others
-    questions_to_remove = defaultdict(set)  # test_file -> set of indices to remove
+    # Strategy: keep the canonical member (lowest test number), remove the others
+    plan = build_removal_plan(clusters, records, locations, include_similar=include_similar)
+    return plan, records, loaded_tests
+
+
+def _update_all_tests(questions_dir: Path, updated_tests: dict):
+    """Patch all_tests.json (if it exists) with the tests that changed."""
+    all_tests_path = questions_dir / "all_tests.json"
+    if not all_tests_path.exists() or not updated_tests:
+        return
     
-    for text, occurrences in duplicates.items():
-        # Sort by test number (lower test number = keep)
-        occurrences_sorted = sorted(
-            occurrences,
-            key=lambda x: int(x[0].stem.replace("test", ""))
-        )
-        
-        # Keep in first test, remove from others
-        keep_test, keep_q, keep_idx = occurrences_sorted[0]
-        
-        for test_file, q, idx in occurrences_sorted[1:]:
-            questions_to_remove[test_file].add(idx)
-            if not dry_run:
-                print(f"  Will remove duplicate from {test_file.name} (ID: {q.get('id', 'N/A')}): {text[:60]}...")
+    print(f"\nUpdating {all_tests_path.name}...")
+    if update_combined_tests_file(all_tests_path, updated_tests):
+        print(f"Updated {len(updated_tests)} test(s) in all_tests.json")
+
+
+def _print_removal_summary(stats: dict, cleaned_count: int):
+    """Print the summary after applying a removal plan."""
+    print(f"\n{'='*80}")
+    print(f"Summary:")
+    print(f"  Cleaned test files: {cleaned_count}")
+    print(f"  Questions removed: {stats['removed']}")
+    if stats["already_applied"]:
+        print(f"  Already removed (skipped): {stats['already_applied']}")
+    if stats["keep_missing"]:
+        print(f"  Kept copy missing (skipped): {stats['keep_missing']}")
+    if stats["failed"]:
+        print(f"  Failed: {stats['failed']}")
+    print(f"{'='*80}")
+
+
+def cmd_remove_duplicates(
+    questions_dir: Path,
+    sergey_only: bool = False,
+    dry_run: bool = False,
+    include_similar: bool = False,
+) -> int:
+    """
+    Remove duplicate questions from test files.
+    Original functionality from remove_duplicates.py, remove_duplicates_improved.py, remove_duplicates_sergey_only.py
+    
+    Builds a removal plan in memory and applies it in one go; use
+    cmd_plan_removal() and cmd_apply_removal() to review the plan first.
+    """
+    print(f"🧹 Removing duplicate questions{' (Sergey tests only)' if sergey_only else ''}{' [DRY RUN]' if dry_run else ''}...\n")
+    
+    plan, records, loaded_tests = _plan_duplicate_removal(questions_dir, sergey_only, include_similar)
     
     if dry_run:
-        print(f"\n[DRY RUN] Would remove duplicates from {len(questions_to_remove)} test file(s)")
+        print(f"\n[DRY RUN] Would remove duplicates from {len(plan['tests'])} test file(s)")
         return 0
     
-    # Remove duplicates from each test file
-    cleaned_count = 0
-    for test_file in test_files:
-        if test_file not in all_questions:
-            continue
-            
-        if test_file not in questions_to_remove:
-            continue
-            
-        questions = all_questions[test_file]
-        indices_to_remove = questions_to_remove[test_file]
-        
-        # Remove questions at specified indices
-        unique_questions = [q for idx, q in enumerate(questions) if idx not in indices_to_remove]
-        
-        if len(unique_questions) != len(questions):
-            if save_questions_file(test_file, unique_questions, create_backup=True):
-                print(f"Cleaned {test_file.name}: removed {len(indices_to_remove)} duplicate(s), kept {len(unique_questions)} questions")
-                cleaned_count += 1
+    for test_name, removals in plan["tests"].items():
+        for removal in removals:
+            question = loaded_tests[test_name][removal["index"]]
+            print(f"  Will remove duplicate from {test_name}.json (ID: {removal['id'] if removal['id'] is not None else 'N/A'}): {normalize_question_text(question)[:60]}...")
     
-    # Update all_tests.json if it exists
-    all_tests_path = questions_dir / "all_tests.json"
-    if all_tests_path.exists():
-        print(f"\nUpdating {all_tests_path.name}...")
-        all_tests_data = {}
-        for test_file in test_files:
-            questions = load_questions_file(test_file)
-            if questions is not None:
-                test_key = test_file.stem
-                all_tests_data[test_key] = questions
-        
-        if save_questions_file(all_tests_path, all_tests_data, create_backup=False):
-            print(f"Updated all_tests.json with {len(all_tests_data)} tests")
+    updated_tests, stats = apply_removal_plan(plan, questions_dir, loaded_tests=loaded_tests)
+    _update_all_tests(questions_dir, updated_tests)
+    _print_removal_summary(stats, len(updated_tests))
     
-    print(f"\n{'='*80}")
-    print(f"Summary:")
-    print(f"  Cleaned test files: {cleaned_count}")
-    print(f"{'='*80}")
+    return 0
+
+
+def cmd_plan_removal(
+    questions_dir: Path,
+    output: str,
+    sergey_only: bool = False,
+    include_similar: bool = False,
+) -> int:
+    """
+    Write a duplicate removal plan without modifying any test files.
+    """
+    print(f"📝 Planning duplicate removal{' (Sergey tests only)' if sergey_only else ''}...\n")
     
+    plan, _, _ = _plan_duplicate_removal(questions_dir, sergey_only, include_similar)
+    save_removal_plan(plan, Path(output))
+    
+    for test_name, removals in plan["tests"].items():
+        print(f"  {test_name}.json: {len(removals)} removal(s)")
+    
+    print(f"\n💾 Saved plan with {plan['removal_count']} removal(s) across {len(plan['tests'])} test file(s) to {output}")
+    print(f"Review it, then run: python question_management.py remove-duplicates apply {output}")
     return 0
 
 
+def cmd_apply_removal(questions_dir: Path, plan_path: str, dry_run: bool = False) -> int:
+    """
+    Apply a removal plan, touching only the test files it lists.
+    Safe to re-run: questions that were already removed are skipped.
+    """
+    print(f"🧹 Applying removal plan {plan_path}{' [DRY RUN]' if dry_run else ''}...\n")
+    
+    try:
+        plan = load_removal_plan(Path(plan_path))
+    except (OSError, ValueError, json.JSONDecodeError) as e:
+        print(f"❌ Error loading plan: {e}")
+        return 1
+    
+    updated_tests, stats = apply_removal_plan(plan, questions_dir, dry_run=dry_run)
+    if not dry_run:
+        _update_all_tests(questions_dir, updated_tests)
+    _print_removal_summary(stats, len(updated_tests))
+    
+    return 1 if stats["failed"] else 0
+
+
+def cmd_find_similar(
+    questions_dir: Path,
+    threshold: float = 0.8,
+    top_k: int = 5,
+    output: str = None,
+    sergey_only: bool = False,
+) -> int:
+    """
+    Find questions that are similar but not identical (TF-IDF cosine similarity).
+    Replaces the per-pair SequenceMatcher loop with a vectorized similarity matrix.
+    """
+    from utils.similarity import build_tfidf_matrix, compute_similarities, question_document
+
+    print(f"🔍 Finding similar questions (TF-IDF cosine >= {threshold}){' (Sergey tests only)' if sergey_only else ''}...\n")
+    
+    test_files = find_test_files(questions_dir)
+    if sergey_only:
+        test_files = [f for f in test_files if is_sergey_test(f)]
+    
+    records = load_question_records(questions_dir, test_files)
+    print(f"Loaded {len(records)} questions from {len(test_files)} test files")
+    
+    if len(records) < 2:
+        print("Not enough questions to compare")
+        return 0
+    
+    start_time = time.perf_counter()
+    documents = [question_document(q) for _, _, q in records]
+    # Exact duplicates share a signature and are reported by find-exact-duplicates instead
+    signatures = [get_question_signature(q) for _, _, q in records]
+    
+    try:
+        matrix, vocabulary = build_tfidf_matrix(documents)
+    except ImportError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    
+    neighbours, pairs = compute_similarities(
+        matrix, top_k=top_k, threshold=threshold, group_ids=signatures
+    )
+    elapsed = time.perf_counter() - start_time
+    
+    print(f"Vocabulary size: {len(vocabulary)} terms")
+    print(f"Computed similarities in {elapsed:.2f}s\n")
+    
+    print(f"{'='*80}")
+    print(f"SIMILAR QUESTION RESULTS")
+    print(f"{'='*80}\n")
+    print(f"Similar pairs (>= {threshold:.0%}): {len(pairs)}\n")
+    
+    for i, j, score in pairs[:20]:  # Show first 20
+        test1, id1, _ = records[i]
+        test2, id2, _ = records[j]
+        print(f"  {test1} (ID: {id1}) <-> {test2} (ID: {id2}): {score:.2%} similar")
+        print(f"    Text: {documents[i][:100]}...\n")
+    
+    if len(pairs) > 20:
+        print(f"  ... and {len(pairs) - 20} more (use --output to save the full report)\n")
+    
+    if output:
+        report = {
+            "threshold": threshold,
+            "top_k": top_k,
+            "pairs": [
+                {
+                    "a": {"test": records[i][0], "id": records[i][1]},
+                    "b": {"test": records[j][0], "id": records[j][1]},
+                    "score": round(score, 4),
+                }
+                for i, j, score in pairs
+            ],
+            "neighbours": [
+                {
+                    "test": test_name,
+                    "id": q_id,
+                    "neighbours": [
+                        {"test": records[j][0], "id": records[j][1], "score": round(score, 4)}
+                        for j, score in row
+                    ],
+                }
+                for (test_name, q_id, _), row in zip(records, neighbours)
+            ],
+        }
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"💾 Saved full report to {output}")
+    
+    return 1 if pairs else 0
+
+
+def cmd_similar_explanations(
+    questions_dir: Path,
+    max_distance: int = 3,
+    min_words: int = 5,
+    output: str = None,
+) -> int:
+    """
+    Find near-identical explanation sections across different questions.
+    Each "Why option X is correct/incorrect" section gets a 64-bit SimHash;
+    sections within max_distance bits are grouped into clusters.
+    """
+    from utils.simhash import cluster_fingerprints, simhash64, text_features
+    
+    print(f"🔍 Finding near-identical explanation sections (SimHash, <= {max_distance} bits)...\n")
+    
+    start_time = time.perf_counter()
+    records = load_question_records(questions_dir)
+    
+    # (test_name, question_id, option_id, kind, question_text, section_text) per section
+    sections = []
+    fingerprints = []
+    feature_cache = {}
+    for test_name, q_id, q in records:
+        question_text = normalize_question_text(q)
+        for option_id, kind, text in split_explanation_sections(q.get("explanation", "")):
+            features = text_features(text)
+            if sum(features.values()) < min_words:
+                continue
+            sections.append((test_name, q_id, option_id, kind, question_text, text))
+            fingerprints.append(simhash64(features, feature_cache))
+    
+    # The same question appearing in several tests legitimately shares its explanation
+    clusters = [
+        members for members in cluster_fingerprints(fingerprints, max_distance)
+        if len({sections[idx][4] for idx in members}) > 1
+    ]
+    clusters.sort(key=lambda members: len({sections[idx][4] for idx in members}), reverse=True)
+    elapsed = time.perf_counter() - start_time
+    
+    print(f"Scanned {len(sections)} explanation sections from {len(records)} questions in {elapsed:.2f}s\n")
+    print(f"{'='*80}")
+    print(f"NEAR-IDENTICAL EXPLANATION SECTIONS")
+    print(f"{'='*80}\n")
+    print(f"Clusters shared by different questions: {len(clusters)}")
+    print(f"Sections involved: {sum(len(members) for members in clusters)}\n")
+    
+    for cluster_id, members in enumerate(clusters[:10], 1):  # Show first 10
+        question_count = len({sections[idx][4] for idx in members})
+        print(f"  Cluster #{cluster_id}: {len(members)} section(s) across {question_count} question(s)")
+        for idx in members[:5]:
+            test_name, q_id, option_id, kind, _, _ = sections[idx]
+            print(f"    - {test_name} (ID: {q_id}) option {option_id} [{kind}]")
+        if len(members) > 5:
+            print(f"    ... and {len(members) - 5} more")
+        print(f"    Text: {sections[members[0]][5][:100]}...\n")
+    
+    if output:
+        with NDJSONWriter(Path(output)) as writer:
+            for cluster_id, members in enumerate(clusters, 1):
+                writer.write({
+                    "cluster_id": cluster_id,
+                    "size": len(members),
+                    "text": sections[members[0]][5],
+                    "sections": [
+                        {
+                            "test": sections[idx][0],
+                            "id": sections[idx][1],
+                            "option": sections[idx][2],
+                            "kind": sections[idx][3],
+                            "simhash": f"{fingerprints[idx]:016x}",
+                        }
+                        for idx in members
+                    ],
+                })
+        print(f"💾 Streamed {writer.count} cluster(s) to {output}")
+    
+    return 1 if clusters else 0
+
+
 def main():
     """Main entry point."""
     parser = argparse.ArgumentParser(
@@ -343,7 +631,8 @@ def main():
     subparsers = parser.add_subparsers(dest='command', help='Command to execute')
     
     # check-duplicates command
-    subparsers.add_parser('check-duplicates', help='Check for duplicate questions (similarity-based)')
+    check_parser = subparsers.add_parser('check-duplicates', help='Check for duplicate questions (similarity-based)')
+    check_parser.add_argument('--report', help='Stream every duplicate cluster to this NDJSON file')
     
     # find-exact-duplicates command
     subparsers.add_parser('find-exact-duplicates', help='Find exact duplicate questions')
@@ -351,11 +640,38 @@ def main():
     # analyze-by-test command
     analyze_parser = subparsers.add_parser('analyze-by-test', help='Analyze duplicates by test file')
     analyze_parser.add_argument('--sergey-only', action='store_true', help='Only analyze Sergey tests (test9+)')
+    analyze_parser.add_argument('--matrix', action='store_true', help='Show the cross-test overlap matrix and most overlapping pairs')
+    analyze_parser.add_argument('--csv', help='Write the pairwise overlap/Jaccard matrix to this CSV file')
+    analyze_parser.add_argument('--cover', action='store_true', help='Report a minimal set of tests covering all unique questions (greedy)')
     
     # remove-duplicates command
     remove_parser = subparsers.add_parser('remove-duplicates', help='Remove duplicate questions')
     remove_parser.add_argument('--sergey-only', action='store_true', help='Only process Sergey tests (test9+)')
     remove_parser.add_argument('--dry-run', action='store_true', help='Show what would be removed without making changes')
+    remove_parser.add_argument('--include-similar', action='store_true', help='Also remove near duplicates (>=95%% similar text)')
+    remove_actions = remove_parser.add_subparsers(dest='action', help='Two-phase removal (omit to plan and apply in one go)')
+    
+    plan_parser = remove_actions.add_parser('plan', help='Write a removal plan without modifying test files')
+    plan_parser.add_argument('--output', default='duplicate_removal_plan.json', help='Plan file to write (default: duplicate_removal_plan.json)')
+    plan_parser.add_argument('--sergey-only', action='store_true', default=argparse.SUPPRESS, help='Only process Sergey tests (test9+)')
+    plan_parser.add_argument('--include-similar', action='store_true', default=argparse.SUPPRESS, help='Also remove near duplicates')
+    
+    apply_parser = remove_actions.add_parser('apply', help='Apply a removal plan to the affected test files')
+    apply_parser.add_argument('plan', help='Plan file written by "remove-duplicates plan"')
+    apply_parser.add_argument('--dry-run', action='store_true', default=argparse.SUPPRESS, help='Show what would be removed without making changes')
+    
+    # find-similar command
+    similar_parser = subparsers.add_parser('find-similar', help='Find similar but not identical questions (TF-IDF cosine)')
+    similar_parser.add_argument('--threshold', type=float, default=0.8, help='Minimum cosine similarity to report a pair (default: 0.8)')
+    similar_parser.add_argument('--top-k', type=int, default=5, help='Nearest neighbours to keep per question (default: 5)')
+    similar_parser.add_argument('--output', help='Write the full pair list and neighbour table to this JSON file')
+    similar_parser.add_argument('--sergey-only', action='store_true', help='Only analyze Sergey tests (test9+)')
+    
+    # similar-explanations command
+    explanations_parser = subparsers.add_parser('similar-explanations', help='Find near-identical explanation sections across different questions (SimHash)')
+    explanations_parser.add_argument('--max-distance', type=int, default=3, help='Maximum Hamming distance between 64-bit SimHashes (default: 3)')
+    explanations_parser.add_argument('--min-words', type=int, default=5, help='Ignore sections with fewer word shingles than this (default: 5)')
+    explanations_parser.add_argument('--output', help='Stream every cluster to this NDJSON file')
     
     args = parser.parse_args()
     
@@ -371,16 +687,48 @@ def main():
     
     # Execute command
     if args.command == 'check-duplicates':
-        return cmd_check_duplicates(questions_dir)
+        return cmd_check_duplicates(questions_dir, report=getattr(args, 'report', None))
     elif args.command == 'find-exact-duplicates':
         return cmd_find_exact_duplicates(questions_dir)
     elif args.command == 'analyze-by-test':
-        return cmd_analyze_by_test(questions_dir, sergey_only=getattr(args, 'sergey_only', False))
+        return cmd_analyze_by_test(
+            questions_dir,
+            sergey_only=getattr(args, 'sergey_only', False),
+            matrix=getattr(args, 'matrix', False),
+            csv_path=getattr(args, 'csv', None),
+            cover=getattr(args, 'cover', False)
+        )
     elif args.command == 'remove-duplicates':
+        action = getattr(args, 'action', None)
+        if action == 'plan':
+            return cmd_plan_removal(
+                questions_dir,
+                output=args.output,
+                sergey_only=getattr(args, 'sergey_only', False),
+                include_similar=getattr(args, 'include_similar', False)
+            )
+        elif action == 'apply':
+            return cmd_apply_removal(questions_dir, args.plan, dry_run=getattr(args, 'dry_run', False))
         return cmd_remove_duplicates(
             questions_dir,
             sergey_only=getattr(args, 'sergey_only', False),
-            dry_run=getattr(args, 'dry_run', False)
+            dry_run=getattr(args, 'dry_run', False),
+            include_similar=getattr(args, 'include_similar', False)
+        )
+    elif args.command == 'find-similar':
+        return cmd_find_similar(
+            questions_dir,
+            threshold=args.threshold,
+            top_k=args.top_k,
+            output=args.output,
+            sergey_only=getattr(args, 'sergey_only', False)
+        )
+    elif args.command == 'similar-explanations':
+        return cmd_similar_explanations(
+            questions_dir,
+            max_distance=args.max_distance,
+            min_words=args.min_words,
+            output=args.output
         )
     else:
         parser.print_help()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Summarize the per-request telemetry recorded by the Gemini enrichment scripts
+(analyze_questions_gemini.py, fix_domains_gemini.py, enrichment_pipeline.py).
+
+Prints, per script and request kind, latency percentiles, throughput, error
+rates, retries and token usage; estimated cost per test file and request
+kind; and a comparison of batch sizes, to size --concurrency and --batch-size.
+
+Usage:
+    python telemetry_summary.py [telemetry.ndjson] [--last-run] [--script analyze]
+"""
+
+import sys
+import math
+import time
+import argparse
+from pathlib import Path
+from collections import defaultdict
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.telemetry import TELEMETRY_FILE, estimate_cost, load_telemetry
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def record_cost(record: dict) -> float:
+    """Estimated USD cost of a record; replayed cache hits cost nothing."""
+    if record.get("cached"):
+        return 0.0
+    return estimate_cost(record.get("model", ""), record.get("prompt_tokens", 0), record.get("response_tokens", 0))
+
+
+def active_seconds(records: list) -> float:
+    """Wall time covered by the records, summed per run (gaps between runs excluded)."""
+    runs = defaultdict(list)
+    for record in records:
+        runs[(record.get("script"), record.get("run"))].append(record)
+    total = 0.0
+    for run_records in runs.values():
+        starts, ends = [], []
+        for record in run_records:
+            try:
+                end = time.mktime(time.strptime(record["ts"], "%Y-%m-%d %H:%M:%S"))
+            except (KeyError, ValueError):
+                continue
+            ends.append(end)
+            starts.append(end - record.get("total_s", 0.0))
+        if ends:
+            # Timestamps have one-second resolution
+            total += max(1.0, max(ends) - min(starts))
+    return total
+
+
+def print_overview(records: list):
+    """Latency, throughput, errors and tokens per script and request kind."""
+    groups = defaultdict(list)
+    for record in records:
+        groups[(record.get("script", "?"), record.get("kind", "?"))].append(record)
+
+    print(f"  {'script/kind':<28}{'calls':>7}{'q':>7}{'q/min':>8}{'latency p50/p95/p99':>22}"
+          f"{'total p95':>10}{'queue p95':>10}{'err%':>7}{'retry':>7}{'cached':>8}")
+    for (script, kind), group in sorted(groups.items()):
+        latencies = [r["latency_s"] for r in group if r.get("latency_s") is not None]
+        questions = sum(r.get("items", 1) for r in group)
+        seconds = active_seconds(group)
+        errors = sum(1 for r in group if not r.get("ok"))
+        retries = sum(r.get("retries", 0) for r in group)
+        cached = sum(1 for r in group if r.get("cached"))
+        print(f"  {script + '/' + kind:<28}{len(group):>7}{questions:>7}{questions / seconds * 60 if seconds else 0:>8.1f}"
+              f"{percentile(latencies, 50):>8.2f}/{percentile(latencies, 95):.2f}/{percentile(latencies, 99):<6.2f}"
+              f"{percentile([r.get('total_s', 0.0) for r in group], 95):>9.2f}s"
+              f"{percentile([r.get('queue_wait_s', 0.0) for r in group], 95):>9.2f}s"
+              f"{100.0 * errors / len(group):>7.1f}{retries / len(group):>7.2f}{100.0 * cached / len(group):>7.0f}%")
+
+    print("\n  latency = one attempt's request time, total = first attempt to final result")
+    print("  (backoff included), queue = rate limiter and shared retry pauses, retry = retries per call")
+
+    error_classes = defaultdict(int)
+    for record in records:
+        for error in record.get("errors", []):
+            error_classes[error] += 1
+    if error_classes:
+        print(f"  Errors seen (incl. retried): {', '.join(f'{k}: {v}' for k, v in sorted(error_classes.items()))}")
+    failed = defaultdict(int)
+    for record in records:
+        if record.get("error_class"):
+            failed[record["error_class"]] += 1
+    if failed:
+        print(f"  Calls failed for good: {', '.join(f'{k}: {v}' for k, v in sorted(failed.items()))}")
+
+    prompt_tokens = sum(r.get("prompt_tokens", 0) for r in records)
+    response_tokens = sum(r.get("response_tokens", 0) for r in records)
+    estimated = sum(1 for r in records if r.get("tokens_estimated"))
+    print(f"  Tokens: {prompt_tokens:,} prompt + {response_tokens:,} response"
+          + (f" ({estimated} call(s) estimated from size)" if estimated else ""))
+    print(f"  Estimated cost: ${sum(record_cost(r) for r in records):.4f}")
+
+
+def print_cost_by_test(records: list):
+    """
+    Estimated cost per test file and request kind; a request's cost is split
+    evenly over its questions. A question with both an analysis and a domain
+    call counts once per kind, so question counts are not added across kinds.
+    """
+    tests = defaultdict(lambda: defaultdict(lambda: {"questions": 0.0, "cost": 0.0, "errors": 0.0, "seconds": 0.0}))
+    for record in records:
+        labels = record.get("tests") or ["(unlabeled)"]
+        share = 1.0 / len(labels)
+        cost = record_cost(record)
+        for test_key in labels:
+            entry = tests[test_key][record.get("kind", "?")]
+            entry["questions"] += share * record.get("items", 1)
+            entry["cost"] += share * cost
+            entry["errors"] += share * (0 if record.get("ok") else 1)
+            entry["seconds"] += share * record.get("total_s", 0.0)
+
+    print(f"  {'test':<16}{'kind':<14}{'questions':>10}{'cost':>12}{'$/question':>12}{'failed':>8}{'request s':>11}")
+
+    def test_order(item):
+        name = item[0]
+        digits = "".join(c for c in name if c.isdigit())
+        return (int(digits) if digits else math.inf, name)
+
+    for test_key, kinds in sorted(tests.items(), key=test_order):
+        for kind, entry in sorted(kinds.items()):
+            per_question = entry["cost"] / entry["questions"] if entry["questions"] else 0.0
+            print(f"  {test_key:<16}{kind:<14}{entry['questions']:>10.0f}{'$' + format(entry['cost'], '.4f'):>12}"
+                  f"{'$' + format(per_question, '.6f'):>12}{entry['errors']:>8.0f}{entry['seconds']:>10.0f}s")
+        if len(kinds) > 1:
+            cost = sum(entry["cost"] for entry in kinds.values())
+            errors = sum(entry["errors"] for entry in kinds.values())
+            seconds = sum(entry["seconds"] for entry in kinds.values())
+            print(f"  {test_key:<16}{'(all kinds)':<14}{'-':>10}{'$' + format(cost, '.4f'):>12}"
+                  f"{'-':>12}{errors:>8.0f}{seconds:>10.0f}s")
+
+
+def print_batching(records: list):
+    """Per-question latency, errors, tokens and cost by questions per request."""
+    groups = defaultdict(list)
+    for record in records:
+        groups[(record.get("kind", "?"), record.get("items", 1))].append(record)
+    if len({items for _, items in groups}) < 2:
+        print("  Only one batch size recorded; run with different --batch-size values to compare")
+        return
+
+    print(f"  {'kind':<16}{'batch':>6}{'calls':>7}{'latency p50':>13}{'s/question':>12}{'err%':>7}"
+          f"{'tokens/q':>10}{'$/question':>12}")
+    for (kind, items), group in sorted(groups.items()):
+        latencies = [r["latency_s"] for r in group if r.get("latency_s") is not None]
+        questions = items * len(group)
+        tokens = sum(r.get("prompt_tokens", 0) + r.get("response_tokens", 0) for r in group)
+        errors = sum(1 for r in group if not r.get("ok"))
+        print(f"  {kind:<16}{items:>6}{len(group):>7}{percentile(latencies, 50):>12.2f}s"
+              f"{sum(r.get('total_s', 0.0) for r in group) / questions:>11.2f}s{100.0 * errors / len(group):>7.1f}"
+              f"{tokens / questions:>10.0f}{'$' + format(sum(record_cost(r) for r in group) / questions, '.6f'):>12}")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Summarize Gemini request telemetry")
+    parser.add_argument("file", nargs="?", default=TELEMETRY_FILE,
+                        help=f"Telemetry file (default: {TELEMETRY_FILE})")
+    parser.add_argument("--last-run", action="store_true", help="Only include the most recent run")
+    parser.add_argument("--script", help="Only include records of one script (analyze, fix_domains, pipeline)")
+    args = parser.parse_args()
+
+    path = Path(args.file)
+    if not path.exists():
+        print(f"❌ File not found: {path}")
+        return 1
+
+    records = load_telemetry(path)
+    if args.script:
+        records = [r for r in records if r.get("script") == args.script]
+    if args.last_run and records:
+        last = max(r.get("run", "") for r in records)
+        records = [r for r in records if r.get("run", "") == last]
+    if not records:
+        print(f"❌ No telemetry records in {path}")
+        return 1
+
+    runs = len({(r.get("script"), r.get("run")) for r in records})
+    print(f"\n{'='*100}")
+    print(f"GEMINI REQUEST TELEMETRY ({len(records)} calls from {runs} run(s) in {path})")
+    print(f"{'='*100}\n")
+    print_overview(records)
+
+    print(f"\n{'-'*100}")
+    print("COST PER TEST FILE")
+    print(f"{'-'*100}\n")
+    print_cost_by_test(records)
+
+    print(f"\n{'-'*100}")
+    print("BATCHING")
+    print(f"{'-'*100}\n")
+    print_batching(records)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
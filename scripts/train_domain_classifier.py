@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Train the offline SAA-C03 domain classifier (utils/domain_classifier.py) on
+the labelled questions/ corpus and save it to models/domain_classifier.npz.
+
+Copies of a question in several tests are counted once. Before saving,
+k-fold cross-validation fits the confidence calibration and reports accuracy,
+the accuracy of the keyword rules it replaces, and how many questions clear
+each confidence threshold (and how accurate those are). The saved model's
+min_confidence is the lowest threshold whose held-out predictions reach
+TARGET_ACCURACY (none: the model is never trusted), and it keeps each
+question's held-out prediction, so fix_domains_gemini.py --classifier and
+the extractors never judge a training question by its in-sample score.
+
+Usage:
+    python train_domain_classifier.py [--folds 5] [--no-save] [--output PATH]
+"""
+
+import sys
+import math
+import random
+import argparse
+from pathlib import Path
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.domain_classifier import (
+    DOMAINS,
+    MODEL_FILE,
+    DomainClassifier,
+    fit_temperature,
+    softmax,
+)
+from utils.question_utils import get_question_fingerprint, get_questions_dir, load_question_records
+from utils.similarity import question_document, require_numpy
+from extract_questions_from_pdf import keyword_domain
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None  # type: ignore
+
+CONFIDENCE_THRESHOLDS = [0.5, 0.7, 0.8, 0.9, 0.95, 0.99]
+DEFAULT_FOLDS = 5
+SEED = 0
+TARGET_ACCURACY = 0.95  # Held-out accuracy a confidence threshold must reach to be trusted
+MIN_KEPT = 20  # Fewest held-out questions above a threshold to measure its accuracy on
+
+
+def load_training_set(questions_dir: Path):
+    """(documents, domains, fingerprints) of the distinct labelled questions."""
+    seen = set()
+    texts, labels, fingerprints = [], [], []
+    for _, _, question in load_question_records(questions_dir):
+        domain = question.get("domain")
+        if domain not in DOMAINS:
+            continue
+        fingerprint = get_question_fingerprint(question)
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        texts.append(question_document(question))
+        labels.append(domain)
+        fingerprints.append(fingerprint)
+    return texts, labels, fingerprints
+
+
+def cross_validate(texts: list, labels: list, folds: int):
+    """Out-of-fold log-likelihoods (questions, domains) of every question."""
+    require_numpy()
+    order = list(range(len(texts)))
+    random.Random(SEED).shuffle(order)
+    scores = np.zeros((len(texts), len(DOMAINS)))
+    for fold in range(folds):
+        test_rows = sorted(order[fold::folds])
+        held_out = set(test_rows)
+        train_rows = [row for row in order if row not in held_out]
+        classifier = DomainClassifier.fit([texts[row] for row in train_rows], [labels[row] for row in train_rows])
+        scores[test_rows] = classifier.log_likelihoods([texts[row] for row in test_rows])
+    return scores
+
+
+def choose_threshold(probabilities, labels: list) -> float:
+    """
+    Lowest confidence at which held-out predictions reach TARGET_ACCURACY.
+
+    Returns:
+        The threshold, or infinity if no threshold with at least MIN_KEPT
+        questions above it is accurate enough
+    """
+    predicted = probabilities.argmax(axis=1)
+    confidence = probabilities.max(axis=1)
+    hits = predicted == np.asarray([DOMAINS.index(label) for label in labels])
+    for threshold in np.arange(0.5, 1.0, 0.005):
+        kept = confidence >= threshold
+        if kept.sum() < MIN_KEPT:
+            break
+        if hits[kept].mean() >= TARGET_ACCURACY:
+            return round(float(threshold), 3)
+    return math.inf
+
+
+def print_report(probabilities, texts: list, labels: list):
+    """Print accuracy, the keyword baseline and confidence-threshold coverage."""
+    total = len(labels)
+    predicted = [DOMAINS[i] for i in probabilities.argmax(axis=1)]
+    confidence = probabilities.max(axis=1)
+    hits = [p == actual for p, actual in zip(predicted, labels)]
+    keyword_correct = sum(1 for text, label in zip(texts, labels) if keyword_domain(text) == label)
+
+    print(f"\n📊 Cross-validated accuracy: {sum(hits) / total:.1%} ({sum(hits)}/{total})")
+    print(f"   Keyword rules (extract_questions_from_pdf): {keyword_correct / total:.1%}")
+
+    print("\n   Per domain (recall):")
+    for domain in DOMAINS:
+        rows = [row for row, actual in enumerate(labels) if actual == domain]
+        if rows:
+            print(f"   - {domain:<40} {sum(hits[row] for row in rows) / len(rows):>6.1%} of {len(rows)}")
+
+    print("\n   Confidence threshold → questions kept local, accuracy on them:")
+    for threshold in CONFIDENCE_THRESHOLDS:
+        kept = [row for row in range(total) if confidence[row] >= threshold]
+        if kept:
+            accuracy = sum(hits[row] for row in kept) / len(kept)
+            print(f"   - ≥ {threshold:<5g} {len(kept) / total:>6.1%} kept, {accuracy:>6.1%} correct")
+        else:
+            print(f"   - ≥ {threshold:<5g}   0.0% kept")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description="Train the offline domain classifier")
+    parser.add_argument("--folds", type=int, default=DEFAULT_FOLDS,
+                        help=f"Cross-validation folds (default: {DEFAULT_FOLDS}, 0 to skip)")
+    parser.add_argument("--no-save", action="store_true", help="Only report cross-validation results")
+    parser.add_argument("--output", type=Path, default=MODEL_FILE, help=f"Model file (default: {MODEL_FILE})")
+    args = parser.parse_args()
+
+    print("📂 Loading labelled questions...")
+    texts, labels, fingerprints = load_training_set(get_questions_dir())
+    if not texts:
+        print("❌ No labelled questions found")
+        return 1
+    counts = {domain: labels.count(domain) for domain in DOMAINS}
+    print(f"✓ {len(texts)} distinct questions: " + ", ".join(f"{d.split()[1]} {c}" for d, c in counts.items()))
+
+    temperature, min_confidence, held_out = 1.0, math.inf, {}
+    if args.folds > 1:
+        print(f"🔁 {args.folds}-fold cross-validation...")
+        scores = cross_validate(texts, labels, args.folds)
+        # Calibrate confidences and the trusted threshold on the held-out predictions
+        temperature = fit_temperature(scores, [DOMAINS.index(label) for label in labels])
+        probabilities = softmax(scores, temperature)
+        print(f"✓ Calibration temperature: {temperature:.1f}")
+        print_report(probabilities, texts, labels)
+        min_confidence = choose_threshold(probabilities, labels)
+        if math.isinf(min_confidence):
+            print(f"\n⚠️  No threshold reaches {TARGET_ACCURACY:.0%} held-out accuracy: "
+                  "the model will never be trusted over the API or the keyword rules")
+        else:
+            print(f"\n✓ Trusted from {min_confidence:g} confidence ({TARGET_ACCURACY:.0%} held-out accuracy)")
+        held_out = {
+            fingerprint: (DOMAINS[int(row.argmax())], float(row.max()))
+            for fingerprint, row in zip(fingerprints, probabilities)
+        }
+    else:
+        print("⚠️  No cross-validation: confidences are uncalibrated and the model will never be trusted")
+
+    if args.no_save:
+        return 0
+    classifier = DomainClassifier.fit(texts, labels)
+    classifier.temperature = temperature
+    classifier.min_confidence = min_confidence
+    classifier.held_out = held_out
+    classifier.save(args.output)
+    print(f"\n💾 Saved model to {args.output} ({args.output.stat().st_size / 1024:.0f} KB)")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -6,10 +6,16 @@ from .question_utils import (
     normalize_text,
     normalize_question_text,
     get_question_signature,
+    get_question_fingerprint,
+    get_text_digest,
+    get_test_number,
+    split_explanation_sections,
     find_test_files,
     load_questions_file,
     save_questions_file,
+    update_combined_tests_file,
     load_all_questions,
+    load_question_records,
     find_duplicates,
     get_project_root,
     get_questions_dir,
@@ -19,10 +25,16 @@ __all__ = [
     'normalize_text',
     'normalize_question_text',
     'get_question_signature',
+    'get_question_fingerprint',
+    'get_text_digest',
+    'get_test_number',
+    'split_explanation_sections',
     'find_test_files',
     'load_questions_file',
     'save_questions_file',
+    'update_combined_tests_file',
     'load_all_questions',
+    'load_question_records',
     'find_duplicates',
     'get_project_root',
     'get_questions_dir',
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Content-digest index over Gemini analysis entries.
+Matches questions to existing analysis by a stable fingerprint of their text
+and options plus their correct answers, so resume and merge survive ID
+changes and test renumbering without applying an analysis to a question
+with a different answer.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+from .enrichment_state import stable_digest
+from .question_utils import get_question_fingerprint, get_text_digest
+
+
+def answers_content_key(content: str, answers: Optional[Iterable[Any]]) -> str:
+    """Content id (fingerprint or text digest) combined with the correct answers."""
+    return stable_digest([content, sorted(str(answer) for answer in answers or [])])
+
+
+def is_usable_entry(entry: Any) -> bool:
+    """Whether an analysis entry holds an analysis that can be applied (not a parse error)."""
+    return isinstance(entry, dict) and isinstance(entry.get("analysis"), dict) and "error" not in entry["analysis"]
+
+
+class AnalysisIndex:
+    """
+    Lookup from question content to analysis store keys.
+
+    Entries written with a "fingerprint" field are matched on the question's
+    fingerprint (normalized text plus options). Older entries only store the
+    question text and are matched on a digest of the normalized text. Either
+    way the correct answers must match too, and entries without a usable
+    analysis are not indexed.
+    """
+
+    def __init__(self, analysis_data: Optional[Dict[str, Any]] = None):
+        self.by_fingerprint: Dict[str, str] = {}
+        self.by_text_digest: Dict[str, str] = {}
+        for key, entry in (analysis_data or {}).items():
+            self.add(key, entry)
+
+    def add(self, key: str, entry: Any):
+        """Index one analysis entry under its output key."""
+        if not is_usable_entry(entry):
+            return
+        answers = entry.get("correct_answers")
+        fingerprint = entry.get("fingerprint")
+        if fingerprint:
+            self.by_fingerprint[answers_content_key(fingerprint, answers)] = key
+            return
+        question_text = entry.get("question_text")
+        if question_text:
+            self.by_text_digest[answers_content_key(get_text_digest(question_text), answers)] = key
+
+    def lookup(self, question: Dict[str, Any]) -> Optional[str]:
+        """
+        Find the analysis key for a question by content and correct answers.
+
+        Returns:
+            Output key of the matching entry, or None
+        """
+        answers = question.get("correctAnswers")
+        key = self.by_fingerprint.get(answers_content_key(get_question_fingerprint(question), answers))
+        if key is None and self.by_text_digest:
+            question_text = question.get("text", "") or question.get("question", "")
+            if question_text:
+                key = self.by_text_digest.get(answers_content_key(get_text_digest(question_text), answers))
+        return key
+
+    def __len__(self) -> int:
+        return len(self.by_fingerprint) + len(self.by_text_digest)
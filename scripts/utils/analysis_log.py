@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL checkpoint log for Gemini analysis results.
+Each analyzed question is appended as one JSON line and the file is fsynced in
+batches, so checkpointing costs O(1) per question. Replaying the log rebuilds
+the results; compaction folds them into the sharded analysis store
+(AnalysisStore.compact_log in analysis_store.py).
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+
+class AnalysisLog:
+    """
+    Append-only writer for analysis results.
+    Use as a context manager; pending lines are fsynced on exit.
+    """
+
+    def __init__(self, log_path: Path, fsync_every: int = 5):
+        self.log_path = Path(log_path)
+        self.fsync_every = max(1, fsync_every)
+        self.count = 0
+        self._unsynced = 0
+        self._file = None
+
+    def open(self) -> "AnalysisLog":
+        torn = False
+        if self.log_path.exists() and self.log_path.stat().st_size:
+            with open(self.log_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                torn = f.read(1) != b"\n"
+        self._file = open(self.log_path, 'a', encoding='utf-8')
+        if torn:
+            # Terminate a line torn by a crash so the next record starts cleanly
+            self._file.write("\n")
+        return self
+
+    def __enter__(self) -> "AnalysisLog":
+        return self.open()
+
+    def append(self, key: str, entry: Dict[str, Any]):
+        """Append one result; fsync every fsync_every appends."""
+        self._file.write(json.dumps({"key": key, "entry": entry}, ensure_ascii=False))
+        self._file.write("\n")
+        self.count += 1
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """Flush and fsync pending lines."""
+        if self._file is None or not self._unsynced:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        """Fsync pending lines and close the log (safe to call twice)."""
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def replay_analysis_log(log_path: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Rebuild results from a checkpoint log. Later lines win over earlier
+    ones; a torn last line (crash mid-write) is ignored.
+
+    Args:
+        log_path: Path to the JSONL log
+
+    Returns:
+        Dictionary mapping question key (testX-qY) to its output entry
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    log_path = Path(log_path)
+    if not log_path.exists():
+        return entries
+
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+                entries[record["key"]] = record["entry"]
+            except (json.JSONDecodeError, KeyError, TypeError):
+                print(f"⚠️  Warning: Skipping unreadable line {line_number} in {log_path.name}")
+    return entries
+
+
+def write_json_atomic(data: Any, file_path: Path):
+    """Write JSON to a temp file, fsync it and atomically replace file_path."""
+    file_path = Path(file_path)
+    temp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        temp_path.replace(file_path)
+    except Exception:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
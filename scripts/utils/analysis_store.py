@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Gemini analysis results sharded per test.
+
+Analyses live in one JSONL shard per test key (analysis/test12.jsonl, one
+{"key", "entry"} line per question, sorted by question number) plus a small
+index.json listing every key with its shard and content id (fingerprint plus
+correct answers, see AnalysisIndex). Keys
+without a testX-qY form (old numeric IDs, content keys) go to other.jsonl.
+
+AnalysisStore is a dict-like view of the whole store: keys, lengths,
+membership and content lookups are answered from the index alone, a shard is
+read the first time one of its entries is read or written, and save()
+rewrites only the shards that changed:
+
+    store = AnalysisStore(ANALYSIS_DIR)
+    entry = store.get("test12-q5")        # reads analysis/test12.jsonl only
+    store["test12-q6"] = new_entry
+    store.save()                          # rewrites test12.jsonl and index.json
+
+migrate_analysis_store.py converts the old monolithic analysis_output.json.
+"""
+
+import json
+import os
+import re
+from collections.abc import MutableMapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from .analysis_index import AnalysisIndex, answers_content_key, is_usable_entry
+from .analysis_log import replay_analysis_log
+from .question_utils import get_text_digest
+
+ANALYSIS_DIR = "analysis"
+LEGACY_ANALYSIS_FILE = "analysis_output.json"  # Monolithic format before sharding
+INDEX_FILE = "index.json"
+INDEX_VERSION = 2  # Version 1 content ids ignored the correct answers; they are rebuilt on load
+OTHER_SHARD = "other"  # Keys that do not name a test
+
+SHARD_KEY_PATTERN = re.compile(r"^(test\d+)-q")
+TEXT_DIGEST_PREFIX = "text:"  # Index content id of entries that only store question text
+
+
+def shard_for_key(key: str) -> str:
+    """Shard holding an analysis key ("test12-q5" -> "test12")."""
+    match = SHARD_KEY_PATTERN.match(key)
+    return match.group(1) if match else OTHER_SHARD
+
+
+def analysis_sort_key(key: str) -> tuple:
+    """Sort key function: test name first, then question number"""
+    if "-q" in key:
+        # Format: testX-qY
+        parts = key.split("-q")
+        test_name = parts[0]
+        q_num = int(parts[1]) if parts[1].isdigit() else 999
+        # Extract test number for sorting
+        test_num = int(test_name.replace("test", "")) if test_name.replace("test", "").isdigit() else 999
+        return (test_num, q_num)
+    elif key.isdigit():
+        # Old numeric format - put at end
+        return (9999, int(key))
+    else:
+        # Unknown format - put at very end
+        return (99999, 0)
+
+
+def content_id(entry: Any) -> Optional[str]:
+    """
+    Index content id of an entry: its fingerprint, or a digest of its question
+    text, combined with its correct answers (see AnalysisIndex). None for
+    entries without a usable analysis, which no other question may reuse.
+    """
+    if not is_usable_entry(entry):
+        return None
+    answers = entry.get("correct_answers")
+    if entry.get("fingerprint"):
+        return answers_content_key(entry["fingerprint"], answers)
+    if entry.get("question_text"):
+        return TEXT_DIGEST_PREFIX + answers_content_key(get_text_digest(entry["question_text"]), answers)
+    return None
+
+
+class AnalysisStore(MutableMapping):
+    """
+    Dict-like access to a sharded analysis directory.
+
+    Args:
+        directory: Store directory (created by save() if missing)
+    """
+
+    def __init__(self, directory=ANALYSIS_DIR):
+        self.directory = Path(directory)
+        self.index_path = self.directory / INDEX_FILE
+        # key -> [shard, content id]
+        self.keys_index: Dict[str, List[Optional[str]]] = {}
+        self.shards: Dict[str, Dict[str, Any]] = {}  # Loaded shards
+        self.dirty: Set[str] = set()
+        self.index_changed = False  # Index to rewrite even if no shard changed
+        self.shard_reads = 0
+        if self.index_path.exists():
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if not isinstance(index, dict) or index.get("version") not in (1, INDEX_VERSION):
+                raise ValueError(f"{self.index_path} is not a version {INDEX_VERSION} analysis index")
+            self.keys_index = index.get("keys", {})
+            if index["version"] != INDEX_VERSION:
+                # Upgraded in place once, so later opens read the index alone again
+                self.rebuild_content_ids()
+                self.save()
+
+    def exists(self) -> bool:
+        return self.index_path.exists()
+
+    def legacy_file(self) -> Optional[Path]:
+        """The monolithic analysis_output.json next to the store if it has not been migrated yet."""
+        legacy = self.directory.parent / LEGACY_ANALYSIS_FILE
+        return legacy if not self.exists() and legacy.exists() else None
+
+    def shard_path(self, shard: str) -> Path:
+        return self.directory / f"{shard}.jsonl"
+
+    def shard_names(self) -> List[str]:
+        """Shards with at least one entry, in test order."""
+        names = {location[0] for location in self.keys_index.values()}
+        return sorted(names, key=lambda name: analysis_sort_key(f"{name}-q0"))
+
+    def load_shard(self, shard: str) -> Dict[str, Any]:
+        """Entries of one shard (read from disk once)."""
+        if shard not in self.shards:
+            self.shards[shard] = replay_analysis_log(self.shard_path(shard))
+            self.shard_reads += 1
+        return self.shards[shard]
+
+    def load(self, shards: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Entries of the given shards (all shards if None) as a plain dict.
+
+        Args:
+            shards: Shard names, i.e. test keys such as "test12"
+        """
+        entries: Dict[str, Any] = {}
+        for shard in (self.shard_names() if shards is None else shards):
+            entries.update(self.load_shard(shard))
+        return entries
+
+    def content_index(self) -> AnalysisIndex:
+        """Content lookup over every entry, built from the index without reading shards."""
+        index = AnalysisIndex()
+        for key, (_, content) in self.keys_index.items():
+            if not content:
+                continue
+            if content.startswith(TEXT_DIGEST_PREFIX):
+                index.by_text_digest[content[len(TEXT_DIGEST_PREFIX):]] = key
+            else:
+                index.by_fingerprint[content] = key
+        return index
+
+    def rebuild_content_ids(self):
+        """Recompute every key's content id from its entry (reads all shards; the index is rewritten on save)."""
+        for key, entry in self.load().items():
+            self.keys_index[key] = [shard_for_key(key), content_id(entry)]
+        self.index_changed = True
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self.keys_index:
+            raise KeyError(key)
+        return self.load_shard(self.keys_index[key][0])[key]
+
+    def __setitem__(self, key: str, entry: Any):
+        shard = shard_for_key(key)
+        self.load_shard(shard)[key] = entry
+        self.keys_index[key] = [shard, content_id(entry)]
+        self.dirty.add(shard)
+
+    def __delitem__(self, key: str):
+        shard = self.keys_index.pop(key)[0]
+        del self.load_shard(shard)[key]
+        self.dirty.add(shard)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.keys_index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self.keys_index))
+
+    def __len__(self) -> int:
+        return len(self.keys_index)
+
+    def save(self, rewrite_all: bool = False) -> int:
+        """
+        Write changed shards (all shards if rewrite_all) and the index.
+
+        Returns:
+            Number of shard files written
+        """
+        shards = set(self.dirty)
+        if rewrite_all:
+            shards |= set(self.shard_names())
+        if not shards and self.exists() and not self.index_changed:
+            return 0
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for shard in sorted(shards):
+            entries = self.load_shard(shard)
+            if entries:
+                lines = [
+                    json.dumps({"key": key, "entry": entries[key]}, ensure_ascii=False) + "\n"
+                    for key in sorted(entries, key=analysis_sort_key)
+                ]
+                _write_text_atomic("".join(lines), self.shard_path(shard))
+            elif self.shard_path(shard).exists():
+                self.shard_path(shard).unlink()
+        ordered = {key: self.keys_index[key] for key in sorted(self.keys_index, key=analysis_sort_key)}
+        # One line per key keeps the index small and its diffs readable
+        lines = [f"{json.dumps(key)}: {json.dumps(location)}" for key, location in ordered.items()]
+        _write_text_atomic(
+            f'{{"version": {INDEX_VERSION}, "keys": {{\n' + ",\n".join(lines) + "\n}}\n", self.index_path
+        )
+        self.keys_index = ordered
+        self.dirty.clear()
+        self.index_changed = False
+        return len(shards)
+
+    def compact_log(self, log_path: Path, truncate: bool = False) -> Optional[Dict[str, int]]:
+        """
+        Fold an analysis checkpoint log into the store (only the shards it touches are rewritten).
+
+        Args:
+            log_path: Path to the JSONL log
+            truncate: Empty the log after a successful compaction
+
+        Returns:
+            Stats dict (existing, logged, total, shards), or None if the log is empty
+        """
+        logged = replay_analysis_log(log_path)
+        if not logged:
+            return None
+        existing = len(self)
+        self.update(logged)
+        shards = self.save()
+        if truncate:
+            # Only after the shards are safely on disk
+            open(log_path, "w").close()
+        return {"existing": existing, "logged": len(logged), "total": len(self), "shards": shards}
+
+
+def _write_text_atomic(text: str, file_path: Path):
+    """Write text to a temp file, fsync it and atomically replace file_path."""
+    temp_path = file_path.with_suffix(file_path.suffix + ".tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        temp_path.replace(file_path)
+    except Exception:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
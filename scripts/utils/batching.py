@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Helpers for multi-question batched prompts.
+A batched prompt numbers its questions as items 1..N and asks for a JSON array
+with one object per item; the response is split per item and validated, so a
+partly bad response only costs individual retries for the failed items.
+"""
+
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+BATCH_ITEM_KEY = "item"
+
+
+def chunked(items: Sequence[Any], size: int) -> Iterator[List[Any]]:
+    """Yield consecutive chunks of at most size items."""
+    size = max(1, size)
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+
+def strip_code_fences(text: str) -> str:
+    """Remove a surrounding ```json ... ``` block from a model response."""
+    text = text.strip()
+    if text.startswith("```json"):
+        text = text[7:]
+    elif text.startswith("```"):
+        text = text[3:]
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def parse_json_array(text: str) -> List[Any]:
+    """
+    Parse a model response that should be a JSON array.
+
+    Raises:
+        ValueError: If the response is not a JSON array
+    """
+    try:
+        data = json.loads(strip_code_fences(text))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Batch response is not valid JSON: {e}") from e
+    if not isinstance(data, list):
+        raise ValueError(f"Batch response is a {type(data).__name__}, expected a JSON array")
+    return data
+
+
+def split_batch_response(
+    text: str,
+    count: int,
+    validate: Callable[[int, Dict[str, Any]], Optional[Any]],
+) -> Dict[int, Any]:
+    """
+    Split a batched response into validated per-item results.
+
+    Args:
+        text: Raw model response
+        count: Number of items in the batch (numbered 1..count)
+        validate: Called with (zero-based position, item object); returns the
+            cleaned result, or None if the object is unusable
+
+    Returns:
+        Dictionary mapping zero-based position to result. Items that are
+        missing, duplicated, out of range or invalid are left out.
+    """
+    try:
+        objects = parse_json_array(text)
+    except ValueError:
+        return {}
+    return split_batch_items(objects, count, validate)
+
+
+def split_batch_items(
+    objects: List[Any],
+    count: int,
+    validate: Callable[[int, Dict[str, Any]], Optional[Any]],
+) -> Dict[int, Any]:
+    """Validated per-item results of an already parsed batch response (see split_batch_response)."""
+    results: Dict[int, Any] = {}
+    seen = set()
+    for obj in objects:
+        if not isinstance(obj, dict):
+            continue
+        try:
+            position = int(obj.get(BATCH_ITEM_KEY)) - 1
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= position < count or position in seen:
+            results.pop(position, None)  # Ambiguous: two answers for one item
+            seen.add(position)
+            continue
+        seen.add(position)
+        result = validate(position, {k: v for k, v in obj.items() if k != BATCH_ITEM_KEY})
+        if result is not None:
+            results[position] = result
+    return results
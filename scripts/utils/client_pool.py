@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Pool of model clients, one per API key, behind the model client interface.
+
+Each key has its own RateLimiter (its project's quota) and health state. A
+request goes to the usable key with the most headroom. A key that is rate
+limited cools down and the request moves on to another key at once; a key
+that fails authentication or has used up its quota is evicted for the rest
+of the run. Other errors reach the caller's retry controller unchanged, as
+does a rate limit when no other key is free:
+
+    pool = create_gemini_client(genai, MODEL_NAME, load_api_keys(), rpm=1000, tpm=1_000_000)
+    response = pool.generate_content(prompt, **kwargs)    # or wrap it in CachedModel
+    print(pool.summary())
+
+Keys come from GOOGLE_API_KEYS (comma-separated), or the single
+GOOGLE_API_KEY / API_KEY. Errors of streamed responses are raised while
+iterating, after the pool has returned, so they count against no key.
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .rate_limit import RateLimiter, estimate_tokens
+from .retry import RATE_LIMIT, classify_error, get_retry_after, get_status_code
+
+KEYS_ENV = "GOOGLE_API_KEYS"
+SINGLE_KEY_ENVS = ("GOOGLE_API_KEY", "API_KEY")
+
+DEFAULT_COOLDOWN = 30.0  # Seconds a rate-limited key rests when the error has no retry hint
+DEFAULT_QUOTA_STRIKES = 5  # Consecutive rate limits after which a key counts as out of quota
+
+AUTH_STATUS_CODES = {401, 403}
+AUTH_MARKERS = ("api key not valid", "api_key_invalid", "permission_denied", "permission denied", "unauthenticated")
+QUOTA_EXHAUSTED_MARKERS = ("perday", "per day", "billing")
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when every key of the pool has been evicted."""
+
+
+def load_api_keys() -> List[str]:
+    """API keys from GOOGLE_API_KEYS, or the single GOOGLE_API_KEY / API_KEY (duplicates removed)."""
+    keys = [key.strip() for key in os.getenv(KEYS_ENV, "").split(",") if key.strip()]
+    if not keys:
+        for name in SINGLE_KEY_ENVS:
+            if os.getenv(name):
+                keys = [os.getenv(name).strip()]
+                break
+    return list(dict.fromkeys(keys))
+
+
+def key_label(position: int, key: str) -> str:
+    """Printable name of a key that does not reveal it ("key2 (...x7Qa)")."""
+    return f"key{position} (...{key[-4:]})"
+
+
+def is_auth_error(error: BaseException) -> bool:
+    """Whether an API error means the key itself is rejected."""
+    text = str(error).lower()
+    return get_status_code(error) in AUTH_STATUS_CODES or any(marker in text for marker in AUTH_MARKERS)
+
+
+def is_quota_exhausted(error: BaseException) -> bool:
+    """Whether a rate-limit error reports a spent daily or billing quota rather than a per-minute limit."""
+    text = str(error).lower()
+    return any(marker in text for marker in QUOTA_EXHAUSTED_MARKERS)
+
+
+class PooledClient:
+    """
+    One key's model client, rate limiter, health and usage counts.
+
+    Args:
+        name: Printable key name (see key_label)
+        model: Model client using this key
+        limiter: The key's requests/tokens per minute limiter
+    """
+
+    def __init__(self, name: str, model, limiter: RateLimiter):
+        self.name = name
+        self.model = model
+        self.limiter = limiter
+        self.evicted: Optional[str] = None  # Reason, once evicted
+        self.cooldown_until = 0.0
+        self.strikes = 0  # Consecutive rate limits
+        self.in_flight = 0
+        self.stats: Counter = Counter()
+
+    def status(self, now: float) -> str:
+        if self.evicted is not None:
+            return f"evicted ({self.evicted})"
+        if now < self.cooldown_until:
+            return f"cooling down {self.cooldown_until - now:.0f}s"
+        return "ok"
+
+
+class ClientPool:
+    """
+    Model client spreading requests over several keys (see the module docstring).
+
+    Args:
+        clients: One PooledClient per key
+        cooldown: Seconds a rate-limited key rests when the error has no retry hint
+        quota_strikes: Consecutive rate limits that evict a key as out of quota
+        output_tokens: Response tokens reserved per request in the tokens/min limiters
+        verbose: Print evictions
+    """
+
+    def __init__(
+        self,
+        clients: List[PooledClient],
+        cooldown: float = DEFAULT_COOLDOWN,
+        quota_strikes: int = DEFAULT_QUOTA_STRIKES,
+        output_tokens: int = 0,
+        verbose: bool = True,
+    ):
+        if not clients:
+            raise ValueError("A client pool needs at least one key")
+        self.clients = clients
+        self.cooldown = cooldown
+        self.quota_strikes = max(1, quota_strikes)
+        self.output_tokens = output_tokens
+        self.verbose = verbose
+        self.waited = 0.0  # Seconds requests spent waiting for a key to cool down
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_models(
+        cls,
+        models: Dict[str, Any],
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        **kwargs,
+    ) -> "ClientPool":
+        """
+        Pool over ready-made clients (e.g. MockGeminiModel instances).
+
+        Args:
+            models: Model client by key name
+            rpm: Requests per minute allowed per key (None = no limit)
+            tpm: Tokens per minute allowed per key (None = no limit)
+        """
+        return cls([PooledClient(name, model, RateLimiter(rpm, tpm)) for name, model in models.items()], **kwargs)
+
+    @classmethod
+    def from_keys(
+        cls,
+        keys: List[str],
+        build_model: Callable[[str], Any],
+        rpm: Optional[float] = None,
+        tpm: Optional[float] = None,
+        **kwargs,
+    ) -> "ClientPool":
+        """Pool with one build_model(key) client per API key (see from_models)."""
+        models = {key_label(position, key): build_model(key) for position, key in enumerate(keys, 1)}
+        return cls.from_models(models, rpm, tpm, **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.clients)
+
+    @property
+    def active(self) -> int:
+        """Keys that have not been evicted."""
+        return sum(1 for client in self.clients if client.evicted is None)
+
+    def _pick(self, tokens: int, tried: Set[int]) -> Tuple[Optional[PooledClient], float]:
+        """
+        Reserve the usable key with the most headroom.
+
+        Returns:
+            (client, 0), or (None, seconds until a key cools down) if none is usable now
+        """
+        with self._lock:
+            live = [client for client in self.clients if client.evicted is None]
+            if not live:
+                reasons = "; ".join(f"{client.name}: {client.evicted}" for client in self.clients)
+                raise PoolExhaustedError(f"All API keys were evicted ({reasons})")
+            now = time.monotonic()
+            candidates = [client for client in live if id(client) not in tried]
+            ready = [client for client in candidates if now >= client.cooldown_until]
+            if not ready:
+                resting = candidates or live
+                return None, max(0.0, min(client.cooldown_until for client in resting) - now)
+            client = min(
+                ready,
+                key=lambda client: (
+                    client.limiter.wait_time(tokens),
+                    -client.limiter.headroom(),
+                    client.in_flight,
+                    client.stats["requests"],
+                ),
+            )
+            client.in_flight += 1
+            client.stats["requests"] += 1
+            return client, 0.0
+
+    def _release(self, client: PooledClient):
+        with self._lock:
+            client.in_flight -= 1
+
+    def _evict(self, client: PooledClient, reason: str):
+        client.evicted = reason
+        if self.verbose:
+            print(f"\n🔑 {client.name} evicted ({reason}); {self.active} key(s) left")
+
+    def _succeeded(self, client: PooledClient, tokens: int):
+        with self._lock:
+            client.strikes = 0
+            client.stats["ok"] += 1
+            client.stats["tokens"] += tokens
+
+    def _failed(self, client: PooledClient, error: BaseException) -> bool:
+        """
+        Record a failed request.
+
+        Returns:
+            True if the error belongs to the key (the request should move to
+            another key), False if any key would have failed the same way
+        """
+        with self._lock:
+            client.stats["errors"] += 1
+            if is_auth_error(error):
+                self._evict(client, f"rejected: {str(error)[:60]}")
+                return True
+            if classify_error(error) != RATE_LIMIT:
+                return False
+            client.stats["rate_limited"] += 1
+            client.strikes += 1
+            if is_quota_exhausted(error) or client.strikes >= self.quota_strikes:
+                self._evict(client, "quota exhausted")
+            else:
+                retry_after = get_retry_after(error)
+                client.cooldown_until = time.monotonic() + (retry_after if retry_after is not None else self.cooldown)
+            return True
+
+    def generate_content(self, prompt: str, **kwargs):
+        tokens = estimate_tokens(prompt) + self.output_tokens
+        tried: Set[int] = set()
+        last_error: Optional[BaseException] = None
+        while True:
+            client, wait = self._pick(tokens, tried)
+            if client is None:
+                if last_error is not None:
+                    raise last_error  # Every key is resting: the retry controller backs off
+                self.waited += wait
+                time.sleep(wait)
+                continue
+            try:
+                client.limiter.acquire(tokens)
+                response = client.model.generate_content(prompt, **kwargs)
+            except Exception as e:
+                if not self._failed(client, e):
+                    raise
+                tried.add(id(client))
+                last_error = e
+                continue
+            finally:
+                self._release(client)
+            self._succeeded(client, tokens)
+            return response
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        tokens = estimate_tokens(prompt) + self.output_tokens
+        tried: Set[int] = set()
+        last_error: Optional[BaseException] = None
+        while True:
+            client, wait = self._pick(tokens, tried)
+            if client is None:
+                if last_error is not None:
+                    raise last_error
+                self.waited += wait
+                await asyncio.sleep(wait)
+                continue
+            try:
+                await client.limiter.acquire_async(tokens)
+                response = await client.model.generate_content_async(prompt, **kwargs)
+            except Exception as e:
+                if not self._failed(client, e):
+                    raise
+                tried.add(id(client))
+                last_error = e
+                continue
+            finally:
+                self._release(client)
+            self._succeeded(client, tokens)
+            return response
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Usage and health of each key."""
+        now = time.monotonic()
+        return [
+            {
+                "key": client.name,
+                "status": client.status(now),
+                "requests": client.stats["requests"],
+                "ok": client.stats["ok"],
+                "rate_limited": client.stats["rate_limited"],
+                "errors": client.stats["errors"],
+                "tokens": client.stats["tokens"],
+                "limiter_wait_s": round(client.limiter.waited, 1),
+            }
+            for client in self.clients
+        ]
+
+    def summary(self) -> str:
+        return "; ".join(
+            f"{entry['key']}: {entry['requests']} request(s), {entry['rate_limited']} rate limited, {entry['status']}"
+            for entry in self.stats()
+        )
+
+
+def gemini_client_factory(genai, model_name: str) -> Callable[[str], Any]:
+    """
+    Builder of GenerativeModel clients bound to one API key each.
+
+    genai.configure() sets a single process-wide key, so each model gets its
+    own API clients created with its key instead.
+    """
+    from google.ai import generativelanguage as glm  # type: ignore  # Installed with google-generativeai
+
+    def build(api_key: str):
+        model = genai.GenerativeModel(model_name)
+        model._client = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        model._async_client = glm.GenerativeServiceAsyncClient(client_options={"api_key": api_key})
+        return model
+
+    return build
+
+
+def create_gemini_client(
+    genai,
+    model_name: str,
+    keys: List[str],
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+    output_tokens: int = 0,
+):
+    """
+    Gemini client for the configured keys.
+
+    Returns:
+        A GenerativeModel for a single key (or none, when only cached
+        responses are replayed), or a ClientPool for several keys with
+        rpm/tpm as each key's limits
+    """
+    if len(keys) <= 1:
+        if keys:
+            genai.configure(api_key=keys[0])
+        return genai.GenerativeModel(model_name)
+    return ClientPool.from_keys(
+        keys, gemini_client_factory(genai, model_name), rpm, tpm, output_tokens=output_tokens
+    )
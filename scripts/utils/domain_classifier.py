@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Offline SAA-C03 domain classifier.
+
+The hashed word unigrams and bigrams of a question's text and options feed
+a multinomial naive Bayes model trained on the labelled questions/ corpus
+(train_domain_classifier.py). The model is a small .npz file of per-domain
+feature counts, a calibration temperature and a confidence threshold, so it
+loads in milliseconds and needs only numpy:
+
+    classifier = load_default_classifier()
+    if classifier is not None:
+        domain, confidence = classifier.predict(question_document(question))
+
+or confident_domain(question), which is None unless the prediction clears the
+model's min_confidence. Temperature and threshold are both fitted on held-out
+(cross-validated) predictions, and the model keeps those predictions for the
+questions it was trained on: scoring a training question with the model itself
+would just repeat its label. Requires numpy; callers fall back to their keyword
+rules when it (or the model file) is missing, or when the model is unsure.
+"""
+
+import math
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None  # type: ignore
+
+from .question_utils import get_question_fingerprint
+from .similarity import question_document, require_numpy, tokenize
+
+MODEL_FILE = Path(__file__).parent.parent / "models" / "domain_classifier.npz"
+N_FEATURES = 2 ** 15  # Hash buckets for unigrams and bigrams
+SMOOTHING = 1.0  # Additive smoothing of the per-domain feature counts
+
+DOMAINS = [
+    "Design Secure Architectures",
+    "Design Resilient Architectures",
+    "Design High-Performing Architectures",
+    "Design Cost-Optimized Architectures",
+]
+
+_default_classifier = None
+_default_load_failed = False
+
+
+def hashed_features(text: str, n_features: int = N_FEATURES) -> "np.ndarray":
+    """
+    Hash buckets of the word unigrams and bigrams present in a text.
+
+    Each n-gram counts once per text (repeated service names would otherwise
+    dominate). crc32 is used rather than hash() so buckets are identical
+    across processes.
+    """
+    require_numpy()
+    tokens = tokenize(text)
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    buckets = {zlib.crc32(gram.encode("utf-8")) % n_features for gram in grams}
+    return np.fromiter(buckets, dtype=np.int64, count=len(buckets))
+
+
+class DomainClassifier:
+    """
+    Multinomial naive Bayes over hashed n-gram presence.
+
+    Naive Bayes posteriors are overconfident, so log-likelihoods are divided
+    by a temperature fitted on held-out predictions (fit_temperature) before
+    they are turned into confidences.
+
+    Args:
+        feature_counts: (domains, n_features) questions containing each feature, per domain
+        class_counts: Training questions per domain
+        domains: Domain names, in row order
+        smoothing: Additive smoothing of the feature counts
+        temperature: Divisor of the log-likelihoods (1 = uncalibrated)
+        min_confidence: Lowest confidence whose held-out predictions were
+            accurate enough to trust (infinite = never trust the model)
+        held_out: Held-out (domain, confidence) of each training question, by
+            question fingerprint
+    """
+
+    def __init__(
+        self,
+        feature_counts,
+        class_counts,
+        domains: Sequence[str] = DOMAINS,
+        smoothing: float = SMOOTHING,
+        temperature: float = 1.0,
+        min_confidence: float = math.inf,
+        held_out: Optional[Dict[str, Tuple[str, float]]] = None,
+    ):
+        require_numpy()
+        self.feature_counts = np.asarray(feature_counts, dtype=np.float64)
+        self.class_counts = np.asarray(class_counts, dtype=np.float64)
+        self.domains = list(domains)
+        self.smoothing = smoothing
+        self.temperature = temperature
+        self.min_confidence = min_confidence
+        self.held_out = held_out or {}
+        self.n_features = self.feature_counts.shape[1]
+        smoothed = self.feature_counts + smoothing
+        self.feature_log_prob = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        self.class_log_prior = np.log((self.class_counts + 1) / (self.class_counts.sum() + len(self.domains)))
+
+    @classmethod
+    def fit(cls, texts: Sequence[str], labels: Sequence[str], smoothing: float = SMOOTHING,
+            n_features: int = N_FEATURES) -> "DomainClassifier":
+        """
+        Train on labelled texts.
+
+        Raises:
+            ValueError: If a label is not one of DOMAINS
+        """
+        require_numpy()
+        unknown = sorted(set(labels) - set(DOMAINS))
+        if unknown:
+            raise ValueError(f"Unknown domain label(s): {', '.join(unknown)}")
+        feature_counts = np.zeros((len(DOMAINS), n_features), dtype=np.float64)
+        for text, label in zip(texts, labels):
+            feature_counts[DOMAINS.index(label), hashed_features(text, n_features)] += 1
+        class_counts = np.asarray([list(labels).count(domain) for domain in DOMAINS])
+        return cls(feature_counts, class_counts, DOMAINS, smoothing)
+
+    def log_likelihoods(self, texts: Sequence[str]) -> "np.ndarray":
+        """(texts, domains) unnormalized log posteriors, before calibration."""
+        scores = np.empty((len(texts), len(self.domains)), dtype=np.float64)
+        for row, text in enumerate(texts):
+            buckets = hashed_features(text, self.n_features)
+            scores[row] = self.feature_log_prob[:, buckets].sum(axis=1) + self.class_log_prior
+        return scores
+
+    def predict_proba(self, texts: Sequence[str]) -> "np.ndarray":
+        """(texts, domains) calibrated posterior probabilities."""
+        return softmax(self.log_likelihoods(texts), self.temperature)
+
+    def predict_many(self, texts: Sequence[str]) -> List[Tuple[str, float]]:
+        """(domain, confidence) for each text; confidence is the top posterior probability."""
+        if not texts:
+            return []
+        probabilities = self.predict_proba(texts)
+        best = probabilities.argmax(axis=1)
+        return [(self.domains[i], float(probabilities[row, i])) for row, i in enumerate(best)]
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """(domain, confidence) for one text."""
+        return self.predict_many([text])[0]
+
+    def predict_question(self, question: dict) -> Tuple[str, float]:
+        """(domain, confidence) for a question dictionary (text and options)."""
+        return self.predict_questions([question])[0]
+
+    def predict_questions(self, questions: Sequence[dict]) -> List[Tuple[str, float]]:
+        """
+        (domain, confidence) for question dictionaries. Questions the model was
+        trained on get their held-out prediction instead of an in-sample one.
+        """
+        fingerprints = [get_question_fingerprint(question) for question in questions]
+        unseen = [row for row, fingerprint in enumerate(fingerprints) if fingerprint not in self.held_out]
+        live = self.predict_many([question_document(questions[row]) for row in unseen])
+        predictions = [self.held_out.get(fingerprint) for fingerprint in fingerprints]
+        for row, prediction in zip(unseen, live):
+            predictions[row] = prediction
+        return predictions
+
+    def save(self, path: Path = MODEL_FILE):
+        """Write the model as a compressed .npz (feature counts are mostly zero)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(
+            path,
+            feature_counts=self.feature_counts.astype(np.uint16),
+            class_counts=self.class_counts.astype(np.int64),
+            domains=np.asarray(self.domains),
+            smoothing=np.asarray(self.smoothing),
+            temperature=np.asarray(self.temperature),
+            min_confidence=np.asarray(self.min_confidence),
+            held_out_fingerprints=np.asarray(list(self.held_out), dtype=str),
+            held_out_domains=np.asarray(
+                [self.domains.index(domain) for domain, _ in self.held_out.values()], dtype=np.int8
+            ),
+            held_out_confidence=np.asarray(
+                [confidence for _, confidence in self.held_out.values()], dtype=np.float32
+            ),
+        )
+
+    @classmethod
+    def load(cls, path: Path = MODEL_FILE) -> "DomainClassifier":
+        """
+        Load a model written by save().
+
+        Raises:
+            OSError: If the file cannot be read
+        """
+        require_numpy()
+        with np.load(Path(path)) as data:
+            domains = [str(domain) for domain in data["domains"]]
+            held_out = {}
+            # Models saved before threshold calibration have neither field and are never trusted
+            if "held_out_fingerprints" in data:
+                held_out = {
+                    str(fingerprint): (domains[int(domain)], float(confidence))
+                    for fingerprint, domain, confidence in zip(
+                        data["held_out_fingerprints"], data["held_out_domains"], data["held_out_confidence"]
+                    )
+                }
+            return cls(
+                data["feature_counts"],
+                data["class_counts"],
+                domains,
+                float(data["smoothing"]),
+                float(data["temperature"]),
+                float(data["min_confidence"]) if "min_confidence" in data else math.inf,
+                held_out,
+            )
+
+
+def softmax(scores: "np.ndarray", temperature: float = 1.0) -> "np.ndarray":
+    """Row-wise softmax of scores / temperature."""
+    scaled = scores / temperature
+    scaled = scaled - scaled.max(axis=1, keepdims=True)
+    probabilities = np.exp(scaled)
+    return probabilities / probabilities.sum(axis=1, keepdims=True)
+
+
+def fit_temperature(scores: "np.ndarray", labels: Sequence[int]) -> float:
+    """
+    Temperature minimizing the negative log-likelihood of held-out predictions.
+
+    Args:
+        scores: (questions, domains) log_likelihoods() of questions the model was not trained on
+        labels: True domain index of each question
+
+    Returns:
+        The best temperature on a log-spaced grid from 1 to 1000
+    """
+    require_numpy()
+    labels = np.asarray(labels, dtype=np.int64)
+    rows = np.arange(len(labels))
+    best, best_loss = 1.0, math.inf
+    for temperature in np.logspace(0, 3, 61):
+        probabilities = softmax(scores, temperature)
+        loss = -np.log(np.maximum(probabilities[rows, labels], 1e-12)).mean()
+        if loss < best_loss:
+            best, best_loss = float(temperature), loss
+    return best
+
+
+def load_default_classifier() -> Optional[DomainClassifier]:
+    """
+    The trained model at MODEL_FILE, loaded once per process; None if numpy
+    is not installed or the model has not been trained yet.
+    """
+    global _default_classifier, _default_load_failed
+    if _default_classifier is None and not _default_load_failed:
+        if np is None or not MODEL_FILE.exists():
+            _default_load_failed = True
+            return None
+        try:
+            _default_classifier = DomainClassifier.load(MODEL_FILE)
+        except (OSError, KeyError, ValueError) as e:
+            print(f"⚠️  Warning: Could not load {MODEL_FILE.name}: {e}")
+            _default_load_failed = True
+    return _default_classifier
+
+
+def confident_domain(question: dict, min_confidence: Optional[float] = None) -> Optional[str]:
+    """
+    Domain of a question (text and options) from the default classifier, or
+    None if there is no model or its confidence is below min_confidence
+    (default: the model's calibrated threshold).
+    """
+    classifier = load_default_classifier()
+    if classifier is None:
+        return None
+    if min_confidence is None:
+        min_confidence = classifier.min_confidence
+    domain, confidence = classifier.predict_question(question)
+    return domain if confidence >= min_confidence else None
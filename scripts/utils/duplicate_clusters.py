@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Duplicate clustering utilities.
+Groups exact and near-duplicate questions into connected components with a
+union-find, picks a canonical member per cluster and streams cluster reports
+to NDJSON.
+"""
+
+import json
+from collections import Counter
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .question_utils import get_question_fingerprint, get_test_number
+
+
+class UnionFind:
+    """Disjoint-set forest over integer indices (path halving, union by size)."""
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> int:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return root_a
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        return root_a
+
+
+def find_near_duplicate_pairs(texts: Sequence[str], threshold: float = 0.95) -> List[Tuple[int, int, float]]:
+    """
+    Find pairs of texts whose SequenceMatcher ratio is >= threshold but < 1.0.
+    Candidates are limited to a sliding window over texts sorted by length
+    (ratio <= 2*min/(len_a+len_b)) and pruned with a character-count upper
+    bound (the same bound as quick_ratio(), from precomputed counts) before the
+    full ratio() is computed.
+
+    Args:
+        texts: Normalized texts (empty strings are ignored)
+        threshold: Minimum similarity ratio
+
+    Returns:
+        List of (i, j, similarity) with i < j
+    """
+    order = sorted((i for i, text in enumerate(texts) if text), key=lambda i: len(texts[i]))
+    max_len_ratio = (2 - threshold) / threshold if threshold > 0 else float("inf")
+    char_counts = {i: Counter(texts[i]) for i in order}
+    pairs = []
+
+    for pos, i in enumerate(order):
+        text_i = texts[i]
+        counts_i = char_counts[i]
+        max_len = len(text_i) * max_len_ratio
+        for j in order[pos + 1:]:
+            text_j = texts[j]
+            if len(text_j) > max_len:
+                break
+            if text_i == text_j:
+                continue
+            counts_j = char_counts[j]
+            matches = sum(min(count, counts_j[char]) for char, count in counts_i.items())
+            if 2.0 * matches / (len(text_i) + len(text_j)) < threshold:
+                continue
+            a, b = (i, j) if i < j else (j, i)
+            sim = SequenceMatcher(None, texts[a], texts[b]).ratio()
+            if threshold <= sim < 1.0:
+                pairs.append((a, b, sim))
+
+    pairs.sort()
+    return pairs
+
+
+def cluster_duplicates(
+    keys: Sequence[str],
+    test_names: Sequence[str],
+    near_pairs: Optional[Iterable[Tuple[int, int, float]]] = None,
+) -> Iterator[List[int]]:
+    """
+    Group records into duplicate clusters (connected components).
+
+    Records sharing a non-empty key are exact duplicates; near_pairs add
+    edges between records that are similar but not identical.
+
+    Args:
+        keys: Exact-match key per record (e.g. normalized question text)
+        test_names: Test name per record, used to pick the canonical member
+        near_pairs: Optional (i, j, similarity) edges
+
+    Yields:
+        Member index lists with at least two members. The first member is
+        the canonical one (lowest test number, then first occurrence).
+    """
+    uf = UnionFind(len(keys))
+
+    first_by_key: Dict[str, int] = {}
+    for idx, key in enumerate(keys):
+        if not key:
+            continue
+        first = first_by_key.setdefault(key, idx)
+        if first != idx:
+            uf.union(first, idx)
+    del first_by_key
+
+    if near_pairs:
+        for i, j, _ in near_pairs:
+            uf.union(i, j)
+
+    members_by_root: Dict[int, List[int]] = {}
+    for idx in range(len(keys)):
+        if uf.size[uf.find(idx)] > 1:
+            members_by_root.setdefault(uf.find(idx), []).append(idx)
+
+    for members in members_by_root.values():
+        members.sort(key=lambda idx: (get_test_number(test_names[idx]), idx))
+        yield members
+
+
+def build_cluster_report(
+    cluster_id: int,
+    members: List[int],
+    records: Sequence[Tuple[str, int, Dict]],
+    keys: Sequence[str],
+) -> Dict:
+    """
+    Build a JSON-serializable report for one cluster.
+
+    Args:
+        cluster_id: Sequential cluster number
+        members: Member indices from cluster_duplicates() (canonical first)
+        records: (test_name, question_id, question) per index
+        keys: Exact-match key per index
+
+    Returns:
+        Cluster report dictionary
+    """
+    canonical = members[0]
+    canonical_key = keys[canonical]
+
+    def describe(idx: int) -> Dict:
+        test_name, q_id, question = records[idx]
+        return {
+            "test": test_name,
+            "id": q_id,
+            "fingerprint": get_question_fingerprint(question),
+            "match": "exact" if keys[idx] == canonical_key else "near",
+        }
+
+    return {
+        "cluster_id": cluster_id,
+        "size": len(members),
+        "canonical": describe(canonical),
+        "duplicates": [describe(idx) for idx in members[1:]],
+        "text": canonical_key[:200],
+    }
+
+
+class NDJSONWriter:
+    """
+    Stream JSON records to a file, one record per line.
+    Use as a context manager; records are written as soon as they are produced.
+    """
+
+    def __init__(self, output_path: Path):
+        self.output_path = Path(output_path)
+        self.count = 0
+        self._file = None
+
+    def __enter__(self) -> "NDJSONWriter":
+        self._file = open(self.output_path, 'w', encoding='utf-8')
+        return self
+
+    def write(self, record: Dict):
+        self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write("\n")
+        self.count += 1
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        self._file = None
+        return False
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Per-question record of which enrichment stages are up to date.
+
+Records are keyed by question content fingerprint, so they follow a question
+across ID changes, renumbered tests and duplicate copies in other tests. For
+each stage a record holds a digest of the stage's input and the output it
+left in the question (or a digest of it). Stages that record the output
+itself also note, per copy, the value the stage last left in that copy, so a
+copy edited since can be told apart from one the stage has not reached yet:
+
+    {"version": 1, "questions": {"<fingerprint>": {"domain": {"input": "...", "output": "...",
+                                                              "copies": {"test2-q4": "..."}}}}}
+"""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .analysis_log import write_json_atomic
+
+STATE_VERSION = 1
+
+
+def stable_digest(value: Any) -> str:
+    """
+    Short digest of a JSON-serializable value, independent of dict key order.
+
+    Args:
+        value: Value to digest
+
+    Returns:
+        16-character hex digest
+    """
+    text = json.dumps(value, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class EnrichmentState:
+    """
+    Stage records loaded from and saved to one JSON file.
+
+    Args:
+        path: State file (created on the first save)
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.records: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.dirty = False
+
+    def load(self) -> "EnrichmentState":
+        """Load records from the state file; a missing or unreadable file starts empty."""
+        if not self.path.exists():
+            return self
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"⚠️  Warning: Could not load {self.path.name}, starting fresh: {e}")
+            return self
+        if not isinstance(data, dict) or data.get("version") != STATE_VERSION:
+            print(f"⚠️  Warning: {self.path.name} has an unknown format, starting fresh")
+            return self
+        self.records = data.get("questions", {})
+        return self
+
+    def get(self, fingerprint: str, stage: str) -> Optional[Dict[str, Any]]:
+        """Record of a stage for a question, or None if the stage never ran for it."""
+        return self.records.get(fingerprint, {}).get(stage)
+
+    def set(
+        self,
+        fingerprint: str,
+        stage: str,
+        input_digest: str,
+        output: Any,
+        copies: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Record that a stage ran for a question with this input and left this output.
+
+        Args:
+            copies: Value last left in each copy of the question, by question key
+        """
+        record = {"input": input_digest, "output": output}
+        if copies:
+            record["copies"] = copies
+        if self.records.get(fingerprint, {}).get(stage) != record:
+            self.records.setdefault(fingerprint, {})[stage] = record
+            self.dirty = True
+
+    def save(self):
+        """Write the state file atomically if any record changed since the last save."""
+        if not self.dirty:
+            return
+        write_json_atomic({"version": STATE_VERSION, "questions": self.records}, self.path)
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self.records)
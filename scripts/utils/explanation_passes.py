@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Registry of named, precompiled explanation normalization passes.
+
+Every pass is one regex substitution compiled once at import. normalize()
+runs a pass set over an explanation in a single traversal: it splits the
+explanation into its "**Why option N is correct/incorrect:**" sections once,
+runs the section passes on each section body (where ^ is the start of the
+body), reassembles it and runs the text passes on the whole. Substitutions
+are counted per pass:
+
+    text, hits = normalize(question["explanation"])
+    text = apply_passes(gemini_text, OPTION_INTRO_PASSES)  # one section body
+
+pass_set_signature() identifies a pass set, so a question already normalized
+by the current passes can be skipped (see normalize_explanations.py).
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .enrichment_state import stable_digest
+
+SECTION = "section"  # Applied to each option section body on its own
+TEXT = "text"  # Applied to the whole explanation
+SCOPES = (SECTION, TEXT)
+
+# Option section headers, kept verbatim when an explanation is split
+SECTION_HEADER = re.compile(r"^\*\*Why option \d+ is (?:correct|incorrect):\*\*[ \t]*\n?", re.MULTILINE)
+
+
+class Pass:
+    """
+    One named substitution.
+
+    Args:
+        name: Registry name (used by --passes and in hit counters)
+        pattern: Regular expression
+        replacement: Replacement string (backreferences allowed)
+        scope: SECTION (each option section body) or TEXT (whole explanation)
+        flags: re flags for compiling pattern
+        description: What the pass fixes
+    """
+
+    def __init__(self, name: str, pattern: str, replacement: str, scope: str = TEXT, flags: int = 0,
+                 description: str = ""):
+        if scope not in SCOPES:
+            raise ValueError(f"Unknown pass scope '{scope}' (choose from {', '.join(SCOPES)})")
+        self.name = name
+        self.pattern = pattern
+        self.regex = re.compile(pattern, flags)
+        self.replacement = replacement
+        self.scope = scope
+        self.flags = flags
+        self.description = description
+
+    def apply(self, text: str) -> Tuple[str, int]:
+        """(new text, substitutions made)"""
+        return self.regex.subn(self.replacement, text)
+
+    def signature(self) -> List:
+        return [self.name, self.pattern, self.replacement, self.scope, self.flags]
+
+
+PASSES: Dict[str, Pass] = {}
+
+
+def register_pass(*args, **kwargs) -> Pass:
+    """Create a Pass and add it to the registry (names are unique)."""
+    new_pass = Pass(*args, **kwargs)
+    if new_pass.name in PASSES:
+        raise ValueError(f"Pass '{new_pass.name}' is already registered")
+    PASSES[new_pass.name] = new_pass
+    return new_pass
+
+
+# "Option X ..." intros at the start of a per-option explanation; order matters
+# ("states that" before the generic option reference)
+OPTION_INTRO_PASSES = [
+    register_pass(
+        "option_intro_correct",
+        r"^Option\s+\d+\s+is\s+correct\s+because\s+", "This is correct because ", SECTION, re.IGNORECASE,
+        'Option X is correct because -> This is correct because',
+    ),
+    register_pass(
+        "option_intro_multiple",
+        r"^Options\s+[\d\s,and]+\s+are\s+correct\s+because\s+", "These are correct because ", SECTION,
+        re.IGNORECASE, 'Options X and Y are correct because -> These are correct because',
+    ),
+    register_pass(
+        "option_intro_correct_answer",
+        r"^Option\s+\d+[^.]*?is\s+the\s+correct\s+answer\s+because\s+", "This is the correct answer because ",
+        SECTION, re.IGNORECASE, "Option X, '...', is the correct answer because -> This is the correct answer because",
+    ),
+    register_pass(
+        "option_intro_best",
+        r"^Option\s+\d+[^.]*?is\s+the\s+best\s+(?:solution|choice)\s+because\s+", "This is the best solution because ",
+        SECTION, re.IGNORECASE, 'Option X is the best solution because -> This is the best solution because',
+    ),
+    register_pass(
+        "option_intro_states",
+        r"^Option\s+\d+\s+states?\s+that\s+", "This states that ", SECTION, re.IGNORECASE,
+        'Option X states that -> This states that',
+    ),
+    register_pass(
+        "option_intro_reference",
+        r"^Option\s+\d+[,\s(]+", "", SECTION, re.IGNORECASE,
+        'Option X, using... -> Using... (option reference at the start removed)',
+    ),
+]
+
+# Whole-explanation cleanup (from the archived cleanup scripts)
+TEXT_PASSES = [
+    register_pass(
+        "other_options_marker",
+        r"^[ \t]*\*\*Why other options are incorrect:\*\*[ \t]*(?:\n|$)", "", TEXT, re.MULTILINE,
+        'Leftover "**Why other options are incorrect:**" lines',
+    ),
+    register_pass(
+        "trailing_whitespace",
+        r"[ \t]+$", "", TEXT, re.MULTILINE,
+        "Spaces and tabs at the end of lines",
+    ),
+    register_pass(
+        "blank_lines",
+        r"\n{3,}", "\n\n", TEXT, 0,
+        "Runs of blank lines collapsed to one",
+    ),
+    register_pass(
+        "outer_whitespace",
+        r"^\s+|\s+$", "", TEXT, 0,
+        "Whitespace before or after the explanation",
+    ),
+]
+
+DEFAULT_PASSES = OPTION_INTRO_PASSES + TEXT_PASSES
+
+
+def select_passes(names: Optional[Iterable[str]] = None) -> List[Pass]:
+    """
+    Passes by name, in registry order; all registered passes if names is None.
+
+    Raises:
+        ValueError: If a name is not registered
+    """
+    if names is None:
+        return list(PASSES.values())
+    names = set(names)
+    unknown = sorted(names - set(PASSES))
+    if unknown:
+        raise ValueError(f"Unknown pass(es): {', '.join(unknown)} (choose from {', '.join(PASSES)})")
+    return [p for name, p in PASSES.items() if name in names]
+
+
+def pass_set_signature(passes: Sequence[Pass]) -> str:
+    """Digest identifying a pass set; changes whenever a pass is added, removed or edited."""
+    return stable_digest([p.signature() for p in passes])
+
+
+def apply_passes(text: str, passes: Sequence[Pass], hits: Optional[Counter] = None) -> str:
+    """Run passes in order over one piece of text, counting substitutions into hits."""
+    for p in passes:
+        text, count = p.apply(text)
+        if count and hits is not None:
+            hits[p.name] += count
+    return text
+
+
+def normalize(explanation: str, passes: Sequence[Pass] = DEFAULT_PASSES) -> Tuple[str, Counter]:
+    """
+    Normalize an explanation in one traversal.
+
+    Returns:
+        Tuple of (normalized explanation, substitutions per pass name)
+    """
+    hits: Counter = Counter()
+    if not explanation:
+        return explanation, hits
+    section_passes = [p for p in passes if p.scope == SECTION]
+    text_passes = [p for p in passes if p.scope == TEXT]
+
+    if section_passes:
+        parts = []
+        position = 0
+        for match in SECTION_HEADER.finditer(explanation):
+            parts.append(explanation[position:match.start()])
+            parts.append(match.group(0))
+            position = match.end()
+        parts.append(explanation[position:])
+        # parts alternates body, header, body, ...; the text before the first header is not a section
+        for index in range(2, len(parts), 2):
+            body = parts[index]
+            stripped = body.rstrip()
+            parts[index] = apply_passes(stripped, section_passes, hits) + body[len(stripped):]
+        explanation = "".join(parts)
+
+    return apply_passes(explanation, text_passes, hits), hits
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Pre-import duplicate gate for the extraction scripts.
+Checks freshly parsed questions against an index of the existing question bank
+(exact fingerprint plus SimHash near-duplicate sketch) before a test file is
+written, and keeps, skips or flags each duplicate according to a policy.
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from .question_utils import (
+    find_test_files,
+    get_question_fingerprint,
+    load_questions_file,
+    normalize_question_text,
+    normalize_text,
+)
+from .simhash import SimHashIndex, simhash64, text_features
+
+# keep: write the question and only report it
+# skip: drop the question
+# flag: write the question with a "duplicateOf" field pointing at the existing copy
+IMPORT_POLICIES = ("keep", "skip", "flag")
+
+
+def question_sketch_text(question: Dict) -> str:
+    """Text used for the near-duplicate sketch (question text plus option texts)."""
+    options = sorted(question.get("options", []), key=lambda x: x.get("id", 0))
+    return " ".join([normalize_question_text(question)] + [normalize_text(opt.get("text", "")) for opt in options])
+
+
+class ImportGate:
+    """
+    Index of existing questions with per-question O(1) duplicate lookups.
+
+    Exact duplicates are found by fingerprint (normalized text and options);
+    near duplicates by a 64-bit SimHash looked up in Hamming-distance bands.
+    """
+
+    def __init__(self, exact_policy: str = "skip", near_policy: str = "flag", max_distance: int = 3):
+        for policy in (exact_policy, near_policy):
+            if policy not in IMPORT_POLICIES:
+                raise ValueError(f"Unknown import policy '{policy}' (expected one of {', '.join(IMPORT_POLICIES)})")
+        self.exact_policy = exact_policy
+        self.near_policy = near_policy
+        self.by_fingerprint: Dict[str, str] = {}
+        self.sketches = SimHashIndex(max_distance)
+        self.feature_cache: Dict[str, int] = {}
+        self.decisions: List[Dict] = []
+        self.accepted = 0
+
+    @classmethod
+    def from_questions_dir(
+        cls,
+        questions_dir: Path,
+        exclude_tests: Iterable[str] = (),
+        **kwargs,
+    ) -> "ImportGate":
+        """
+        Build a gate indexing every existing test file.
+
+        Args:
+            questions_dir: Path to questions directory
+            exclude_tests: Test names (e.g. "test8") that are about to be
+                overwritten and must not count as existing copies
+            **kwargs: Passed to ImportGate()
+        """
+        gate = cls(**kwargs)
+        excluded = set(exclude_tests)
+        if questions_dir.exists():
+            for test_file in find_test_files(questions_dir):
+                if test_file.stem in excluded:
+                    continue
+                for question in load_questions_file(test_file) or []:
+                    if isinstance(question, dict):
+                        gate.add(f"{test_file.stem}-q{question.get('id')}", question)
+        return gate
+
+    def _sketch(self, question: Dict) -> int:
+        return simhash64(text_features(question_sketch_text(question)), self.feature_cache)
+
+    def add(self, location: str, question: Dict):
+        """Index a question under a location label such as "test4-q44"."""
+        self.by_fingerprint.setdefault(get_question_fingerprint(question), location)
+        self.sketches.add(location, self._sketch(question))
+
+    def check(self, question: Dict) -> Optional[Dict]:
+        """
+        Look up a question in the index.
+
+        Returns:
+            None if the question is new, otherwise a dict with "match"
+            ("exact" or "near"), "duplicate_of" and "distance"
+        """
+        location = self.by_fingerprint.get(get_question_fingerprint(question))
+        if location is not None:
+            return {"match": "exact", "duplicate_of": location, "distance": 0}
+
+        matches = self.sketches.query(self._sketch(question))
+        if matches:
+            location, distance = min(matches, key=lambda m: m[1])
+            return {"match": "near", "duplicate_of": location, "distance": distance}
+        return None
+
+    def filter(self, questions: List[Dict], test_key: str) -> List[Dict]:
+        """
+        Apply the import policy to parsed questions before they are written.
+        Accepted questions are added to the index, so duplicates within the
+        same import are caught too.
+
+        Args:
+            questions: Parsed questions for one test
+            test_key: Test the questions are being written to (e.g. "test8")
+
+        Returns:
+            Questions to write
+        """
+        accepted = []
+        for question in questions:
+            match = self.check(question)
+            if match is not None:
+                policy = self.exact_policy if match["match"] == "exact" else self.near_policy
+                self.decisions.append({
+                    "test": test_key,
+                    "id": question.get("id"),
+                    "action": {"keep": "kept", "skip": "skipped", "flag": "flagged"}[policy],
+                    **match,
+                    "text": normalize_question_text(question)[:120],
+                })
+                if policy == "skip":
+                    continue
+                if policy == "flag":
+                    question["duplicateOf"] = match["duplicate_of"]
+
+            self.add(f"{test_key}-q{question.get('id')}", question)
+            accepted.append(question)
+
+        self.accepted += len(accepted)
+        return accepted
+
+    def print_report(self):
+        """Print a summary of the gate's decisions."""
+        skipped = sum(1 for d in self.decisions if d["action"] == "skipped")
+        flagged = sum(1 for d in self.decisions if d["action"] == "flagged")
+        print(f"\n🚧 Import gate: {self.accepted} question(s) accepted, {skipped} skipped, {flagged} flagged as duplicates")
+        for decision in self.decisions[:20]:  # Show first 20
+            print(f"  {decision['action'].upper()}: {decision['test']} Q{decision['id']} "
+                  f"({decision['match']} duplicate of {decision['duplicate_of']}): {decision['text'][:60]}...")
+        if len(self.decisions) > 20:
+            print(f"  ... and {len(self.decisions) - 20} more")
+
+    def save_report(self, report_path: Path):
+        """Write every decision to a JSON import report."""
+        report = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "exact_policy": self.exact_policy,
+            "near_policy": self.near_policy,
+            "accepted": self.accepted,
+            "decisions": self.decisions,
+        }
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def parse_policy_args(
+    argv: Optional[List[str]] = None,
+    description: Optional[str] = None,
+    exact_default: str = "skip",
+    near_default: str = "flag",
+):
+    """
+    Parse an extraction script's command line: --dedup-policy POLICY (both
+    kinds), --dedup-exact POLICY and --dedup-near POLICY. The kind-specific
+    options win over --dedup-policy; an unknown policy exits with a usage error.
+
+    Args:
+        argv: Arguments to parse (default: sys.argv[1:])
+        description: Script description for --help
+
+    Returns:
+        Tuple of (exact_policy, near_policy)
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--dedup-policy", choices=IMPORT_POLICIES, help="Policy for exact and near duplicates of existing questions"
+    )
+    parser.add_argument(
+        "--dedup-exact", choices=IMPORT_POLICIES, help=f"Policy for exact duplicates (default: {exact_default})"
+    )
+    parser.add_argument(
+        "--dedup-near", choices=IMPORT_POLICIES, help=f"Policy for near duplicates (default: {near_default})"
+    )
+    args = parser.parse_args(argv)
+    exact_policy = args.dedup_exact or args.dedup_policy or exact_default
+    near_policy = args.dedup_near or args.dedup_policy or near_default
+    return exact_policy, near_policy
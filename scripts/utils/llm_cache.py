@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Content-addressed on-disk cache for LLM responses.
+Responses are keyed by a hash of the model name, prompt, generation config and
+safety settings, stored as one JSON file each, and evicted least recently used
+first once the cache grows past its size limit.
+
+Wrap a model with CachedModel to use the cache from any enrichment script:
+
+    model = CachedModel(genai.GenerativeModel(MODEL_NAME), MODEL_NAME, ResponseCache(cache_dir))
+    response = model.generate_content(prompt, generation_config=..., safety_settings=...)
+
+Streamed responses (stream=True) are cached once the stream has been read to
+the end. Callers that reject a response (e.g. malformed JSON) should call
+model.invalidate() so a retry does not replay it.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_DIR = ".llm_cache"
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+EVICT_TO_RATIO = 0.9  # Evict down to 90% of the limit so eviction does not run on every write
+
+
+class CacheMissError(LookupError):
+    """Raised in cache-only mode when a request is not cached."""
+
+
+def make_cache_key(
+    model_name: str,
+    prompt: str,
+    generation_config: Optional[Dict[str, Any]] = None,
+    safety_settings: Any = None,
+) -> str:
+    """
+    Hash everything that determines a response.
+    Safety setting enums are serialized by name, so keys are stable across runs.
+    """
+    payload = json.dumps(
+        {
+            "model": model_name,
+            "prompt": prompt,
+            "generation_config": generation_config,
+            "safety_settings": safety_settings,
+        },
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache of raw response texts on disk.
+    Each entry is <cache_dir>/<key[:2]>/<key>.json; reads refresh the file's
+    mtime, and eviction removes the oldest mtimes first.
+    """
+
+    def __init__(self, cache_dir: Path = Path(DEFAULT_CACHE_DIR), max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "invalidations": 0}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.total_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _entries(self):
+        """Yield (path, mtime, size) for every cached entry."""
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".json"):
+                    stat = entry.stat()
+                    yield Path(entry.path), stat.st_mtime, stat.st_size
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response text, or None."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                text = json.load(f)["text"]
+        except (OSError, ValueError, KeyError):
+            self.stats["misses"] += 1
+            return None
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        self.stats["hits"] += 1
+        return text
+
+    def contains(self, key: str) -> bool:
+        """Whether a response is cached, without counting a hit or marking it as used."""
+        return self._path(key).exists()
+
+    def put(self, key: str, text: str, metadata: Optional[Dict[str, Any]] = None):
+        """Store a response text (atomically) and evict old entries if over the limit."""
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        record = {"key": key, "created": time.strftime("%Y-%m-%d %H:%M:%S"), "text": text}
+        if metadata:
+            record.update(metadata)
+        data = json.dumps(record, ensure_ascii=False).encode('utf-8')
+
+        previous = path.stat().st_size if path.exists() else 0
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        temp_path.replace(path)
+
+        self.total_bytes += len(data) - previous
+        self.stats["writes"] += 1
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def delete(self, key: str) -> bool:
+        """Remove one entry; returns True if it was cached."""
+        path = self._path(key)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except OSError:
+            return False
+        self.total_bytes -= size
+        self.stats["invalidations"] += 1
+        return True
+
+    def evict(self):
+        """Remove least recently used entries until the cache is under the target size."""
+        target = self.max_bytes * EVICT_TO_RATIO
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        self.total_bytes = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if self.total_bytes <= target:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            self.total_bytes -= size
+            self.stats["evictions"] += 1
+
+    def summary(self) -> str:
+        """One-line hit/miss summary."""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        hit_rate = self.stats["hits"] / lookups if lookups else 0.0
+        return (
+            f"{self.stats['hits']} hit(s), {self.stats['misses']} miss(es) ({hit_rate:.0%} hit rate), "
+            f"{self.stats['writes']} write(s), {self.stats['evictions']} eviction(s), "
+            f"{self.stats['invalidations']} invalidated, "
+            f"{self.total_bytes / (1024 * 1024):.1f} MB on disk"
+        )
+
+
+class CachedResponse:
+    """Minimal stand-in for a model response served from the cache."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.cached = True
+
+    # Replayed streams arrive as a single chunk
+    def __iter__(self):
+        yield self
+
+    async def __aiter__(self):
+        yield self
+
+
+class CachingStream:
+    """
+    Pass a streamed response through, caching its text once it has been read
+    to the end. Streams abandoned part-way (e.g. rejected as malformed) are not cached.
+    """
+
+    def __init__(self, response, on_complete):
+        self.response = response
+        self.on_complete = on_complete
+        self.parts = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def __iter__(self):
+        for chunk in self.response:
+            self.parts.append(chunk.text)
+            yield chunk
+        self.on_complete(self.text)
+
+    async def __aiter__(self):
+        async for chunk in self.response:
+            self.parts.append(chunk.text)
+            yield chunk
+        self.on_complete(self.text)
+
+
+class CachedModel:
+    """
+    Wrap a model so generate_content()/generate_content_async() go through a ResponseCache.
+
+    Args:
+        model: Object with generate_content (and optionally generate_content_async)
+        model_name: Name included in the cache key
+        cache: ResponseCache to read and write
+        cache_only: Never call the model; raise CacheMissError on a miss
+    """
+
+    def __init__(self, model, model_name: str, cache: ResponseCache, cache_only: bool = False):
+        self.model = model
+        self.model_name = model_name
+        self.cache = cache
+        self.cache_only = cache_only
+
+    def _lookup(self, prompt: str, kwargs: Dict[str, Any]):
+        key = self._key(prompt, kwargs)
+        text = self.cache.get(key)
+        if text is None and self.cache_only:
+            raise CacheMissError(f"Response not cached (key {key[:12]})")
+        return key, text
+
+    def _key(self, prompt: str, kwargs: Dict[str, Any]) -> str:
+        return make_cache_key(
+            self.model_name,
+            prompt,
+            kwargs.get("generation_config"),
+            kwargs.get("safety_settings"),
+        )
+
+    def _store(self, key: str, response, stream: bool = False):
+        if stream:
+            return CachingStream(response, lambda text: self.cache.put(key, text, {"model": self.model_name}))
+        # Only cache responses that produced text (blocked responses raise here)
+        self.cache.put(key, response.text, {"model": self.model_name})
+        return response
+
+    def generate_content(self, prompt: str, **kwargs):
+        key, text = self._lookup(prompt, kwargs)
+        if text is not None:
+            return CachedResponse(text)
+        response = self.model.generate_content(prompt, **kwargs)
+        return self._store(key, response, kwargs.get("stream", False))
+
+    async def generate_content_async(self, prompt: str, **kwargs):
+        key, text = self._lookup(prompt, kwargs)
+        if text is not None:
+            return CachedResponse(text)
+        response = await self.model.generate_content_async(prompt, **kwargs)
+        return self._store(key, response, kwargs.get("stream", False))
+
+    def invalidate(self, prompt: str, **kwargs) -> bool:
+        """Drop the cached response for a request (same arguments as generate_content)."""
+        return self.cache.delete(self._key(prompt, kwargs))
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for a Gemini GenerativeModel, for offline testing and benchmarks.
+
+The enrichment scripts only rely on this model client interface:
+
+    model.generate_content(prompt, **kwargs) -> response with a .text attribute
+    await model.generate_content_async(prompt, **kwargs) -> the same
+    with stream=True: an iterable (async iterable for the async call) of chunks with .text
+    API failures raise exceptions whose message or status_code carries the HTTP status
+
+MockGeminiModel implements it without network access. It recognizes the
+analysis and domain prompts (single and batched) and answers them with
+schema-valid synthetic JSON or domain names, after a sampled latency and with
+configurable rates of 429/500/503 errors and malformed responses.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+from .batching import BATCH_ITEM_KEY
+
+MOCK_MODEL_NAME = "mock-gemini"
+
+DOMAINS = [
+    "Design Secure Architectures",
+    "Design Resilient Architectures",
+    "Design High-Performing Architectures",
+    "Design Cost-Optimized Architectures",
+]
+
+ERROR_MESSAGES = {
+    429: "429 Resource has been exhausted (e.g. check quota).",
+    500: "500 An internal error has occurred.",
+    503: "503 The service is currently unavailable.",
+}
+
+LATENCY_KINDS = ("fixed", "uniform", "lognormal")
+STREAM_CHUNK_CHARS = 200  # Characters per streamed chunk
+FIRST_CHUNK_SHARE = 0.3  # Share of a streamed request's latency spent before the first chunk
+PROSE_PREFIX = "Sure! Here is the detailed analysis you asked for:\n\n"
+Z_99 = 2.326  # 99th percentile of the standard normal distribution
+
+ITEM_PATTERN = re.compile(r"^=== ITEM (\d+) ===$", re.MULTILINE)
+CORRECT_PATTERN = re.compile(r"^Correct Answer\(s\): \[([\d, ]*)\]", re.MULTILINE)
+OPTION_PATTERN = re.compile(r"^(\d+)\. ", re.MULTILINE)
+
+
+class MockAPIError(Exception):
+    """Injected API failure; the message starts with the HTTP status like real errors."""
+
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        message = ERROR_MESSAGES.get(status_code, f"{status_code} Mock error")
+        if retry_after is not None:
+            message += f" Please retry in {retry_after:.2f}s."
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class MockResponse:
+    """Minimal response object with the generated text."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class LatencyModel:
+    """
+    Request latency distribution.
+
+    Args:
+        kind: "fixed" (always median), "uniform" (symmetric around the median,
+            up to p99) or "lognormal" (long tail with the given median and p99)
+        median_ms: Median latency in milliseconds
+        p99_ms: 99th percentile latency in milliseconds
+        per_item_ms: Extra latency per additional question in a batched prompt
+    """
+
+    def __init__(self, kind: str = "lognormal", median_ms: float = 800, p99_ms: float = 4000, per_item_ms: float = 0):
+        if kind not in LATENCY_KINDS:
+            raise ValueError(f"Unknown latency kind '{kind}' (choose from {', '.join(LATENCY_KINDS)})")
+        self.kind = kind
+        self.median_ms = median_ms
+        self.p99_ms = max(p99_ms, median_ms)
+        self.per_item_ms = per_item_ms
+
+    def sample(self, rng: random.Random, items: int = 1) -> float:
+        """Sample one latency in seconds."""
+        if self.kind == "fixed":
+            latency_ms = self.median_ms
+        elif self.kind == "uniform":
+            latency_ms = rng.uniform(max(0.0, 2 * self.median_ms - self.p99_ms), self.p99_ms)
+        else:
+            sigma = math.log(self.p99_ms / self.median_ms) / Z_99 if self.median_ms > 0 else 0.0
+            latency_ms = self.median_ms * math.exp(sigma * rng.gauss(0, 1))
+        return (latency_ms + self.per_item_ms * max(0, items - 1)) / 1000.0
+
+
+def _split_items(prompt: str) -> List[str]:
+    """Question blocks of a prompt (one block for single-question prompts)."""
+    starts = [m.end() for m in ITEM_PATTERN.finditer(prompt)]
+    if not starts:
+        return [prompt]
+    ends = [m.start() for m in ITEM_PATTERN.finditer(prompt)][1:] + [len(prompt)]
+    return [prompt[start:end] for start, end in zip(starts, ends)]
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha1(text.encode('utf-8')).hexdigest()[:8], 16)
+
+
+def synthetic_domain(block: str) -> str:
+    """Deterministic domain for a question block."""
+    return DOMAINS[_digest(block) % len(DOMAINS)]
+
+
+def synthetic_analysis(block: str) -> Dict[str, Any]:
+    """Schema-valid analysis for a question block, explaining every option."""
+    match = CORRECT_PATTERN.search(block)
+    correct = [int(n) for n in match.group(1).split(",") if n.strip()] if match else []
+    options = sorted({int(n) for n in OPTION_PATTERN.findall(block)})
+    label = f"#{_digest(block) % 10000:04d}"
+    return {
+        "analysis": f"Synthetic analysis of question {label}: the scenario calls for a managed, well-architected solution.",
+        "correct_explanations": {
+            str(i): f"This is correct because it meets the stated requirements (mock {label}/{i})." for i in correct
+        },
+        "incorrect_explanations": {
+            str(i): f"This does not meet the requirements (mock {label}/{i})." for i in options if i not in correct
+        },
+        "aws_concepts": ["Amazon S3", "AWS IAM"],
+        "best_practices": ["Apply least privilege", "Prefer managed services"],
+        "key_takeaways": f"Synthetic takeaway for question {label}.",
+    }
+
+
+def synthetic_response(prompt: str) -> str:
+    """Answer an analysis or domain prompt, single or batched."""
+    is_domain_prompt = "AWS SAA-C03 Domains" in prompt
+    blocks = _split_items(prompt)
+    batched = ITEM_PATTERN.search(prompt) is not None
+
+    if is_domain_prompt and not batched:
+        return synthetic_domain(blocks[0])
+    if is_domain_prompt:
+        return json.dumps([
+            {BATCH_ITEM_KEY: i, "domain": synthetic_domain(block)} for i, block in enumerate(blocks, 1)
+        ])
+    if not batched:
+        return json.dumps(synthetic_analysis(blocks[0]), indent=2)
+    return json.dumps(
+        [dict({BATCH_ITEM_KEY: i}, **synthetic_analysis(block)) for i, block in enumerate(blocks, 1)],
+        indent=2,
+    )
+
+
+class MockGeminiModel:
+    """
+    Offline model client with configurable latency and failure injection.
+
+    Args:
+        latency: LatencyModel (defaults to lognormal, 800 ms median, 4 s p99)
+        error_rates: Probability of each injected status code per request,
+            e.g. {429: 0.05, 503: 0.01}
+        malformed_rate: Probability that a successful response is truncated
+            (JSON cut off mid-document, or a chatty non-answer for domain prompts)
+        quota_rpm: If set, requests beyond this many in any 60 seconds fail
+            with 429 and a "retry in Ns" hint like a real quota (counted as
+            "quota" in stats, separately from injected 429s)
+        time_scale: Multiplier for sleeps, e.g. 0.01 to run 100x faster
+        seed: Random seed for reproducible runs
+
+    The stats attribute counts calls and outcomes; request_log keeps
+    (prompt digest, start, end, outcome) for every call.
+    """
+
+    def __init__(
+        self,
+        latency: Optional[LatencyModel] = None,
+        error_rates: Optional[Dict[int, float]] = None,
+        malformed_rate: float = 0.0,
+        quota_rpm: Optional[float] = None,
+        time_scale: float = 1.0,
+        seed: Optional[int] = None,
+    ):
+        self.latency = latency or LatencyModel()
+        self.error_rates = {int(code): rate for code, rate in (error_rates or {}).items() if rate > 0}
+        self.malformed_rate = malformed_rate
+        self.quota_rpm = quota_rpm
+        self.time_scale = time_scale
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.recent_starts: deque = deque()
+        self.stats: Counter = Counter()
+        self.request_log: List[tuple] = []
+
+    def _plan(self, prompt: str):
+        """Draw latency and outcome for one request (thread-safe)."""
+        items = max(1, len(ITEM_PATTERN.findall(prompt)))
+        with self.lock:
+            now = time.monotonic()
+            latency = self.latency.sample(self.rng, items) * self.time_scale
+            outcome = "ok"
+            retry_after = None
+            if self.quota_rpm:
+                window = 60.0 * self.time_scale
+                while self.recent_starts and now - self.recent_starts[0] > window:
+                    self.recent_starts.popleft()
+                if len(self.recent_starts) >= self.quota_rpm:
+                    outcome = "quota"
+                    retry_after = self.recent_starts[0] + window - now
+                    latency = min(latency, 0.05 * self.time_scale)  # Quota errors return fast
+                else:
+                    self.recent_starts.append(now)
+            if outcome == "ok":
+                draw = self.rng.random()
+                for code, rate in self.error_rates.items():
+                    if draw < rate:
+                        outcome = code
+                        break
+                    draw -= rate
+            if outcome == "ok" and self.rng.random() < self.malformed_rate:
+                outcome = "malformed"
+            self.stats["calls"] += 1
+            self.stats[str(outcome)] += 1
+        return now, latency, outcome, retry_after
+
+    def _log(self, prompt: str, started: float, outcome):
+        with self.lock:
+            self.request_log.append((_digest(prompt), started, time.monotonic(), outcome))
+
+    def _response_text(self, prompt: str, outcome, retry_after: Optional[float]) -> str:
+        """Response text for a planned outcome; raises the injected error, if any."""
+        if outcome == "quota":
+            raise MockAPIError(429, retry_after)
+        if outcome not in ("ok", "malformed"):
+            raise MockAPIError(outcome)
+        text = synthetic_response(prompt)
+        if outcome == "malformed":
+            if not text.lstrip().startswith(("{", "[")):
+                text = "It depends on the primary focus of the scenario."
+            elif _digest(prompt) % 2:
+                text = text[: len(text) // 2]  # Cut off mid-document
+            else:
+                text = PROSE_PREFIX + text  # Chatty preamble before the JSON
+        return text
+
+    def _finish(self, prompt: str, started: float, outcome, retry_after: Optional[float]):
+        self._log(prompt, started, outcome)
+        return MockResponse(self._response_text(prompt, outcome, retry_after))
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        started, latency, outcome, retry_after = self._plan(prompt)
+        if stream:
+            return MockStream(self, prompt, started, latency, outcome, retry_after)
+        time.sleep(latency)
+        return self._finish(prompt, started, outcome, retry_after)
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        started, latency, outcome, retry_after = self._plan(prompt)
+        if stream:
+            return MockStream(self, prompt, started, latency, outcome, retry_after)
+        await asyncio.sleep(latency)
+        return self._finish(prompt, started, outcome, retry_after)
+
+
+class MockStream:
+    """
+    Streamed mock response: the first chunk arrives after FIRST_CHUNK_SHARE of
+    the sampled latency and the rest are spread over the remainder. Injected
+    errors are raised before the first chunk. The request is logged when the
+    stream ends or is abandoned.
+    """
+
+    def __init__(self, model: MockGeminiModel, prompt: str, started: float, latency: float, outcome, retry_after):
+        self.model = model
+        self.prompt = prompt
+        self.started = started
+        self.latency = latency
+        self.outcome = outcome
+        self.retry_after = retry_after
+        self.parts: List[str] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self.parts)
+
+    def _chunks(self) -> List[str]:
+        try:
+            text = self.model._response_text(self.prompt, self.outcome, self.retry_after)
+        except MockAPIError:
+            self.model._log(self.prompt, self.started, self.outcome)
+            raise
+        return [text[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(text), STREAM_CHUNK_CHARS)] or [""]
+
+    def _delays(self, count: int) -> List[float]:
+        first = self.latency * FIRST_CHUNK_SHARE
+        rest = (self.latency - first) / max(1, count - 1)
+        return [first] + [rest] * (count - 1)
+
+    def __iter__(self):
+        time.sleep(self.latency * FIRST_CHUNK_SHARE)
+        chunks = self._chunks()
+        try:
+            for delay, chunk in zip(self._delays(len(chunks)), chunks):
+                if self.parts:
+                    time.sleep(delay)
+                self.parts.append(chunk)
+                yield MockResponse(chunk)
+        finally:
+            self.model._log(self.prompt, self.started, self.outcome)
+
+    async def __aiter__(self):
+        await asyncio.sleep(self.latency * FIRST_CHUNK_SHARE)
+        chunks = self._chunks()
+        try:
+            for delay, chunk in zip(self._delays(len(chunks)), chunks):
+                if self.parts:
+                    await asyncio.sleep(delay)
+                self.parts.append(chunk)
+                yield MockResponse(chunk)
+        finally:
+            self.model._log(self.prompt, self.started, self.outcome)
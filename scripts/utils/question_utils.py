@@ -8,8 +8,9 @@ import json
 import os
 import shutil
 import re
+import hashlib
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional, Set
+from typing import Dict, Iterable, List, Tuple, Optional, Set
 from collections import defaultdict
 
 
@@ -74,6 +75,75 @@ def get_question_signature(question: Dict) -> str:
     return signature
 
 
+# "**Why option 2 is correct:**" / "**Why option 0 is incorrect:**" section headers
+EXPLANATION_SECTION_HEADER = re.compile(r'\*\*Why option (\d+) is (correct|incorrect):\*\*[ \t]*\n?')
+
+
+def split_explanation_sections(explanation: str) -> List[Tuple[int, str, str]]:
+    """
+    Split an explanation into its per-option sections.
+    
+    Args:
+        explanation: Explanation text using "**Why option X is correct/incorrect:**" headers
+        
+    Returns:
+        List of (option_id, "correct" or "incorrect", section_text) tuples;
+        text before the first header is ignored
+    """
+    if not explanation:
+        return []
+    
+    matches = list(EXPLANATION_SECTION_HEADER.finditer(explanation))
+    sections = []
+    for i, match in enumerate(matches):
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(explanation)
+        sections.append((int(match.group(1)), match.group(2), explanation[match.end():end].strip()))
+    return sections
+
+
+def get_question_fingerprint(question: Dict) -> str:
+    """
+    Create a short, stable fingerprint for a question from its signature.
+    Unlike Python's built-in hash(), this is identical across processes and runs.
+    
+    Args:
+        question: Question dictionary
+        
+    Returns:
+        16-character hex digest
+    """
+    signature = get_question_signature(question)
+    return hashlib.sha1(signature.encode('utf-8')).hexdigest()[:16]
+
+
+def get_text_digest(text: str) -> str:
+    """
+    Create a short, stable digest of normalized text.
+    Used to match records that only store question text (no options).
+    
+    Args:
+        text: Raw text
+        
+    Returns:
+        16-character hex digest
+    """
+    return hashlib.sha1(normalize_text(text).encode('utf-8')).hexdigest()[:16]
+
+
+def get_test_number(test_name: str) -> int:
+    """
+    Extract the test number from a test name or file stem (e.g. "test12" -> 12).
+    
+    Args:
+        test_name: Test name, file stem or file name
+        
+    Returns:
+        Test number, or a large number for non-numeric names so they sort last
+    """
+    test_num_str = test_name.replace(".json", "").replace("test", "")
+    return int(test_num_str) if test_num_str.isdigit() else 999
+
+
 def find_test_files(questions_dir: Path, exclude_backups: bool = True) -> List[Path]:
     """
     Find all test JSON files in the questions directory.
@@ -166,6 +236,108 @@ def save_questions_file(file_path: Path, questions: List[Dict], create_backup: b
         return False
 
 
+# Top-level keys of a combined file written by json.dump(..., indent=2)
+_TOP_LEVEL_KEY = re.compile(r'^  ("(?:[^"\\]|\\.)*"): ', re.MULTILINE)
+
+
+def _index_combined_file(text: str) -> Optional[List[Tuple[str, int, int]]]:
+    """
+    Locate each top-level value in a combined tests file without parsing it.
+    
+    Args:
+        text: File content written by json.dump(data, indent=2)
+        
+    Returns:
+        List of (key, value_start, value_end) character spans, or None if the
+        file is not in the expected layout
+    """
+    body = text.rstrip()
+    if not body.startswith("{\n") or not body.endswith("\n}"):
+        return None
+    
+    matches = list(_TOP_LEVEL_KEY.finditer(body))
+    spans = []
+    for i, match in enumerate(matches):
+        start = match.end()
+        if i + 1 < len(matches):
+            end = matches[i + 1].start() - 2  # strip ",\n" before the next key
+            if body[end:end + 2] != ",\n":
+                return None
+        else:
+            end = len(body) - 2  # strip "\n}"
+        value = body[start:end]
+        if not (value.startswith("[") and value.endswith("]")):
+            return None
+        spans.append((json.loads(match.group(1)), start, end))
+    return spans
+
+
+def update_combined_tests_file(
+    file_path: Path,
+    updated_tests: Dict[str, List[Dict]],
+    removed_tests: Iterable[str] = (),
+) -> bool:
+    """
+    Update selected tests in a combined file such as all_tests.json.
+    Serialized bytes of unchanged tests are spliced in as-is; only the updated
+    tests are re-serialized. Falls back to a full load and rewrite if the file
+    is not in the layout written by save_questions_file().
+    
+    Args:
+        file_path: Path to the combined tests file
+        updated_tests: Mapping of test key to its new question list
+        removed_tests: Test keys to drop from the file
+        
+    Returns:
+        True if successful, False otherwise
+    """
+    try:
+        text = file_path.read_text(encoding='utf-8')
+    except Exception as e:
+        print(f"❌ Error reading {file_path.name}: {e}")
+        return False
+    
+    spans = _index_combined_file(text)
+    if spans is None:
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError as e:
+            print(f"❌ Error parsing {file_path.name}: {e}")
+            return False
+        data.update(updated_tests)
+        for key in removed_tests:
+            data.pop(key, None)
+        return save_questions_file(file_path, data, create_backup=False)
+    
+    def serialize(questions: List[Dict]) -> str:
+        # Nested one level deep inside the top-level object
+        return json.dumps(questions, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+    
+    entries = []
+    seen = set(removed_tests)
+    for key, start, end in spans:
+        if key in seen:
+            continue
+        seen.add(key)
+        value = serialize(updated_tests[key]) if key in updated_tests else text[start:end]
+        entries.append(f"  {json.dumps(key, ensure_ascii=False)}: {value}")
+    for key, questions in updated_tests.items():
+        if key not in seen:
+            entries.append(f"  {json.dumps(key, ensure_ascii=False)}: {serialize(questions)}")
+    
+    temp_path = file_path.with_suffix(".json.tmp")
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write("{\n" + ",\n".join(entries) + "\n}")
+        temp_path.replace(file_path)
+        return True
+    except Exception as e:
+        print(f"❌ Error saving {file_path.name}: {e}")
+        if temp_path.exists():
+            temp_path.unlink()
+        return False
+
+
 def load_all_questions(questions_dir: Path) -> Dict[str, List[Tuple[str, int, Dict]]]:
     """
     Load all questions from all test JSON files.
@@ -211,6 +383,33 @@ def load_all_questions(questions_dir: Path) -> Dict[str, List[Tuple[str, int, Di
     return question_map
 
 
+def load_question_records(questions_dir: Path, test_files: Optional[List[Path]] = None) -> List[Tuple[str, int, Dict]]:
+    """
+    Load every question as a flat list of records, in test file order.
+    
+    Args:
+        questions_dir: Path to questions directory
+        test_files: Optional subset of test files (defaults to all test files)
+        
+    Returns:
+        List of (test_name, question_id, question_dict) tuples
+    """
+    if test_files is None:
+        test_files = find_test_files(questions_dir)
+    
+    records = []
+    for test_file in test_files:
+        questions = load_questions_file(test_file)
+        if questions is None:
+            continue
+        
+        for question in questions:
+            if isinstance(question, dict) and question.get("id") is not None:
+                records.append((test_file.stem, question["id"], question))
+    
+    return records
+
+
 def find_duplicates(question_map: Dict[str, List[Tuple[str, int, Dict]]]) -> Dict[str, List[Tuple[str, int]]]:
     """
     Find duplicate questions (signatures that appear more than once).
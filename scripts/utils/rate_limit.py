@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Token-bucket rate limiting for API clients.
+A RateLimiter combines a requests-per-minute and a tokens-per-minute bucket and
+can be shared by threads (acquire) or asyncio tasks (acquire_async).
+"""
+
+import asyncio
+import threading
+import time
+from typing import Optional, Tuple
+
+# Rough size of a prompt in model tokens (about 4 characters per token)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text."""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+class TokenBucket:
+    """
+    Bucket refilled continuously at rate_per_minute, holding at most capacity.
+    Not thread-safe on its own; RateLimiter serializes access.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0  # per second
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount is available (0 if it is available now)."""
+        self._refill(now)
+        # Requests larger than the bucket are let through once it is full
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self.tokens -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """
+    Shared requests-per-minute and tokens-per-minute limiter.
+
+    Either limit can be None to disable it. Each acquire() takes one request
+    and the estimated token count, waiting until both buckets allow it.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = threading.Lock()
+        self.waited = 0.0  # Total seconds callers spent waiting
+
+    def _try_acquire(self, tokens: int) -> float:
+        """Take capacity if available; otherwise return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    wait = max(wait, bucket.wait_time(amount, now))
+            if wait > 0:
+                return wait
+            for bucket, amount in ((self.requests, 1), (self.tokens, tokens)):
+                if bucket is not None:
+                    bucket.take(amount)
+            return 0.0
+
+    def acquire(self, tokens: int = 0):
+        """Block the calling thread until a request of this size is allowed."""
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            self.waited += wait
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens: int = 0):
+        """Wait (without blocking the event loop) until a request of this size is allowed."""
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            self.waited += wait
+            await asyncio.sleep(wait)
+
+    def wait_time(self, tokens: int = 0) -> float:
+        """Seconds until a request of this size would be allowed (nothing is taken)."""
+        with self._lock:
+            now = time.monotonic()
+            return max(
+                [bucket.wait_time(amount, now) for bucket, amount in ((self.requests, 1), (self.tokens, tokens)) if bucket],
+                default=0.0,
+            )
+
+    def headroom(self) -> float:
+        """Available share of the tighter bucket, from 0 (exhausted) to 1 (full or unlimited)."""
+        with self._lock:
+            now = time.monotonic()
+            shares = [1.0]
+            for bucket in (self.requests, self.tokens):
+                if bucket is not None:
+                    bucket._refill(now)
+                    shares.append(max(0.0, bucket.tokens) / bucket.capacity)
+            return min(shares)
+
+    def limits(self) -> Tuple[Optional[float], Optional[float]]:
+        """Configured (requests_per_minute, tokens_per_minute)."""
+        return (
+            self.requests.rate * 60 if self.requests else None,
+            self.tokens.rate * 60 if self.tokens else None,
+        )
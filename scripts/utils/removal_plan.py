@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Two-phase duplicate removal: build a reviewable removal plan, then apply it.
+A plan records the location and fingerprint of every question to remove and
+the copy that is kept, so it can be reviewed, re-applied and run in CI.
+"""
+
+import json
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .question_utils import (
+    get_question_fingerprint,
+    get_test_number,
+    load_questions_file,
+    save_questions_file,
+)
+
+PLAN_VERSION = 1
+
+
+def build_removal_plan(
+    clusters: Sequence[List[int]],
+    records: Sequence[Tuple[str, int, Dict]],
+    locations: Sequence[Tuple[Path, int]],
+    include_similar: bool = False,
+) -> Dict:
+    """
+    Build a removal plan from duplicate clusters.
+
+    Args:
+        clusters: Member index lists from cluster_duplicates() (canonical first)
+        records: (test_name, question_id, question) per index
+        locations: (test_file, question_index) per index
+        include_similar: Whether near duplicates were clustered (recorded in the plan)
+
+    Returns:
+        Plan dictionary mapping each affected test to its removals
+    """
+    removals = defaultdict(list)
+
+    for members in clusters:
+        keep_test, keep_id, keep_question = records[members[0]]
+        keep = {
+            "test": keep_test,
+            "id": keep_id,
+            "fingerprint": get_question_fingerprint(keep_question),
+        }
+        for member in members[1:]:
+            test_name, q_id, question = records[member]
+            removals[test_name].append({
+                "index": locations[member][1],
+                "id": q_id,
+                "fingerprint": get_question_fingerprint(question),
+                "keep": keep,
+            })
+
+    tests = {}
+    for test_name in sorted(removals, key=get_test_number):
+        tests[test_name] = sorted(removals[test_name], key=lambda r: r["index"])
+
+    return {
+        "version": PLAN_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "strategy": "keep-lowest-test",
+        "include_similar": include_similar,
+        "removal_count": sum(len(r) for r in tests.values()),
+        "tests": tests,
+    }
+
+
+def save_removal_plan(plan: Dict, plan_path: Path):
+    """Write a removal plan to disk."""
+    with open(plan_path, 'w', encoding='utf-8') as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+
+
+def load_removal_plan(plan_path: Path) -> Dict:
+    """
+    Load and validate a removal plan.
+
+    Raises:
+        ValueError: If the file is not a supported removal plan
+    """
+    with open(plan_path, 'r', encoding='utf-8') as f:
+        plan = json.load(f)
+
+    if not isinstance(plan, dict) or plan.get("version") != PLAN_VERSION or not isinstance(plan.get("tests"), dict):
+        raise ValueError(f"{plan_path} is not a version {PLAN_VERSION} removal plan")
+    return plan
+
+
+def _locate_question(questions: List[Dict], entry: Dict) -> Optional[int]:
+    """
+    Find the index of a planned removal (or kept copy) in the current question list.
+    The planned index is tried first; if the file changed since planning, the
+    question is looked up by fingerprint and ID. Returns None when it is gone.
+    """
+    def matches(question) -> bool:
+        return (
+            isinstance(question, dict)
+            and question.get("id") == entry["id"]
+            and get_question_fingerprint(question) == entry["fingerprint"]
+        )
+
+    index = entry.get("index")
+    if isinstance(index, int) and 0 <= index < len(questions) and matches(questions[index]):
+        return index
+
+    for idx, question in enumerate(questions):
+        if matches(question):
+            return idx
+    return None
+
+
+def apply_removal_plan(
+    plan: Dict,
+    questions_dir: Path,
+    dry_run: bool = False,
+    loaded_tests: Optional[Dict[str, List[Dict]]] = None,
+) -> Tuple[Dict[str, List[Dict]], Dict[str, int]]:
+    """
+    Apply a removal plan, touching only the affected test files.
+
+    Args:
+        plan: Plan from build_removal_plan() or load_removal_plan()
+        questions_dir: Path to questions directory
+        dry_run: Report what would change without writing files
+        loaded_tests: Optional already-loaded questions per test name, to avoid re-reading files
+
+    Returns:
+        Tuple of (updated_tests, stats) where updated_tests maps test name to its
+        new question list (only for tests that changed) and stats counts
+        removed, already_applied, keep_missing (the kept copy is no longer
+        there, so the duplicate stays) and failed entries
+    """
+    loaded_tests = dict(loaded_tests or {})
+    updated_tests = {}
+    stats = {"removed": 0, "already_applied": 0, "keep_missing": 0, "failed": 0}
+
+    def current_questions(test_name: str) -> Optional[List[Dict]]:
+        if test_name in updated_tests:
+            return updated_tests[test_name]
+        if test_name not in loaded_tests:
+            loaded_tests[test_name] = load_questions_file(questions_dir / f"{test_name}.json")
+        return loaded_tests[test_name]
+
+    for test_name, removals in plan["tests"].items():
+        test_file = questions_dir / f"{test_name}.json"
+        questions = current_questions(test_name)
+        if questions is None:
+            print(f"  ⚠️  Warning: {test_file.name} could not be loaded, skipping {len(removals)} removal(s)")
+            stats["failed"] += len(removals)
+            continue
+
+        indices_to_remove = set()
+        for removal in removals:
+            idx = _locate_question(questions, removal)
+            if idx is None:
+                stats["already_applied"] += 1
+                continue
+            # Never remove a duplicate whose kept copy was edited or removed since planning
+            keep = removal["keep"]
+            keep_questions = questions if keep["test"] == test_name else current_questions(keep["test"])
+            if keep_questions is None or _locate_question(keep_questions, keep) is None:
+                print(f"  ⚠️  Warning: kept copy {keep['test']} #{keep['id']} changed or was removed, not removing {test_name} #{removal['id']}")
+                stats["keep_missing"] += 1
+                continue
+            indices_to_remove.add(idx)
+
+        if not indices_to_remove:
+            continue
+
+        unique_questions = [q for idx, q in enumerate(questions) if idx not in indices_to_remove]
+        stats["removed"] += len(indices_to_remove)
+
+        if dry_run:
+            print(f"  [DRY RUN] Would remove {len(indices_to_remove)} duplicate(s) from {test_file.name}")
+            continue
+
+        if save_questions_file(test_file, unique_questions, create_backup=True):
+            print(f"Cleaned {test_file.name}: removed {len(indices_to_remove)} duplicate(s), kept {len(unique_questions)} questions")
+            updated_tests[test_name] = unique_questions
+        else:
+            stats["removed"] -= len(indices_to_remove)
+            stats["failed"] += len(indices_to_remove)
+
+    return updated_tests, stats
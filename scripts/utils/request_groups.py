@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Grouping of pending model requests by question content.
+
+The same question often appears verbatim in several tests. Pending work is
+grouped by request_key() (content fingerprint plus correct answers, which
+both the analysis and the domain prompts include), only the first item of
+each group is sent to the model, and its result is fanned out to the rest
+with a record of which question it was computed for:
+
+    for representative, *copies in group_duplicates(work, lambda item: request_key(item[2])):
+        ...
+"""
+
+from typing import Callable, Dict, Iterable, List, TypeVar
+
+from .analysis_index import answers_content_key
+from .question_utils import get_question_fingerprint
+
+T = TypeVar("T")
+
+
+def request_key(question: Dict) -> str:
+    """Key shared by questions a single model request can answer for."""
+    return answers_content_key(get_question_fingerprint(question), question.get("correctAnswers"))
+
+
+def group_duplicates(items: Iterable[T], key: Callable[[T], str]) -> List[List[T]]:
+    """
+    Items grouped by key, in order of first occurrence.
+
+    Returns:
+        Groups; the first item of each is the one to send, the others are its copies
+    """
+    groups: Dict[str, List[T]] = {}
+    for item in items:
+        groups.setdefault(key(item), []).append(item)
+    return list(groups.values())
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Shared retry controller for model API calls.
+One RetryController is shared by every in-flight request of a run, so a rate
+limit seen by one request pauses all of them, repeated server errors open a
+circuit breaker for everyone, and each question gets a bounded retry budget.
+
+    retry = RetryController(base_delay=5, max_attempts=10)
+    response = retry.call(lambda: model.generate_content(prompt))
+    response = await retry.call_async(lambda: model.generate_content_async(prompt))
+"""
+
+import asyncio
+import random
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Type
+
+RATE_LIMIT = "rate_limit"
+SERVER_ERROR = "server_error"
+CLIENT_ERROR = "client_error"  # Not retried (bad request, auth, not found)
+MALFORMED = "malformed"  # Unusable response text: retried at once, nothing to back off from
+OTHER_ERROR = "other"
+
+DEFAULT_BASE_DELAY = 5.0
+DEFAULT_MAX_DELAY = 60.0
+DEFAULT_MAX_ATTEMPTS = 10
+DEFAULT_QUESTION_BUDGET = 300.0  # Seconds one call may spend retrying
+DEFAULT_BREAKER_THRESHOLD = 5  # Consecutive server errors that open the circuit
+DEFAULT_BREAKER_COOLDOWN = 60.0
+
+RETRYABLE_SERVER_CODES = {500, 502, 503, 504}
+STATUS_PATTERN = re.compile(r"\b(4\d\d|5\d\d)\b")
+RATE_LIMIT_MARKERS = ("resourceexhausted", "resource has been exhausted", "quota", "rate limit", "too many requests")
+MALFORMED_MARKERS = ("malformed response",)
+SERVER_MARKERS = ("serviceunavailable", "internalservererror", "deadlineexceeded", "deadline exceeded", "service is currently unavailable")
+RETRY_AFTER_PATTERNS = [
+    re.compile(r"retry[_ ]delay\s*\{\s*seconds:\s*(\d+)", re.IGNORECASE),  # google.rpc.RetryInfo
+    re.compile(r"retry in\s*([\d.]+)\s*s", re.IGNORECASE),
+    re.compile(r"retry-after:?\s*([\d.]+)", re.IGNORECASE),
+]
+
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of an API error from its attributes, or the first status-like number in its message."""
+    for attr in ("status_code", "code"):
+        value = getattr(error, attr, None)
+        if isinstance(value, int) and 400 <= value < 600:
+            return value
+    match = STATUS_PATTERN.search(str(error))
+    return int(match.group(1)) if match else None
+
+
+def classify_error(error: BaseException) -> str:
+    """Classify an API error as RATE_LIMIT, SERVER_ERROR, CLIENT_ERROR, MALFORMED or OTHER_ERROR."""
+    text = f"{type(error).__name__} {error}".lower()
+    if any(marker in text for marker in MALFORMED_MARKERS):
+        return MALFORMED  # Checked first: the response text may contain status-like numbers
+    code = get_status_code(error)
+    if code == 429 or any(marker in text for marker in RATE_LIMIT_MARKERS):
+        return RATE_LIMIT
+    if code in RETRYABLE_SERVER_CODES or any(marker in text for marker in SERVER_MARKERS):
+        return SERVER_ERROR
+    if code is not None and 400 <= code < 500:
+        return CLIENT_ERROR
+    return OTHER_ERROR
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """Server-suggested wait in seconds (Retry-After header, RetryInfo or message hint), or None."""
+    value = getattr(error, "retry_after", None)
+    if value is None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is not None:
+            try:
+                value = headers.get("Retry-After")
+            except AttributeError:
+                value = None
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            pass
+    text = str(error)
+    for pattern in RETRY_AFTER_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def _init_trace(trace: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    trace = trace if trace is not None else {}
+    trace.update(attempts=0, errors=[], paused_s=0.0, backoff_s=0.0)
+    return trace
+
+
+class RetryController:
+    """
+    Retry policy and shared backoff state for all requests of a run.
+
+    Args:
+        base_delay: First backoff delay in seconds (doubled per attempt)
+        max_delay: Cap for a single backoff delay
+        max_attempts: Attempts per call (first try included)
+        question_budget: Seconds a single call may spend on retries before giving up
+        breaker_threshold: Consecutive server errors that open the circuit
+        breaker_cooldown: Seconds the circuit stays open before requests resume
+        no_retry: Exception types re-raised immediately (e.g. cache misses)
+        seed: Random seed for the backoff jitter
+        verbose: Print retry, pause and circuit messages
+
+    Rate limits pause every request until a jittered backoff (or the server's
+    Retry-After hint) has passed. Server errors are retried with backoff, and
+    after breaker_threshold in a row the circuit opens: all requests wait for
+    the cooldown, then the next success closes it again.
+    """
+
+    def __init__(
+        self,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+        question_budget: float = DEFAULT_QUESTION_BUDGET,
+        breaker_threshold: int = DEFAULT_BREAKER_THRESHOLD,
+        breaker_cooldown: float = DEFAULT_BREAKER_COOLDOWN,
+        no_retry: Tuple[Type[BaseException], ...] = (),
+        seed: Optional[int] = None,
+        verbose: bool = True,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max(1, max_attempts)
+        self.question_budget = question_budget
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.no_retry = tuple(no_retry)
+        self.verbose = verbose
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.pause_until = 0.0
+        self.rate_limit_streak = 0
+        self.server_error_streak = 0
+        self.circuit_open_until = 0.0
+        self.stats: Counter = Counter()
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def backoff(self, exponent: int) -> float:
+        """Jittered exponential delay: uniformly between half and all of base * 2**exponent (capped)."""
+        delay = min(self.max_delay, self.base_delay * (2 ** max(0, exponent)))
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def wait_time(self) -> float:
+        """Seconds every request must wait now (shared rate-limit pause or open circuit)."""
+        with self.lock:
+            now = time.monotonic()
+            return max(0.0, self.pause_until - now, self.circuit_open_until - now)
+
+    def record_success(self):
+        """Reset the failure streaks; closes the circuit if it was open."""
+        with self.lock:
+            if self.server_error_streak >= self.breaker_threshold:
+                self._log("🔌 Circuit closed: requests are succeeding again")
+            self.rate_limit_streak = 0
+            self.server_error_streak = 0
+            self.stats["successes"] += 1
+
+    def record_failure(self, error: BaseException, attempt: int, started: float) -> Optional[float]:
+        """
+        Update the shared state after a failed attempt.
+
+        Args:
+            error: Exception raised by the attempt
+            attempt: Zero-based attempt number of this call
+            started: time.monotonic() when this call started
+
+        Returns:
+            Seconds to wait before retrying this call, or None to give up
+        """
+        kind = classify_error(error)
+        hint = get_retry_after(error)
+        with self.lock:
+            now = time.monotonic()
+            self.stats[kind] += 1
+            if kind == CLIENT_ERROR:
+                delay = None
+            elif kind == MALFORMED:
+                delay = 0.0
+            elif kind == RATE_LIMIT:
+                # Only the first 429 after a pause escalates it; requests that were
+                # already in flight when the pause started just wait it out
+                if now >= self.pause_until:
+                    self.rate_limit_streak += 1
+                    pause = hint if hint is not None else self.backoff(self.rate_limit_streak - 1)
+                    self.pause_until = now + pause
+                    self.stats["pauses"] += 1
+                    self._log(f"\n⏸️  Rate limited: pausing all requests for {pause:.1f}s")
+                elif hint is not None and now + hint > self.pause_until:
+                    self.pause_until = now + hint
+                # Spread retries out so paused requests do not all resume at once
+                pause_left = self.pause_until - now
+                delay = pause_left + self.rng.uniform(0, pause_left * 0.1)
+            elif kind == SERVER_ERROR:
+                self.server_error_streak += 1
+                delay = hint if hint is not None else self.backoff(attempt)
+                # Open on reaching the threshold, and re-open on a failure after the cooldown
+                if self.server_error_streak >= self.breaker_threshold and now >= self.circuit_open_until:
+                    self.circuit_open_until = now + self.breaker_cooldown
+                    self.stats["circuit_opens"] += 1
+                    self._log(
+                        f"\n🔌 Circuit open after {self.server_error_streak} server errors in a row: "
+                        f"pausing all requests for {self.breaker_cooldown:.0f}s"
+                    )
+            else:
+                delay = hint if hint is not None else self.backoff(0)
+
+            if delay is not None and attempt + 1 >= self.max_attempts:
+                delay = None
+            if delay is not None and now + max(delay, self.circuit_open_until - now) - started > self.question_budget:
+                delay = None
+            if delay is None:
+                self.stats["give_ups"] += 1
+            else:
+                self.stats["retries"] += 1
+
+        if delay is None:
+            self._log(f"\n❌ Giving up after {attempt + 1} attempt(s): {str(error)[:150]}")
+        elif kind == MALFORMED:
+            self._log(f"\n⚠️  {str(error)[:150]}. Retrying (attempt {attempt + 1}/{self.max_attempts})...")
+        elif kind != RATE_LIMIT:
+            self._log(
+                f"\n⚠️  {kind.replace('_', ' ').capitalize()}: {str(error)[:100]}. "
+                f"Retrying in {delay:.1f}s (attempt {attempt + 1}/{self.max_attempts})..."
+            )
+        return delay
+
+    def call(self, fn: Callable[[], Any], trace: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Call fn with retries, waiting on the shared state between attempts.
+
+        Args:
+            fn: Makes one attempt
+            trace: Optional dict filled with attempts, error classes and the
+                seconds spent paused (shared pause or open circuit) and in backoff
+
+        Raises:
+            The last exception once retries are exhausted (or immediately for
+            no_retry types and non-retryable client errors)
+        """
+        trace = _init_trace(trace)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = self.wait_time()
+            while wait > 0:
+                time.sleep(wait)
+                trace["paused_s"] += wait
+                wait = self.wait_time()
+            trace["attempts"] += 1
+            try:
+                result = fn()
+            except self.no_retry:
+                raise
+            except Exception as e:
+                trace["errors"].append(classify_error(e))
+                delay = self.record_failure(e, attempt, started)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                trace["backoff_s"] += delay
+                attempt += 1
+                continue
+            self.record_success()
+            return result
+
+    async def call_async(self, fn: Callable[[], Awaitable[Any]], trace: Optional[Dict[str, Any]] = None) -> Any:
+        """Async variant of call(); fn returns a new awaitable per attempt."""
+        trace = _init_trace(trace)
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            wait = self.wait_time()
+            while wait > 0:
+                await asyncio.sleep(wait)
+                trace["paused_s"] += wait
+                wait = self.wait_time()
+            trace["attempts"] += 1
+            try:
+                result = await fn()
+            except self.no_retry:
+                raise
+            except Exception as e:
+                trace["errors"].append(classify_error(e))
+                delay = self.record_failure(e, attempt, started)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                trace["backoff_s"] += delay
+                attempt += 1
+                continue
+            self.record_success()
+            return result
+
+    def summary(self) -> str:
+        """One-line retry summary."""
+        return (
+            f"{self.stats['retries']} retry(ies), {self.stats[RATE_LIMIT]} rate limit(s), "
+            f"{self.stats[SERVER_ERROR]} server error(s), {self.stats[MALFORMED]} malformed response(s), "
+            f"{self.stats['pauses']} shared pause(s), "
+            f"{self.stats['circuit_opens']} circuit open(s), {self.stats['give_ups']} gave up"
+        )
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Priority scheduling of enrichment work under a request or time budget.
+
+Work items from all test files go into one heap and are handed out highest
+priority first (file order among equal priorities) until the queue is empty
+or the budget is spent, so a run limited by quota does the most valuable
+work first:
+
+    counter = RequestCounter(model)
+    scheduler = PriorityScheduler(WorkBudget(max_requests=200, requests_used=lambda: counter.requests))
+    scheduler.push(score, item)
+    for batch in scheduler.batches(5):
+        ...
+"""
+
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+
+class RequestCounter:
+    """Model wrapper counting the requests that reach the API (below the response cache)."""
+
+    def __init__(self, model):
+        self.model = model
+        self.requests = 0
+
+    def generate_content(self, prompt, **kwargs):
+        self.requests += 1
+        return self.model.generate_content(prompt, **kwargs)
+
+    async def generate_content_async(self, prompt, **kwargs):
+        self.requests += 1
+        return await self.model.generate_content_async(prompt, **kwargs)
+
+
+class WorkBudget:
+    """
+    Cap on the API requests and wall time a run may spend.
+
+    The budget is checked before each batch is handed out, so requests
+    already in flight (and their retries) may overshoot it slightly.
+
+    Args:
+        max_requests: Maximum API requests, or None for no limit
+        max_minutes: Maximum minutes from start(), or None for no limit
+        requests_used: Returns the API requests sent so far (e.g. a RequestCounter's count)
+    """
+
+    def __init__(
+        self,
+        max_requests: Optional[int] = None,
+        max_minutes: Optional[float] = None,
+        requests_used: Optional[Callable[[], int]] = None,
+    ):
+        self.max_requests = max_requests
+        self.max_minutes = max_minutes
+        self.requests_used = requests_used or (lambda: 0)
+        self.started: Optional[float] = None
+
+    @property
+    def limited(self) -> bool:
+        return self.max_requests is not None or self.max_minutes is not None
+
+    def start(self):
+        """Start the clock (the first exhausted() check starts it otherwise)."""
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def elapsed_minutes(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (time.monotonic() - self.started) / 60
+
+    def exhausted(self) -> Optional[str]:
+        """Why the budget is spent, or None while work may continue."""
+        self.start()
+        if self.max_requests is not None and self.requests_used() >= self.max_requests:
+            return f"request budget of {self.max_requests} spent"
+        if self.max_minutes is not None and self.elapsed_minutes() >= self.max_minutes:
+            return f"time budget of {self.max_minutes:g} min spent"
+        return None
+
+    def describe(self) -> str:
+        parts = []
+        if self.max_requests is not None:
+            parts.append(f"{self.requests_used()}/{self.max_requests} requests")
+        if self.max_minutes is not None:
+            parts.append(f"{self.elapsed_minutes():.1f}/{self.max_minutes:g} min")
+        return ", ".join(parts) or "unlimited"
+
+
+class PriorityScheduler:
+    """
+    Max-priority queue of work items with an optional budget.
+
+    Args:
+        budget: Budget checked before each batch; None for no limit
+    """
+
+    def __init__(self, budget: Optional[WorkBudget] = None):
+        self.budget = budget or WorkBudget()
+        self.heap: List[Tuple[float, int, Any]] = []
+        self.sequence = itertools.count()  # Keeps insertion order among equal priorities
+        self.stopped: Optional[str] = None
+
+    def push(self, priority: float, item: Any):
+        heapq.heappush(self.heap, (-priority, next(self.sequence), item))
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def pop_batch(self, size: int) -> List[Any]:
+        """
+        Up to size highest-priority items; empty once the queue is drained or
+        the budget is spent (the reason is kept in stopped).
+        """
+        if not self.heap:
+            return []
+        reason = self.budget.exhausted()
+        if reason:
+            self.stopped = reason
+            return []
+        count = min(max(1, size), len(self.heap))
+        return [heapq.heappop(self.heap)[2] for _ in range(count)]
+
+    def batches(self, size: int) -> Iterator[List[Any]]:
+        """Yield batches in priority order until the queue is drained or the budget is spent."""
+        while True:
+            batch = self.pop_batch(size)
+            if not batch:
+                return
+            yield batch
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+64-bit SimHash fingerprints and a Hamming-distance index.
+Used to find near-identical text (e.g. copy-pasted or templated explanation
+sections) without comparing every pair of texts.
+"""
+
+import hashlib
+import re
+from collections import Counter
+from typing import Dict, Hashable, Iterable, List, Set, Tuple
+
+from .duplicate_clusters import UnionFind
+from .test_overlap import popcount
+
+SIMHASH_BITS = 64
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def text_features(text: str, shingle_size: int = 3) -> Counter:
+    """
+    Extract weighted word shingles from text.
+
+    Args:
+        text: Raw text (lowercased and tokenized here)
+        shingle_size: Words per shingle; shorter texts use a single shingle
+
+    Returns:
+        Counter of shingle -> occurrence count
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) <= shingle_size:
+        return Counter([" ".join(words)]) if words else Counter()
+    return Counter(
+        " ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)
+    )
+
+
+# Bit-parallel accumulation: each hash bit is spread into its own 32-bit lane
+# of a big integer, so summing spread hashes counts set bits for all 64
+# positions in a single addition.
+_LANE_BITS = 32
+_LANE_MASK = (1 << _LANE_BITS) - 1
+_BYTE_SPREAD = [
+    sum(((byte >> i) & 1) << (i * _LANE_BITS) for i in range(8)) for byte in range(256)
+]
+
+
+def _spread_feature(feature: str, cache: Dict[str, int]) -> int:
+    spread = cache.get(feature)
+    if spread is None:
+        # blake2b is stable across processes, unlike the built-in hash()
+        value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+        spread = 0
+        for k in range(8):
+            spread |= _BYTE_SPREAD[(value >> (8 * k)) & 0xFF] << (8 * k * _LANE_BITS)
+        cache[feature] = spread
+    return spread
+
+
+def simhash64(features: Counter, cache: Dict[str, int] = None) -> int:
+    """
+    Compute a 64-bit SimHash from weighted features.
+
+    Args:
+        features: Counter of feature -> weight
+        cache: Optional dict reused across calls to memoize feature hashes
+
+    Returns:
+        64-bit fingerprint (0 for empty input)
+    """
+    if cache is None:
+        cache = {}
+    lanes = 0
+    total = 0
+    for feature, weight in features.items():
+        lanes += _spread_feature(feature, cache) * weight
+        total += weight
+
+    # A bit is set when the features with that bit set outweigh the rest
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        if 2 * ((lanes >> (bit * _LANE_BITS)) & _LANE_MASK) > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints."""
+    return popcount(a ^ b)
+
+
+class SimHashIndex:
+    """
+    Index of SimHash fingerprints for Hamming-distance queries.
+
+    Fingerprints are split into max_distance + 1 bands; by the pigeonhole
+    principle, two fingerprints within max_distance bits agree exactly on at
+    least one band, so only items sharing a band bucket are compared.
+    """
+
+    def __init__(self, max_distance: int = 3):
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.band_bits = -(-SIMHASH_BITS // self.band_count)  # ceil division
+        self.band_mask = (1 << self.band_bits) - 1
+        self.buckets: List[Dict[int, List[Hashable]]] = [dict() for _ in range(self.band_count)]
+        self.fingerprints: Dict[Hashable, int] = {}
+
+    def _bands(self, fingerprint: int) -> Iterable[Tuple[int, int]]:
+        for band in range(self.band_count):
+            yield band, fingerprint >> (band * self.band_bits) & self.band_mask
+
+    def add(self, item_id: Hashable, fingerprint: int):
+        """Add an item to the index."""
+        self.fingerprints[item_id] = fingerprint
+        for band, key in self._bands(fingerprint):
+            self.buckets[band].setdefault(key, []).append(item_id)
+
+    def query(self, fingerprint: int) -> List[Tuple[Hashable, int]]:
+        """
+        Find indexed items within max_distance of a fingerprint.
+
+        Returns:
+            List of (item_id, distance)
+        """
+        seen: Set[Hashable] = set()
+        results = []
+        for band, key in self._bands(fingerprint):
+            for item_id in self.buckets[band].get(key, ()):
+                if item_id in seen:
+                    continue
+                seen.add(item_id)
+                distance = hamming_distance(fingerprint, self.fingerprints[item_id])
+                if distance <= self.max_distance:
+                    results.append((item_id, distance))
+        return results
+
+    def near_duplicate_pairs(self) -> List[Tuple[Hashable, Hashable, int]]:
+        """
+        Find all pairs of indexed items within max_distance of each other.
+
+        Returns:
+            List of (item_a, item_b, distance), each pair reported once
+        """
+        pairs = []
+        seen_pairs: Set[Tuple[Hashable, Hashable]] = set()
+        for band_buckets in self.buckets:
+            for members in band_buckets.values():
+                for i, item_a in enumerate(members):
+                    fingerprint_a = self.fingerprints[item_a]
+                    for item_b in members[i + 1:]:
+                        if (item_a, item_b) in seen_pairs:
+                            continue
+                        seen_pairs.add((item_a, item_b))
+                        distance = hamming_distance(fingerprint_a, self.fingerprints[item_b])
+                        if distance <= self.max_distance:
+                            pairs.append((item_a, item_b, distance))
+        return pairs
+
+
+def cluster_fingerprints(fingerprints: List[int], max_distance: int = 3) -> Iterable[List[int]]:
+    """
+    Group items whose fingerprints are within max_distance bits of each other.
+
+    Identical fingerprints are collapsed before indexing, so heavily repeated
+    (templated) texts cost one index entry instead of one pair per copy.
+
+    Args:
+        fingerprints: SimHash fingerprint per item
+        max_distance: Maximum Hamming distance for two items to be linked
+
+    Yields:
+        Item index lists (connected components) with at least two members
+    """
+    items_by_fingerprint: Dict[int, List[int]] = {}
+    for idx, fingerprint in enumerate(fingerprints):
+        items_by_fingerprint.setdefault(fingerprint, []).append(idx)
+
+    unique = list(items_by_fingerprint)
+    index = SimHashIndex(max_distance)
+    for pos, fingerprint in enumerate(unique):
+        index.add(pos, fingerprint)
+
+    uf = UnionFind(len(unique))
+    for a, b, _ in index.near_duplicate_pairs():
+        uf.union(a, b)
+
+    clusters: Dict[int, List[int]] = {}
+    for pos, fingerprint in enumerate(unique):
+        clusters.setdefault(uf.find(pos), []).extend(items_by_fingerprint[fingerprint])
+
+    for members in clusters.values():
+        if len(members) > 1:
+            yield sorted(members)
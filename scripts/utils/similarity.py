@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Vectorized TF-IDF cosine similarity engine for the question bank.
+Builds a TF-IDF matrix over normalized question and option text and computes
+cosine similarities in memory-bounded row blocks.
+
+Requires numpy. scipy is used for a sparse matrix when installed; otherwise a
+dense float32 matrix is used.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:
+    np = None  # type: ignore
+
+try:
+    from scipy import sparse  # type: ignore
+except ImportError:
+    sparse = None  # type: ignore
+
+from .question_utils import normalize_text, normalize_question_text
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024  # Upper bound for one block of similarity scores
+
+
+def require_numpy():
+    """Raise a helpful error if numpy is not installed."""
+    if np is None:
+        raise ImportError(
+            "numpy is required for similarity reports. "
+            "Install it with: pip install -r scripts/requirements_analysis.txt"
+        )
+
+
+def question_document(question: Dict) -> str:
+    """
+    Build the text document used to vectorize a question.
+
+    Args:
+        question: Question dictionary
+
+    Returns:
+        Normalized question text followed by normalized option texts
+    """
+    parts = [normalize_question_text(question)]
+    for opt in sorted(question.get("options", []), key=lambda x: x.get("id", 0)):
+        parts.append(normalize_text(opt.get("text", "")))
+    return " ".join(part for part in parts if part)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split normalized text into word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def build_tfidf_matrix(
+    documents: Sequence[str],
+    min_df: int = 1,
+    max_df_ratio: float = 1.0,
+):
+    """
+    Build an L2-normalized TF-IDF matrix (sublinear tf, smoothed idf).
+
+    Args:
+        documents: Document strings, one per row
+        min_df: Ignore terms that appear in fewer documents than this
+        max_df_ratio: Ignore terms that appear in more than this fraction of documents
+
+    Returns:
+        Tuple of (matrix, vocabulary) where matrix is a scipy CSR matrix when
+        scipy is installed and a dense float32 ndarray otherwise
+    """
+    require_numpy()
+
+    tokenized = [Counter(tokenize(doc)) for doc in documents]
+    n_docs = len(tokenized)
+
+    doc_freq = Counter()
+    for counts in tokenized:
+        doc_freq.update(counts.keys())
+
+    max_df = max_df_ratio * n_docs
+    vocabulary = {}
+    for term in sorted(doc_freq):
+        if min_df <= doc_freq[term] <= max_df:
+            vocabulary[term] = len(vocabulary)
+
+    idf = np.empty(len(vocabulary), dtype=np.float32)
+    for term, col in vocabulary.items():
+        idf[col] = math.log((1 + n_docs) / (1 + doc_freq[term])) + 1.0
+
+    rows, cols, values = [], [], []
+    for row, counts in enumerate(tokenized):
+        for term, count in counts.items():
+            col = vocabulary.get(term)
+            if col is not None:
+                rows.append(row)
+                cols.append(col)
+                values.append(1.0 + math.log(count))
+
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float32) * idf[cols]
+
+    # L2-normalize each row so that dot products are cosine similarities
+    norms = np.zeros(n_docs, dtype=np.float32)
+    np.add.at(norms, rows, values * values)
+    norms = np.sqrt(norms)
+    norms[norms == 0] = 1.0
+    values /= norms[rows]
+
+    shape = (n_docs, len(vocabulary))
+    if sparse is not None:
+        matrix = sparse.csr_matrix((values, (rows, cols)), shape=shape, dtype=np.float32)
+    else:
+        matrix = np.zeros(shape, dtype=np.float32)
+        matrix[rows, cols] = values
+
+    return matrix, vocabulary
+
+
+def iter_similarity_blocks(matrix, block_bytes: int = DEFAULT_BLOCK_BYTES) -> Iterator[Tuple[int, "np.ndarray"]]:
+    """
+    Yield cosine similarity scores one block of rows at a time.
+
+    Args:
+        matrix: Row-normalized matrix from build_tfidf_matrix()
+        block_bytes: Memory budget for one block of float32 scores
+
+    Yields:
+        (start_row, scores) where scores has shape (block_rows, n_rows)
+    """
+    n_rows = matrix.shape[0]
+    block_rows = max(1, block_bytes // max(1, n_rows * 4))
+    transposed = matrix.T
+
+    for start in range(0, n_rows, block_rows):
+        block = matrix[start:start + block_rows] @ transposed
+        if sparse is not None and sparse.issparse(block):
+            block = block.toarray()
+        yield start, np.asarray(block, dtype=np.float32)
+
+
+def compute_similarities(
+    matrix,
+    top_k: int = 5,
+    threshold: Optional[float] = None,
+    group_ids: Optional[Sequence[str]] = None,
+    block_bytes: int = DEFAULT_BLOCK_BYTES,
+) -> Tuple[List[List[Tuple[int, float]]], List[Tuple[int, int, float]]]:
+    """
+    Compute top-k neighbours per row and all pairs above a threshold in one pass.
+
+    Args:
+        matrix: Row-normalized matrix from build_tfidf_matrix()
+        top_k: Number of neighbours to keep per row (0 to skip)
+        threshold: Minimum similarity for the pair list (None to skip)
+        group_ids: Optional identity key per row; rows sharing a key (e.g. exact
+            duplicates) are never reported as neighbours or pairs of each other
+        block_bytes: Memory budget for one block of float32 scores
+
+    Returns:
+        Tuple of (neighbours, pairs):
+        - neighbours[i] is a list of (j, score) sorted by descending score
+        - pairs is a list of (i, j, score) with i < j, sorted by descending score
+    """
+    require_numpy()
+
+    n_rows = matrix.shape[0]
+    top_k = min(top_k, max(0, n_rows - 1))
+    groups = None
+    if group_ids is not None:
+        group_index: Dict[str, int] = {}
+        groups = np.fromiter(
+            (group_index.setdefault(key, len(group_index)) for key in group_ids),
+            dtype=np.int64,
+            count=n_rows,
+        )
+
+    neighbours: List[List[Tuple[int, float]]] = []
+    pairs: List[Tuple[int, int, float]] = []
+
+    for start, block in iter_similarity_blocks(matrix, block_bytes):
+        block_rows = block.shape[0]
+        row_ids = np.arange(start, start + block_rows)
+
+        # Never match a row with itself or with rows in the same group
+        block[np.arange(block_rows), row_ids] = -1.0
+        if groups is not None:
+            block[groups[row_ids][:, None] == groups[None, :]] = -1.0
+
+        if threshold is not None:
+            # Only the upper triangle, so each pair is reported once
+            hits_r, hits_c = np.nonzero(block >= threshold)
+            upper = hits_c > row_ids[hits_r]
+            for r, c in zip(hits_r[upper], hits_c[upper]):
+                pairs.append((int(start + r), int(c), float(block[r, c])))
+
+        if top_k > 0:
+            top = np.argpartition(-block, top_k - 1, axis=1)[:, :top_k]
+            top_scores = np.take_along_axis(block, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for cols, scores in zip(top, top_scores):
+                neighbours.append([
+                    (int(col), float(score)) for col, score in zip(cols, scores) if score > 0
+                ])
+
+    pairs.sort(key=lambda x: x[2], reverse=True)
+    return neighbours, pairs
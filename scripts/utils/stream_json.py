@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Incremental validation of JSON model responses.
+
+A StreamingJSONValidator is fed response chunks as they arrive and raises
+MalformedResponseError as soon as the text can no longer become the expected
+document, so a bad streamed response is abandoned (and retried) without
+waiting for the rest of it:
+
+    validator = StreamingJSONValidator(dict, {"aws_concepts": list})
+    for chunk in model.generate_content(prompt, stream=True):
+        validator.feed(chunk.text)
+    analysis = validator.finish()
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Type
+
+FENCE = "```"
+OPENING_CHARS = {str: '"', dict: "{", list: "["}
+TYPE_NAMES = {'"': "a string", "{": "an object", "[": "an array"}
+ROOT_NAMES = {"{": "object", "[": "array"}
+SCALAR_CHARS = set("0123456789+-.eE") | set("truefalsn")  # Numbers, true, false, null
+WHITESPACE = set(" \t\r\n")
+
+
+class MalformedResponseError(ValueError):
+    """A model response that cannot become a valid result; retried like a failed request."""
+
+
+class StreamingJSONValidator:
+    """
+    Incremental structural check of one JSON document arriving in chunks.
+
+    feed() raises MalformedResponseError as soon as the text is unrecoverable:
+    prose instead of JSON, mismatched brackets, stray characters, or a known
+    field whose value has the wrong type. finish() parses the complete
+    document. A leading ```json fence is skipped and anything after the
+    document (such as the closing fence) is ignored.
+
+    Args:
+        root: Expected top-level type (dict or list)
+        field_types: Expected types (str, dict or list) of known fields,
+            checked on the top-level object, or on each object of a
+            top-level array
+    """
+
+    def __init__(self, root: Type = dict, field_types: Optional[Dict[str, Type]] = None):
+        self.root_char = OPENING_CHARS[root]
+        self.field_types = {
+            field: OPENING_CHARS[kind] for field, kind in (field_types or {}).items() if kind in OPENING_CHARS
+        }
+        self.field_depth = 1 if root is dict else 2
+        self.text = ""
+        self.pos = 0
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self.stack: List[str] = []
+        self.expect_key: List[bool] = []  # Per open object: the next string is a field name
+        self.in_string = False
+        self.escape = False
+        self.key_start: Optional[int] = None
+        self.last_key: Optional[str] = None
+        self.awaiting_value = False
+
+    @property
+    def complete(self) -> bool:
+        """True once the top-level value has been closed."""
+        return self.end is not None
+
+    @property
+    def document(self) -> str:
+        """Text of the JSON document received so far (without fences or trailing text)."""
+        if self.start is None:
+            return ""
+        return self.text[self.start:self.end]
+
+    def _fail(self, reason: str):
+        raise MalformedResponseError(f"Malformed response: {reason}")
+
+    def feed(self, chunk: str):
+        """
+        Scan the next chunk of the response.
+
+        Raises:
+            MalformedResponseError: If the response can no longer be valid
+        """
+        self.text += chunk or ""
+        if self.complete:
+            return
+        if self.start is None and not self._find_start():
+            return
+        self._scan()
+
+    def _find_start(self) -> bool:
+        """Skip whitespace and a leading fence line; True once the document has started."""
+        while self.pos < len(self.text):
+            char = self.text[self.pos]
+            if char in WHITESPACE:
+                self.pos += 1
+                continue
+            rest = self.text[self.pos:]
+            if rest.startswith(FENCE) or FENCE.startswith(rest):
+                newline = rest.find("\n")
+                if newline < 0:
+                    return False  # Wait for the rest of the fence line
+                self.pos += newline + 1
+                continue
+            if char != self.root_char:
+                self._fail(f"starts with {rest[:40]!r} instead of {TYPE_NAMES[self.root_char]}")
+            self.start = self.pos
+            return True
+        return False
+
+    def _scan(self):
+        text = self.text
+        i = self.pos
+        while i < len(text):
+            char = text[i]
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.key_start is not None:
+                        self.last_key = text[self.key_start:i]
+                        self.key_start = None
+                i += 1
+                continue
+            if char in WHITESPACE:
+                i += 1
+                continue
+
+            in_object = bool(self.stack) and self.stack[-1] == "{"
+            if in_object and self.expect_key[-1] and char not in '"}:':
+                self._fail(f"expected a field name, got {char!r} at offset {i - self.start}")
+            if self.awaiting_value:
+                self.awaiting_value = False
+                expected = self.field_types.get(self.last_key)
+                if expected and char != expected:
+                    self._fail(f"field '{self.last_key}' should be {TYPE_NAMES[expected]}")
+
+            if char == '"':
+                self.in_string = True
+                if in_object and self.expect_key[-1] and len(self.stack) == self.field_depth:
+                    self.key_start = i + 1
+            elif char in "{[":
+                self.stack.append(char)
+                self.expect_key.append(char == "{")
+            elif char in "}]":
+                if not self.stack or self.stack[-1] != ("{" if char == "}" else "["):
+                    self._fail(f"unexpected {char!r} at offset {i - self.start}")
+                self.stack.pop()
+                self.expect_key.pop()
+                if not self.stack:
+                    self.end = i + 1
+                    self.pos = self.end
+                    return
+            elif char == ":":
+                if not (in_object and self.expect_key[-1]):
+                    self._fail(f"unexpected ':' at offset {i - self.start}")
+                self.expect_key[-1] = False
+                if len(self.stack) == self.field_depth:
+                    self.awaiting_value = True
+            elif char == ",":
+                if in_object:
+                    self.expect_key[-1] = True
+            elif char not in SCALAR_CHARS:
+                self._fail(f"unexpected {char!r} at offset {i - self.start}")
+            i += 1
+        self.pos = i
+
+    def finish(self) -> Any:
+        """
+        Parse the complete document.
+
+        Raises:
+            MalformedResponseError: If the response held no complete, valid document
+        """
+        if self.start is None:
+            self._fail(f"no JSON {ROOT_NAMES[self.root_char]} in the response")
+        if not self.complete:
+            self._fail(f"truncated after {len(self.document)} characters")
+        try:
+            # strict=False accepts raw newlines inside strings, which models often emit
+            return json.loads(self.document, strict=False)
+        except json.JSONDecodeError as e:
+            raise MalformedResponseError(f"Malformed response: invalid JSON: {e}") from e
+
+
+def parse_json_response(text: str, root: Type = dict, field_types: Optional[Dict[str, Type]] = None) -> Any:
+    """
+    Validate and parse a complete (non-streamed) response.
+
+    Raises:
+        MalformedResponseError: If the response is not the expected document
+    """
+    validator = StreamingJSONValidator(root, field_types)
+    validator.feed(text)
+    return validator.finish()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Synthetic question corpus generator for scale benchmarks.
+Produces test files in the questions/ schema whose text is sampled from a word
+bigram model trained on the real question bank, and plants exact, reordered
+and paraphrased duplicates at known rates. The planted duplicates are recorded
+in a ground-truth manifest so detectors can be scored.
+"""
+
+import json
+import random
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from .question_utils import get_question_fingerprint
+
+MANIFEST_FILE = "manifest.json"
+DUPLICATE_KINDS = ("exact", "reordered", "paraphrased")
+
+_START = "<s>"
+_END = "</s>"
+
+# Word substitutions used to paraphrase question text (applied case-sensitively)
+PARAPHRASE_SUBSTITUTIONS = {
+    "company": "organization",
+    "organization": "company",
+    "needs": "requires",
+    "requires": "needs",
+    "solution": "approach",
+    "application": "app",
+    "Which": "What",
+    "should": "must",
+    "must": "should",
+    "wants": "would like",
+    "data": "information",
+    "use": "utilize",
+    "MOST": "most",
+    "quickly": "rapidly",
+    "secure": "protected",
+    "store": "keep",
+    "users": "customers",
+}
+
+
+class BigramTextModel:
+    """Word bigram model used to sample realistic-looking sentences."""
+
+    def __init__(self, texts: Sequence[str]):
+        # Successor lists keep duplicates, so random.choice() samples by frequency
+        self.successors: Dict[str, List[str]] = defaultdict(list)
+        for text in texts:
+            words = text.split()
+            if not words:
+                continue
+            previous = _START
+            for word in words:
+                self.successors[previous].append(word)
+                previous = word
+            self.successors[previous].append(_END)
+
+    def sample(self, rng: random.Random, target_words: int) -> str:
+        """
+        Sample text of roughly target_words words.
+        Restarts from a sentence start whenever the chain ends early.
+        """
+        words = []
+        previous = _START
+        while len(words) < target_words:
+            candidates = self.successors.get(previous)
+            word = rng.choice(candidates) if candidates else _END
+            if word == _END:
+                previous = _START
+                continue
+            words.append(word)
+            previous = word
+        return " ".join(words)
+
+
+def _word_lengths(texts: Sequence[str]) -> List[int]:
+    lengths = [len(text.split()) for text in texts if text]
+    return lengths or [20]
+
+
+class CorpusProfile:
+    """
+    Text and shape distributions learned from a real question bank.
+    """
+
+    def __init__(self, questions: Sequence[Dict]):
+        question_texts = [q.get("text", "") for q in questions]
+        option_texts = [opt.get("text", "") for q in questions for opt in q.get("options", [])]
+
+        self.question_model = BigramTextModel(question_texts)
+        self.option_model = BigramTextModel(option_texts)
+        self.question_lengths = _word_lengths(question_texts)
+        self.option_lengths = _word_lengths(option_texts)
+        self.option_counts = [len(q.get("options", [])) for q in questions if q.get("options")] or [4]
+        self.correct_counts = [len(q.get("correctAnswers", [])) for q in questions if q.get("correctAnswers")] or [1]
+        self.domains = [q.get("domain") for q in questions if q.get("domain")] or ["Design Resilient Architectures"]
+
+    def sample_question(self, rng: random.Random, question_id: int) -> Dict:
+        """Sample a new question in the questions/ schema."""
+        option_count = max(2, rng.choice(self.option_counts))
+        correct_count = min(rng.choice(self.correct_counts), option_count - 1)
+        correct = set(rng.sample(range(option_count), correct_count))
+
+        options = [
+            {
+                "id": opt_id,
+                "text": self.option_model.sample(rng, rng.choice(self.option_lengths)),
+                "correct": opt_id in correct,
+            }
+            for opt_id in range(option_count)
+        ]
+        explanation = "\n\n".join(
+            f"**Why option {opt['id']} is {'correct' if opt['correct'] else 'incorrect'}:**\n"
+            + self.option_model.sample(rng, rng.choice(self.option_lengths) * 2)
+            for opt in options
+        )
+        return {
+            "id": question_id,
+            "text": self.question_model.sample(rng, rng.choice(self.question_lengths)),
+            "options": options,
+            "correctAnswers": sorted(correct),
+            "explanation": explanation,
+            "domain": rng.choice(self.domains),
+        }
+
+
+def reorder_options(question: Dict, rng: random.Random) -> Dict:
+    """
+    Copy a question with its options shuffled and renumbered.
+    The question text is unchanged but the option signature differs.
+    """
+    copy = json.loads(json.dumps(question))
+    options = copy["options"]
+    order = list(range(len(options)))
+    while len(order) > 1 and order == sorted(order):
+        rng.shuffle(order)
+    copy["options"] = [
+        {**options[old_id], "id": new_id} for new_id, old_id in enumerate(order)
+    ]
+    copy["correctAnswers"] = [opt["id"] for opt in copy["options"] if opt["correct"]]
+    return copy
+
+
+def paraphrase_question(question: Dict, rng: random.Random, max_edits: int = 3) -> Dict:
+    """
+    Copy a question with 1..max_edits small word-level edits to its text
+    (substitutions, adjacent swaps or a dropped word).
+    """
+    copy = json.loads(json.dumps(question))
+    words = copy["text"].split()
+    for _ in range(rng.randint(1, max_edits)):
+        if len(words) < 3:
+            break
+        substitutable = [i for i, word in enumerate(words) if word in PARAPHRASE_SUBSTITUTIONS]
+        edit = rng.random()
+        if substitutable and edit < 0.6:
+            i = rng.choice(substitutable)
+            words[i] = PARAPHRASE_SUBSTITUTIONS[words[i]]
+        elif edit < 0.85:
+            i = rng.randrange(len(words) - 1)
+            words[i], words[i + 1] = words[i + 1], words[i]
+        else:
+            del words[rng.randrange(len(words))]
+    text = " ".join(words)
+    if text == question["text"]:
+        text += " Select the best option."
+    copy["text"] = text
+    return copy
+
+
+def generate_corpus(
+    profile: CorpusProfile,
+    size: int,
+    questions_per_test: int = 65,
+    exact_rate: float = 0.02,
+    reordered_rate: float = 0.01,
+    paraphrased_rate: float = 0.02,
+    seed: int = 42,
+) -> Tuple[Dict[str, List[Dict]], Dict]:
+    """
+    Generate a synthetic corpus with planted duplicates.
+
+    Each planted duplicate copies an earlier question (exactly, with shuffled
+    options, or with a paraphrased text) into a random position of the corpus.
+
+    Args:
+        profile: Distributions learned from the real question bank
+        size: Total number of questions to generate
+        questions_per_test: Questions per test file
+        exact_rate: Fraction of questions that are exact copies
+        reordered_rate: Fraction that are copies with reordered options
+        paraphrased_rate: Fraction that are copies with paraphrased text
+        seed: Random seed (the same seed gives the same corpus)
+
+    Returns:
+        Tuple of (tests, manifest) where tests maps test name to its questions
+        and manifest records every planted duplicate
+    """
+    rng = random.Random(seed)
+    plan = (
+        ["exact"] * int(size * exact_rate)
+        + ["reordered"] * int(size * reordered_rate)
+        + ["paraphrased"] * int(size * paraphrased_rate)
+    )
+    plan += [None] * (size - len(plan))
+    rng.shuffle(plan)
+    # A copy needs an original earlier in the corpus
+    for pos in range(min(len(plan), 10)):
+        plan[pos] = None
+
+    questions: List[Dict] = []
+    planted = []
+    originals: List[int] = []  # positions of non-copy questions
+    seen_fingerprints = set()
+
+    for pos, kind in enumerate(plan):
+        question_id = pos % questions_per_test + 1
+        if kind is None:
+            question = profile.sample_question(rng, question_id)
+            # Resample the rare accidental collision so the ground truth stays exact
+            while get_question_fingerprint(question) in seen_fingerprints:
+                question = profile.sample_question(rng, question_id)
+            seen_fingerprints.add(get_question_fingerprint(question))
+            originals.append(pos)
+        else:
+            source_pos = rng.choice(originals)
+            source = questions[source_pos]
+            if kind == "exact":
+                question = json.loads(json.dumps(source))
+            elif kind == "reordered":
+                question = reorder_options(source, rng)
+            else:
+                question = paraphrase_question(source, rng)
+            question["id"] = question_id
+            planted.append((kind, source_pos, pos))
+        questions.append(question)
+
+    def location(pos: int) -> str:
+        return f"test{pos // questions_per_test + 1}-q{pos % questions_per_test + 1}"
+
+    tests = {}
+    for start in range(0, len(questions), questions_per_test):
+        tests[f"test{start // questions_per_test + 1}"] = questions[start:start + questions_per_test]
+
+    manifest = {
+        "seed": seed,
+        "size": size,
+        "questions_per_test": questions_per_test,
+        "rates": {"exact": exact_rate, "reordered": reordered_rate, "paraphrased": paraphrased_rate},
+        "planted_counts": dict(Counter(kind for kind, _, _ in planted)),
+        "duplicates": [
+            {"kind": kind, "original": location(source_pos), "copy": location(pos)}
+            for kind, source_pos, pos in planted
+        ],
+    }
+    return tests, manifest
+
+
+def write_corpus(output_dir: Path, tests: Dict[str, List[Dict]], manifest: Dict):
+    """Write test files and the ground-truth manifest to a directory."""
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for test_name, questions in tests.items():
+        with open(output_dir / f"{test_name}.json", 'w', encoding='utf-8') as f:
+            json.dump(questions, f, indent=2, ensure_ascii=False)
+    with open(output_dir / MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def load_manifest(corpus_dir: Path) -> Dict:
+    """Load the ground-truth manifest of a generated corpus."""
+    with open(corpus_dir / MANIFEST_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Per-request telemetry for the Gemini enrichment scripts.
+
+Every logical model call (all of its retry attempts) becomes one line in a
+local NDJSON file: queue wait, request latency, prompt/response size, token
+usage, attempts, error classes and the test files the prompt's questions
+belong to. telemetry_summary.py turns the file into latency percentiles,
+throughput, error rates and estimated cost per test file.
+
+    telemetry = Telemetry(Path("gemini_telemetry.ndjson"), "analyze", MODEL_NAME)
+    with telemetry_labels(tests=["test12"]):
+        call = telemetry.call("analysis", prompt)
+        ...
+        call.finish()
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .rate_limit import CHARS_PER_TOKEN
+
+TELEMETRY_FILE = "gemini_telemetry.ndjson"
+
+# USD per million (input, output) tokens; unknown models are estimated at the default
+MODEL_PRICES = {
+    "gemini-2.0-flash": (0.10, 0.40),
+}
+DEFAULT_MODEL_PRICE = MODEL_PRICES["gemini-2.0-flash"]
+
+_labels: ContextVar[Dict[str, Any]] = ContextVar("telemetry_labels", default={})
+
+
+@contextmanager
+def telemetry_labels(**labels):
+    """Attach labels (e.g. tests=[...] per question in the prompt) to the calls recorded inside the block."""
+    token = _labels.set({**_labels.get(), **labels})
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def usage_tokens(response: Any) -> Tuple[Optional[int], Optional[int]]:
+    """(prompt, response) token counts reported by the API, or None where unavailable."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return None, None
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    response_tokens = getattr(usage, "candidates_token_count", None)
+    return prompt_tokens or None, response_tokens or None
+
+
+def estimate_cost(model: str, prompt_tokens: int, response_tokens: int) -> float:
+    """Estimated USD cost of a request at the model's list price."""
+    price_in, price_out = MODEL_PRICES.get(model, DEFAULT_MODEL_PRICE)
+    return (prompt_tokens * price_in + response_tokens * price_out) / 1_000_000
+
+
+class CallRecorder:
+    """
+    Measurements for one logical model call, across all of its attempts.
+
+    The retry controller fills trace (attempts, error classes, pause and
+    backoff time); the caller reports rate-limiter waits with queued() and
+    each response with received(), then writes the record with finish().
+    """
+
+    def __init__(self, telemetry: "Telemetry", kind: str, prompt: str, items: int = 1):
+        self.telemetry = telemetry
+        self.kind = kind
+        self.items = items
+        self.prompt_chars = len(prompt)
+        self.labels = dict(_labels.get())
+        self.started = time.monotonic()
+        self.trace: Dict[str, Any] = {}
+        self.queue_wait = 0.0
+        self.latency: Optional[float] = None
+        self.response_chars = 0
+        self.tokens: Tuple[Optional[int], Optional[int]] = (None, None)
+        self.cached = False
+
+    def queued(self, seconds: float):
+        """Add time spent waiting on a client-side rate limiter."""
+        self.queue_wait += seconds
+
+    def received(self, attempt_started: float, text: str, response: Any):
+        """Record the response of the latest attempt."""
+        self.latency = time.monotonic() - attempt_started
+        self.response_chars = len(text or "")
+        self.tokens = usage_tokens(response)
+        self.cached = bool(getattr(response, "cached", False))
+
+    def finish(self, error_class: Optional[str] = None):
+        """Write the record; error_class is None for a successful call."""
+        prompt_tokens, response_tokens = self.tokens
+        estimated = prompt_tokens is None or response_tokens is None
+        # Cached responses and some streams carry no usage metadata: estimate from size
+        if prompt_tokens is None:
+            prompt_tokens = max(1, self.prompt_chars // CHARS_PER_TOKEN)
+        if response_tokens is None:
+            response_tokens = self.response_chars // CHARS_PER_TOKEN
+        attempts = self.trace.get("attempts", 1)
+        record = {
+            "ts": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "run": self.telemetry.run,
+            "script": self.telemetry.script,
+            "model": self.telemetry.model,
+            "kind": self.kind,
+            "items": self.items,
+            "queue_wait_s": round(self.queue_wait + self.trace.get("paused_s", 0.0), 4),
+            "backoff_s": round(self.trace.get("backoff_s", 0.0), 4),
+            "latency_s": round(self.latency, 4) if self.latency is not None else None,
+            "total_s": round(time.monotonic() - self.started, 4),
+            "prompt_chars": self.prompt_chars,
+            "response_chars": self.response_chars,
+            "prompt_tokens": prompt_tokens,
+            "response_tokens": response_tokens,
+            "tokens_estimated": estimated,
+            "cached": self.cached,
+            "attempts": attempts,
+            "retries": max(0, attempts - 1),
+            "errors": self.trace.get("errors", []),
+            "error_class": error_class,
+            "ok": error_class is None,
+        }
+        record.update(self.labels)
+        self.telemetry.write(record)
+
+
+class Telemetry:
+    """
+    Append-only NDJSON telemetry file shared by every request of a run.
+
+    Args:
+        path: NDJSON file to append to, or None to record nothing
+        script: Name of the script recording (e.g. "analyze")
+        model: Model name, used to price requests
+    """
+
+    def __init__(self, path: Optional[Path], script: str, model: str):
+        self.path = Path(path) if path else None
+        self.script = script
+        self.model = model
+        self.run = time.strftime("%Y-%m-%d %H:%M:%S")  # Groups the records of one run
+        self.lock = threading.Lock()
+        self.file = None
+        self.records = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def call(self, kind: str, prompt: str, items: int = 1) -> CallRecorder:
+        """Start measuring one logical model call."""
+        return CallRecorder(self, kind, prompt, items)
+
+    def write(self, record: Dict[str, Any]):
+        """Append one record (thread-safe); the file is opened on the first write."""
+        if not self.enabled:
+            return
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line)
+            self.file.flush()
+            self.records += 1
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def load_telemetry(path: Path) -> List[Dict[str, Any]]:
+    """
+    Read telemetry records, skipping lines that are not valid JSON
+    (e.g. the last line of a run that was killed mid-write).
+    """
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Cross-test overlap analysis using bitsets.
+Each test is a bitset over a global dictionary of question fingerprints, so
+pairwise overlap and Jaccard similarity reduce to AND/OR plus popcount.
+"""
+
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+
+def popcount(bits: int) -> int:
+    """Count set bits in a non-negative integer."""
+    try:
+        return bits.bit_count()
+    except AttributeError:  # Python < 3.10
+        return bin(bits).count("1")
+
+
+def build_test_bitsets(test_keys: Dict[str, Iterable[str]]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """
+    Build one bitset per test over a global fingerprint dictionary.
+
+    Args:
+        test_keys: Mapping of test name to the question fingerprints it contains
+
+    Returns:
+        Tuple of (bitsets, key_index) where bitsets maps test name to an int
+        bitset and key_index maps each distinct key to its bit position
+    """
+    key_index: Dict[str, int] = {}
+    bitsets: Dict[str, int] = {}
+
+    for test_name, keys in test_keys.items():
+        bits = 0
+        for key in keys:
+            if key:
+                bits |= 1 << key_index.setdefault(key, len(key_index))
+        bitsets[test_name] = bits
+
+    return bitsets, key_index
+
+
+def overlap_matrix(names: Sequence[str], bitsets: Dict[str, int]) -> Tuple[List[List[int]], List[List[float]]]:
+    """
+    Compute the N x N overlap and Jaccard matrices.
+
+    Args:
+        names: Test names in matrix order
+        bitsets: Bitsets from build_test_bitsets()
+
+    Returns:
+        Tuple of (overlap, jaccard). overlap[i][i] is the number of distinct
+        questions in test i; jaccard[i][i] is 1.0 for non-empty tests.
+    """
+    n = len(names)
+    sizes = [popcount(bitsets[name]) for name in names]
+    overlap = [[0] * n for _ in range(n)]
+    jaccard = [[0.0] * n for _ in range(n)]
+
+    for i in range(n):
+        bits_i = bitsets[names[i]]
+        overlap[i][i] = sizes[i]
+        jaccard[i][i] = 1.0 if sizes[i] else 0.0
+        for j in range(i + 1, n):
+            shared = popcount(bits_i & bitsets[names[j]])
+            union = sizes[i] + sizes[j] - shared
+            overlap[i][j] = overlap[j][i] = shared
+            jaccard[i][j] = jaccard[j][i] = shared / union if union else 0.0
+
+    return overlap, jaccard
+
+
+def greedy_cover(names: Sequence[str], bitsets: Dict[str, int]) -> List[Tuple[str, int]]:
+    """
+    Greedily pick tests until every distinct question is covered.
+    Each step picks the test that adds the most uncovered questions (ties go
+    to the earlier test in names), which is within a ln(n) factor of optimal.
+
+    Args:
+        names: Candidate test names
+        bitsets: Bitsets from build_test_bitsets()
+
+    Returns:
+        List of (test_name, newly_covered_count) in pick order
+    """
+    remaining = 0
+    for name in names:
+        remaining |= bitsets[name]
+
+    picks = []
+    candidates = list(names)
+    while remaining and candidates:
+        best = max(candidates, key=lambda name: popcount(bitsets[name] & remaining))
+        gained = popcount(bitsets[best] & remaining)
+        if gained == 0:
+            break
+        picks.append((best, gained))
+        remaining &= ~bitsets[best]
+        candidates.remove(best)
+
+    return picks
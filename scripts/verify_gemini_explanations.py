@@ -6,10 +6,14 @@ and not generic placeholder text
 
 import json
 import os
+import sys
 from pathlib import Path
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Mapping, Tuple
+
+# Import shared utilities
+sys.path.insert(0, str(Path(__file__).parent))
+from utils.analysis_store import ANALYSIS_DIR, AnalysisStore
 
-ANALYSIS_FILE = "analysis_output.json"
 QUESTIONS_DIR = "questions"
 
 # Generic explanation patterns to detect (exact matches)
@@ -63,7 +67,7 @@ def get_question_key(question: Dict[str, Any], test_key: str) -> str:
     return ""
 
 
-def verify_test_file(analysis_data: Dict[str, Any], test_file: str) -> Tuple[List[str], List[str], List[str]]:
+def verify_test_file(analysis_data: Mapping[str, Any], test_file: str) -> Tuple[List[str], List[str], List[str]]:
     """Verify a single test file"""
     test_path = Path(test_file)
     test_key = test_path.stem if test_path.stem.startswith("test") else None
@@ -105,10 +109,13 @@ def verify_test_file(analysis_data: Dict[str, Any], test_file: str) -> Tuple[Lis
 def main():
     """Main verification function"""
     
-    # Load analysis data
-    print(f"📂 Loading analysis from {ANALYSIS_FILE}...")
-    with open(ANALYSIS_FILE, 'r', encoding='utf-8') as f:
-        analysis_data = json.load(f)
+    # Only the store index is needed: verification checks which questions have analysis
+    print(f"📂 Loading analysis index from {ANALYSIS_DIR}/...")
+    analysis_data = AnalysisStore(ANALYSIS_DIR)
+    legacy = analysis_data.legacy_file()
+    if legacy is not None:
+        print(f"❌ {legacy} has not been migrated; run migrate_analysis_store.py first")
+        return 1
     print(f"✓ Loaded {len(analysis_data)} analysis entries\n")
     
     # Find all test files